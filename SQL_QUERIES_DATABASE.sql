@@ -71,7 +71,9 @@ CREATE TABLE contract (
     proposal_id BIGINT UNIQUE NOT NULL,
     client_id BIGINT NOT NULL,
     freelancer_id BIGINT NOT NULL,
-    total_amount_cents INTEGER,
+    total_amount_cents INTEGER DEFAULT 0,
+    paid_amount_cents INTEGER DEFAULT 0,
+    remaining_amount_cents INTEGER GENERATED ALWAYS AS (total_amount_cents - paid_amount_cents) STORED,
     status VARCHAR(20) DEFAULT 'active',
     FOREIGN KEY (proposal_id) REFERENCES proposal(proposal_id),
     FOREIGN KEY (client_id) REFERENCES users(user_id),
@@ -94,11 +96,48 @@ CREATE TABLE payment (
     payee_id BIGINT NOT NULL,
     amount_cents INTEGER NOT NULL,
     status VARCHAR(20),
+    released_at TIMESTAMP,
     FOREIGN KEY (contract_id) REFERENCES contract(contract_id),
     FOREIGN KEY (milestone_id) REFERENCES milestone(milestone_id),
     FOREIGN KEY (payer_id) REFERENCES users(user_id),
     FOREIGN KEY (payee_id) REFERENCES users(user_id)
 );
+-- foreign keys are not indexed automatically; the contract total triggers look these up
+CREATE INDEX idx_milestone_contract ON milestone(contract_id);
+CREATE INDEX idx_project_client ON project(client_id);
+-- keyset pagination orders (get_*_page in database.py)
+CREATE INDEX idx_freelancer_rating ON freelancer_profile(avg_rating, user_id);
+CREATE INDEX idx_project_deadline ON project((COALESCE(deadline, 'infinity'::date)), project_id);
+CREATE INDEX idx_proposal_project_bid ON proposal(project_id, bid_amount_cents, proposal_id);
+CREATE INDEX idx_payment_contract ON payment(contract_id);
+
+-- a milestone is paid out at most once
+CREATE UNIQUE INDEX uq_payment_released_milestone ON payment(milestone_id) WHERE status = 'released';
+
+-- milestones waiting to be released by the payment release workers (jobs/release_payments.py)
+CREATE TABLE payment_release_queue (
+    milestone_id BIGINT PRIMARY KEY,
+    enqueued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (milestone_id) REFERENCES milestone(milestone_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_payment_release_queue_enqueued ON payment_release_queue(enqueued_at);
+
+-- earnings ledger: released payment totals per payee, overall and per month,
+-- maintained by trg_payment_earnings_ledger so earnings lookups are point reads
+CREATE TABLE payee_earnings (
+    payee_id BIGINT PRIMARY KEY,
+    total_earned_cents BIGINT NOT NULL DEFAULT 0,
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (payee_id) REFERENCES users(user_id)
+);
+CREATE TABLE payee_earnings_monthly (
+    payee_id BIGINT,
+    month DATE,
+    earned_cents BIGINT NOT NULL DEFAULT 0,
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (payee_id, month),
+    FOREIGN KEY (payee_id) REFERENCES users(user_id)
+);
 CREATE TABLE review (
     review_id BIGSERIAL PRIMARY KEY,
     contract_id BIGINT NOT NULL,
@@ -273,6 +312,18 @@ VALUES
 (3,1,2,9,4,'Good communication'),
 (4,1,9,2,4,'Smooth project');
 
+-- the rows above use explicit ids, so move the sequences past them
+-- (otherwise the next generated id collides with id 1)
+SELECT setval(pg_get_serial_sequence('users', 'user_id'), (SELECT MAX(user_id) FROM users));
+SELECT setval(pg_get_serial_sequence('freelancer_profile', 'profile_id'), (SELECT MAX(profile_id) FROM freelancer_profile));
+SELECT setval(pg_get_serial_sequence('skill', 'skill_id'), (SELECT MAX(skill_id) FROM skill));
+SELECT setval(pg_get_serial_sequence('project', 'project_id'), (SELECT MAX(project_id) FROM project));
+SELECT setval(pg_get_serial_sequence('proposal', 'proposal_id'), (SELECT MAX(proposal_id) FROM proposal));
+SELECT setval(pg_get_serial_sequence('contract', 'contract_id'), (SELECT MAX(contract_id) FROM contract));
+SELECT setval(pg_get_serial_sequence('milestone', 'milestone_id'), (SELECT MAX(milestone_id) FROM milestone));
+SELECT setval(pg_get_serial_sequence('payment', 'payment_id'), (SELECT MAX(payment_id) FROM payment));
+SELECT setval(pg_get_serial_sequence('review', 'review_id'), (SELECT MAX(review_id) FROM review));
+
 
 
 
@@ -325,51 +376,196 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- to compute the Total Contract Value
-
+-- (contract.total_amount_cents is kept in sync by the trg_milestone_contract_totals_* triggers)
 CREATE OR REPLACE FUNCTION get_contract_total(cid BIGINT)
 RETURNS INTEGER AS $$
 BEGIN
     RETURN (
-        SELECT SUM(amount_cents)
-        FROM milestone
+        SELECT total_amount_cents
+        FROM contract
         WHERE contract_id = cid
     );
 END;
 $$ LANGUAGE plpgsql;
 
+-- to recompute the stored totals of one contract:
+-- total is the sum of its milestones (the accepted bid while it has none),
+-- paid is the sum of its released payments
+CREATE OR REPLACE FUNCTION refresh_contract_totals(cid BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    -- lock the contract first, so the sums below run on a snapshot taken after any
+    -- concurrent release or milestone change of this contract committed. NO KEY UPDATE
+    -- (the UPDATE's own lock) doesn't wait on the key-share locks of the foreign keys
+    -- of payment and milestone inserts, so concurrent inserts don't deadlock here
+    PERFORM 1 FROM contract WHERE contract_id = cid FOR NO KEY UPDATE;
+    UPDATE contract c
+    SET total_amount_cents = COALESCE(
+            (SELECT SUM(m.amount_cents) FROM milestone m WHERE m.contract_id = cid),
+            (SELECT p.bid_amount_cents FROM proposal p WHERE p.proposal_id = c.proposal_id),
+            0),
+        paid_amount_cents = COALESCE(
+            (SELECT SUM(pay.amount_cents) FROM payment pay
+             WHERE pay.contract_id = cid AND pay.status = 'released'),
+            0)
+    WHERE c.contract_id = cid;
+END;
+$$ LANGUAGE plpgsql;
+
 
 --Procedures:
--- to Accept Proposal & Create Contract
-CREATE OR REPLACE PROCEDURE accept_proposal(p_proposal_id BIGINT)
+-- to Accept Proposal & Create Contract; returns the contract id
+-- Accepts for the same project are serialized on the project row, the other pending
+-- proposals are rejected in the same statement, and accepting an already accepted
+-- proposal returns its existing contract instead of failing on contract.proposal_id.
+DROP PROCEDURE IF EXISTS accept_proposal(BIGINT);
+CREATE OR REPLACE FUNCTION accept_proposal(p_proposal_id BIGINT)
+RETURNS BIGINT
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    v_project_id BIGINT;
+    v_status VARCHAR(20);
+    v_contract_id BIGINT;
 BEGIN
-    UPDATE proposal
-    SET status = 'accepted'
+    SELECT project_id INTO v_project_id
+    FROM proposal
+    WHERE proposal_id = p_proposal_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Proposal % does not exist', p_proposal_id;
+    END IF;
+
+    -- NO KEY UPDATE still lets new proposals reference the project while we hold it
+    PERFORM 1 FROM project WHERE project_id = v_project_id FOR NO KEY UPDATE;
+
+    SELECT contract_id INTO v_contract_id
+    FROM contract
     WHERE proposal_id = p_proposal_id;
 
-    INSERT INTO contract (proposal_id, client_id, freelancer_id, status)
-    SELECT proposal_id, p.client_id, p.freelancer_id, 'active'
+    IF FOUND THEN
+        RETURN v_contract_id;
+    END IF;
+
+    SELECT status INTO v_status
+    FROM proposal
+    WHERE proposal_id = p_proposal_id;
+
+    IF v_status <> 'pending' THEN
+        RAISE EXCEPTION 'Proposal % is %, not pending', p_proposal_id, v_status;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM proposal
+        WHERE project_id = v_project_id AND status = 'accepted'
+    ) THEN
+        RAISE EXCEPTION 'Project % already has an accepted proposal', v_project_id;
+    END IF;
+
+    UPDATE proposal
+    SET status = CASE WHEN proposal_id = p_proposal_id THEN 'accepted' ELSE 'rejected' END
+    WHERE project_id = v_project_id
+      AND (proposal_id = p_proposal_id OR status = 'pending');
+
+    INSERT INTO contract (proposal_id, client_id, freelancer_id, total_amount_cents, status)
+    SELECT p.proposal_id, pr.client_id, p.freelancer_id, p.bid_amount_cents, 'active'
     FROM proposal p
     JOIN project pr ON p.project_id = pr.project_id
-    WHERE proposal_id = p_proposal_id;
+    WHERE p.proposal_id = p_proposal_id
+    RETURNING contract_id INTO v_contract_id;
+
+    RETURN v_contract_id;
 END;
 $$;
 
--- to Complete Milestone & Release Payment
-CREATE OR REPLACE PROCEDURE release_payment(m_id BIGINT)
-LANGUAGE plpgsql
-AS $$
+-- to Complete Milestones & Release their Payments in one set-based pass;
+-- idempotent per milestone: milestones that already have a released payment are skipped
+CREATE OR REPLACE FUNCTION release_payment_batch(m_ids BIGINT[])
+RETURNS INTEGER AS $$
+DECLARE
+    released_count INTEGER;
+    inserted_count INTEGER;
 BEGIN
     UPDATE milestone
     SET status = 'completed'
-    WHERE milestone_id = m_id;
+    WHERE milestone_id = ANY(m_ids) AND status IS DISTINCT FROM 'completed';
+
+    -- release the escrowed payment if the milestone has one, otherwise pay it out directly
+    UPDATE payment p
+    SET status = 'released'
+    WHERE p.milestone_id = ANY(m_ids) AND p.status = 'escrowed'
+      AND NOT EXISTS (
+          SELECT 1 FROM payment r
+          WHERE r.milestone_id = p.milestone_id AND r.status = 'released'
+      );
+    GET DIAGNOSTICS released_count = ROW_COUNT;
 
     INSERT INTO payment (contract_id, milestone_id, payer_id, payee_id, amount_cents, status)
-    SELECT contract_id, milestone_id, c.client_id, c.freelancer_id, amount_cents, 'released'
+    SELECT m.contract_id, m.milestone_id, c.client_id, c.freelancer_id, m.amount_cents, 'released'
     FROM milestone m
     JOIN contract c ON m.contract_id = c.contract_id
-    WHERE milestone_id = m_id;
+    WHERE m.milestone_id = ANY(m_ids)
+      AND NOT EXISTS (
+          SELECT 1 FROM payment p
+          WHERE p.milestone_id = m.milestone_id AND p.status = 'released'
+      )
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+
+    RETURN released_count + inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- to Complete Milestone & Release Payment
+CREATE OR REPLACE PROCEDURE release_payment(m_id BIGINT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM release_payment_batch(ARRAY[m_id]);
+END;
+$$;
+
+-- to queue every pending milestone that is due for release
+CREATE OR REPLACE FUNCTION enqueue_due_milestones(as_of DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    queued INTEGER;
+BEGIN
+    INSERT INTO payment_release_queue (milestone_id)
+    SELECT milestone_id
+    FROM milestone
+    WHERE status = 'pending' AND due_date <= as_of
+    ON CONFLICT (milestone_id) DO NOTHING;
+    GET DIAGNOSTICS queued = ROW_COUNT;
+    RETURN queued;
+END;
+$$ LANGUAGE plpgsql;
+
+--to set up this database as shard shard_index (0-based) of shard_count:
+--ids of client-owned rows become shard_index + 1 modulo shard_count, so rows
+--created on different shards never share an id. Run it on every shard while
+--they still hold the same data (before pruning), so new ids start above all existing ones
+CREATE OR REPLACE PROCEDURE configure_shard(shard_index INTEGER, shard_count INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    t RECORD;
+    max_id BIGINT;
+    next_id BIGINT;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES ('project', 'project_id'), ('proposal', 'proposal_id'),
+                              ('contract', 'contract_id'), ('milestone', 'milestone_id'),
+                              ('payment', 'payment_id'), ('review', 'review_id')) v(tbl, col)
+    LOOP
+        EXECUTE format('SELECT COALESCE(MAX(%I), 0) FROM %I', t.col, t.tbl) INTO max_id;
+        next_id := max_id - (max_id % shard_count) + shard_index + 1;
+        IF next_id <= max_id THEN
+            next_id := next_id + shard_count;
+        END IF;
+        EXECUTE format('ALTER SEQUENCE %s INCREMENT BY %s RESTART WITH %s',
+                       pg_get_serial_sequence(t.tbl, t.col), shard_count, next_id);
+    END LOOP;
 END;
 $$;
 
@@ -386,19 +582,26 @@ $$;
 
 --triggers:
 --to implement that only freelancers can submit proposals
+-- statement-level so a bulk insert checks every new proposal with one set-based query
 CREATE OR REPLACE FUNCTION check_proposal_role()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (SELECT role FROM users WHERE user_id = NEW.freelancer_id) <> 'freelancer' THEN
+    IF EXISTS (
+        SELECT 1
+        FROM new_proposals n
+        JOIN users u ON u.user_id = n.freelancer_id
+        WHERE u.role <> 'freelancer'
+    ) THEN
         RAISE EXCEPTION 'Only freelancers can submit proposals';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_check_proposal_role
-BEFORE INSERT ON proposal
-FOR EACH ROW
+AFTER INSERT ON proposal
+REFERENCING NEW TABLE AS new_proposals
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_proposal_role();
 
 
@@ -419,27 +622,1728 @@ END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_check_milestones_on_complete
-BEFORE UPDATE ON contract
+BEFORE UPDATE OF status ON contract
 FOR EACH ROW
 EXECUTE FUNCTION check_milestones_before_completion();
 
 --to Auto-Update Freelancer Avg Rating
+-- statement-level: each reviewee touched by the statement is recomputed once
 CREATE OR REPLACE FUNCTION update_avg_rating()
 RETURNS TRIGGER AS $$
 BEGIN
-    UPDATE freelancer_profile
-    SET avg_rating = get_freelancer_avg_rating(NEW.reviewee_id)
-    WHERE user_id = NEW.reviewee_id;
-    RETURN NEW;
+    UPDATE freelancer_profile f
+    SET avg_rating = r.avg_rating
+    FROM (
+        SELECT reviewee_id, AVG(rating) AS avg_rating
+        FROM review
+        WHERE reviewee_id IN (SELECT DISTINCT reviewee_id FROM new_reviews)
+        GROUP BY reviewee_id
+    ) r
+    WHERE f.user_id = r.reviewee_id;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_update_rating
 AFTER INSERT ON review
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_reviews
+FOR EACH STATEMENT
 EXECUTE FUNCTION update_avg_rating();
 
 
+--to keep contract total/paid/remaining amounts in sync with milestones and payments
+-- Statement-level: each contract a statement touches is refreshed once, in contract_id
+-- order, however many of its rows changed. Triggers with transition tables can't list
+-- UPDATE columns, so an update refreshes only the contracts whose (amount_cents, status)
+-- rows differ as a multiset before and after it, since nothing else feeds their totals
+CREATE OR REPLACE FUNCTION sync_contract_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_contract_totals(changed.contract_id)
+        FROM (SELECT DISTINCT n.contract_id FROM new_rows n ORDER BY 1) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_contract_totals(changed.contract_id)
+        FROM (SELECT DISTINCT o.contract_id FROM old_rows o ORDER BY 1) changed;
+    ELSE
+        PERFORM refresh_contract_totals(changed.contract_id)
+        FROM (SELECT DISTINCT moved.contract_id
+              FROM ((SELECT o.contract_id, o.amount_cents, o.status FROM old_rows o
+                     EXCEPT ALL
+                     SELECT n.contract_id, n.amount_cents, n.status FROM new_rows n)
+                    UNION ALL
+                    (SELECT n.contract_id, n.amount_cents, n.status FROM new_rows n
+                     EXCEPT ALL
+                     SELECT o.contract_id, o.amount_cents, o.status FROM old_rows o)) moved
+              ORDER BY 1) changed;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_milestone_contract_totals_insert
+AFTER INSERT ON milestone
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_milestone_contract_totals_update
+AFTER UPDATE ON milestone
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_milestone_contract_totals_delete
+AFTER DELETE ON milestone
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_payment_contract_totals_insert
+AFTER INSERT ON payment
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_payment_contract_totals_update
+AFTER UPDATE ON payment
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_payment_contract_totals_delete
+AFTER DELETE ON payment
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+-- backfill the stored totals for contracts loaded before the triggers existed
+SELECT refresh_contract_totals(contract_id) FROM contract;
+
+--to stamp payments with the time they were released
+CREATE OR REPLACE FUNCTION stamp_payment_release()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status = 'released' AND NEW.released_at IS NULL THEN
+        NEW.released_at := CURRENT_TIMESTAMP;
+    ELSIF NEW.status IS DISTINCT FROM 'released' THEN
+        NEW.released_at := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_stamp_payment_release
+BEFORE INSERT OR UPDATE OF status, released_at ON payment
+FOR EACH ROW
+EXECUTE FUNCTION stamp_payment_release();
+
+-- sample payments predate released_at: date them by their milestone
+UPDATE payment p
+SET released_at = m.due_date
+FROM milestone m
+WHERE p.milestone_id = m.milestone_id AND p.status = 'released' AND p.released_at IS NULL;
+
+--to apply a signed amount of released earnings to the payee ledger
+CREATE OR REPLACE FUNCTION apply_earnings_delta(pid BIGINT, released TIMESTAMP, delta_cents BIGINT, delta_count INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO payee_earnings (payee_id, total_earned_cents, payment_count)
+    VALUES (pid, delta_cents, delta_count)
+    ON CONFLICT (payee_id) DO UPDATE
+    SET total_earned_cents = payee_earnings.total_earned_cents + EXCLUDED.total_earned_cents,
+        payment_count = payee_earnings.payment_count + EXCLUDED.payment_count;
+
+    INSERT INTO payee_earnings_monthly (payee_id, month, earned_cents, payment_count)
+    VALUES (pid, date_trunc('month', released)::DATE, delta_cents, delta_count)
+    ON CONFLICT (payee_id, month) DO UPDATE
+    SET earned_cents = payee_earnings_monthly.earned_cents + EXCLUDED.earned_cents,
+        payment_count = payee_earnings_monthly.payment_count + EXCLUDED.payment_count;
+END;
+$$ LANGUAGE plpgsql;
+
+--to keep the earnings ledger in sync with released payments
+CREATE OR REPLACE FUNCTION update_earnings_ledger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'released' THEN
+        PERFORM apply_earnings_delta(OLD.payee_id, OLD.released_at, -OLD.amount_cents, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'released' THEN
+        PERFORM apply_earnings_delta(NEW.payee_id, NEW.released_at, NEW.amount_cents, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_payment_earnings_ledger
+AFTER INSERT OR DELETE OR UPDATE OF payee_id, amount_cents, status, released_at ON payment
+FOR EACH ROW
+EXECUTE FUNCTION update_earnings_ledger();
+
+--to compare the earnings ledger against the raw payments: every month bucket and every
+--payee's lifetime total (month NULL), amounts and payment counts; returns only those that differ
+CREATE OR REPLACE FUNCTION reconcile_payee_earnings()
+RETURNS TABLE (payee_id BIGINT, month DATE, ledger_cents BIGINT, actual_cents BIGINT,
+               ledger_count BIGINT, actual_count BIGINT) AS $$
+BEGIN
+    RETURN QUERY
+    WITH actual AS (
+        SELECT p.payee_id, date_trunc('month', p.released_at)::DATE AS month,
+               SUM(p.amount_cents)::BIGINT AS earned_cents, COUNT(*) AS payment_count
+        FROM payment p
+        WHERE p.status = 'released'
+        GROUP BY 1, 2
+    )
+    SELECT COALESCE(l.payee_id, a.payee_id),
+           COALESCE(l.month, a.month),
+           COALESCE(l.earned_cents, 0),
+           COALESCE(a.earned_cents, 0),
+           COALESCE(l.payment_count, 0)::BIGINT,
+           COALESCE(a.payment_count, 0)
+    FROM payee_earnings_monthly l
+    FULL JOIN actual a ON a.payee_id = l.payee_id AND a.month = l.month
+    WHERE COALESCE(l.earned_cents, 0) <> COALESCE(a.earned_cents, 0)
+       OR COALESCE(l.payment_count, 0) <> COALESCE(a.payment_count, 0)
+    UNION ALL
+    SELECT COALESCE(t.payee_id, s.payee_id),
+           NULL::DATE,
+           COALESCE(t.total_earned_cents, 0),
+           COALESCE(s.earned_cents, 0),
+           COALESCE(t.payment_count, 0)::BIGINT,
+           COALESCE(s.payment_count, 0)
+    FROM payee_earnings t
+    FULL JOIN (
+        SELECT a.payee_id, SUM(a.earned_cents)::BIGINT AS earned_cents,
+               SUM(a.payment_count)::BIGINT AS payment_count
+        FROM actual a
+        GROUP BY a.payee_id
+    ) s ON s.payee_id = t.payee_id
+    WHERE COALESCE(t.total_earned_cents, 0) <> COALESCE(s.earned_cents, 0)
+       OR COALESCE(t.payment_count, 0) <> COALESCE(s.payment_count, 0);
+END;
+$$ LANGUAGE plpgsql;
+
+--to rebuild the earnings ledger from the raw payments
+CREATE OR REPLACE PROCEDURE rebuild_payee_earnings()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM payee_earnings_monthly;
+    DELETE FROM payee_earnings;
+
+    INSERT INTO payee_earnings_monthly (payee_id, month, earned_cents, payment_count)
+    SELECT payee_id, date_trunc('month', released_at)::DATE, SUM(amount_cents), COUNT(*)
+    FROM payment
+    WHERE status = 'released'
+    GROUP BY 1, 2;
+
+    INSERT INTO payee_earnings (payee_id, total_earned_cents, payment_count)
+    SELECT payee_id, SUM(earned_cents), SUM(payment_count)
+    FROM payee_earnings_monthly
+    GROUP BY payee_id;
+END;
+$$;
+
+-- build the ledger for payments loaded before the triggers existed
+CALL rebuild_payee_earnings();
+
+-- change tracking for the app's offline snapshot (snapshot.py):
+-- change_xid is the id of the transaction that last wrote the row, so a client that
+-- remembers pg_snapshot_xmin() of its previous sync can fetch just the rows written
+-- since (xid8 never wraps). Deletes can't be seen that way; they bump a per-table
+-- counter instead, and the client then reloads that table's view.
+ALTER TABLE users ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE freelancer_profile ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE skill ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE project ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE contract ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+CREATE INDEX idx_users_change_xid ON users(change_xid);
+CREATE INDEX idx_freelancer_profile_change_xid ON freelancer_profile(change_xid);
+CREATE INDEX idx_skill_change_xid ON skill(change_xid);
+CREATE INDEX idx_project_change_xid ON project(change_xid);
+CREATE INDEX idx_contract_change_xid ON contract(change_xid);
+
+CREATE TABLE table_delete_version (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION stamp_change_xid()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_delete_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_delete_version (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_delete_version.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_change_xid BEFORE UPDATE ON users
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+CREATE TRIGGER trg_freelancer_profile_change_xid BEFORE UPDATE ON freelancer_profile
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+CREATE TRIGGER trg_skill_change_xid BEFORE UPDATE ON skill
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+CREATE TRIGGER trg_project_change_xid BEFORE UPDATE ON project
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+CREATE TRIGGER trg_contract_change_xid BEFORE UPDATE ON contract
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+
+CREATE TRIGGER trg_users_delete_version AFTER DELETE OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_delete_version();
+CREATE TRIGGER trg_freelancer_profile_delete_version AFTER DELETE OR TRUNCATE ON freelancer_profile
+FOR EACH STATEMENT EXECUTE FUNCTION bump_delete_version();
+CREATE TRIGGER trg_skill_delete_version AFTER DELETE OR TRUNCATE ON skill
+FOR EACH STATEMENT EXECUTE FUNCTION bump_delete_version();
+CREATE TRIGGER trg_project_delete_version AFTER DELETE OR TRUNCATE ON project
+FOR EACH STATEMENT EXECUTE FUNCTION bump_delete_version();
+CREATE TRIGGER trg_contract_delete_version AFTER DELETE OR TRUNCATE ON contract
+FOR EACH STATEMENT EXECUTE FUNCTION bump_delete_version();
+
+-- budget range search (search_projects_page in database.py): a project's budget is the
+-- inclusive range [budget_min_cents, budget_max_cents], matched with && (overlaps).
+-- btree_gist lets the deadline share the GiST index, so "budget overlaps my range and
+-- due within 14 days" is a single index scan; broad filters that match most projects
+-- are served by walking idx_project_deadline in page order instead.
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE project ADD CONSTRAINT chk_project_budget_order CHECK (budget_min_cents <= budget_max_cents);
+ALTER TABLE project ADD COLUMN budget_range int4range
+    GENERATED ALWAYS AS (int4range(budget_min_cents, budget_max_cents, '[]')) STORED;
+CREATE INDEX idx_project_budget_deadline ON project USING gist (budget_range, deadline);
+
+-- full-text project search (search_projects_text_page in database.py): the title
+-- (weight A) ranks above the description (weight B). A stored generated column is
+-- kept up to date by PostgreSQL on every insert and update, and the GIN index finds
+-- the matching projects without reading the others.
+ALTER TABLE project ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+                         setweight(to_tsvector('english', COALESCE(description, '')), 'B')) STORED;
+CREATE INDEX idx_project_search ON project USING gin (search_vector);
+
+-- the proposal lists (get_proposals_by_project / get_proposals_page) send this preview
+-- and the letter's length instead of the whole cover letter, which is fetched on demand.
+-- Whitespace runs become single spaces so the preview fits one list row
+CREATE OR REPLACE FUNCTION cover_letter_preview(letter TEXT, n INTEGER)
+RETURNS TEXT AS $$
+    SELECT regexp_replace(left(letter, n), '\s+', ' ', 'g')
+           || CASE WHEN char_length(letter) > n THEN '…' ELSE '' END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- overdue / due-soon milestone sweeper (jobs/sweep_milestones.py):
+-- only pending milestones can be late, so the sweep walks this partial index and
+-- its cost follows the number of pending milestones in the window, not the table
+-- size. It also serves enqueue_due_milestones.
+CREATE INDEX idx_milestone_pending_due ON milestone(due_date, milestone_id) WHERE status = 'pending';
+
+-- the flags the sweeper maintains: one row per pending milestone that is overdue or
+-- due within the sweep horizon. swept_at is the start of the sweep that last saw it
+CREATE TABLE milestone_risk (
+    milestone_id BIGINT PRIMARY KEY,
+    contract_id BIGINT NOT NULL,
+    due_date DATE NOT NULL,
+    risk VARCHAR(10) NOT NULL CHECK (risk IN ('overdue', 'due_soon')),
+    flagged_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    swept_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (milestone_id) REFERENCES milestone(milestone_id) ON DELETE CASCADE,
+    FOREIGN KEY (contract_id) REFERENCES contract(contract_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_milestone_risk_contract ON milestone_risk(contract_id);
+
+-- the sweep's position, so an interrupted sweep resumes where it stopped. A sweep
+-- is in progress while last_milestone_id is set; as_of is the date it judges against
+CREATE TABLE milestone_sweep_cursor (
+    sweep_name VARCHAR(50) PRIMARY KEY,
+    as_of DATE,
+    started_at TIMESTAMP,
+    last_due_date DATE,
+    last_milestone_id BIGINT,
+    completed_at TIMESTAMP
+);
+
+-- to flag the next batch of overdue / due-soon milestones and advance the cursor,
+-- all in the caller's transaction. The batch that comes back short ends the sweep:
+-- flags it didn't refresh (milestones since rescheduled past the horizon) are dropped.
+-- Concurrent sweepers queue on the cursor row.
+CREATE OR REPLACE FUNCTION sweep_due_milestones(p_batch_size INTEGER, p_horizon_days INTEGER)
+RETURNS TABLE (processed INTEGER, overdue INTEGER, due_soon INTEGER, finished BOOLEAN) AS $$
+DECLARE
+    cur milestone_sweep_cursor%ROWTYPE;
+    v_last_due DATE;
+    v_last_id BIGINT;
+BEGIN
+    INSERT INTO milestone_sweep_cursor (sweep_name) VALUES ('due_milestones')
+    ON CONFLICT (sweep_name) DO NOTHING;
+    SELECT * INTO cur FROM milestone_sweep_cursor WHERE sweep_name = 'due_milestones' FOR UPDATE;
+    IF cur.last_milestone_id IS NULL THEN
+        cur.as_of := CURRENT_DATE;
+        cur.started_at := CURRENT_TIMESTAMP;
+    END IF;
+
+    WITH batch AS (
+        SELECT m.milestone_id, m.contract_id, m.due_date
+        FROM milestone m
+        WHERE m.status = 'pending'
+          AND m.due_date <= cur.as_of + p_horizon_days
+          AND (m.due_date, m.milestone_id) > (COALESCE(cur.last_due_date, '-infinity'::date),
+                                              COALESCE(cur.last_milestone_id, 0))
+        ORDER BY m.due_date, m.milestone_id
+        LIMIT p_batch_size
+    ), flagged AS (
+        INSERT INTO milestone_risk (milestone_id, contract_id, due_date, risk, swept_at)
+        SELECT b.milestone_id, b.contract_id, b.due_date,
+               CASE WHEN b.due_date < cur.as_of THEN 'overdue' ELSE 'due_soon' END, cur.started_at
+        FROM batch b
+        ON CONFLICT (milestone_id) DO UPDATE
+        SET due_date = EXCLUDED.due_date, risk = EXCLUDED.risk, swept_at = EXCLUDED.swept_at
+        RETURNING milestone_risk.milestone_id, milestone_risk.due_date, milestone_risk.risk
+    )
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE f.risk = 'overdue'), COUNT(*) FILTER (WHERE f.risk = 'due_soon'),
+           (array_agg(f.due_date ORDER BY f.due_date DESC, f.milestone_id DESC))[1],
+           (array_agg(f.milestone_id ORDER BY f.due_date DESC, f.milestone_id DESC))[1]
+    INTO processed, overdue, due_soon, v_last_due, v_last_id
+    FROM flagged f;
+
+    finished := processed < p_batch_size;
+    IF finished THEN
+        DELETE FROM milestone_risk WHERE swept_at < cur.started_at;
+        UPDATE milestone_sweep_cursor
+        SET as_of = cur.as_of, started_at = cur.started_at,
+            last_due_date = NULL, last_milestone_id = NULL, completed_at = CURRENT_TIMESTAMP
+        WHERE sweep_name = 'due_milestones';
+    ELSE
+        UPDATE milestone_sweep_cursor
+        SET as_of = cur.as_of, started_at = cur.started_at,
+            last_due_date = v_last_due, last_milestone_id = v_last_id
+        WHERE sweep_name = 'due_milestones';
+    END IF;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- a milestone that is completed (or otherwise leaves pending) is no longer at risk;
+-- statement-level so bulk releases clear their flags with one delete
+CREATE OR REPLACE FUNCTION clear_milestone_risk()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM milestone_risk r
+    USING new_milestones n
+    WHERE r.milestone_id = n.milestone_id AND n.status IS DISTINCT FROM 'pending';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_milestone_clear_risk
+AFTER UPDATE ON milestone
+REFERENCING NEW TABLE AS new_milestones
+FOR EACH STATEMENT
+EXECUTE FUNCTION clear_milestone_risk();
+
+-- contracts with flagged milestones, one row each: reads only the flags, so it
+-- stays small however many milestones exist
+CREATE OR REPLACE VIEW at_risk_contracts AS
+SELECT r.contract_id, c.client_id, c.freelancer_id,
+       COUNT(*) FILTER (WHERE r.risk = 'overdue') AS overdue_milestones,
+       COUNT(*) FILTER (WHERE r.risk = 'due_soon') AS due_soon_milestones,
+       MIN(r.due_date) AS next_due_date,
+       SUM(m.amount_cents) AS amount_at_risk_cents
+FROM milestone_risk r
+JOIN contract c ON c.contract_id = r.contract_id
+JOIN milestone m ON m.milestone_id = r.milestone_id
+GROUP BY r.contract_id, c.client_id, c.freelancer_id;
+
+
+-- reputation score (jobs/update_reputation.py): a Bayesian average of a freelancer's
+-- ratings in which older reviews count less. A review written t days ago weighs
+-- 2^(-t / half_life), and with prior_mean the platform-wide mean rating the score is
+--     (prior_weight * prior_mean + sum(weight * rating)) / (prior_weight + sum(weight))
+-- so a few reviews stay close to the platform mean and many recent ones move the
+-- score to their own average. Unlike avg_rating, one 5-star review no longer outranks
+-- 400 reviews averaging 4.9. get_all_freelancers and the skill search order by it.
+ALTER TABLE review ADD COLUMN created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+-- 0 until the first refresh after the profile is created
+ALTER TABLE freelancer_profile ADD COLUMN reputation_score DOUBLE PRECISION NOT NULL DEFAULT 0;
+CREATE INDEX idx_freelancer_reputation ON freelancer_profile(reputation_score, user_id);
+CREATE INDEX idx_freelancer_unscored ON freelancer_profile(user_id) WHERE reputation_score = 0;
+
+-- Weights are stored relative to a fixed epoch, 2^((written - epoch) / half_life), so a
+-- review's stored weight never changes: each reviewee's sums only grow by the reviews
+-- added since the last refresh, and 1 / review_weight(now) scales them to today's
+-- weights. The sums are per reviewee; the platform totals give prior_mean.
+-- The weights overflow double precision past 2^1024, so the half-life must be long
+-- enough for the years ahead (jobs/update_reputation.py checks it, see config.py).
+CREATE OR REPLACE FUNCTION review_weight(written TIMESTAMP, half_life_days DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT power(2::DOUBLE PRECISION,
+                 EXTRACT(EPOCH FROM written - TIMESTAMP '2020-01-01')::DOUBLE PRECISION / (half_life_days * 86400))
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION reputation_score(decayed_weight DOUBLE PRECISION, decayed_rating_sum DOUBLE PRECISION,
+                                            prior_mean DOUBLE PRECISION, prior_weight DOUBLE PRECISION,
+                                            half_life_days DOUBLE PRECISION, as_of TIMESTAMP)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT (prior_weight * prior_mean + decayed_rating_sum / k) / (prior_weight + decayed_weight / k)
+    FROM (SELECT review_weight(as_of, half_life_days) AS k) now_weight
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE freelancer_reputation (
+    user_id BIGINT PRIMARY KEY,
+    decayed_weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+    decayed_rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    review_count BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- the platform totals behind prior_mean and the half-life the sums were built with
+CREATE TABLE reputation_state (
+    state_name VARCHAR(50) PRIMARY KEY,
+    half_life_days DOUBLE PRECISION,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    review_count BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+-- reviews added (sign 1) or removed (sign -1) since the last refresh; an edited review
+-- is both. Filled by the review triggers below and drained by take_reputation_deltas
+CREATE TABLE review_reputation_delta (
+    delta_id BIGSERIAL PRIMARY KEY,
+    reviewee_id BIGINT NOT NULL,
+    rating SMALLINT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    sign SMALLINT NOT NULL CHECK (sign IN (-1, 1))
+);
+
+-- statement-level: a bulk insert queues its reviews with one INSERT ... SELECT
+CREATE OR REPLACE FUNCTION queue_reputation_deltas()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO review_reputation_delta (reviewee_id, rating, created_at, sign)
+        SELECT n.reviewee_id, n.rating, n.created_at, 1
+        FROM new_reviews n
+        WHERE n.rating IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO review_reputation_delta (reviewee_id, rating, created_at, sign)
+        SELECT o.reviewee_id, o.rating, o.created_at, -1
+        FROM old_reviews o
+        WHERE o.rating IS NOT NULL;
+    ELSE
+        INSERT INTO review_reputation_delta (reviewee_id, rating, created_at, sign)
+        SELECT d.reviewee_id, d.rating, d.created_at, d.sign
+        FROM old_reviews o
+        JOIN new_reviews n ON n.review_id = o.review_id
+        CROSS JOIN LATERAL (VALUES (o.reviewee_id, o.rating, o.created_at, -1),
+                                   (n.reviewee_id, n.rating, n.created_at, 1)) d(reviewee_id, rating, created_at, sign)
+        WHERE (o.reviewee_id, o.rating, o.created_at) IS DISTINCT FROM (n.reviewee_id, n.rating, n.created_at)
+          AND d.rating IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_review_reputation_insert
+AFTER INSERT ON review
+REFERENCING NEW TABLE AS new_reviews
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_reputation_deltas();
+
+CREATE TRIGGER trg_review_reputation_update
+AFTER UPDATE ON review
+REFERENCING OLD TABLE AS old_reviews NEW TABLE AS new_reviews
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_reputation_deltas();
+
+CREATE TRIGGER trg_review_reputation_delete
+AFTER DELETE ON review
+REFERENCING OLD TABLE AS old_reviews
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_reputation_deltas();
+
+-- to take the queued deltas, summed per reviewee (weights for the given half-life).
+-- With p_rebuild the queue is cleared and every review is summed instead, in one
+-- statement so a review committed meanwhile is counted exactly once (later).
+CREATE OR REPLACE FUNCTION take_reputation_deltas(p_half_life_days DOUBLE PRECISION, p_rebuild BOOLEAN)
+RETURNS TABLE (reviewee_id BIGINT, decayed_weight DOUBLE PRECISION, decayed_rating_sum DOUBLE PRECISION,
+               rating_sum BIGINT, review_count BIGINT) AS $$
+BEGIN
+    IF p_rebuild THEN
+        RETURN QUERY
+        WITH cleared AS (
+            DELETE FROM review_reputation_delta
+        )
+        SELECT r.reviewee_id, SUM(review_weight(r.created_at, p_half_life_days)),
+               SUM(r.rating * review_weight(r.created_at, p_half_life_days)),
+               SUM(r.rating)::BIGINT, COUNT(*)
+        FROM review r
+        WHERE r.rating IS NOT NULL
+        GROUP BY r.reviewee_id;
+    ELSE
+        RETURN QUERY
+        WITH taken AS (
+            DELETE FROM review_reputation_delta
+            RETURNING review_reputation_delta.reviewee_id, review_reputation_delta.rating,
+                      review_reputation_delta.created_at, review_reputation_delta.sign
+        )
+        SELECT t.reviewee_id, SUM(t.sign * review_weight(t.created_at, p_half_life_days)),
+               SUM(t.sign * t.rating * review_weight(t.created_at, p_half_life_days)),
+               SUM(t.sign * t.rating)::BIGINT, SUM(t.sign)::BIGINT
+        FROM taken t
+        GROUP BY t.reviewee_id;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- to add per-reviewee deltas (from take_reputation_deltas, or their total over all
+-- shards) to the sums and rescore the profiles whose sums changed plus the ones never
+-- scored; p_rescore_all rescores every profile from the stored sums instead, which
+-- applies the decay to freelancers without new reviews. p_rebuild replaces the sums.
+-- Returns the number of scores rewritten.
+CREATE OR REPLACE FUNCTION apply_reputation_deltas(p_user_ids BIGINT[], p_weights DOUBLE PRECISION[],
+                                                   p_rating_sums DOUBLE PRECISION[], p_ratings BIGINT[],
+                                                   p_counts BIGINT[], p_half_life_days DOUBLE PRECISION,
+                                                   p_prior_weight DOUBLE PRECISION, p_rebuild BOOLEAN,
+                                                   p_rescore_all BOOLEAN)
+RETURNS INTEGER AS $$
+DECLARE
+    state reputation_state%ROWTYPE;
+    v_prior DOUBLE PRECISION;
+    v_now TIMESTAMP := LOCALTIMESTAMP;
+    rescored INTEGER;
+BEGIN
+    INSERT INTO reputation_state (state_name) VALUES ('reputation')
+    ON CONFLICT (state_name) DO NOTHING;
+    SELECT * INTO state FROM reputation_state WHERE state_name = 'reputation' FOR UPDATE;
+    IF p_rebuild THEN
+        DELETE FROM freelancer_reputation;
+        state.rating_sum := 0;
+        state.review_count := 0;
+    ELSIF state.half_life_days IS DISTINCT FROM p_half_life_days THEN
+        RAISE EXCEPTION 'Reputation sums were built with half-life % days, not %; rebuild them',
+            state.half_life_days, p_half_life_days;
+    END IF;
+
+    INSERT INTO freelancer_reputation (user_id, decayed_weight, decayed_rating_sum, review_count)
+    SELECT d.user_id, d.weight, d.rating_sum, d.review_count
+    FROM unnest(p_user_ids, p_weights, p_rating_sums, p_counts) d(user_id, weight, rating_sum, review_count)
+    ON CONFLICT (user_id) DO UPDATE
+    SET decayed_weight = freelancer_reputation.decayed_weight + EXCLUDED.decayed_weight,
+        decayed_rating_sum = freelancer_reputation.decayed_rating_sum + EXCLUDED.decayed_rating_sum,
+        review_count = freelancer_reputation.review_count + EXCLUDED.review_count;
+
+    state.rating_sum := state.rating_sum + COALESCE((SELECT SUM(x) FROM unnest(p_ratings) x), 0);
+    state.review_count := state.review_count + COALESCE((SELECT SUM(x) FROM unnest(p_counts) x), 0);
+    v_prior := CASE WHEN state.review_count > 0 THEN state.rating_sum::DOUBLE PRECISION / state.review_count
+                    ELSE 0 END;
+
+    IF p_rebuild OR p_rescore_all THEN
+        UPDATE freelancer_profile f
+        SET reputation_score = s.score
+        FROM (
+            SELECT p.profile_id,
+                   reputation_score(COALESCE(r.decayed_weight, 0), COALESCE(r.decayed_rating_sum, 0),
+                                    v_prior, p_prior_weight, p_half_life_days, v_now) AS score
+            FROM freelancer_profile p
+            LEFT JOIN freelancer_reputation r ON r.user_id = p.user_id
+        ) s
+        WHERE f.profile_id = s.profile_id AND f.reputation_score IS DISTINCT FROM s.score;
+    ELSE
+        UPDATE freelancer_profile f
+        SET reputation_score = s.score
+        FROM (
+            SELECT p.profile_id,
+                   reputation_score(COALESCE(r.decayed_weight, 0), COALESCE(r.decayed_rating_sum, 0),
+                                    v_prior, p_prior_weight, p_half_life_days, v_now) AS score
+            FROM freelancer_profile p
+            LEFT JOIN freelancer_reputation r ON r.user_id = p.user_id
+            WHERE p.user_id = ANY (p_user_ids) OR p.reputation_score = 0
+        ) s
+        WHERE f.profile_id = s.profile_id AND f.reputation_score IS DISTINCT FROM s.score;
+    END IF;
+    GET DIAGNOSTICS rescored = ROW_COUNT;
+
+    UPDATE reputation_state
+    SET half_life_days = p_half_life_days, rating_sum = state.rating_sum,
+        review_count = state.review_count, refreshed_at = v_now
+    WHERE state_name = 'reputation';
+    RETURN rescored;
+END;
+$$ LANGUAGE plpgsql;
+
+-- to take and apply the deltas of this database in one call (the unsharded refresh).
+-- Returns the number of reviewees whose sums changed and of scores rewritten
+CREATE OR REPLACE FUNCTION refresh_reputation(p_half_life_days DOUBLE PRECISION, p_prior_weight DOUBLE PRECISION,
+                                              p_rebuild BOOLEAN, p_rescore_all BOOLEAN)
+RETURNS TABLE (reviewees INTEGER, rescored INTEGER) AS $$
+DECLARE
+    v_ids BIGINT[];
+    v_weights DOUBLE PRECISION[];
+    v_rating_sums DOUBLE PRECISION[];
+    v_ratings BIGINT[];
+    v_counts BIGINT[];
+BEGIN
+    SELECT COUNT(*), COALESCE(array_agg(t.reviewee_id), '{}'), COALESCE(array_agg(t.decayed_weight), '{}'),
+           COALESCE(array_agg(t.decayed_rating_sum), '{}'), COALESCE(array_agg(t.rating_sum), '{}'),
+           COALESCE(array_agg(t.review_count), '{}')
+    INTO reviewees, v_ids, v_weights, v_rating_sums, v_ratings, v_counts
+    FROM take_reputation_deltas(p_half_life_days, p_rebuild) t;
+    rescored := apply_reputation_deltas(v_ids, v_weights, v_rating_sums, v_ratings, v_counts,
+                                        p_half_life_days, p_prior_weight, p_rebuild, p_rescore_all);
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- score the sample reviews (REPUTATION_HALF_LIFE_DAYS and REPUTATION_PRIOR_WEIGHT in config.py)
+SELECT * FROM refresh_reputation(180, 5, true, true);
+
+-- bid analytics (get_bid_analytics in database.py): a project's bid distribution,
+-- each bid against the budget, and every bidder's record of accepted proposals.
+-- Counting a bidder's decided proposals reads only this index
+CREATE INDEX idx_proposal_freelancer_status ON proposal(freelancer_id, status);
+
+-- a counter per project bumped by every statement that changes its proposals, so
+-- cached analytics are revalidated with a point read instead of recomputed.
+-- Statement-level: a bulk insert or accept_proposal bumps each project once
+CREATE TABLE proposal_version (
+    project_id BIGINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (project_id) REFERENCES project(project_id) ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION bump_proposal_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO proposal_version (project_id, version)
+        SELECT DISTINCT n.project_id, 1 FROM new_proposals n
+        ORDER BY 1
+        ON CONFLICT (project_id) DO UPDATE SET version = proposal_version.version + 1;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO proposal_version (project_id, version)
+        SELECT DISTINCT o.project_id, 1 FROM old_proposals o
+        ORDER BY 1
+        ON CONFLICT (project_id) DO UPDATE SET version = proposal_version.version + 1;
+    ELSE
+        INSERT INTO proposal_version (project_id, version)
+        SELECT project_id, 1
+        FROM (SELECT o.project_id FROM old_proposals o
+              UNION
+              SELECT n.project_id FROM new_proposals n) changed
+        ORDER BY 1
+        ON CONFLICT (project_id) DO UPDATE SET version = proposal_version.version + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_proposal_version_insert
+AFTER INSERT ON proposal
+REFERENCING NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+CREATE TRIGGER trg_proposal_version_update
+AFTER UPDATE ON proposal
+REFERENCING OLD TABLE AS old_proposals NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+CREATE TRIGGER trg_proposal_version_delete
+AFTER DELETE ON proposal
+REFERENCING OLD TABLE AS old_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+-- related skills (related_skills.py): a sparse skill x skill matrix counting the
+-- freelancers and projects that list both skills. Only pairs seen together are stored,
+-- in both directions so a skill's neighbours are one index range. skill_usage counts
+-- the lists each skill is on; a pair's similarity is
+--     owners / sqrt(usage(skill) * usage(related skill))   (cosine, 0..1)
+-- The counts are refreshed from a queue of skill list changes, so a refresh costs the
+-- pairs of the freelancers and projects that changed, not the whole catalogue. No
+-- foreign keys: a deleted skill's counts drain to zero through the queue.
+-- version (here and in skill_cooccurrence) is the refresh that last changed the row,
+-- so readers holding the graph in memory re-read only the skills whose scores moved
+CREATE TABLE skill_usage (
+    skill_id BIGINT PRIMARY KEY,
+    owners BIGINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL
+);
+CREATE INDEX idx_skill_usage_version ON skill_usage(version);
+
+CREATE TABLE skill_cooccurrence (
+    skill_id BIGINT,
+    related_skill_id BIGINT,
+    owners BIGINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL,
+    PRIMARY KEY (skill_id, related_skill_id)
+);
+CREATE INDEX idx_skill_cooccurrence_version ON skill_cooccurrence(version);
+
+CREATE TABLE skill_graph_state (
+    graph_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+-- skills added to (sign 1) or removed from (sign -1) a freelancer's ('f', profile_id)
+-- or a project's ('p', project_id) list since the last refresh
+CREATE TABLE skill_list_change (
+    change_id BIGSERIAL PRIMARY KEY,
+    owner_kind CHAR(1) NOT NULL CHECK (owner_kind IN ('f', 'p')),
+    owner_id BIGINT NOT NULL,
+    skill_id BIGINT NOT NULL,
+    sign SMALLINT NOT NULL CHECK (sign IN (-1, 1))
+);
+
+-- statement-level; an update queues only the rows whose (owner, skill) changed, so
+-- proficiency edits queue nothing
+CREATE OR REPLACE FUNCTION queue_freelancer_skill_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO skill_list_change (owner_kind, owner_id, skill_id, sign)
+        SELECT 'f', o.profile_id, o.skill_id, -1
+        FROM old_skills o
+        WHERE TG_OP = 'DELETE' OR NOT EXISTS (SELECT 1 FROM new_skills n
+                                              WHERE n.profile_id = o.profile_id AND n.skill_id = o.skill_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO skill_list_change (owner_kind, owner_id, skill_id, sign)
+        SELECT 'f', n.profile_id, n.skill_id, 1
+        FROM new_skills n
+        WHERE TG_OP = 'INSERT' OR NOT EXISTS (SELECT 1 FROM old_skills o
+                                              WHERE o.profile_id = n.profile_id AND o.skill_id = n.skill_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queue_project_skill_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO skill_list_change (owner_kind, owner_id, skill_id, sign)
+        SELECT 'p', o.project_id, o.skill_id, -1
+        FROM old_skills o
+        WHERE TG_OP = 'DELETE' OR NOT EXISTS (SELECT 1 FROM new_skills n
+                                              WHERE n.project_id = o.project_id AND n.skill_id = o.skill_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO skill_list_change (owner_kind, owner_id, skill_id, sign)
+        SELECT 'p', n.project_id, n.skill_id, 1
+        FROM new_skills n
+        WHERE TG_OP = 'INSERT' OR NOT EXISTS (SELECT 1 FROM old_skills o
+                                              WHERE o.project_id = n.project_id AND o.skill_id = n.skill_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_freelancer_skill_changes_insert
+AFTER INSERT ON freelancer_skill
+REFERENCING NEW TABLE AS new_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_freelancer_skill_changes();
+
+CREATE TRIGGER trg_freelancer_skill_changes_update
+AFTER UPDATE ON freelancer_skill
+REFERENCING OLD TABLE AS old_skills NEW TABLE AS new_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_freelancer_skill_changes();
+
+CREATE TRIGGER trg_freelancer_skill_changes_delete
+AFTER DELETE ON freelancer_skill
+REFERENCING OLD TABLE AS old_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_freelancer_skill_changes();
+
+CREATE TRIGGER trg_project_skill_changes_insert
+AFTER INSERT ON project_skill
+REFERENCING NEW TABLE AS new_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_project_skill_changes();
+
+CREATE TRIGGER trg_project_skill_changes_update
+AFTER UPDATE ON project_skill
+REFERENCING OLD TABLE AS old_skills NEW TABLE AS new_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_project_skill_changes();
+
+CREATE TRIGGER trg_project_skill_changes_delete
+AFTER DELETE ON project_skill
+REFERENCING OLD TABLE AS old_skills
+FOR EACH STATEMENT
+EXECUTE FUNCTION queue_project_skill_changes();
+
+-- to fold the queued skill list changes into the counts, as one set-based statement.
+-- For each changed list it rebuilds the old list from the current one and the net
+-- queued changes, and adds pairs(new list) - pairs(old list) to the matrix. Queued
+-- changes committed meanwhile stay for the next refresh; refreshes run one at a time.
+-- Returns the number of pairs whose count changed and the new graph version
+CREATE OR REPLACE FUNCTION refresh_skill_cooccurrence()
+RETURNS TABLE (changed_pairs INTEGER, graph_version BIGINT) AS $$
+BEGIN
+    INSERT INTO skill_graph_state (graph_name) VALUES ('skills')
+    ON CONFLICT (graph_name) DO NOTHING;
+    UPDATE skill_graph_state SET version = skill_graph_state.version + 1, refreshed_at = LOCALTIMESTAMP
+    WHERE graph_name = 'skills'
+    RETURNING skill_graph_state.version INTO graph_version;
+
+    WITH taken AS (
+        DELETE FROM skill_list_change
+        RETURNING skill_list_change.owner_kind, skill_list_change.owner_id,
+                  skill_list_change.skill_id, skill_list_change.sign
+    ), net AS (
+        SELECT t.owner_kind, t.owner_id, t.skill_id, SUM(t.sign) AS delta
+        FROM taken t
+        GROUP BY t.owner_kind, t.owner_id, t.skill_id
+    ), touched AS (
+        SELECT DISTINCT n.owner_kind, n.owner_id FROM net n
+    ), current_lists AS (
+        SELECT 'f'::CHAR(1) AS owner_kind, fs.profile_id AS owner_id, fs.skill_id
+        FROM touched o
+        JOIN freelancer_skill fs ON fs.profile_id = o.owner_id
+        WHERE o.owner_kind = 'f'
+        UNION ALL
+        SELECT 'p'::CHAR(1), ps.project_id, ps.skill_id
+        FROM touched o
+        JOIN project_skill ps ON ps.project_id = o.owner_id
+        WHERE o.owner_kind = 'p'
+    ), membership AS (
+        -- on the list now unless it was just added (net +1), or not on it now but removed (net -1)
+        SELECT COALESCE(c.owner_kind, n.owner_kind) AS owner_kind, COALESCE(c.owner_id, n.owner_id) AS owner_id,
+               COALESCE(c.skill_id, n.skill_id) AS skill_id,
+               (c.skill_id IS NOT NULL)::INTEGER AS in_new,
+               (CASE WHEN c.skill_id IS NOT NULL THEN COALESCE(n.delta, 0) <= 0 ELSE n.delta < 0 END)::INTEGER AS in_old
+        FROM current_lists c
+        FULL JOIN net n ON n.owner_kind = c.owner_kind AND n.owner_id = c.owner_id AND n.skill_id = c.skill_id
+    ), usage_delta AS (
+        INSERT INTO skill_usage (skill_id, owners, version)
+        SELECT m.skill_id, SUM(m.in_new - m.in_old), graph_version
+        FROM membership m
+        GROUP BY m.skill_id
+        HAVING SUM(m.in_new - m.in_old) <> 0
+        ON CONFLICT (skill_id) DO UPDATE
+        SET owners = skill_usage.owners + EXCLUDED.owners, version = EXCLUDED.version
+    )
+    INSERT INTO skill_cooccurrence (skill_id, related_skill_id, owners, version)
+    SELECT a.skill_id, b.skill_id, SUM(a.in_new * b.in_new - a.in_old * b.in_old), graph_version
+    FROM membership a
+    JOIN membership b ON b.owner_kind = a.owner_kind AND b.owner_id = a.owner_id AND b.skill_id <> a.skill_id
+    GROUP BY a.skill_id, b.skill_id
+    HAVING SUM(a.in_new * b.in_new - a.in_old * b.in_old) <> 0
+    ON CONFLICT (skill_id, related_skill_id) DO UPDATE
+    SET owners = skill_cooccurrence.owners + EXCLUDED.owners, version = EXCLUDED.version;
+    GET DIAGNOSTICS changed_pairs = ROW_COUNT;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- build the matrix for the skill lists loaded before the triggers existed
+INSERT INTO skill_list_change (owner_kind, owner_id, skill_id, sign)
+SELECT 'f', profile_id, skill_id, 1 FROM freelancer_skill
+UNION ALL
+SELECT 'p', project_id, skill_id, 1 FROM project_skill;
+SELECT * FROM refresh_skill_cooccurrence();
+-- time partitioning (jobs/archive_history.py): proposal and payment only grow, so they
+-- are range-partitioned by month on their creation time. Each month is a partition with
+-- its own indexes, vacuumed and reindexed on its own, and the lookups below carry a
+-- lower bound on created_at so PostgreSQL skips (prunes) the months before it:
+--     a project's proposals   created_at >= project.created_at
+--     a contract's payments   created_at >= contract.proposal_created_at
+-- New rows are stamped with clock_timestamp(), after the row they belong to was
+-- committed; rows given an explicit earlier created_at are rejected by the triggers
+-- below, as the pruned lookups would miss them. Rows written before this section are
+-- dated by it. Partitions are created PARTITION_MONTHS_AHEAD months in advance
+-- (ensure_month_partitions); an insert past the last one fails.
+ALTER TABLE project ADD COLUMN created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE milestone ADD COLUMN created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- to create the partition of parent holding month, named <parent>_yYYYYmMM, unless a
+-- table of that name exists (also after it was moved to the archive). Returns whether
+-- it was created
+CREATE OR REPLACE FUNCTION create_month_partition(parent REGCLASS, month DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    part_name TEXT := parent::TEXT || to_char(month, '"_y"YYYY"m"MM');
+    from_time TIMESTAMP := date_trunc('month', month);
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                   part_name, parent, from_time, from_time + INTERVAL '1 month');
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+-- to create the partitions of the current month and the months_ahead months after it;
+-- returns how many were missing
+CREATE OR REPLACE FUNCTION ensure_month_partitions(parent REGCLASS, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+    SELECT COUNT(*) FILTER (WHERE create_month_partition(parent, (date_trunc('month', LOCALTIMESTAMP)
+                                                                  + make_interval(months => m))::DATE))::INTEGER
+    FROM generate_series(0, months_ahead) m
+$$ LANGUAGE sql;
+
+-- proposal: the primary key of a partitioned table must contain the partition key, so it
+-- becomes (proposal_id, created_at) and contract references it with the proposal's
+-- created_at. Copied over, then the old table's triggers are recreated.
+ALTER TABLE contract DROP CONSTRAINT contract_proposal_id_fkey;
+ALTER TABLE proposal RENAME TO proposal_unpartitioned;
+ALTER TABLE proposal_unpartitioned DROP CONSTRAINT proposal_pkey;
+ALTER TABLE proposal_unpartitioned DROP CONSTRAINT proposal_project_id_freelancer_id_key;
+DROP INDEX idx_proposal_project_bid, idx_proposal_freelancer_status;
+
+CREATE TABLE proposal (
+    proposal_id BIGINT NOT NULL DEFAULT nextval('proposal_proposal_id_seq'),
+    project_id BIGINT NOT NULL,
+    freelancer_id BIGINT NOT NULL,
+    bid_amount_cents INTEGER NOT NULL,
+    status VARCHAR(20) DEFAULT 'pending',
+    cover_letter TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (proposal_id, created_at),
+    FOREIGN KEY (project_id) REFERENCES project(project_id),
+    FOREIGN KEY (freelancer_id) REFERENCES users(user_id)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE proposal_proposal_id_seq OWNED BY proposal.proposal_id;
+CREATE INDEX idx_proposal_project_bid ON proposal(project_id, bid_amount_cents, proposal_id);
+CREATE INDEX idx_proposal_freelancer_status ON proposal(freelancer_id, status);
+-- the archive job walks the old rejected proposals
+CREATE INDEX idx_proposal_rejected ON proposal(created_at) WHERE status = 'rejected';
+
+SELECT ensure_month_partitions('proposal', 3);
+INSERT INTO proposal (proposal_id, project_id, freelancer_id, bid_amount_cents, status, cover_letter, created_at)
+SELECT proposal_id, project_id, freelancer_id, bid_amount_cents, status, cover_letter, CURRENT_TIMESTAMP
+FROM proposal_unpartitioned;
+DROP TABLE proposal_unpartitioned;
+
+ALTER TABLE contract ADD COLUMN proposal_created_at TIMESTAMP;
+UPDATE contract c
+SET proposal_created_at = p.created_at
+FROM proposal p
+WHERE p.proposal_id = c.proposal_id;
+ALTER TABLE contract ALTER COLUMN proposal_created_at SET NOT NULL;
+ALTER TABLE contract ADD FOREIGN KEY (proposal_id, proposal_created_at) REFERENCES proposal(proposal_id, created_at);
+
+-- payment: same conversion. Nothing references payment.
+ALTER TABLE payment RENAME TO payment_unpartitioned;
+ALTER TABLE payment_unpartitioned DROP CONSTRAINT payment_pkey;
+DROP INDEX idx_payment_contract, uq_payment_released_milestone;
+
+CREATE TABLE payment (
+    payment_id BIGINT NOT NULL DEFAULT nextval('payment_payment_id_seq'),
+    contract_id BIGINT NOT NULL,
+    milestone_id BIGINT,
+    payer_id BIGINT NOT NULL,
+    payee_id BIGINT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    status VARCHAR(20),
+    released_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (payment_id, created_at),
+    FOREIGN KEY (contract_id) REFERENCES contract(contract_id),
+    FOREIGN KEY (milestone_id) REFERENCES milestone(milestone_id),
+    FOREIGN KEY (payer_id) REFERENCES users(user_id),
+    FOREIGN KEY (payee_id) REFERENCES users(user_id)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE payment_payment_id_seq OWNED BY payment.payment_id;
+CREATE INDEX idx_payment_contract ON payment(contract_id);
+CREATE INDEX idx_payment_milestone ON payment(milestone_id);
+-- escrowed payments, so the archive job sees at once whether a month is settled
+CREATE INDEX idx_payment_unsettled ON payment(created_at) WHERE status IS DISTINCT FROM 'released';
+
+SELECT ensure_month_partitions('payment', 3);
+INSERT INTO payment (payment_id, contract_id, milestone_id, payer_id, payee_id, amount_cents, status,
+                     released_at, created_at)
+SELECT payment_id, contract_id, milestone_id, payer_id, payee_id, amount_cents, status,
+       released_at, CURRENT_TIMESTAMP
+FROM payment_unpartitioned;
+DROP TABLE payment_unpartitioned;
+
+-- cold storage: rejected proposals and settled payment months older than
+-- ARCHIVE_AFTER_MONTHS, partitioned by month like the live tables. Nothing writes
+-- to them but the archive job; the history views read live and archived rows
+CREATE TABLE proposal_archive (LIKE proposal) PARTITION BY RANGE (created_at);
+ALTER TABLE proposal_archive ADD PRIMARY KEY (proposal_id, created_at);
+CREATE INDEX idx_proposal_archive_freelancer_status ON proposal_archive(freelancer_id, status);
+
+CREATE TABLE payment_archive (LIKE payment) PARTITION BY RANGE (created_at);
+ALTER TABLE payment_archive ADD PRIMARY KEY (payment_id, created_at);
+CREATE INDEX idx_payment_archive_contract ON payment_archive(contract_id);
+
+CREATE OR REPLACE VIEW proposal_history AS
+SELECT * FROM proposal
+UNION ALL
+SELECT * FROM proposal_archive;
+
+CREATE OR REPLACE VIEW payment_history AS
+SELECT * FROM payment
+UNION ALL
+SELECT * FROM payment_archive;
+
+-- one proposal per freelancer and project, and one released payment per milestone:
+-- unique indexes on a partitioned table must contain created_at, so these keys are kept
+-- in tables of their own by the triggers below, and a duplicate fails the statement.
+-- Archived proposals keep their key. proposal_key also maps a proposal id to its
+-- created_at, so lookups by id alone can be pruned to the proposal's month
+CREATE TABLE proposal_key (
+    project_id BIGINT,
+    freelancer_id BIGINT,
+    proposal_id BIGINT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (project_id, freelancer_id)
+);
+INSERT INTO proposal_key (project_id, freelancer_id, proposal_id, created_at)
+SELECT project_id, freelancer_id, proposal_id, created_at FROM proposal;
+CREATE UNIQUE INDEX idx_proposal_key_proposal ON proposal_key(proposal_id) INCLUDE (created_at);
+
+CREATE TABLE released_milestone (
+    milestone_id BIGINT PRIMARY KEY,
+    payment_id BIGINT NOT NULL
+);
+INSERT INTO released_milestone (milestone_id, payment_id)
+SELECT milestone_id, payment_id FROM payment WHERE status = 'released' AND milestone_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION track_proposal_keys()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') AND EXISTS (
+        SELECT 1 FROM new_proposals n
+        JOIN project p ON p.project_id = n.project_id
+        WHERE n.created_at < p.created_at
+    ) THEN
+        RAISE EXCEPTION 'A proposal cannot be created before its project';
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM proposal_key k
+        USING old_proposals o
+        WHERE k.project_id = o.project_id AND k.freelancer_id = o.freelancer_id
+          AND NOT EXISTS (SELECT 1 FROM proposal_archive a
+                          WHERE a.proposal_id = o.proposal_id AND a.created_at = o.created_at);
+    ELSIF TG_OP = 'UPDATE' THEN
+        DELETE FROM proposal_key k
+        USING old_proposals o
+        JOIN new_proposals n ON n.proposal_id = o.proposal_id
+        WHERE k.project_id = o.project_id AND k.freelancer_id = o.freelancer_id
+          AND (n.project_id, n.freelancer_id) IS DISTINCT FROM (o.project_id, o.freelancer_id);
+        INSERT INTO proposal_key (project_id, freelancer_id, proposal_id, created_at)
+        SELECT n.project_id, n.freelancer_id, n.proposal_id, n.created_at
+        FROM new_proposals n
+        JOIN old_proposals o ON o.proposal_id = n.proposal_id
+        WHERE (n.project_id, n.freelancer_id) IS DISTINCT FROM (o.project_id, o.freelancer_id);
+        UPDATE proposal_key k
+        SET created_at = n.created_at
+        FROM new_proposals n
+        JOIN old_proposals o ON o.proposal_id = n.proposal_id
+        WHERE k.proposal_id = n.proposal_id AND n.created_at <> o.created_at;
+    ELSE
+        INSERT INTO proposal_key (project_id, freelancer_id, proposal_id, created_at)
+        SELECT n.project_id, n.freelancer_id, n.proposal_id, n.created_at FROM new_proposals n;
+    END IF;
+    RETURN NULL;
+EXCEPTION
+    WHEN unique_violation THEN
+        RAISE EXCEPTION 'A freelancer can submit only one proposal per project'
+            USING ERRCODE = 'unique_violation';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_released_milestones()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM released_milestone r
+        USING old_payments o
+        WHERE r.milestone_id = o.milestone_id AND r.payment_id = o.payment_id AND o.status = 'released';
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF EXISTS (
+            SELECT 1 FROM new_payments n
+            JOIN contract c ON c.contract_id = n.contract_id
+            WHERE n.created_at < c.proposal_created_at
+        ) THEN
+            RAISE EXCEPTION 'A payment cannot be created before its contract''s proposal';
+        END IF;
+        INSERT INTO released_milestone (milestone_id, payment_id)
+        SELECT n.milestone_id, n.payment_id
+        FROM new_payments n
+        WHERE n.status = 'released' AND n.milestone_id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+EXCEPTION
+    WHEN unique_violation THEN
+        RAISE EXCEPTION 'A milestone can be paid out only once' USING ERRCODE = 'unique_violation';
+END;
+$$ LANGUAGE plpgsql;
+
+-- the triggers of the old tables, and the key triggers
+CREATE TRIGGER trg_check_proposal_role
+AFTER INSERT ON proposal
+REFERENCING NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_proposal_role();
+
+CREATE TRIGGER trg_proposal_version_insert
+AFTER INSERT ON proposal
+REFERENCING NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+CREATE TRIGGER trg_proposal_version_update
+AFTER UPDATE ON proposal
+REFERENCING OLD TABLE AS old_proposals NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+CREATE TRIGGER trg_proposal_version_delete
+AFTER DELETE ON proposal
+REFERENCING OLD TABLE AS old_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_proposal_version();
+
+CREATE TRIGGER trg_proposal_keys_insert
+AFTER INSERT ON proposal
+REFERENCING NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_proposal_keys();
+
+CREATE TRIGGER trg_proposal_keys_update
+AFTER UPDATE ON proposal
+REFERENCING OLD TABLE AS old_proposals NEW TABLE AS new_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_proposal_keys();
+
+CREATE TRIGGER trg_proposal_keys_delete
+AFTER DELETE ON proposal
+REFERENCING OLD TABLE AS old_proposals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_proposal_keys();
+
+CREATE TRIGGER trg_payment_contract_totals_insert
+AFTER INSERT ON payment
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_payment_contract_totals_update
+AFTER UPDATE ON payment
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_payment_contract_totals_delete
+AFTER DELETE ON payment
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_contract_totals();
+
+CREATE TRIGGER trg_stamp_payment_release
+BEFORE INSERT OR UPDATE OF status, released_at ON payment
+FOR EACH ROW
+EXECUTE FUNCTION stamp_payment_release();
+
+CREATE TRIGGER trg_payment_earnings_ledger
+AFTER INSERT OR DELETE OR UPDATE OF payee_id, amount_cents, status, released_at ON payment
+FOR EACH ROW
+EXECUTE FUNCTION update_earnings_ledger();
+
+CREATE TRIGGER trg_released_milestones_insert
+AFTER INSERT ON payment
+REFERENCING NEW TABLE AS new_payments
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_released_milestones();
+
+CREATE TRIGGER trg_released_milestones_update
+AFTER UPDATE ON payment
+REFERENCING OLD TABLE AS old_payments NEW TABLE AS new_payments
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_released_milestones();
+
+CREATE TRIGGER trg_released_milestones_delete
+AFTER DELETE ON payment
+REFERENCING OLD TABLE AS old_payments
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_released_milestones();
+
+-- the functions that look up proposals and payments, with the created_at bounds, and
+-- reading the archive where they need the whole history
+
+-- to recompute the stored totals of one contract (paid includes archived payments)
+CREATE OR REPLACE FUNCTION refresh_contract_totals(cid BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    -- lock the contract first, so the sums below run on a snapshot taken after any
+    -- concurrent release or milestone change of this contract committed. NO KEY UPDATE
+    -- (the UPDATE's own lock) doesn't wait on the key-share locks of the foreign keys
+    -- of payment and milestone inserts, so concurrent inserts don't deadlock here
+    PERFORM 1 FROM contract WHERE contract_id = cid FOR NO KEY UPDATE;
+    UPDATE contract c
+    SET total_amount_cents = COALESCE(
+            (SELECT SUM(m.amount_cents) FROM milestone m WHERE m.contract_id = cid),
+            (SELECT p.bid_amount_cents FROM proposal p
+             WHERE p.proposal_id = c.proposal_id AND p.created_at = c.proposal_created_at),
+            0),
+        paid_amount_cents = COALESCE(
+            (SELECT SUM(pay.amount_cents) FROM payment_history pay
+             WHERE pay.contract_id = cid AND pay.status = 'released'
+               AND pay.created_at >= c.proposal_created_at),
+            0)
+    WHERE c.contract_id = cid;
+END;
+$$ LANGUAGE plpgsql;
+
+-- to Accept Proposal & Create Contract; returns the contract id (see above).
+-- The project's proposals are looked up from the month it was posted
+CREATE OR REPLACE FUNCTION accept_proposal(p_proposal_id BIGINT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_project_id BIGINT;
+    v_created_at TIMESTAMP;
+    v_posted_at TIMESTAMP;
+    v_status VARCHAR(20);
+    v_contract_id BIGINT;
+BEGIN
+    -- the proposal's created_at from its key prunes every lookup below to its month
+    SELECT created_at INTO v_created_at FROM proposal_key WHERE proposal_id = p_proposal_id;
+
+    SELECT project_id INTO v_project_id
+    FROM proposal
+    WHERE proposal_id = p_proposal_id AND created_at = v_created_at;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Proposal % does not exist', p_proposal_id;
+    END IF;
+
+    -- NO KEY UPDATE still lets new proposals reference the project while we hold it
+    SELECT created_at INTO v_posted_at FROM project WHERE project_id = v_project_id FOR NO KEY UPDATE;
+
+    SELECT contract_id INTO v_contract_id
+    FROM contract
+    WHERE proposal_id = p_proposal_id;
+
+    IF FOUND THEN
+        RETURN v_contract_id;
+    END IF;
+
+    SELECT status INTO v_status
+    FROM proposal
+    WHERE proposal_id = p_proposal_id AND created_at = v_created_at;
+
+    IF v_status <> 'pending' THEN
+        RAISE EXCEPTION 'Proposal % is %, not pending', p_proposal_id, v_status;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM proposal
+        WHERE project_id = v_project_id AND created_at >= v_posted_at AND status = 'accepted'
+    ) THEN
+        RAISE EXCEPTION 'Project % already has an accepted proposal', v_project_id;
+    END IF;
+
+    UPDATE proposal
+    SET status = CASE WHEN proposal_id = p_proposal_id THEN 'accepted' ELSE 'rejected' END
+    WHERE project_id = v_project_id AND created_at >= v_posted_at
+      AND (proposal_id = p_proposal_id OR status = 'pending');
+
+    INSERT INTO contract (proposal_id, proposal_created_at, client_id, freelancer_id, total_amount_cents, status)
+    SELECT p.proposal_id, p.created_at, pr.client_id, p.freelancer_id, p.bid_amount_cents, 'active'
+    FROM proposal p
+    JOIN project pr ON p.project_id = pr.project_id
+    WHERE p.proposal_id = p_proposal_id AND p.created_at = v_created_at
+    RETURNING contract_id INTO v_contract_id;
+
+    RETURN v_contract_id;
+END;
+$$;
+
+-- to Complete Milestones & Release their Payments (see above). Without a unique index
+-- to fall back on, concurrent releases of a milestone are serialized on its row
+CREATE OR REPLACE FUNCTION release_payment_batch(m_ids BIGINT[])
+RETURNS INTEGER AS $$
+DECLARE
+    since TIMESTAMP;
+    released_count INTEGER;
+    inserted_count INTEGER;
+BEGIN
+    PERFORM 1 FROM milestone WHERE milestone_id = ANY(m_ids) ORDER BY milestone_id FOR NO KEY UPDATE;
+
+    UPDATE milestone
+    SET status = 'completed'
+    WHERE milestone_id = ANY(m_ids) AND status IS DISTINCT FROM 'completed';
+
+    -- the milestones' payments are no older than their contracts' proposals
+    SELECT MIN(c.proposal_created_at) INTO since
+    FROM milestone m
+    JOIN contract c ON m.contract_id = c.contract_id
+    WHERE m.milestone_id = ANY(m_ids);
+
+    -- release the escrowed payment if the milestone has one, otherwise pay it out directly
+    UPDATE payment p
+    SET status = 'released'
+    WHERE p.milestone_id = ANY(m_ids) AND p.status = 'escrowed' AND p.created_at >= since
+      AND NOT EXISTS (SELECT 1 FROM released_milestone r WHERE r.milestone_id = p.milestone_id);
+    GET DIAGNOSTICS released_count = ROW_COUNT;
+
+    INSERT INTO payment (contract_id, milestone_id, payer_id, payee_id, amount_cents, status)
+    SELECT m.contract_id, m.milestone_id, c.client_id, c.freelancer_id, m.amount_cents, 'released'
+    FROM milestone m
+    JOIN contract c ON m.contract_id = c.contract_id
+    WHERE m.milestone_id = ANY(m_ids)
+      AND NOT EXISTS (SELECT 1 FROM released_milestone r WHERE r.milestone_id = m.milestone_id);
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+
+    RETURN released_count + inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- the earnings ledger checks and rebuilds count archived payments too
+CREATE OR REPLACE FUNCTION reconcile_payee_earnings()
+RETURNS TABLE (payee_id BIGINT, month DATE, ledger_cents BIGINT, actual_cents BIGINT,
+               ledger_count BIGINT, actual_count BIGINT) AS $$
+BEGIN
+    RETURN QUERY
+    WITH actual AS (
+        SELECT p.payee_id, date_trunc('month', p.released_at)::DATE AS month,
+               SUM(p.amount_cents)::BIGINT AS earned_cents, COUNT(*) AS payment_count
+        FROM payment_history p
+        WHERE p.status = 'released'
+        GROUP BY 1, 2
+    )
+    SELECT COALESCE(l.payee_id, a.payee_id),
+           COALESCE(l.month, a.month),
+           COALESCE(l.earned_cents, 0),
+           COALESCE(a.earned_cents, 0),
+           COALESCE(l.payment_count, 0)::BIGINT,
+           COALESCE(a.payment_count, 0)
+    FROM payee_earnings_monthly l
+    FULL JOIN actual a ON a.payee_id = l.payee_id AND a.month = l.month
+    WHERE COALESCE(l.earned_cents, 0) <> COALESCE(a.earned_cents, 0)
+       OR COALESCE(l.payment_count, 0) <> COALESCE(a.payment_count, 0)
+    UNION ALL
+    SELECT COALESCE(t.payee_id, s.payee_id),
+           NULL::DATE,
+           COALESCE(t.total_earned_cents, 0),
+           COALESCE(s.earned_cents, 0),
+           COALESCE(t.payment_count, 0)::BIGINT,
+           COALESCE(s.payment_count, 0)
+    FROM payee_earnings t
+    FULL JOIN (
+        SELECT a.payee_id, SUM(a.earned_cents)::BIGINT AS earned_cents,
+               SUM(a.payment_count)::BIGINT AS payment_count
+        FROM actual a
+        GROUP BY a.payee_id
+    ) s ON s.payee_id = t.payee_id
+    WHERE COALESCE(t.total_earned_cents, 0) <> COALESCE(s.earned_cents, 0)
+       OR COALESCE(t.payment_count, 0) <> COALESCE(s.payment_count, 0);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE PROCEDURE rebuild_payee_earnings()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM payee_earnings_monthly;
+    DELETE FROM payee_earnings;
+
+    INSERT INTO payee_earnings_monthly (payee_id, month, earned_cents, payment_count)
+    SELECT payee_id, date_trunc('month', released_at)::DATE, SUM(amount_cents), COUNT(*)
+    FROM payment_history
+    WHERE status = 'released'
+    GROUP BY 1, 2;
+
+    INSERT INTO payee_earnings (payee_id, total_earned_cents, payment_count)
+    SELECT payee_id, SUM(earned_cents), SUM(payment_count)
+    FROM payee_earnings_monthly
+    GROUP BY payee_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION count_freelancer_proposals(fid BIGINT)
+RETURNS INTEGER AS $$
+BEGIN
+    RETURN (
+        SELECT COUNT(*)
+        FROM proposal_history
+        WHERE freelancer_id = fid
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- the monthly partitions of the live and archive tables, with their time range and size
+CREATE OR REPLACE VIEW month_partitions AS
+SELECT i.inhparent::REGCLASS::TEXT AS parent_table,
+       c.relname::TEXT AS partition_name,
+       bounds[1]::TIMESTAMP AS from_time,
+       bounds[2]::TIMESTAMP AS to_time,
+       GREATEST(c.reltuples, 0)::BIGINT AS estimated_rows,
+       pg_total_relation_size(c.oid) AS total_bytes
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+CROSS JOIN LATERAL regexp_match(pg_get_expr(c.relpartbound, c.oid),
+                                'FROM \(''([^'']+)''\) TO \(''([^'']+)''\)') bounds
+WHERE i.inhparent IN ('proposal'::REGCLASS, 'payment'::REGCLASS,
+                      'proposal_archive'::REGCLASS, 'payment_archive'::REGCLASS);
+
+-- to move one batch of rejected proposals created before cutoff (oldest first) into
+-- proposal_archive. Proposals a contract points to stay. Returns the number moved, 0
+-- when none are left
+CREATE OR REPLACE FUNCTION archive_rejected_proposals(cutoff TIMESTAMP, batch_size INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    ids BIGINT[];
+    stamps TIMESTAMP[];
+    moved_count INTEGER;
+BEGIN
+    SELECT array_agg(b.proposal_id), array_agg(b.created_at) INTO ids, stamps
+    FROM (SELECT p.proposal_id, p.created_at
+          FROM proposal p
+          WHERE p.status = 'rejected' AND p.created_at < cutoff
+            AND NOT EXISTS (SELECT 1 FROM contract c
+                            WHERE c.proposal_id = p.proposal_id AND c.proposal_created_at = p.created_at)
+          ORDER BY p.created_at
+          LIMIT batch_size
+          FOR UPDATE SKIP LOCKED) b;
+    IF ids IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    PERFORM create_month_partition('proposal_archive', m.month)
+    FROM (SELECT DISTINCT date_trunc('month', s)::DATE AS month FROM unnest(stamps) s) m;
+
+    WITH moved AS (
+        DELETE FROM proposal p
+        USING unnest(ids, stamps) b(proposal_id, created_at)
+        WHERE p.proposal_id = b.proposal_id AND p.created_at = b.created_at
+        RETURNING p.*
+    )
+    INSERT INTO proposal_archive SELECT * FROM moved;
+    GET DIAGNOSTICS moved_count = ROW_COUNT;
+    RETURN moved_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- a month of payments that holds only released payments moves from payment to
+-- payment_archive whole: the partition is detached and attached, no row is rewritten
+-- and no trigger fires, so the earnings ledger, contract totals and released
+-- milestones stay as they are. DatabaseConnection.archive_payment_month runs it as
+-- separate short transactions, so payment is never locked ACCESS EXCLUSIVE:
+--   1. begin_payment_archive records the move and adds a CHECK of the month's bounds
+--      NOT VALID; the CHECK is then validated without blocking writes
+--   2. ALTER TABLE payment DETACH PARTITION ... CONCURRENTLY (FINALIZE if a run was
+--      stopped during it); not allowed inside a function
+--   3. finish_payment_archive attaches it to payment_archive, where the validated
+--      CHECK saves the scan of the month
+-- Between 2 and 3 the month is in neither table. A stopped run leaves its row in
+-- payment_archive_move, and the next run resumes from there
+CREATE TABLE payment_archive_move (
+    partition_name TEXT PRIMARY KEY,
+    from_time TIMESTAMP NOT NULL,
+    to_time TIMESTAMP NOT NULL
+);
+
+-- step 1: FALSE if the month still has unsettled payments, TRUE once the move is
+-- recorded (or when it already was)
+CREATE OR REPLACE FUNCTION begin_payment_archive(part_name TEXT)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_from TIMESTAMP;
+    v_to TIMESTAMP;
+BEGIN
+    IF EXISTS (SELECT 1 FROM payment_archive_move WHERE partition_name = part_name) THEN
+        RETURN TRUE;
+    END IF;
+    SELECT mp.from_time, mp.to_time INTO v_from, v_to
+    FROM month_partitions mp
+    WHERE mp.parent_table = 'payment' AND mp.partition_name = part_name;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION '% is not a partition of payment', part_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM payment p
+               WHERE p.created_at >= v_from AND p.created_at < v_to
+                 AND p.status IS DISTINCT FROM 'released') THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO payment_archive_move (partition_name, from_time, to_time)
+    VALUES (part_name, v_from, v_to);
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I '
+                   'CHECK (created_at IS NOT NULL AND created_at >= %L AND created_at < %L) NOT VALID',
+                   part_name, part_name || '_bounds', v_from, v_to);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- step 3: attach the detached month to payment_archive and end its move; returns the
+-- rows moved
+CREATE OR REPLACE FUNCTION finish_payment_archive(part_name TEXT)
+RETURNS BIGINT AS $$
+DECLARE
+    v_from TIMESTAMP;
+    v_to TIMESTAMP;
+    moved_count BIGINT;
+BEGIN
+    DELETE FROM payment_archive_move WHERE partition_name = part_name
+    RETURNING from_time, to_time INTO v_from, v_to;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'no archive move of % was begun', part_name;
+    END IF;
+    EXECUTE format('ALTER TABLE payment_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                   part_name, v_from, v_to);
+    EXECUTE format('SELECT COUNT(*) FROM %I', part_name) INTO moved_count;
+    RETURN moved_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- partitioned parents are not analyzed by autovacuum (their partitions are); the archive
+-- job analyzes them after every run
+ANALYZE proposal;
+ANALYZE payment;
+
+-- schema migrations (migrations.py, jobs/migrate.py): one row per migration started,
+-- holding the next step to run and, during a backfill, the last key done and the
+-- key the backfill stops at. Every backfill chunk commits together with its row
+-- here, so a stopped migration resumes exactly where it left off
+CREATE TABLE schema_migration (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    step INTEGER NOT NULL DEFAULT 0,
+    last_key BIGINT,
+    max_key BIGINT,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+-- monthly statements (jobs/generate_statements.py): every worker reads one range of
+-- freelancer ids, so contracts, released payments and reviews are reached by the
+-- freelancer's id. Archived payment months keep their index when attached
+CREATE INDEX idx_contract_freelancer ON contract(freelancer_id);
+CREATE INDEX idx_payment_payee_released ON payment(payee_id, released_at) WHERE status = 'released';
+CREATE INDEX idx_payment_archive_payee_released ON payment_archive(payee_id, released_at)
+    WHERE status = 'released';
+CREATE INDEX idx_review_reviewee_created ON review(reviewee_id, created_at);
+
+-- analytics extracts (analytics.py): proposals and payments get the change_xid stamp
+-- of the snapshot tables, so the app re-reads only the rows written since its last
+-- extract. The column is added with a constant default, which rewrites nothing, and
+-- rows written before this section read as 0 (older than any extract). The archives
+-- get the column too: archived proposals and payment months keep their stamp
+ALTER TABLE proposal ADD COLUMN change_xid xid8 NOT NULL DEFAULT '0';
+ALTER TABLE proposal ALTER COLUMN change_xid SET DEFAULT pg_current_xact_id();
+ALTER TABLE proposal_archive ADD COLUMN change_xid xid8 NOT NULL DEFAULT '0';
+ALTER TABLE payment ADD COLUMN change_xid xid8 NOT NULL DEFAULT '0';
+ALTER TABLE payment ALTER COLUMN change_xid SET DEFAULT pg_current_xact_id();
+ALTER TABLE payment_archive ADD COLUMN change_xid xid8 NOT NULL DEFAULT '0';
+CREATE INDEX idx_proposal_change_xid ON proposal(change_xid);
+CREATE INDEX idx_proposal_archive_change_xid ON proposal_archive(change_xid);
+CREATE INDEX idx_payment_change_xid ON payment(change_xid);
+CREATE INDEX idx_payment_archive_change_xid ON payment_archive(change_xid);
+
+CREATE TRIGGER trg_proposal_change_xid BEFORE UPDATE ON proposal
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+CREATE TRIGGER trg_payment_change_xid BEFORE UPDATE ON payment
+FOR EACH ROW EXECUTE FUNCTION stamp_change_xid();
+
+-- the history views list the new column
+CREATE OR REPLACE VIEW proposal_history AS
+SELECT * FROM proposal
+UNION ALL
+SELECT * FROM proposal_archive;
+
+CREATE OR REPLACE VIEW payment_history AS
+SELECT * FROM payment
+UNION ALL
+SELECT * FROM payment_archive;
+
+-- freelancer directory: the Freelancers tab, the API freelancer list and the skill
+-- search read this instead of joining the profile tables on every call. Each row
+-- also carries the freelancer's skills (strongest first), review count, completed
+-- contracts and earnings. jobs/refresh_directory.py refreshes it CONCURRENTLY, so
+-- readers are never blocked: when the source tables signal a change, and on a schedule.
+CREATE MATERIALIZED VIEW freelancer_directory AS
+WITH skills AS (
+    SELECT fs.profile_id,
+           string_agg(s.skill_name, ', ' ORDER BY fs.proficiency_level DESC NULLS LAST, s.skill_name) AS skills,
+           array_agg(fs.skill_id ORDER BY fs.skill_id) AS skill_ids,
+           array_agg(fs.proficiency_level ORDER BY fs.skill_id) AS skill_levels
+    FROM freelancer_skill fs
+    JOIN skill s ON s.skill_id = fs.skill_id
+    GROUP BY fs.profile_id
+), reviews AS (
+    SELECT reviewee_id, COUNT(*) AS review_count
+    FROM review
+    GROUP BY reviewee_id
+), contracts AS (
+    SELECT freelancer_id, COUNT(*) AS completed_contracts
+    FROM contract
+    WHERE status = 'completed'
+    GROUP BY freelancer_id
+)
+SELECT u.user_id, u.username, f.headline, f.rate_per_hour, COALESCE(f.avg_rating, 0) AS avg_rating,
+       f.reputation_score,
+       COALESCE(sk.skills, '') AS skills,
+       COALESCE(r.review_count, 0) AS review_count,
+       COALESCE(c.completed_contracts, 0) AS completed_contracts,
+       COALESCE(e.total_earned_cents, 0) AS earned_cents,
+       COALESCE(sk.skill_ids, '{}') AS skill_ids,
+       COALESCE(sk.skill_levels, '{}') AS skill_levels
+FROM freelancer_profile f
+JOIN users u ON u.user_id = f.user_id
+LEFT JOIN skills sk ON sk.profile_id = f.profile_id
+LEFT JOIN reviews r ON r.reviewee_id = f.user_id
+LEFT JOIN contracts c ON c.freelancer_id = f.user_id
+LEFT JOIN payee_earnings e ON e.payee_id = f.user_id;
+
+-- REFRESH ... CONCURRENTLY needs a unique index; the others serve the list orders
+-- (see FREELANCER_SORTS in database.py) and the skill search (skill_ids @> ARRAY[id])
+CREATE UNIQUE INDEX idx_freelancer_directory_user ON freelancer_directory(user_id);
+CREATE INDEX idx_freelancer_directory_reputation ON freelancer_directory(reputation_score DESC, user_id DESC);
+CREATE INDEX idx_freelancer_directory_rating ON freelancer_directory(avg_rating DESC, user_id DESC);
+CREATE INDEX idx_freelancer_directory_earned ON freelancer_directory(earned_cents DESC, user_id DESC);
+CREATE INDEX idx_freelancer_directory_reviews ON freelancer_directory(review_count DESC, user_id DESC);
+CREATE INDEX idx_freelancer_directory_skills ON freelancer_directory USING GIN (skill_ids);
+
+-- change signal: every statement writing a source table notifies the refresh job
+-- listening on the freelancer_directory channel (identical notifications of one
+-- transaction are delivered once, at commit)
+CREATE OR REPLACE FUNCTION notify_freelancer_directory()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('freelancer_directory', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_directory AFTER INSERT OR UPDATE OR DELETE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_freelancer_profile_directory AFTER INSERT OR UPDATE OR DELETE ON freelancer_profile
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_freelancer_skill_directory AFTER INSERT OR UPDATE OR DELETE ON freelancer_skill
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_skill_directory AFTER UPDATE OR DELETE ON skill
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_review_directory AFTER INSERT OR UPDATE OR DELETE ON review
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_contract_directory AFTER INSERT OR UPDATE OR DELETE ON contract
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+CREATE TRIGGER trg_payee_earnings_directory AFTER INSERT OR UPDATE OR DELETE ON payee_earnings
+FOR EACH STATEMENT EXECUTE FUNCTION notify_freelancer_directory();
+
 --Implementing functional requirements
 
 --User Login (credential validation)
@@ -489,6 +2393,19 @@ SELECT title, budget_min_cents, budget_max_cents
 FROM project
 WHERE budget_min_cents >= 50000 AND budget_max_cents <= 120000;
 
+--Projects whose budget overlaps a range and due in the next 14 days
+SELECT title, budget_min_cents, budget_max_cents, deadline
+FROM project
+WHERE budget_range && int4range(50000, 120000, '[]')
+  AND deadline BETWEEN CURRENT_DATE AND CURRENT_DATE + 14
+ORDER BY deadline, project_id;
+
+--Search projects by keywords, best match first, with the matching part of the description
+SELECT title, ts_rank(search_vector, q) AS rank, ts_headline('english', description, q)
+FROM project, websearch_to_tsquery('english', 'web platform') q
+WHERE search_vector @@ q
+ORDER BY rank DESC, project_id;
+
 --Projects requiring a specific skill
 SELECT p.title, s.skill_name
 FROM project p
@@ -619,7 +2536,7 @@ SELECT
     u.username,
     SUM(p.amount_cents) AS total_earned
 FROM users u
-JOIN payment p ON u.user_id = p.payee_id
+JOIN payment_history p ON u.user_id = p.payee_id
 WHERE u.role = 'freelancer'
 GROUP BY u.user_id, u.username;
 
@@ -0,0 +1,311 @@
+"""
+Analytics module for SkillLink application
+Keeps columnar NumPy extracts of the payment and proposal history, refreshed incrementally, and aggregates them into trends
+"""
+
+import io
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2 import Error
+
+# Bump when EXTRACTS changes shape; older cache files are then ignored
+CACHE_VERSION = 1
+
+# Rows up to which every change_xid is visible: the next extract starts here
+WATERMARK_QUERY = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text"
+
+# Per extract: its columns (the key first, if it has one) with their in-memory dtype and
+# the query producing them. Every column is a NOT NULL bigint, so the binary COPY rows
+# have a fixed width and are read with one np.frombuffer. Keyed extracts are read in
+# key order in batches of %(batch)s rows after %(after)s, keeping only the rows changed
+# since %(since)s; the others are small and read whole on every refresh.
+EXTRACTS = {
+    "payments": {
+        "key": "payment_id",
+        "columns": (("payment_id", np.int64), ("released_at", np.int64), ("amount_cents", np.int64),
+                    ("released", np.int8)),
+        "query": """
+        SELECT payment_id, COALESCE(EXTRACT(EPOCH FROM released_at), 0)::bigint,
+               amount_cents::bigint, COALESCE(status = 'released', false)::int::bigint
+        FROM payment_history
+        WHERE change_xid >= %(since)s::xid8 AND payment_id > %(after)s
+        ORDER BY payment_id
+        LIMIT %(batch)s
+        """,
+    },
+    "proposals": {
+        "key": "proposal_id",
+        "columns": (("proposal_id", np.int64), ("project_id", np.int64), ("created_at", np.int64),
+                    ("status", np.int8)),
+        "query": """
+        SELECT proposal_id, project_id, EXTRACT(EPOCH FROM created_at)::bigint,
+               CASE status WHEN 'accepted' THEN 1 WHEN 'rejected' THEN 2 ELSE 0 END::bigint
+        FROM proposal_history
+        WHERE change_xid >= %(since)s::xid8 AND proposal_id > %(after)s
+        ORDER BY proposal_id
+        LIMIT %(batch)s
+        """,
+    },
+    "project_skills": {
+        "key": None,
+        "columns": (("project_id", np.int64), ("skill_id", np.int64)),
+        "query": "SELECT project_id, skill_id FROM project_skill",
+    },
+}
+
+# proposals "status" codes
+ACCEPTED = 1
+REJECTED = 2
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+# 1970-01-05, the first Monday after the epoch: weeks start on Mondays
+FIRST_MONDAY = date(1970, 1, 5)
+WEEK_SECONDS = 7 * 86400
+MONDAY_OFFSET = 4 * 86400
+
+
+def read_binary_copy(data, columns) -> Dict[str, np.ndarray]:
+    """The columns of a COPY ... (FORMAT binary) stream whose fields are all NOT NULL
+    bigints, as arrays of the given dtypes"""
+    if bytes(data[:11]) != COPY_SIGNATURE:
+        raise ValueError("not a binary COPY stream")
+    offset = 19 + int.from_bytes(data[15:19], "big")
+    fields = [("fields", ">i2")]
+    for index, (name, _) in enumerate(columns):
+        fields += [(f"length{index}", ">i4"), (name, ">i8")]
+    row = np.dtype(fields)
+    count = (len(data) - offset - 2) // row.itemsize
+    table = np.frombuffer(data, dtype=row, count=count, offset=offset)
+    if count and not ((table["fields"] == len(columns)).all()
+                      and all((table[f"length{index}"] == 8).all() for index in range(len(columns)))):
+        raise ValueError("binary COPY rows must hold NOT NULL bigints only")
+    return {name: table[name].astype(dtype) for name, dtype in columns}
+
+
+def merge_extract(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray], key: str) -> Dict[str, np.ndarray]:
+    """old with the rows of new replacing those with the same key, new keys added; both
+    are sorted by key and so is the result"""
+    old_keys, new_keys = old[key], new[key]
+    if not old_keys.size:
+        return new
+    position = np.minimum(np.searchsorted(old_keys, new_keys), old_keys.size - 1)
+    hit = old_keys[position] == new_keys
+    merged = {}
+    for column, values in old.items():
+        values = values.copy()
+        values[position[hit]] = new[column][hit]
+        merged[column] = np.concatenate([values, new[column][~hit]])
+    added = new_keys[~hit]
+    if added.size and added[0] < old_keys[-1]:
+        order = np.argsort(merged[key], kind="stable")
+        merged = {column: values[order] for column, values in merged.items()}
+    return merged
+
+
+def month_start(month: int) -> date:
+    """The first day of a month counted from January 1970"""
+    return date(1970 + month // 12, month % 12 + 1, 1)
+
+
+class Analytics:
+    """Columnar copies of the payment and proposal history, with trend aggregates
+
+    refresh() reads only the rows written since the previous refresh (by the
+    change_xid watermark of every database), via binary COPY straight into
+    arrays, and merges them in by key. The aggregates are vectorized over the
+    whole history. The arrays are replaced, never changed in place, so refresh()
+    may run in a worker thread while the UI reads. Rows deleted outright (not
+    archived) stay until a full refresh.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, batch_rows: int = 1000000):
+        self.cache_path = cache_path
+        self.batch_rows = batch_rows
+        self.extracts: Dict[str, Dict[str, np.ndarray]] = {}
+        self.watermarks: Optional[List[str]] = None
+        self.skill_names: Dict[int, str] = {}
+
+    def __len__(self):
+        return sum(len(next(iter(extract.values()))) for extract in self.extracts.values())
+
+    def load_cache(self) -> bool:
+        """Read the extracts saved by save_cache; False if there is no usable cache"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path) as saved:
+                meta = json.loads(str(saved["meta"]))
+                if meta["version"] != CACHE_VERSION:
+                    return False
+                self.extracts = {name: {column: saved[f"{name}.{column}"] for column, _ in spec["columns"]}
+                                 for name, spec in EXTRACTS.items()}
+            self.watermarks = meta["watermarks"]
+            self.skill_names = {int(skill_id): name for skill_id, name in meta["skill_names"].items()}
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error reading analytics cache {self.cache_path}: {e}")
+            return False
+
+    def save_cache(self) -> bool:
+        """Write the extracts and watermarks, so the next start refreshes incrementally"""
+        if not self.cache_path or self.watermarks is None:
+            return False
+        arrays = {f"{name}.{column}": values
+                  for name, extract in self.extracts.items() for column, values in extract.items()}
+        meta = {"version": CACHE_VERSION, "watermarks": self.watermarks, "skill_names": self.skill_names}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(self.cache_path + ".tmp", "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+            return True
+        except OSError as e:
+            print(f"Error writing analytics cache {self.cache_path}: {e}")
+            return False
+
+    def refresh(self, db, full: bool = False) -> Optional[int]:
+        """Bring the extracts up to date over db (one or all shards of a sharded
+        connection), returning how many rows were read; full re-reads everything"""
+        targets = getattr(db, "shards", None) or [db]
+        watermarks = self.watermarks
+        if full or watermarks is None or len(watermarks) != len(targets):
+            watermarks = ["0"] * len(targets)
+        incremental = watermarks[0] != "0"
+
+        fetched = {name: [] for name in EXTRACTS}
+        new_watermarks = []
+        skill_names = {}
+        for target, since in zip(targets, watermarks):
+            # one REPEATABLE READ transaction per database so the watermark matches the rows read
+            try:
+                target.connection.rollback()
+                target.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                # the first load reads the whole history; later ones only what changed
+                target.cursor.execute("SET LOCAL statement_timeout = 0")
+                target.cursor.execute(WATERMARK_QUERY)
+                new_watermarks.append(target.cursor.fetchone()[0])
+                for name, spec in EXTRACTS.items():
+                    fetched[name].append(self._extract(target, spec, since))
+                target.cursor.execute("SELECT skill_id, skill_name FROM skill")
+                skill_names.update(target.cursor.fetchall())
+                target.connection.commit()
+            except (Error, ValueError) as e:
+                print(f"Error refreshing analytics: {e}")
+                if not target.connection.closed:
+                    target.connection.rollback()
+                return None
+
+        extracts = {}
+        read = 0
+        for name, spec in EXTRACTS.items():
+            parts = fetched[name]
+            new = {column: np.concatenate([part[column] for part in parts]) for column, _ in spec["columns"]}
+            read += len(new[spec["columns"][0][0]])
+            key = spec["key"]
+            if key and len(parts) > 1:
+                order = np.argsort(new[key], kind="stable")
+                new = {column: values[order] for column, values in new.items()}
+            if key and incremental and name in self.extracts:
+                new = merge_extract(self.extracts[name], new, key)
+            extracts[name] = new
+
+        self.extracts = extracts
+        self.watermarks = new_watermarks
+        self.skill_names = skill_names
+        return read
+
+    def _extract(self, db, spec, since: str) -> Dict[str, np.ndarray]:
+        """Read one extract's rows changed since the watermark, batch by batch"""
+        columns = spec["columns"]
+        copy = f"COPY ({spec['query']}) TO STDOUT WITH (FORMAT binary)"
+        parts = []
+        after = -2 ** 63
+        while True:
+            buffer = io.BytesIO()
+            db.cursor.copy_expert(db.cursor.mogrify(copy, {"since": since, "after": after,
+                                                           "batch": self.batch_rows}).decode(),
+                                  buffer, size=1024 * 1024)
+            part = read_binary_copy(buffer.getbuffer(), columns)
+            parts.append(part)
+            rows = len(part[columns[0][0]])
+            if spec["key"] is None or rows < self.batch_rows:
+                break
+            after = int(part[spec["key"]][-1])
+        return {column: np.concatenate([part[column] for part in parts]) for column, _ in columns}
+
+    def gmv_by_week(self) -> List[Tuple[date, int, int]]:
+        """(week starting Monday, released cents, payments released) of every week from
+        the first release to the last, empty weeks included"""
+        payments = self.extracts.get("payments")
+        if not payments:
+            return []
+        released = payments["released"] == 1
+        times = payments["released_at"][released]
+        if not times.size:
+            return []
+        weeks = (times - MONDAY_OFFSET) // WEEK_SECONDS
+        first = int(weeks.min())
+        weeks -= first
+        cents = np.bincount(weeks, weights=payments["amount_cents"][released])
+        counts = np.bincount(weeks)
+        return [(FIRST_MONDAY + timedelta(weeks=first + index), int(cents[index]), int(counts[index]))
+                for index in range(counts.size)]
+
+    def proposals_by_month(self) -> List[Tuple[date, int, int, float, int]]:
+        """(month, proposals, projects receiving them, proposals per project, accepted)
+        by month of proposal, from the first month to the last"""
+        proposals = self.extracts.get("proposals")
+        if not proposals or not proposals["created_at"].size:
+            return []
+        times = proposals["created_at"]
+        # months counted from January 1970, by searching the month boundaries
+        first = int(np.datetime64(int(times.min()), "s").astype("datetime64[M]").astype(np.int64))
+        last = int(np.datetime64(int(times.max()), "s").astype("datetime64[M]").astype(np.int64))
+        bounds = np.arange(first, last + 2).astype("datetime64[M]").astype("datetime64[s]").astype(np.int64)
+        months = np.searchsorted(bounds, times, side="right") - 1
+        counts = np.bincount(months)
+        projects = proposals["project_id"]
+        # distinct (month, project) pairs, counted per month
+        span = int(projects.max()) + 1
+        pairs = np.sort(months * span + projects)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        project_counts = np.bincount(pairs // span, minlength=counts.size)
+        accepted = np.bincount(months, weights=proposals["status"] == ACCEPTED, minlength=counts.size)
+        return [(month_start(first + index), int(counts[index]), int(project_counts[index]),
+                 float(counts[index] / project_counts[index]) if project_counts[index] else 0.0,
+                 int(accepted[index]))
+                for index in range(counts.size)]
+
+    def acceptance_by_skill(self, min_decided: int = 1) -> List[Tuple[str, int, int, float]]:
+        """(skill, decided proposals, accepted, acceptance rate) over the proposals on
+        projects requiring each skill, most decided first"""
+        proposals = self.extracts.get("proposals")
+        project_skills = self.extracts.get("project_skills")
+        if not proposals or not project_skills or not project_skills["project_id"].size:
+            return []
+        decided = proposals["status"] != 0
+        if not decided.any():
+            return []
+        # decided and accepted proposals per project (ids are serial, so dense enough to index by)
+        project_ids = proposals["project_id"][decided]
+        span = int(max(project_ids.max(), project_skills["project_id"].max())) + 1
+        decided_per_project = np.bincount(project_ids, minlength=span)
+        accepted_per_project = np.bincount(project_ids, weights=proposals["status"][decided] == ACCEPTED,
+                                           minlength=span)
+        # ... summed over the projects requiring each skill
+        skill_ids = project_skills["skill_id"]
+        skill_decided = np.bincount(skill_ids, weights=decided_per_project[project_skills["project_id"]])
+        skill_accepted = np.bincount(skill_ids, weights=accepted_per_project[project_skills["project_id"]])
+        rows = []
+        for skill_id in np.argsort(-skill_decided, kind="stable"):
+            if skill_decided[skill_id] < max(min_decided, 1):
+                break
+            rows.append((self.skill_names.get(int(skill_id), f"skill {skill_id}"),
+                         int(skill_decided[skill_id]), int(skill_accepted[skill_id]),
+                         float(skill_accepted[skill_id] / skill_decided[skill_id])))
+        return rows
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+SkillLink - Headless JSON API
+Serves the DatabaseConnection catalogue over HTTP for browser and mobile clients
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from database import DatabaseConnection, DatabaseConnectionPool, FREELANCER_SORTS
+from sharding import ShardedDatabaseConnection
+from config import (DB_CONFIG, DB_REPLICAS, DB_SHARDS, REPLICA_MAX_LAG_SECONDS,
+                    API_HOST, API_PORT, API_WORKERS, API_KEEPALIVE_SECONDS, API_BACKLOG, DB_POOL_SIZE,
+                    API_PAGE_SIZE, API_MAX_PAGE_SIZE, API_CACHE_MAX_AGE,
+                    STATEMENT_TIMEOUTS_MS, STATEMENT_TIMEOUT_DEFAULT_MS)
+
+# Column names for the rows each DatabaseConnection method returns
+FREELANCER_FIELDS = ("user_id", "username", "headline", "rate_per_hour", "avg_rating", "reputation_score",
+                     "skills", "review_count", "completed_contracts", "earned_cents")
+PROJECT_FIELDS = ("project_id", "title", "budget_min_cents", "budget_max_cents", "deadline")
+PROJECT_MATCH_FIELDS = PROJECT_FIELDS + ("snippet", "rank")
+PROPOSAL_FIELDS = ("proposal_id", "freelancer", "bid_amount_cents", "status",
+                   "cover_letter_preview", "cover_letter_length")
+CONTRACT_FIELDS = ("contract_id", "client_id", "freelancer_id", "total_amount_cents",
+                   "paid_amount_cents", "remaining_amount_cents", "status")
+MILESTONE_FIELDS = ("milestone_id", "title", "amount_cents", "due_date", "status")
+REVIEW_FIELDS = ("rating", "feedback", "reviewer")
+SKILL_FIELDS = ("skill_id", "skill_name", "skill_description")
+BID_SUMMARY_FIELDS = ("bid_count", "min_bid", "median_bid", "p90_bid", "max_bid",
+                      "budget_min_cents", "budget_max_cents")
+BID_FIELDS = ("proposal_id", "freelancer_id", "bid_amount_cents", "bid_percentile", "budget_position",
+              "freelancer_accepted", "freelancer_decided")
+SEARCH_FIELDS = ("username", "skill_name", "proficiency_level", "avg_rating", "reputation_score")
+
+
+class ApiError(Exception):
+    """An error response with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    """json.dumps default for dates and NUMERIC values"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def rows_to_dicts(fields, rows):
+    """Turn result tuples into dicts keyed by column name"""
+    return [dict(zip(fields, row)) for row in available(rows)]
+
+
+def encode_cursor(values):
+    """Opaque keyset cursor for the next page"""
+    raw = json.dumps([str(v) for v in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor from encode_cursor; None for the first page"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return tuple(json.loads(base64.urlsafe_b64decode(padded)))
+    except ValueError:
+        raise ApiError(400, "Invalid cursor")
+
+
+def page_limit(params):
+    """Page size from ?limit=, clamped to API_MAX_PAGE_SIZE"""
+    try:
+        limit = int(params.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, "limit must be a number")
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def page(fields, rows, limit, cursor_of):
+    """Build a page response; next_cursor is set when the page is full"""
+    rows = available(rows)
+    next_cursor = encode_cursor(cursor_of(rows[-1])) if len(rows) == limit else None
+    return {"items": rows_to_dicts(fields, rows), "next_cursor": next_cursor}
+
+
+def int_param(params, name):
+    """Optional integer query parameter"""
+    if name not in params:
+        return None
+    try:
+        return int(params[name])
+    except ValueError:
+        raise ApiError(400, f"{name} must be a number")
+
+
+def date_param(params, name):
+    """Optional YYYY-MM-DD query parameter"""
+    if name not in params:
+        return None
+    try:
+        return date.fromisoformat(params[name])
+    except ValueError:
+        raise ApiError(400, f"{name} must be a date (YYYY-MM-DD)")
+
+
+def available(value):
+    """Raise 503 when a database method failed (or timed out) and returned None"""
+    if value is None:
+        raise ApiError(503, "Database query failed")
+    return value
+
+
+def found(value, what):
+    """Raise 404 for missing single resources"""
+    if not value:
+        raise ApiError(404, f"{what} not found")
+    return value
+
+
+class SkillLinkApi:
+    """Routes requests to DatabaseConnection methods on pooled connections"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        # (method, path regex, handler, cacheable)
+        self.routes = [
+            ("GET", r"/freelancers", self.list_freelancers, True),
+            ("GET", r"/freelancers/(\d+)", self.freelancer, True),
+            ("GET", r"/freelancers/(\d+)/earnings", self.freelancer_earnings, True),
+            ("GET", r"/freelancers/(\d+)/reviews", self.freelancer_reviews, True),
+            ("GET", r"/projects", self.list_projects, True),
+            ("GET", r"/projects/(\d+)", self.project, True),
+            ("GET", r"/projects/(\d+)/proposals", self.project_proposals, True),
+            ("GET", r"/projects/(\d+)/bid_analytics", self.project_bid_analytics, True),
+            ("GET", r"/contracts", self.list_contracts, True),
+            ("GET", r"/contracts/(\d+)/milestones", self.contract_milestones, True),
+            ("GET", r"/skills", self.skills, True),
+            ("GET", r"/search/freelancers", self.search_freelancers, True),
+            ("GET", r"/proposals/(\d+)/cover_letter", self.proposal_cover_letter, True),
+            ("POST", r"/proposals/(\d+)/accept", self.accept_proposal, False),
+            ("POST", r"/milestones/(\d+)/release", self.release_payment, False),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler, cacheable)
+                       for method, pattern, handler, cacheable in self.routes]
+
+    def dispatch(self, method, path, params):
+        """Run the matching handler; returns (payload, cacheable)"""
+        allowed = False
+        for route_method, pattern, handler, cacheable in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                with self.pool.connection(timeout=10) as db:
+                    db.query_failed = False
+                    try:
+                        payload = handler(db, params, *(int(g) for g in match.groups()))
+                    except ApiError:
+                        # a failed lookup returns None and reads as "not found"
+                        if not db.query_failed:
+                            raise
+                    if db.query_failed:
+                        raise ApiError(503, "Database query failed")
+                    return payload, cacheable
+            except queue.Empty:
+                raise ApiError(503, "No database connection available")
+        raise ApiError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    # Handlers
+    def list_freelancers(self, db, params):
+        limit = page_limit(params)
+        sort = params.get("sort", "reputation")
+        if sort not in FREELANCER_SORTS:
+            raise ApiError(400, f"sort must be one of: {', '.join(FREELANCER_SORTS)}")
+        rows = db.get_freelancers_page(limit, decode_cursor(params.get("after")), sort)
+        position = FREELANCER_FIELDS.index(FREELANCER_SORTS[sort][0])
+        return page(FREELANCER_FIELDS, rows, limit, lambda row: (row[position], row[0]))
+
+    def freelancer(self, db, params, user_id):
+        details = found(db.get_freelancer_details(user_id), "Freelancer")
+        username, email, headline, bio, rate, rating = details
+        return {"user_id": user_id, "username": username, "email": email, "headline": headline,
+                "bio": bio, "rate_per_hour": rate, "avg_rating": rating,
+                "skills": [{"skill_name": name, "proficiency_level": level}
+                           for name, level in available(db.get_freelancer_skills(user_id))]}
+
+    def freelancer_earnings(self, db, params, user_id):
+        total = available(db.get_freelancer_earnings(user_id))
+        monthly = db.get_freelancer_monthly_earnings(user_id)
+        return {"user_id": user_id,
+                "total_earned_cents": total[0] or 0,
+                "monthly": rows_to_dicts(("month", "earned_cents", "payment_count"), monthly)}
+
+    def freelancer_reviews(self, db, params, user_id):
+        return {"items": rows_to_dicts(REVIEW_FIELDS, db.get_freelancer_reviews(user_id))}
+
+    def list_projects(self, db, params):
+        limit = page_limit(params)
+        after = decode_cursor(params.get("after"))
+        filters = (int_param(params, "budget_min"), int_param(params, "budget_max"),
+                   date_param(params, "due_from"), date_param(params, "due_to"))
+        text = params.get("q", "").strip()
+        if text:
+            # ranked full-text search; the cursor is the last row's (rank, project_id)
+            rows = db.search_projects_text_page(text, limit, *filters, after=after)
+            return page(PROJECT_MATCH_FIELDS, rows, limit, lambda row: (row[6], row[0]))
+        if any(value is not None for value in filters):
+            rows = db.search_projects_page(limit, *filters, after=after)
+        else:
+            rows = db.get_projects_page(limit, after)
+        return page(PROJECT_FIELDS, rows, limit, lambda row: (row[4] or "infinity", row[0]))
+
+    def project(self, db, params, project_id):
+        details = found(db.get_project_details(project_id), "Project")
+        project = dict(zip(("project_id", "title", "description", "budget_min_cents",
+                            "budget_max_cents", "deadline", "client"), details))
+        project["skills"] = [name for (name,) in available(db.get_project_skills(project_id))]
+        return project
+
+    def project_proposals(self, db, params, project_id):
+        limit = page_limit(params)
+        rows = db.get_proposals_page(project_id, limit, decode_cursor(params.get("after")))
+        return page(PROPOSAL_FIELDS, rows, limit, lambda row: (row[2], row[0]))
+
+    def project_bid_analytics(self, db, params, project_id):
+        summary, bids = found(db.get_bid_analytics(project_id), "Project")
+        return dict(zip(BID_SUMMARY_FIELDS, summary), bids=rows_to_dicts(BID_FIELDS, bids))
+
+    def proposal_cover_letter(self, db, params, proposal_id):
+        letter = db.get_proposal_cover_letter(proposal_id)
+        if letter is None:
+            raise ApiError(404, "Proposal not found")
+        return {"proposal_id": proposal_id, "cover_letter": letter}
+
+    def list_contracts(self, db, params):
+        limit = page_limit(params)
+        rows = db.get_active_contracts_page(limit, decode_cursor(params.get("after")))
+        return page(CONTRACT_FIELDS, rows, limit, lambda row: (row[0],))
+
+    def contract_milestones(self, db, params, contract_id):
+        return {"items": rows_to_dicts(MILESTONE_FIELDS, db.get_contract_milestones(contract_id))}
+
+    def skills(self, db, params):
+        return {"items": rows_to_dicts(SKILL_FIELDS, db.get_all_skills())}
+
+    def search_freelancers(self, db, params):
+        skill = params.get("skill", "").strip()
+        if not skill:
+            raise ApiError(400, "skill is required")
+        return {"items": rows_to_dicts(SEARCH_FIELDS, db.search_freelancers_by_skill(skill))}
+
+    def accept_proposal(self, db, params, proposal_id):
+        contract_id = db.accept_proposal(proposal_id)
+        if contract_id is None:
+            raise ApiError(409, "Proposal could not be accepted")
+        return {"proposal_id": proposal_id, "contract_id": contract_id}
+
+    def release_payment(self, db, params, milestone_id):
+        released = db.release_milestone_payment(milestone_id)
+        if released is None:
+            raise ApiError(409, "Payment could not be released")
+        return {"milestone_id": milestone_id, "released": bool(released)}
+
+
+def format_response(status, headers, body, close):
+    """Serialize an HTTP/1.1 response"""
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Date: {formatdate(usegmt=True)}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append(f"Content-Length: {len(body)}")
+    if close:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def raise_open_files_limit():
+    """Raise the soft open-files limit to the hard one; every client holds a socket"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+class AsyncApiServer:
+    """HTTP/1.1 keep-alive server running SkillLinkApi on an asyncio event loop
+
+    Every client connection, idle keep-alive ones included, is a coroutine on
+    one event loop. A request takes one of the worker threads only while its
+    handler runs the blocking DatabaseConnection calls and encodes the JSON,
+    so thousands of open clients share a few threads and pooled connections.
+    """
+
+    MAX_HEADERS = 100
+
+    def __init__(self, api, workers, keepalive=API_KEEPALIVE_SECONDS):
+        self.api = api
+        self.keepalive = keepalive
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def serve(self, host, port):
+        """Accept connections until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=API_BACKLOG)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=False)
+
+    async def read_request(self, reader):
+        """Read a request head as (method, target, version, headers); None at end of stream
+
+        Waits at most keepalive seconds for each line, so idle clients are dropped.
+        """
+        line = await asyncio.wait_for(reader.readline(), self.keepalive)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise ApiError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.keepalive)
+            if line in (b"\r\n", b"\n", b""):
+                return method, target, version, headers
+            if len(headers) >= self.MAX_HEADERS:
+                raise ApiError(431, "Too many headers")
+            name, colon, value = line.decode("latin-1").partition(":")
+            if not colon:
+                raise ApiError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+
+    async def handle_connection(self, reader, writer):
+        """Answer a client's requests in order until it closes or stays idle too long"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except ApiError as e:
+                    body = json.dumps({"error": str(e)}).encode()
+                    writer.write(format_response(e.status, {"Content-Type": "application/json"}, body, True))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                # the request body is unused; drain it so keep-alive stays in sync
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)
+                status, response_headers, body = await loop.run_in_executor(
+                    self.executor, self.respond, method, target, headers)
+                connection = headers.get("connection", "").lower()
+                close = connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive")
+                writer.write(format_response(status, response_headers, body, close))
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # idle, truncated, reset or oversized (a line beyond the stream limit): just hang up
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, method, target, headers):
+        """Run a request through SkillLinkApi (on a worker thread); returns (status, headers, body)"""
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            payload, cacheable = self.api.dispatch(method, url.path.rstrip("/") or "/", params)
+            status = 200
+        except ApiError as e:
+            payload, cacheable, status = {"error": str(e)}, False, e.status
+
+        body = json.dumps(payload, default=to_json, separators=(",", ":")).encode()
+        response_headers = {"Content-Type": "application/json"}
+        if cacheable:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            response_headers["ETag"] = etag
+            response_headers["Cache-Control"] = f"max-age={API_CACHE_MAX_AGE}"
+            if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+                status, body = 304, b""
+        return status, response_headers, body
+
+
+def create_connection():
+    """Build an unconnected DatabaseConnection from config.py"""
+    timeouts = {"statement_timeouts": STATEMENT_TIMEOUTS_MS,
+                "default_statement_timeout": STATEMENT_TIMEOUT_DEFAULT_MS}
+    if DB_SHARDS:
+        return ShardedDatabaseConnection(DB_SHARDS, **timeouts)
+    return DatabaseConnection(**DB_CONFIG, replicas=DB_REPLICAS,
+                              max_replica_lag=REPLICA_MAX_LAG_SECONDS, **timeouts)
+
+
+def main():
+    """Main entry point"""
+    pool = DatabaseConnectionPool(create_connection, DB_POOL_SIZE)
+    if not pool.open():
+        print("Failed to connect to database. Please check config.py.")
+        return
+
+    raise_open_files_limit()
+    server = AsyncApiServer(SkillLinkApi(pool), API_WORKERS)
+    print(f"SkillLink API listening on http://{API_HOST}:{API_PORT} "
+          f"({API_WORKERS} workers, {DB_POOL_SIZE} connections)")
+    try:
+        asyncio.run(server.serve(API_HOST, API_PORT))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""
+Asyncio database module for SkillLink application
+Same query catalogue as DatabaseConnection, on psycopg 3's async driver and pool
+"""
+
+from datetime import date
+from typing import List, Tuple, Optional, Any, Sequence
+
+from psycopg import AsyncConnection, Error
+from psycopg_pool import AsyncConnectionPool
+
+
+# Characters of each cover letter the proposal lists return; the rest is fetched on demand
+COVER_LETTER_PREVIEW_CHARS = 80
+
+# ts_headline options for the search_projects_text_page snippets: hits are marked «like this»
+PROJECT_SNIPPET_OPTIONS = 'StartSel=«, StopSel=», MaxWords=20, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "'
+
+# Orders of the freelancer directory lists: sort column and its type for keyset cursors
+FREELANCER_SORTS = {
+    "reputation": ("reputation_score", "float8"),
+    "rating": ("avg_rating", "numeric"),
+    "earnings": ("earned_cents", "bigint"),
+    "reviews": ("review_count", "bigint"),
+}
+
+FREELANCER_DIRECTORY_COLUMNS = """user_id, username, headline, rate_per_hour, avg_rating, reputation_score,
+       skills, review_count, completed_contracts, earned_cents"""
+
+# Queries shared by the single-query methods and the pipelined composites
+FREELANCER_DETAILS_QUERY = """
+SELECT u.username, u.email, f.headline, f.bio, f.rate_per_hour, f.avg_rating
+FROM freelancer_profile f
+JOIN users u ON f.user_id = u.user_id
+WHERE u.user_id = %s
+"""
+
+FREELANCER_SKILLS_QUERY = """
+SELECT s.skill_name, fs.proficiency_level
+FROM freelancer_skill fs
+JOIN freelancer_profile f ON fs.profile_id = f.profile_id
+JOIN skill s ON fs.skill_id = s.skill_id
+WHERE f.user_id = %s
+ORDER BY fs.proficiency_level DESC
+"""
+
+FREELANCER_EARNINGS_QUERY = """
+SELECT total_earned_cents as total_earned
+FROM payee_earnings
+WHERE payee_id = %s
+"""
+
+FREELANCER_REVIEWS_QUERY = """
+SELECT r.rating, r.feedback, u.username as reviewer
+FROM review r
+JOIN users u ON r.reviewer_id = u.user_id
+WHERE r.reviewee_id = %s
+ORDER BY r.review_id DESC
+"""
+
+PROJECT_DETAILS_QUERY = """
+SELECT p.project_id, p.title, p.description, p.budget_min_cents,
+       p.budget_max_cents, p.deadline, u.username as client_name
+FROM project p
+JOIN users u ON p.client_id = u.user_id
+WHERE p.project_id = %s
+"""
+
+PROJECT_SKILLS_QUERY = """
+SELECT s.skill_name
+FROM project_skill ps
+JOIN skill s ON ps.skill_id = s.skill_id
+WHERE ps.project_id = %s
+"""
+
+PROJECT_PROPOSALS_QUERY = """
+SELECT pr.proposal_id, u.username, pr.bid_amount_cents, pr.status,
+       cover_letter_preview(pr.cover_letter, %s), char_length(pr.cover_letter)
+FROM proposal pr
+JOIN users u ON pr.freelancer_id = u.user_id
+WHERE pr.project_id = %s
+  AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %s)
+ORDER BY pr.bid_amount_cents
+"""
+
+
+class AsyncDatabaseConnection:
+    """Pooled, non-blocking counterpart of DatabaseConnection for asyncio callers
+
+    Every call borrows a pooled connection for just that call, so one instance is
+    shared by all tasks of an event loop and concurrency is bounded by max_size
+    connections instead of by threads. Connections run in autocommit mode: reads
+    skip the BEGIN/COMMIT round trips and writes open their own transaction.
+    Replicas, sharding and the batch jobs stay on DatabaseConnection.
+    """
+
+    def __init__(self, host="localhost", database="skilllink", user="postgres", password="",
+                 port=5432, min_size: int = 4, max_size: int = 16):
+        """Initialize database connection parameters and pool bounds"""
+        self.host = host
+        self.database = database
+        self.user = user
+        self.password = password
+        self.port = port
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def connect(self, timeout: float = 30.0) -> bool:
+        """Open the pool and wait until min_size connections are established"""
+        self.pool = AsyncConnectionPool(
+            kwargs={"host": self.host, "port": self.port, "dbname": self.database,
+                    "user": self.user, "password": self.password, "autocommit": True},
+            connection_class=AsyncConnection,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            open=False,
+        )
+        try:
+            await self.pool.open(wait=True, timeout=timeout)
+            return True
+        except Exception as e:
+            # PoolTimeout carries the underlying connection error in its message
+            print(f"Error connecting to database: {e}")
+            await self.pool.close()
+            self.pool = None
+            return False
+
+    async def disconnect(self):
+        """Close the pool and all its connections"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    async def execute_query(self, query: str, params: Optional[Sequence] = None) -> Optional[List[Tuple]]:
+        """Execute a SELECT query and return results"""
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(query, params)
+                return await cursor.fetchall()
+        except Error as e:
+            print(f"Error executing query: {e}")
+            return None
+
+    async def execute_update(self, query: str, params: Optional[Sequence] = None) -> bool:
+        """Execute INSERT, UPDATE, or DELETE query in its own transaction"""
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.transaction():
+                    await conn.execute(query, params)
+            return True
+        except Error as e:
+            print(f"Error executing update: {e}")
+            return False
+
+    async def execute_pipeline(self, queries: List[Tuple[str, Optional[Sequence]]]) -> Optional[List[List[Tuple]]]:
+        """Run several SELECTs on one connection in pipeline mode
+
+        All statements are sent before any result is read, so the batch costs one
+        network round trip instead of one per query. Returns one row list per query.
+        """
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.pipeline():
+                    cursors = [await conn.execute(query, params) for query, params in queries]
+                return [await cursor.fetchall() for cursor in cursors]
+        except Error as e:
+            print(f"Error executing pipeline: {e}")
+            return None
+
+    async def _execute_scalar(self, query: str, params: Sequence, action: str) -> Optional[Any]:
+        """Run a single-value write function in a transaction; None on error"""
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.transaction():
+                    cursor = await conn.execute(query, params)
+                    return (await cursor.fetchone())[0]
+        except Error as e:
+            print(f"Error {action}: {e}")
+            return None
+
+    # User queries
+    async def get_all_users(self) -> Optional[List[Tuple]]:
+        """Retrieve all users"""
+        query = "SELECT user_id, username, email, role, status, joined_at FROM users ORDER BY user_id"
+        return await self.execute_query(query)
+
+    async def get_users_by_role(self, role: str) -> Optional[List[Tuple]]:
+        """Get users by specific role"""
+        query = "SELECT user_id, username, email, role, status FROM users WHERE role = %s"
+        return await self.execute_query(query, (role,))
+
+    async def login_user(self, username: str, password_hash: str) -> Optional[Tuple]:
+        """Validate user credentials"""
+        query = """
+        SELECT user_id, role, status
+        FROM users
+        WHERE username = %s AND password_hash = %s AND status = 'active'
+        """
+        result = await self.execute_query(query, (username, password_hash))
+        return result[0] if result else None
+
+    # Freelancer queries
+    async def get_all_freelancers(self) -> Optional[List[Tuple]]:
+        """Get every freelancer from the directory, best reputation first"""
+        query = f"""
+        SELECT {FREELANCER_DIRECTORY_COLUMNS}
+        FROM freelancer_directory
+        ORDER BY reputation_score DESC, user_id DESC
+        """
+        return await self.execute_query(query)
+
+    async def get_freelancers_page(self, limit: int, after: Optional[Tuple] = None,
+                                   sort: str = "reputation") -> Optional[List[Tuple]]:
+        """Get one page of the freelancer directory, highest first by a FREELANCER_SORTS order
+
+        after is the (sort value, user_id) of the last row of the previous page.
+        """
+        column, cast = FREELANCER_SORTS[sort]
+        where = f"WHERE ({column}, user_id) < (%s::{cast}, %s::bigint)" if after else ""
+        query = f"""
+        SELECT {FREELANCER_DIRECTORY_COLUMNS}
+        FROM freelancer_directory
+        {where}
+        ORDER BY {column} DESC, user_id DESC
+        LIMIT %s
+        """
+        return await self.execute_query(query, (*(after or ()), limit))
+
+    async def get_freelancer_details(self, user_id: int) -> Optional[Tuple]:
+        """Get detailed freelancer profile"""
+        result = await self.execute_query(FREELANCER_DETAILS_QUERY, (user_id,))
+        return result[0] if result else None
+
+    async def get_freelancer_skills(self, user_id: int) -> Optional[List[Tuple]]:
+        """Get skills for a specific freelancer"""
+        return await self.execute_query(FREELANCER_SKILLS_QUERY, (user_id,))
+
+    async def get_freelancer_profile(self, user_id: int) -> Optional[Tuple]:
+        """Get (details, skills, total earned cents, reviews) for a freelancer in one round trip"""
+        results = await self.execute_pipeline([
+            (FREELANCER_DETAILS_QUERY, (user_id,)),
+            (FREELANCER_SKILLS_QUERY, (user_id,)),
+            (FREELANCER_EARNINGS_QUERY, (user_id,)),
+            (FREELANCER_REVIEWS_QUERY, (user_id,)),
+        ])
+        if not results or not results[0]:
+            return None
+        details, skills, earnings, reviews = results
+        return details[0], skills, earnings[0][0] if earnings else 0, reviews
+
+    # Project queries
+    async def get_all_projects(self) -> Optional[List[Tuple]]:
+        """Get all projects"""
+        query = """
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
+        FROM project
+        ORDER BY deadline, project_id
+        """
+        return await self.execute_query(query)
+
+    async def get_projects_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects by deadline (projects without one last)
+
+        after is the (deadline or 'infinity', project_id) of the previous page's last row.
+        """
+        where = "WHERE (COALESCE(deadline, 'infinity'::date), project_id) > (%s::date, %s::bigint)" if after else ""
+        query = f"""
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
+        FROM project
+        {where}
+        ORDER BY COALESCE(deadline, 'infinity'::date), project_id
+        LIMIT %s
+        """
+        return await self.execute_query(query, (*(after or ()), limit))
+
+    @staticmethod
+    def _project_filters(budget_min_cents: Optional[int], budget_max_cents: Optional[int],
+                         deadline_from: Optional[date], deadline_to: Optional[date]) -> Tuple[List[str], List[Any]]:
+        """WHERE conditions and parameters for the project budget / deadline filters"""
+        conditions = []
+        params: List[Any] = []
+        if budget_min_cents is not None or budget_max_cents is not None:
+            conditions.append("budget_range && int4range(%s::int, %s::int, '[]')")
+            params += [budget_min_cents, budget_max_cents]
+        if deadline_from is not None:
+            conditions.append("deadline >= %s")
+            params.append(deadline_from)
+        if deadline_to is not None:
+            conditions.append("deadline <= %s")
+            params.append(deadline_to)
+        return conditions, params
+
+    async def search_projects_page(self, limit: int, budget_min_cents: Optional[int] = None,
+                                   budget_max_cents: Optional[int] = None, deadline_from: Optional[date] = None,
+                                   deadline_to: Optional[date] = None,
+                                   after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects whose budget overlaps a range, ordered like get_projects_page
+
+        Either budget bound may be None (open-ended); deadline_from/deadline_to are inclusive.
+        """
+        conditions, params = self._project_filters(budget_min_cents, budget_max_cents,
+                                                   deadline_from, deadline_to)
+        if after:
+            conditions.append("(COALESCE(deadline, 'infinity'::date), project_id) > (%s::date, %s::bigint)")
+            params += after
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"""
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
+        FROM project
+        {where}
+        ORDER BY COALESCE(deadline, 'infinity'::date), project_id
+        LIMIT %s
+        """
+        return await self.execute_query(query, (*params, limit))
+
+    async def search_projects_text_page(self, text: str, limit: int, budget_min_cents: Optional[int] = None,
+                                        budget_max_cents: Optional[int] = None,
+                                        deadline_from: Optional[date] = None, deadline_to: Optional[date] = None,
+                                        after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects matching a full-text search, best match first
+
+        Rows and after are as for DatabaseConnection.search_projects_text_page.
+        """
+        conditions, params = self._project_filters(budget_min_cents, budget_max_cents,
+                                                   deadline_from, deadline_to)
+        filters = "".join(f" AND {condition}" for condition in conditions)
+        page_where = "WHERE rank < %s::real OR (rank = %s::real AND project_id > %s::bigint)" if after else ""
+        page_params = (after[0], after[0], after[1]) if after else ()
+        query = f"""
+        WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+        ranked AS (
+            SELECT p.project_id, ts_rank(p.search_vector, q.query) AS rank
+            FROM project p, q
+            WHERE p.search_vector @@ q.query{filters}
+        ),
+        page AS (
+            SELECT project_id, rank
+            FROM ranked
+            {page_where}
+            ORDER BY rank DESC, project_id
+            LIMIT %s
+        )
+        SELECT p.project_id, p.title, p.budget_min_cents, p.budget_max_cents, p.deadline,
+               ts_headline('english', COALESCE(p.description, ''), q.query, %s), page.rank
+        FROM page
+        JOIN project p ON p.project_id = page.project_id, q
+        ORDER BY page.rank DESC, p.project_id
+        """
+        return await self.execute_query(query, (text, *params, *page_params, limit, PROJECT_SNIPPET_OPTIONS))
+
+    async def get_project_details(self, project_id: int) -> Optional[Tuple]:
+        """Get detailed project information"""
+        result = await self.execute_query(PROJECT_DETAILS_QUERY, (project_id,))
+        return result[0] if result else None
+
+    async def get_project_skills(self, project_id: int) -> Optional[List[Tuple]]:
+        """Get required skills for a project"""
+        return await self.execute_query(PROJECT_SKILLS_QUERY, (project_id,))
+
+    async def get_project_overview(self, project_id: int) -> Optional[Tuple]:
+        """Get (details, skills, proposals) for a project in one round trip"""
+        results = await self.execute_pipeline([
+            (PROJECT_DETAILS_QUERY, (project_id,)),
+            (PROJECT_SKILLS_QUERY, (project_id,)),
+            (PROJECT_PROPOSALS_QUERY, (COVER_LETTER_PREVIEW_CHARS, project_id, project_id)),
+        ])
+        if not results or not results[0]:
+            return None
+        details, skills, proposals = results
+        return details[0], skills, proposals
+
+    async def get_client_projects(self, client_id: int) -> Optional[List[Tuple]]:
+        """Get a client's projects with their proposal count and whether one was accepted"""
+        query = """
+        SELECT p.project_id, p.title, p.budget_min_cents, p.budget_max_cents,
+               COUNT(pr.proposal_id) as proposal_count,
+               COUNT(pr.proposal_id) FILTER (WHERE pr.status = 'accepted') > 0 as in_progress
+        FROM project p
+        LEFT JOIN proposal pr ON p.project_id = pr.project_id AND pr.created_at >= p.created_at
+        WHERE p.client_id = %s
+        GROUP BY p.project_id, p.title, p.budget_min_cents, p.budget_max_cents
+        ORDER BY p.project_id DESC
+        """
+        return await self.execute_query(query, (client_id,))
+
+    # Proposal queries
+    async def get_proposals_by_project(self, project_id: int) -> Optional[List[Tuple]]:
+        """Get all proposals for a project"""
+        return await self.execute_query(PROJECT_PROPOSALS_QUERY, (COVER_LETTER_PREVIEW_CHARS, project_id, project_id))
+
+    async def get_proposals_page(self, project_id: int, limit: int,
+                                 after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of a project's proposals by bid (lowest first)
+
+        after is the (bid_amount_cents, proposal_id) of the previous page's last row.
+        """
+        where = "AND (pr.bid_amount_cents, pr.proposal_id) > (%s::integer, %s::bigint)" if after else ""
+        query = f"""
+        SELECT pr.proposal_id, u.username, pr.bid_amount_cents, pr.status,
+               cover_letter_preview(pr.cover_letter, %s), char_length(pr.cover_letter)
+        FROM proposal pr
+        JOIN users u ON pr.freelancer_id = u.user_id
+        WHERE pr.project_id = %s {where}
+          AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %s)
+        ORDER BY pr.bid_amount_cents, pr.proposal_id
+        LIMIT %s
+        """
+        return await self.execute_query(query, (COVER_LETTER_PREVIEW_CHARS, project_id, *(after or ()),
+                                                project_id, limit))
+
+    async def get_proposal_cover_letter(self, proposal_id: int) -> Optional[str]:
+        """Get a proposal's full cover letter ('' if it has none), None if not found"""
+        # created_at from the proposal's key prunes the lookup to its month's partition
+        query = """
+        SELECT COALESCE(cover_letter, '')
+        FROM proposal
+        WHERE proposal_id = %s
+          AND created_at = (SELECT created_at FROM proposal_key WHERE proposal_id = %s)
+        """
+        result = await self.execute_query(query, (proposal_id, proposal_id))
+        return result[0][0] if result else None
+
+    async def get_proposals_by_freelancer(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get all proposals by a freelancer"""
+        query = """
+        SELECT p.title, pr.bid_amount_cents, pr.status
+        FROM proposal_history pr
+        JOIN project p ON pr.project_id = p.project_id
+        WHERE pr.freelancer_id = %s
+        ORDER BY pr.proposal_id DESC
+        """
+        return await self.execute_query(query, (freelancer_id,))
+
+    async def accept_proposal(self, proposal_id: int) -> Optional[int]:
+        """Accept a proposal, reject the project's other pending proposals and return the contract id"""
+        return await self._execute_scalar("SELECT accept_proposal(%s)", (proposal_id,),
+                                          "accepting proposal")
+
+    # Contract queries
+    async def get_active_contracts(self) -> Optional[List[Tuple]]:
+        """Get all active contracts with their stored total, paid and remaining amounts"""
+        query = """
+        SELECT c.contract_id, c.client_id, c.freelancer_id,
+               c.total_amount_cents, c.paid_amount_cents, c.remaining_amount_cents, c.status
+        FROM contract c
+        WHERE c.status = 'active'
+        ORDER BY c.contract_id
+        """
+        return await self.execute_query(query)
+
+    async def get_active_contracts_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of active contracts by id; after is the (contract_id,) of the previous page's last row"""
+        where = "AND c.contract_id > %s::bigint" if after else ""
+        query = f"""
+        SELECT c.contract_id, c.client_id, c.freelancer_id,
+               c.total_amount_cents, c.paid_amount_cents, c.remaining_amount_cents, c.status
+        FROM contract c
+        WHERE c.status = 'active' {where}
+        ORDER BY c.contract_id
+        LIMIT %s
+        """
+        return await self.execute_query(query, (*(after or ()), limit))
+
+    async def get_contract_milestones(self, contract_id: int) -> Optional[List[Tuple]]:
+        """Get milestones for a specific contract"""
+        query = """
+        SELECT milestone_id, title, amount_cents, due_date, status
+        FROM milestone
+        WHERE contract_id = %s
+        ORDER BY due_date
+        """
+        return await self.execute_query(query, (contract_id,))
+
+    # Payment queries
+    async def get_freelancer_earnings(self, freelancer_id: int) -> Optional[Tuple]:
+        """Get total earnings for a freelancer from the earnings ledger"""
+        result = await self.execute_query(FREELANCER_EARNINGS_QUERY, (freelancer_id,))
+        if result is None:
+            return None
+        return result[0] if result else (0,)
+
+    async def get_freelancer_monthly_earnings(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get released earnings per month for a freelancer, oldest month first"""
+        query = """
+        SELECT month, earned_cents, payment_count
+        FROM payee_earnings_monthly
+        WHERE payee_id = %s AND payment_count > 0
+        ORDER BY month
+        """
+        return await self.execute_query(query, (freelancer_id,))
+
+    async def release_milestone_payment(self, milestone_id: int) -> Optional[int]:
+        """Complete a milestone and release its payment; returns 1 if paid now, 0 if already paid"""
+        return await self._execute_scalar("SELECT release_payment_batch(ARRAY[%s]::BIGINT[])",
+                                          (milestone_id,), "releasing payment")
+
+    # Review queries
+    async def get_freelancer_reviews(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get all reviews for a freelancer"""
+        return await self.execute_query(FREELANCER_REVIEWS_QUERY, (freelancer_id,))
+
+    # Admin queries
+    async def get_admin_stats(self) -> Optional[Tuple]:
+        """Get platform totals: users (all, clients, freelancers, admins), projects,
+        active contracts and released payment cents"""
+        query = """
+        SELECT u.total_users, u.clients, u.freelancers, u.admins,
+               (SELECT COUNT(*) FROM project) as total_projects,
+               (SELECT COUNT(*) FROM contract WHERE status = 'active') as active_contracts,
+               (SELECT COALESCE(SUM(total_earned_cents), 0) FROM payee_earnings) as released_cents
+        FROM (
+            SELECT COUNT(*) as total_users,
+                   COUNT(*) FILTER (WHERE role = 'client') as clients,
+                   COUNT(*) FILTER (WHERE role = 'freelancer') as freelancers,
+                   COUNT(*) FILTER (WHERE role = 'admin') as admins
+            FROM users
+        ) u
+        """
+        result = await self.execute_query(query)
+        return result[0] if result else None
+
+    # Skill queries
+    async def get_all_skills(self) -> Optional[List[Tuple]]:
+        """Get all available skills"""
+        query = "SELECT skill_id, skill_name, skill_description FROM skill ORDER BY skill_name"
+        return await self.execute_query(query)
+
+    # Search queries
+    async def search_freelancers_by_skill(self, skill_name: str) -> Optional[List[Tuple]]:
+        """Find freelancers with a specific skill in the freelancer directory"""
+        query = """
+        SELECT d.username, s.skill_name, d.skill_levels[array_position(d.skill_ids, s.skill_id)] AS proficiency_level,
+               d.avg_rating, d.reputation_score
+        FROM skill s
+        JOIN freelancer_directory d ON d.skill_ids @> ARRAY[s.skill_id]
+        WHERE s.skill_name = %s
+        ORDER BY proficiency_level DESC, d.reputation_score DESC
+        """
+        return await self.execute_query(query, (skill_name,))
+
+    async def search_freelancers_by_skills(self, skill_names: List[str]) -> Optional[List[Tuple]]:
+        """Find freelancers with any of several skills in the freelancer directory
+        (one row per freelancer and skill)"""
+        query = """
+        SELECT d.username, s.skill_name, d.skill_levels[array_position(d.skill_ids, s.skill_id)] AS proficiency_level,
+               d.avg_rating, d.reputation_score
+        FROM skill s
+        JOIN freelancer_directory d ON d.skill_ids @> ARRAY[s.skill_id]
+        WHERE s.skill_name = ANY(%s)
+        ORDER BY proficiency_level DESC, d.reputation_score DESC
+        """
+        return await self.execute_query(query, (list(skill_names),))
+
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for accept_proposal
+
+Creates a set of bench projects where every bench freelancer has a
+pending proposal, then lets one thread per freelancer race to accept its
+own proposal on every project. Afterwards it checks that each project has
+exactly one accepted proposal, one contract and no pending leftovers, and
+that the only errors seen were the expected "already has an accepted
+proposal" rejections. The bench rows are deleted at the end.
+
+Usage: python3 benchmarks/accept_proposal_contention.py [threads] [projects]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import errors
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+
+SETUP = """
+INSERT INTO users (username, email, password_hash, role)
+VALUES ('bench_acc_client', 'bench_acc_client@mail.com', 'x', 'client');
+
+INSERT INTO users (username, email, password_hash, role)
+SELECT 'bench_acc_fl_' || g, 'bench_acc_fl_' || g || '@mail.com', 'x', 'freelancer'
+FROM generate_series(1, %(threads)s) g;
+
+INSERT INTO project (client_id, title, budget_min_cents, budget_max_cents, price_model)
+SELECT (SELECT user_id FROM users WHERE username = 'bench_acc_client'),
+       'bench_acc_project_' || g, 10000, 20000, 'fixed'
+FROM generate_series(1, %(projects)s) g;
+
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents, cover_letter)
+SELECT p.project_id, u.user_id, 15000, 'bench'
+FROM project p
+CROSS JOIN users u
+WHERE p.title LIKE 'bench\\_acc\\_project\\_%%' AND u.username LIKE 'bench\\_acc\\_fl\\_%%';
+"""
+
+TEARDOWN = """
+DELETE FROM contract WHERE client_id = (SELECT user_id FROM users WHERE username = 'bench_acc_client');
+DELETE FROM proposal WHERE project_id IN (SELECT project_id FROM project WHERE title LIKE 'bench\\_acc\\_project\\_%');
+DELETE FROM project WHERE title LIKE 'bench\\_acc\\_project\\_%';
+DELETE FROM users WHERE username LIKE 'bench\\_acc\\_%';
+"""
+
+# per project: number of accepted proposals, pending leftovers and contracts
+VERIFY = """
+SELECT p.project_id,
+       COUNT(*) FILTER (WHERE pr.status = 'accepted') AS accepted,
+       COUNT(*) FILTER (WHERE pr.status = 'pending') AS pending,
+       (SELECT COUNT(*) FROM contract c
+        JOIN proposal cp ON cp.proposal_id = c.proposal_id
+        WHERE cp.project_id = p.project_id) AS contracts
+FROM project p
+JOIN proposal pr ON pr.project_id = p.project_id
+WHERE p.title LIKE 'bench\\_acc\\_project\\_%'
+GROUP BY p.project_id
+"""
+
+# the proposals each bench freelancer races to accept, in project order
+PROPOSALS_BY_FREELANCER = """
+SELECT u.username, pr.proposal_id
+FROM proposal pr
+JOIN users u ON u.user_id = pr.freelancer_id
+JOIN project p ON p.project_id = pr.project_id
+WHERE p.title LIKE 'bench\\_acc\\_project\\_%'
+ORDER BY p.project_id
+"""
+
+
+def racer(proposal_ids, barrier, stats, lock):
+    """Try to accept every proposal in proposal_ids, classifying each outcome"""
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        return
+    accepted = rejected = anomalies = 0
+    barrier.wait()
+    for proposal_id in proposal_ids:
+        try:
+            db.cursor.execute("SELECT accept_proposal(%s)", (proposal_id,))
+            db.connection.commit()
+            accepted += 1
+        except errors.RaiseException:
+            # expected: another freelancer won the project first
+            db.connection.rollback()
+            rejected += 1
+        except Exception as e:
+            db.connection.rollback()
+            anomalies += 1
+            print(f"  anomaly: {type(e).__name__}: {e}".rstrip())
+    db.disconnect()
+    with lock:
+        stats["accepted"] += accepted
+        stats["rejected"] += rejected
+        stats["anomalies"] += anomalies
+
+
+def main():
+    """Run the race and verify the outcome"""
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    projects = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+    db.cursor.execute(TEARDOWN)
+    db.cursor.execute(SETUP, {"threads": threads, "projects": projects})
+    db.connection.commit()
+
+    by_freelancer = {}
+    for username, proposal_id in db.execute_query(PROPOSALS_BY_FREELANCER):
+        by_freelancer.setdefault(username, []).append(proposal_id)
+
+    print("=" * 60)
+    print(f"accept_proposal contention test: {threads} threads x {projects} projects")
+    print("=" * 60)
+
+    stats = {"accepted": 0, "rejected": 0, "anomalies": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(by_freelancer))
+    workers = [threading.Thread(target=racer, args=(ids, barrier, stats, lock))
+               for ids in by_freelancer.values()]
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    rows = db.execute_query(VERIFY)
+    bad = [row for row in rows if row[1] != 1 or row[2] != 0 or row[3] != 1]
+
+    attempts = stats["accepted"] + stats["rejected"] + stats["anomalies"]
+    print(f"\nAttempts: {attempts} in {elapsed:.2f}s ({attempts / elapsed:,.0f} attempts/s)")
+    print(f"  accepted:  {stats['accepted']} (expected {projects})")
+    print(f"  rejected:  {stats['rejected']}")
+    print(f"  anomalies: {stats['anomalies']}")
+
+    ok = not bad and stats["anomalies"] == 0 and stats["accepted"] == projects
+    if ok:
+        print("\n✓ Every project has exactly one accepted proposal and one contract")
+    else:
+        print(f"\n✗ {len(bad)} project(s) in an inconsistent state")
+        for project_id, accepted, pending, contracts in bad[:10]:
+            print(f"  project {project_id}: accepted={accepted} pending={pending} contracts={contracts}")
+
+    db.cursor.execute(TEARDOWN)
+    db.connection.commit()
+    db.disconnect()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
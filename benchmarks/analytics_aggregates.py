@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Analytics tab benchmark: trend aggregates over the columnar extracts
+
+Fills an Analytics object with N synthetic payments and N proposals spread
+over six years (projects with three skills each) and measures:
+  - each aggregate of the Analytics tab (GMV per week, proposals per month,
+    acceptance rate by skill) and all three together
+  - an incremental merge of 1% changed and new rows
+  - writing and reading the local cache file
+
+No database is needed.
+
+Usage: python3 benchmarks/analytics_aggregates.py [rows]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import Analytics, merge_extract
+
+START = 1577836800  # 2020-01-01
+SPAN = 6 * 365 * 86400
+
+
+def build(rows: int) -> Analytics:
+    """An Analytics object holding synthetic extracts of rows payments and proposals"""
+    rng = np.random.default_rng(42)
+    projects = max(rows // 10, 1)
+    analytics = Analytics(batch_rows=rows)
+    analytics.extracts = {
+        "payments": {
+            "payment_id": np.arange(1, rows + 1, dtype=np.int64),
+            "released_at": START + rng.integers(0, SPAN, rows),
+            "amount_cents": rng.integers(1000, 500000, rows),
+            "released": (rng.random(rows) < 0.9).astype(np.int8),
+        },
+        "proposals": {
+            "proposal_id": np.arange(1, rows + 1, dtype=np.int64),
+            "project_id": rng.integers(1, projects + 1, rows),
+            "created_at": START + rng.integers(0, SPAN, rows),
+            "status": rng.choice(np.array([0, 1, 2], dtype=np.int8), rows, p=[0.3, 0.1, 0.6]),
+        },
+        "project_skills": {
+            "project_id": np.repeat(np.arange(1, projects + 1, dtype=np.int64), 3),
+            "skill_id": rng.integers(1, 200, projects * 3),
+        },
+    }
+    analytics.skill_names = {skill_id: f"skill_{skill_id}" for skill_id in range(1, 200)}
+    analytics.watermarks = ["0"]
+    return analytics
+
+
+def timed(function, runs=5):
+    """Median milliseconds of function()"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Build the extracts and time the aggregates, a merge and the cache"""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    analytics = build(rows)
+
+    print("=" * 60)
+    print(f"Analytics aggregates: {rows:,} payments and {rows:,} proposals")
+    print("=" * 60)
+    print(f"{'operation':<34}{'median ms':>12}")
+    for label, function in (("GMV per week", analytics.gmv_by_week),
+                            ("proposals per month", analytics.proposals_by_month),
+                            ("acceptance by skill", analytics.acceptance_by_skill),
+                            ("all three", lambda: (analytics.gmv_by_week(), analytics.proposals_by_month(),
+                                                   analytics.acceptance_by_skill()))):
+        print(f"{label:<34}{timed(function):>12.1f}")
+
+    # 1% of the payments changed, half of them updates and half new ones
+    payments = analytics.extracts["payments"]
+    changed = max(rows // 100, 2)
+    keys = np.concatenate([np.arange(1, rows + 1, 200, dtype=np.int64)[:changed // 2],
+                           np.arange(rows + 1, rows + 1 + changed // 2, dtype=np.int64)])
+    delta = {"payment_id": keys, "released_at": START + SPAN - keys % 86400,
+             "amount_cents": keys % 100000, "released": np.ones(keys.size, dtype=np.int8)}
+    print(f"{'merge ' + format(keys.size, ',') + ' changed payments':<34}"
+          f"{timed(lambda: merge_extract(payments, delta, 'payment_id')):>12.1f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        analytics.cache_path = os.path.join(directory, "analytics.npz")
+        print(f"{'save cache':<34}{timed(analytics.save_cache, runs=3):>12.1f}")
+        print(f"{'load cache':<34}{timed(Analytics(analytics.cache_path).load_cache, runs=3):>12.1f}")
+        print(f"cache file: {os.path.getsize(analytics.cache_path) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
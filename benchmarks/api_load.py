@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load generator for the SkillLink JSON API
+
+Opens one keep-alive connection per client and replays a read-heavy mix of
+requests against a running api_server.py for a fixed duration. Half of the
+requests revalidate with If-None-Match, as a caching client would. Clients are
+coroutines, so one process can hold thousands of them open: run it with many
+more clients than the server's API_WORKERS to check that open connections
+don't need a worker each.
+
+Usage: python3 benchmarks/api_load.py [--clients N] [--seconds S] [--host H] [--port P]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import API_HOST, API_PORT, API_WORKERS
+from api_server import raise_open_files_limit
+
+PATHS = [
+    "/freelancers?limit=50",
+    "/projects?limit=50",
+    "/contracts?limit=50",
+    "/skills",
+    "/search/freelancers?skill=Python",
+    "/freelancers/5",
+    "/freelancers/5/earnings",
+    "/projects/1",
+    "/projects/1/proposals",
+]
+
+
+async def request(reader, writer, host, path, headers):
+    """Send a GET on a keep-alive connection; returns (status, response headers)"""
+    head = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write((head + "\r\n").encode("latin-1"))
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by the server")
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(response_headers.get("content-length", 0)))
+    return int(status_line.split()[1]), response_headers
+
+
+async def client(host, port, deadline, results):
+    """Issue requests until deadline; records latencies and status counts"""
+    etags = {}
+    connection = None
+    while time.perf_counter() < deadline:
+        path = random.choice(PATHS)
+        headers = {}
+        if path in etags and random.random() < 0.5:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection(host, port), 30)
+            status, response_headers = await asyncio.wait_for(
+                request(*connection, host, path, headers), 30)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            if connection is not None:
+                connection[1].close()
+                connection = None
+            results["statuses"]["error"] = results["statuses"].get("error", 0) + 1
+            await asyncio.sleep(0.1)
+            continue
+        results["latencies"].append(time.perf_counter() - start)
+        results["statuses"][status] = results["statuses"].get(status, 0) + 1
+        if "etag" in response_headers:
+            etags[path] = response_headers["etag"]
+    if connection is not None:
+        connection[1].close()
+
+
+async def run(args, results):
+    """Run every client to the deadline"""
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(client(args.host, args.port, deadline, results) for _ in range(args.clients)))
+
+
+def main():
+    """Run the load and print throughput and latency percentiles"""
+    parser = argparse.ArgumentParser(description="Load test the SkillLink API")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    raise_open_files_limit()
+    results = {"latencies": [], "statuses": {}}
+    start = time.perf_counter()
+    asyncio.run(run(args, results))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results["latencies"])
+    if not latencies:
+        print("No successful requests")
+        sys.exit(1)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print("=" * 60)
+    print(f"SkillLink API load test: {args.clients} clients for {args.seconds:.0f}s "
+          f"(server configured with {API_WORKERS} workers)")
+    print("=" * 60)
+    print(f"Requests: {len(latencies)} ({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"Latency ms: p50 {percentile(0.50):.1f}  p90 {percentile(0.90):.1f}  "
+          f"p99 {percentile(0.99):.1f}  max {latencies[-1] * 1000:.1f}")
+    print("Statuses: " + ", ".join(f"{status}: {count}" for status, count
+                                   in sorted(results["statuses"].items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
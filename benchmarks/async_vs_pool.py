@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: AsyncDatabaseConnection vs DatabaseConnectionPool
+
+Simulates N concurrent callers that each open freelancer profiles (details,
+skills, earnings and reviews) back to back for a fixed duration, with the
+same number of database connections on both sides:
+  sync   one thread per caller sharing a DatabaseConnectionPool, four
+         sequential queries per profile
+  async  one asyncio task per caller sharing an AsyncDatabaseConnection,
+         the four queries pipelined in one round trip
+  async-seq  the async layer without pipelining, to separate the two effects
+
+Usage: python3 benchmarks/async_vs_pool.py [--callers 16,64,256,1024] [--seconds S] [--connections C]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_POOL_SIZE
+from database import DatabaseConnection, DatabaseConnectionPool
+from async_database import AsyncDatabaseConnection
+
+
+def summarize(latencies, elapsed):
+    """(profiles/s, p50 ms, p99 ms) for a run"""
+    latencies.sort()
+    if not latencies:
+        return 0.0, 0.0, 0.0
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return len(latencies) / elapsed, percentile(0.50), percentile(0.99)
+
+
+def run_sync(freelancer_ids, callers, seconds, connections):
+    """Threads borrowing from the blocking pool"""
+    pool = DatabaseConnectionPool(lambda: DatabaseConnection(**DB_CONFIG), connections)
+    if not pool.open():
+        sys.exit(1)
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def caller(offset):
+        mine = []
+        i = offset
+        while time.perf_counter() < deadline:
+            user_id = freelancer_ids[i % len(freelancer_ids)]
+            i += callers
+            start = time.perf_counter()
+            with pool.connection() as db:
+                db.get_freelancer_details(user_id)
+                db.get_freelancer_skills(user_id)
+                db.get_freelancer_earnings(user_id)
+                db.get_freelancer_reviews(user_id)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        list(executor.map(caller, range(callers)))
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return summarize(latencies, elapsed)
+
+
+async def run_async(freelancer_ids, callers, seconds, connections, pipelined):
+    """Tasks sharing one async pool"""
+    db = AsyncDatabaseConnection(**DB_CONFIG, min_size=connections, max_size=connections)
+    if not await db.connect():
+        sys.exit(1)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def caller(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            user_id = freelancer_ids[i % len(freelancer_ids)]
+            i += callers
+            start = time.perf_counter()
+            if pipelined:
+                await db.get_freelancer_profile(user_id)
+            else:
+                await db.get_freelancer_details(user_id)
+                await db.get_freelancer_skills(user_id)
+                await db.get_freelancer_earnings(user_id)
+                await db.get_freelancer_reviews(user_id)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(offset) for offset in range(callers)))
+    elapsed = time.perf_counter() - start
+    await db.disconnect()
+    return summarize(latencies, elapsed)
+
+
+def main():
+    """Run every mode at every concurrency level and print a table"""
+    parser = argparse.ArgumentParser(description="Compare the async layer with the sync pool")
+    parser.add_argument("--callers", default="16,64,256,1024",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=DB_POOL_SIZE)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.callers.split(",")]
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+    freelancer_ids = [row[0] for row in db.get_all_freelancers() or []]
+    db.disconnect()
+    if not freelancer_ids:
+        print("No freelancers to query")
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Freelancer profile lookups, {args.connections} connections, {args.seconds:.0f}s per run")
+    print("=" * 72)
+    print(f"{'callers':>8}  {'mode':<10} {'profiles/s':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for callers in levels:
+        results = [
+            ("sync", run_sync(freelancer_ids, callers, args.seconds, args.connections)),
+            ("async-seq", asyncio.run(run_async(freelancer_ids, callers, args.seconds,
+                                                args.connections, pipelined=False))),
+            ("async", asyncio.run(run_async(freelancer_ids, callers, args.seconds,
+                                            args.connections, pipelined=True))),
+        ]
+        for mode, (rate, p50, p99) in results:
+            print(f"{callers:>8}  {mode:<10} {rate:>12,.0f} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Bid analytics benchmark: cold, cached and invalidated get_bid_analytics calls
+
+Inserts N bids on sample project 1 inside a transaction, then times
+get_bid_analytics when it computes the statistics (cold), when the cached
+result is revalidated against proposal_version (warm), and after a new bid
+bumps the version. The transaction is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/bid_analytics.py [bids] [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+
+INSERT_BENCH_FREELANCERS = """
+INSERT INTO users (username, email, password_hash, role)
+SELECT 'bench_bid_' || g, 'bench_bid_' || g || '@mail.com', 'x', 'freelancer'
+FROM generate_series(1, %s) g
+"""
+
+# every bench freelancer bids on project 1; a third of them have decided bids on project 2
+INSERT_BIDS = """
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents)
+SELECT 1, u.user_id, 20000 + (u.user_id * 7919) %% 100000
+FROM users u
+WHERE u.username LIKE 'bench_bid_%%'
+"""
+INSERT_HISTORY = """
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents, status)
+SELECT 2, u.user_id, 50000, CASE WHEN u.user_id %% 2 = 0 THEN 'accepted' ELSE 'rejected' END
+FROM users u
+WHERE u.username LIKE 'bench_bid_%%' AND u.user_id %% 3 = 0
+"""
+
+
+def timed(call, repeats):
+    """Median milliseconds of call() over repeats runs"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000
+
+
+def main():
+    """Load the bids and time the three cases"""
+    bids = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Bid analytics of project 1 with {bids:,} extra bids")
+    print("=" * 72)
+    try:
+        db.cursor.execute(INSERT_BENCH_FREELANCERS, (bids,))
+        db.cursor.execute(INSERT_BIDS)
+        db.cursor.execute(INSERT_HISTORY)
+        db.cursor.execute("ANALYZE proposal")
+
+        def cold():
+            db._bid_analytics.clear()
+            return db.get_bid_analytics(1)
+
+        def invalidated():
+            db.cursor.execute("UPDATE proposal SET bid_amount_cents = bid_amount_cents WHERE proposal_id = "
+                              "(SELECT MIN(proposal_id) FROM proposal WHERE project_id = 1)")
+            return db.get_bid_analytics(1)
+
+        summary, rows = cold()
+        print(f"{summary[0]:,} bids: min {summary[1]}, median {summary[2]:.0f}, p90 {summary[3]:.0f} cents")
+        print(f"cold (computed)        {timed(cold, repeats):8.2f} ms")
+        db.get_bid_analytics(1)
+        print(f"warm (revalidated)     {timed(lambda: db.get_bid_analytics(1), repeats):8.2f} ms")
+        print(f"after a proposal edit  {timed(invalidated, repeats):8.2f} ms")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
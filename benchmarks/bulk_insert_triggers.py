@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Bulk insert benchmark for the proposal/review triggers
+
+Compares the old FOR EACH ROW triggers against the statement-level
+triggers from SQL_QUERIES_DATABASE.sql. Every run happens inside a
+transaction that is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/bulk_insert_triggers.py [rows]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+
+# The row-level triggers as they were before the statement-level rewrite
+ROW_LEVEL_TRIGGERS = """
+DROP TRIGGER trg_check_proposal_role ON proposal;
+DROP TRIGGER trg_update_rating ON review;
+
+CREATE FUNCTION pg_temp.check_proposal_role_row()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (SELECT role FROM users WHERE user_id = NEW.freelancer_id) <> 'freelancer' THEN
+        RAISE EXCEPTION 'Only freelancers can submit proposals';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pg_temp.update_avg_rating_row()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE freelancer_profile
+    SET avg_rating = get_freelancer_avg_rating(NEW.reviewee_id)
+    WHERE user_id = NEW.reviewee_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_check_proposal_role
+BEFORE INSERT ON proposal
+FOR EACH ROW
+EXECUTE FUNCTION pg_temp.check_proposal_role_row();
+
+CREATE TRIGGER trg_update_rating
+AFTER INSERT ON review
+FOR EACH ROW
+EXECUTE FUNCTION pg_temp.update_avg_rating_row();
+"""
+
+INSERT_BENCH_USERS = """
+INSERT INTO users (username, email, password_hash, role)
+SELECT 'bench_fl_' || g, 'bench_fl_' || g || '@mail.com', 'x', 'freelancer'
+FROM generate_series(1, %s) g
+"""
+
+# every bench freelancer bids on project 1
+INSERT_PROPOSALS = """
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents, cover_letter)
+SELECT 1, u.user_id, 50000 + u.user_id, 'bench'
+FROM users u
+WHERE u.username LIKE 'bench_fl_%'
+"""
+
+# every bench user reviews contract 1, spread over the eight sample freelancers
+INSERT_REVIEWS = """
+INSERT INTO review (contract_id, reviewer_id, reviewee_id, rating, feedback)
+SELECT 1, u.user_id, 5 + u.user_id % 8, 1 + u.user_id % 5, 'bench'
+FROM users u
+WHERE u.username LIKE 'bench_fl_%'
+"""
+
+
+def run(db, rows, row_level):
+    """Time one bulk proposal insert and one bulk review insert"""
+    cursor = db.cursor
+    try:
+        if row_level:
+            cursor.execute(ROW_LEVEL_TRIGGERS)
+        cursor.execute(INSERT_BENCH_USERS, (rows,))
+
+        start = time.perf_counter()
+        cursor.execute(INSERT_PROPOSALS)
+        proposal_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cursor.execute(INSERT_REVIEWS)
+        review_time = time.perf_counter() - start
+    finally:
+        db.connection.rollback()
+    return proposal_time, review_time
+
+
+def main():
+    """Run both trigger variants and print throughput"""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Bulk insert benchmark ({rows} rows per statement)")
+    print("=" * 60)
+
+    results = {}
+    for label, row_level in (("FOR EACH ROW", True), ("FOR EACH STATEMENT", False)):
+        proposal_time, review_time = run(db, rows, row_level)
+        results[label] = (proposal_time, review_time)
+        print(f"\n{label}:")
+        print(f"  proposals: {proposal_time:.3f}s ({rows / proposal_time:,.0f} rows/s)")
+        print(f"  reviews:   {review_time:.3f}s ({rows / review_time:,.0f} rows/s)")
+
+    before = results["FOR EACH ROW"]
+    after = results["FOR EACH STATEMENT"]
+    print(f"\nSpeedup: proposals x{before[0] / after[0]:.1f}, reviews x{before[1] / after[1]:.1f}")
+
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Freelancer directory benchmark: precomputed listing vs computing it per call
+
+Compares, against the configured database:
+  - the directory's defining query run live (joins and aggregates on every call)
+    versus reading the materialized freelancer_directory, for the full list
+  - one API page (get_freelancers_page) in every FREELANCER_SORTS order
+  - the skill search on the directory's GIN index
+  - REFRESH MATERIALIZED VIEW CONCURRENTLY (rolled back)
+
+Usage: python3 benchmarks/freelancer_directory.py [runs]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection, FREELANCER_SORTS
+
+
+def timed(function, runs):
+    """Median milliseconds of function()"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def fetch(db, query, params=None):
+    """Run a query to completion"""
+    db.cursor.execute(query, params)
+    return db.cursor.fetchall()
+
+
+def main():
+    """Time the live and precomputed listings, the sorted pages, search and a refresh"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    try:
+        definition = fetch(db, "SELECT pg_get_viewdef('freelancer_directory'::regclass)")[0][0].rstrip().rstrip(";")
+        live = f"SELECT * FROM ({definition}) d ORDER BY reputation_score DESC, user_id DESC"
+        count = fetch(db, "SELECT COUNT(*) FROM freelancer_directory")[0][0]
+        skill = fetch(db, """
+            SELECT s.skill_name FROM freelancer_skill fs JOIN skill s ON s.skill_id = fs.skill_id
+            GROUP BY s.skill_name ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+
+        print("=" * 60)
+        print(f"Freelancer directory: {count:,} freelancers, median of {runs} runs")
+        print("=" * 60)
+        print(f"{'query':<40}{'median ms':>12}")
+        print(f"{'full list, computed live':<40}{timed(lambda: fetch(db, live), runs):>12.2f}")
+        print(f"{'full list, from the directory':<40}{timed(db.get_all_freelancers, runs):>12.2f}")
+        for sort in FREELANCER_SORTS:
+            print(f"{'page of 50 by ' + sort:<40}{timed(lambda: db.get_freelancers_page(50, None, sort), runs):>12.2f}")
+        if skill:
+            print(f"{'search ' + repr(skill[0][0]):<40}"
+                  f"{timed(lambda: db.search_freelancers_by_skill(skill[0][0]), runs):>12.2f}")
+
+        db.cursor.execute("SET statement_timeout = 0")
+        start = time.perf_counter()
+        db.cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY freelancer_directory")
+        print(f"{'refresh concurrently':<40}{(time.perf_counter() - start) * 1000:>12.2f}")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Partition pruning benchmark: project proposal lists over monthly partitions
+
+Inside a transaction, creates proposal partitions for the past M months and
+posts one bench project per month, each receiving P proposals spread over the
+months since it was posted. For the newest and the oldest bench project it
+compares the proposal list query with and without the created_at bound that
+get_proposals_by_project adds (proposals are never older than their project),
+and the lookup of one of its proposals by id with and without the created_at
+from proposal_key that get_proposal_cover_letter adds:
+  - partitions scanned (from EXPLAIN ANALYZE)
+  - query latency
+The transaction is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/partition_pruning.py [months] [proposals_per_project]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+
+CREATE_PAST_PARTITIONS = """
+SELECT COUNT(*) FILTER (WHERE create_month_partition('proposal',
+           (date_trunc('month', LOCALTIMESTAMP) - make_interval(months => m))::DATE))
+FROM generate_series(1, %s) m
+"""
+
+INSERT_BENCH_USERS = """
+INSERT INTO users (username, email, password_hash, role)
+SELECT 'bench_pp_' || g, 'bench_pp_' || g || '@mail.com', 'x',
+       CASE WHEN g = 0 THEN 'client' ELSE 'freelancer' END
+FROM generate_series(0, %s) g
+"""
+
+# project m (1 = this month) is posted m - 1 months ago
+INSERT_BENCH_PROJECTS = """
+INSERT INTO project (client_id, title, budget_min_cents, budget_max_cents, created_at)
+SELECT u.user_id, 'bench_pp_project_' || m, 10000, 90000,
+       date_trunc('month', LOCALTIMESTAMP) - make_interval(months => m - 1) + INTERVAL '1 day'
+FROM users u
+CROSS JOIN generate_series(1, %s) m
+WHERE u.username = 'bench_pp_0'
+"""
+
+# every bench freelancer bids once on every project, at a time between its posting and now
+INSERT_BENCH_PROPOSALS = """
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents, created_at)
+SELECT p.project_id, u.user_id, %s + u.user_id %% 80000,
+       p.created_at + (LOCALTIMESTAMP - p.created_at) * ((u.user_id %% 97) / 97.0)
+FROM project p
+CROSS JOIN users u
+WHERE p.title LIKE 'bench\\_pp\\_project\\_%%' AND u.username LIKE 'bench\\_pp\\_%%' AND u.role = 'freelancer'
+"""
+
+BENCH_PROJECT = "SELECT project_id FROM project WHERE title = %s"
+
+UNBOUNDED_QUERY = """
+SELECT pr.proposal_id, pr.bid_amount_cents, pr.status
+FROM proposal pr
+WHERE pr.project_id = %s
+ORDER BY pr.bid_amount_cents
+"""
+
+BOUNDED_QUERY = """
+SELECT pr.proposal_id, pr.bid_amount_cents, pr.status
+FROM proposal pr
+WHERE pr.project_id = %s
+  AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %s)
+ORDER BY pr.bid_amount_cents
+"""
+
+BY_ID_QUERY = "SELECT COALESCE(cover_letter, '') FROM proposal WHERE proposal_id = %s"
+
+BY_KEY_QUERY = """
+SELECT COALESCE(cover_letter, '')
+FROM proposal
+WHERE proposal_id = %s
+  AND created_at = (SELECT created_at FROM proposal_key WHERE proposal_id = %s)
+"""
+
+PROJECT_PROPOSAL = "SELECT MIN(proposal_id) FROM proposal_key WHERE project_id = %s"
+
+
+def scanned_partitions(plan) -> int:
+    """Proposal partitions an EXPLAIN ANALYZE plan node and its children actually read"""
+    own = plan.get("Relation Name", "").startswith("proposal_y") and plan.get("Actual Loops", 0) > 0
+    return own + sum(scanned_partitions(child) for child in plan.get("Plans", []))
+
+
+def measure(db, query, params, runs=50):
+    """(partitions scanned, median milliseconds) of a query"""
+    db.cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query, params)
+    plan = db.cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        db.cursor.execute(query, params)
+        db.cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return scanned_partitions(plan[0]["Plan"]), statistics.median(timings)
+
+
+def main():
+    """Build the bench projects and compare the pruned and unpruned lists"""
+    months = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    per_project = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Partition pruning: {months} monthly projects x {per_project:,} proposals")
+    print("=" * 72)
+    try:
+        db.cursor.execute(CREATE_PAST_PARTITIONS, (months,))
+        db.cursor.execute(INSERT_BENCH_USERS, (per_project,))
+        db.cursor.execute(INSERT_BENCH_PROJECTS, (months,))
+        db.cursor.execute(INSERT_BENCH_PROPOSALS, (10000,))
+        print(f"{db.cursor.rowcount:,} proposals inserted")
+        db.cursor.execute("ANALYZE proposal")
+
+        print(f"{'project':<22}{'query':<12}{'partitions':>12}{'median ms':>12}")
+        for label, title in (("newest", "bench_pp_project_1"), ("oldest", f"bench_pp_project_{months}")):
+            db.cursor.execute(BENCH_PROJECT, (title,))
+            project_id = db.cursor.fetchone()[0]
+            db.cursor.execute(PROJECT_PROPOSAL, (project_id,))
+            proposal_id = db.cursor.fetchone()[0]
+            for query_label, query, params in (("unbounded", UNBOUNDED_QUERY, (project_id,)),
+                                               ("bounded", BOUNDED_QUERY, (project_id, project_id)),
+                                               ("by id", BY_ID_QUERY, (proposal_id,)),
+                                               ("by key", BY_KEY_QUERY, (proposal_id, proposal_id))):
+                partitions, elapsed = measure(db, query, params)
+                print(f"{label + ' (' + str(project_id) + ')':<22}{query_label:<12}{partitions:>12}{elapsed:>12.2f}")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
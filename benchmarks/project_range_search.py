@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Project search benchmark: budget/deadline filters and full-text search
+
+Loads N synthetic projects inside a transaction, then times the first page of
+search_projects_page for typical filters and shows which index each plan uses:
+a narrow budget range, a minimum budget due in the next 14 days, the deadline
+window alone, and a broad minimum budget that matches most projects. It then
+times search_projects_text_page for a rare and a common phrase, alone and
+with a filter. The transaction is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/project_range_search.py [projects] [repeats]
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+
+# budgets between $100 and $7,000 wide up to $2,000, deadlines within a year either
+# side of today, one in twenty without a deadline; all owned by sample client 1.
+# Titles pair two of 100 topics and descriptions three of them, so two topics
+# together match a few projects in a thousand and a single topic one in twenty
+INSERT_PROJECTS = """
+INSERT INTO project (client_id, title, description, budget_min_cents, budget_max_cents, price_model, deadline)
+SELECT 1, w.words[1 + g %% 100] || ' ' || w.words[1 + (g / 100) %% 100],
+       'Looking for help with ' || w.words[1 + (g / 7) %% 100] || ', ' || w.words[1 + (g / 13) %% 100]
+           || ' and ' || w.words[1 + (g / 31) %% 100] || ' for a growing business',
+       b.low, b.low + (g * 104729) %% 200000, 'fixed',
+       CASE WHEN g %% 20 = 0 THEN NULL ELSE CURRENT_DATE + ((g * 7907) %% 730 - 365) END
+FROM generate_series(1, %s) g,
+     LATERAL (SELECT 10000 + (g * 7919) %% 500000 AS low) b,
+     (SELECT array_agg('topic' || chr(97 + i %% 26) || chr(97 + i / 26)) AS words
+      FROM generate_series(0, 99) i) w
+"""
+
+PAGE_SIZE = 50
+
+
+def cases():
+    """(label, search_projects_page filters)"""
+    today = date.today()
+    return [
+        ("budget overlaps $500-$800", (50000, 80000, None, None)),
+        ("budget >= $5,000, due in 14 days", (500000, None, today, today + timedelta(days=14))),
+        ("due in 14 days", (None, None, today, today + timedelta(days=14))),
+        ("budget >= $100 (matches most)", (10000, None, None, None)),
+    ]
+
+
+def text_cases():
+    """(label, search text, search_projects_text_page filters)"""
+    today = date.today()
+    return [
+        ("text 'topicba topicca' (rare)", "topicba topicca", (None, None, None, None)),
+        ("text 'topicba' (common)", "topicba", (None, None, None, None)),
+        ("text 'topicba', due in 14 days", "topicba", (None, None, today, today + timedelta(days=14))),
+    ]
+
+
+def timed_page(search, repeats):
+    """(rows on the page, p50 ms, p99 ms) over repeats runs of search()"""
+    latencies = []
+    rows = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = search()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    return len(rows or []), p50, p99
+
+
+def plan_scans(db, filters):
+    """The scan nodes of the plan PostgreSQL picks for a filter"""
+    budget_min, budget_max, deadline_from, deadline_to = filters
+    conditions, params = [], []
+    if budget_min is not None or budget_max is not None:
+        conditions.append("budget_range && int4range(%s::int, %s::int, '[]')")
+        params += [budget_min, budget_max]
+    if deadline_from is not None:
+        conditions.append("deadline >= %s")
+        params.append(deadline_from)
+    if deadline_to is not None:
+        conditions.append("deadline <= %s")
+        params.append(deadline_to)
+    db.cursor.execute(f"""
+        EXPLAIN (COSTS OFF)
+        SELECT project_id FROM project WHERE {' AND '.join(conditions)}
+        ORDER BY COALESCE(deadline, 'infinity'::date), project_id LIMIT {PAGE_SIZE}
+        """, params)
+    return [line.strip() for (line,) in db.cursor.fetchall() if "Scan" in line]
+
+
+def main():
+    """Load the projects, run every case and print latencies"""
+    projects = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Project range search, {projects:,} extra projects, first page of {PAGE_SIZE}")
+    print("=" * 72)
+    try:
+        start = time.perf_counter()
+        db.cursor.execute(INSERT_PROJECTS, (projects,))
+        db.cursor.execute("ANALYZE project")
+        print(f"loaded in {time.perf_counter() - start:.1f}s\n")
+
+        for label, filters in cases():
+            rows, p50, p99 = timed_page(lambda: db.search_projects_page(PAGE_SIZE, *filters), repeats)
+            print(f"{label:<36} rows {rows:>3}  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+            for scan in plan_scans(db, filters):
+                print(f"    {scan}")
+
+        print()
+        for label, text, filters in text_cases():
+            rows, p50, p99 = timed_page(lambda: db.search_projects_text_page(text, PAGE_SIZE, *filters),
+                                        repeats)
+            print(f"{label:<36} rows {rows:>3}  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Proposal list payload benchmark: full cover letters vs previews
+
+Inserts N proposals with L-character cover letters on sample project 1 inside
+a transaction, then compares the old listing query (the whole cover_letter)
+with get_proposals_by_project (a preview plus the letter's length):
+  - result bytes received (the text and numbers in the rows, as UTF-8)
+  - fetch time
+  - memory held by the rows as the proposals list keeps them (ProposalRows)
+The transaction is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/proposal_payload.py [proposals] [letter_chars]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from database import DatabaseConnection
+from rows import RowSet, ProposalRows
+
+INSERT_BENCH_FREELANCERS = """
+INSERT INTO users (username, email, password_hash, role)
+SELECT 'bench_fl_' || g, 'bench_fl_' || g || '@mail.com', 'x', 'freelancer'
+FROM generate_series(1, %s) g
+"""
+
+# every bench freelancer bids on project 1 with a letter of the requested length
+INSERT_PROPOSALS = """
+INSERT INTO proposal (project_id, freelancer_id, bid_amount_cents, cover_letter)
+SELECT 1, u.user_id, 50000 + u.user_id,
+       left(repeat('I have shipped projects like this one before. ', %s / 40 + 1), %s)
+FROM users u
+WHERE u.username LIKE 'bench_fl_%%'
+"""
+
+# the listing query before previews
+FULL_LETTERS_QUERY = """
+SELECT pr.proposal_id, u.username, pr.bid_amount_cents, pr.status, pr.cover_letter
+FROM proposal pr
+JOIN users u ON pr.freelancer_id = u.user_id
+WHERE pr.project_id = %s
+ORDER BY pr.bid_amount_cents
+"""
+
+
+class FullLetterRows(RowSet):
+    """The proposal list rows before previews"""
+    __slots__ = ()
+    COLUMNS = (("proposal_id", "int"), ("freelancer", "text"), ("bid_amount_cents", "cents"),
+               ("status", "label"), ("cover_letter", "text"))
+
+
+def payload_bytes(rows):
+    """Approximate bytes on the wire: every value as text, NULLs free"""
+    return sum(len(str(value).encode()) for row in rows for value in row if value is not None)
+
+
+def measure(fetch, row_class):
+    """(rows, seconds, payload bytes, bytes held as row_class) for one fetch"""
+    start = time.perf_counter()
+    rows = fetch()
+    elapsed = time.perf_counter() - start
+    size = payload_bytes(rows)
+    gc.collect()
+    tracemalloc.start()
+    held = row_class.from_result(rows, format_now=True)
+    gc.collect()
+    held_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return len(rows), elapsed, size, held_bytes
+
+
+def main():
+    """Load the proposals and compare both listings"""
+    proposals = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    letter_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Proposal list of project 1: {proposals:,} extra proposals, {letter_chars:,}-char letters")
+    print("=" * 72)
+    try:
+        db.cursor.execute(INSERT_BENCH_FREELANCERS, (proposals,))
+        db.cursor.execute(INSERT_PROPOSALS, (letter_chars, letter_chars))
+
+        results = [
+            ("full letters", measure(lambda: db.execute_query(FULL_LETTERS_QUERY, (1,)), FullLetterRows)),
+            ("previews", measure(lambda: db.get_proposals_by_project(1), ProposalRows)),
+        ]
+        for label, (count, elapsed, size, held) in results:
+            print(f"{label:<14} rows {count:>7,}  fetch {elapsed * 1000:8.1f} ms  "
+                  f"payload {size / 2**20:7.2f} MiB  held {held / 2**20:7.2f} MiB")
+
+        (_, full_time, full_size, full_held), (_, preview_time, preview_size, preview_held) = \
+            (result for _, result in results)
+        print(f"\npayload x{full_size / preview_size:.1f} smaller, memory x{full_held / preview_held:.1f} "
+              f"smaller, fetch x{full_time / preview_time:.1f} faster")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Related skills benchmark: co-occurrence refresh and in-memory lookups
+
+Inserts S skills and F freelancers with K clustered skills each inside a
+transaction, then times
+  - refresh_skill_cooccurrence over the whole queue (the initial build)
+  - the incremental refresh after 1% of the freelancers change one skill
+  - RelatedSkills.load and the sync picking up that refresh
+  - RelatedSkills.related lookups (microseconds, no database)
+The transaction is rolled back, so the database is left untouched.
+
+Usage: python3 benchmarks/related_skills.py [skills] [freelancers] [skills_per_freelancer]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, RELATED_SKILLS_TOP_N
+from database import DatabaseConnection
+from related_skills import RelatedSkills
+
+INSERT_BENCH_SKILLS = """
+INSERT INTO skill (skill_name)
+SELECT 'bench_skill_' || g FROM generate_series(1, %s) g
+"""
+
+INSERT_BENCH_FREELANCERS = """
+WITH new_users AS (
+    INSERT INTO users (username, email, password_hash, role)
+    SELECT 'bench_rs_' || g, 'bench_rs_' || g || '@mail.com', 'x', 'freelancer'
+    FROM generate_series(1, %s) g
+    RETURNING user_id
+)
+INSERT INTO freelancer_profile (user_id)
+SELECT user_id FROM new_users
+"""
+
+# K skills per freelancer, clustered: a freelancer draws from a window of 50 consecutive
+# bench skills, so the skills near each other co-occur
+INSERT_BENCH_SKILL_LISTS = """
+INSERT INTO freelancer_skill (profile_id, skill_id, proficiency_level)
+SELECT DISTINCT f.profile_id, s.first_id + f.profile_id %% (s.skills - 50) + (f.profile_id * 7919 + k * 31) %% 50, 3
+FROM freelancer_profile f
+JOIN users u ON u.user_id = f.user_id AND u.username LIKE 'bench_rs_%%'
+CROSS JOIN generate_series(1, %s) k
+CROSS JOIN (SELECT MIN(skill_id) AS first_id, COUNT(*) AS skills
+            FROM skill WHERE skill_name LIKE 'bench_skill_%%') s
+ON CONFLICT DO NOTHING
+"""
+
+# 1% of the bench freelancers swap their lowest skill for the next one
+CHANGE_SKILL_LISTS = """
+UPDATE freelancer_skill fs
+SET skill_id = fs.skill_id + 1
+FROM (
+    SELECT profile_id, MIN(skill_id) AS skill_id
+    FROM freelancer_skill
+    WHERE profile_id IN (SELECT f.profile_id FROM freelancer_profile f
+                         JOIN users u ON u.user_id = f.user_id
+                         WHERE u.username LIKE 'bench_rs_%%' AND f.profile_id %% 100 = 0)
+    GROUP BY profile_id
+) lowest
+WHERE fs.profile_id = lowest.profile_id AND fs.skill_id = lowest.skill_id
+  AND NOT EXISTS (SELECT 1 FROM freelancer_skill o WHERE o.profile_id = fs.profile_id AND o.skill_id = fs.skill_id + 1)
+"""
+
+
+def timed(call):
+    """(result, milliseconds) of one call()"""
+    start = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    """Build the bench graph and time the refreshes and lookups"""
+    skills = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    freelancers = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    per_freelancer = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Related skills: {skills:,} skills, {freelancers:,} freelancers x {per_freelancer} skills")
+    print("=" * 72)
+    try:
+        db.cursor.execute(INSERT_BENCH_SKILLS, (skills,))
+        db.cursor.execute(INSERT_BENCH_FREELANCERS, (freelancers,))
+        db.cursor.execute(INSERT_BENCH_SKILL_LISTS, (per_freelancer,))
+        db.cursor.execute("ANALYZE skill_list_change")
+        # refresh_skill_cooccurrence commits, so time the SQL function directly
+        query = "SELECT * FROM refresh_skill_cooccurrence()"
+
+        def refresh():
+            db.cursor.execute(query)
+            return db.cursor.fetchone()
+
+        (pairs, _), elapsed = timed(refresh)
+        print(f"initial build            {elapsed:10.1f} ms  ({pairs:,} pairs)")
+
+        related = RelatedSkills(RELATED_SKILLS_TOP_N)
+        loaded, elapsed = timed(lambda: related.load(db))
+        print(f"load into memory         {elapsed:10.1f} ms  ({loaded:,} skills)")
+
+        db.cursor.execute(CHANGE_SKILL_LISTS)
+        print(f"{db.cursor.rowcount:,} freelancer(s) changed a skill")
+        (pairs, _), elapsed = timed(refresh)
+        print(f"incremental refresh      {elapsed:10.1f} ms  ({pairs:,} pairs)")
+        synced, elapsed = timed(lambda: related.sync(db))
+        print(f"incremental sync         {elapsed:10.1f} ms  ({synced:,} skills re-read)")
+
+        names = [f"bench_skill_{random.randint(1, skills)}" for _ in range(100000)]
+        start = time.perf_counter()
+        for name in names:
+            related.related(name, 5)
+        per_lookup = (time.perf_counter() - start) / len(names) * 1e6
+        print(f"lookup                   {per_lookup:10.2f} us")
+    finally:
+        db.connection.rollback()
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
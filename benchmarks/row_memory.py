@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Memory and formatting benchmark for the row containers in rows.py
+
+Builds N synthetic result rows shaped like psycopg2's output (fresh str, int
+and Decimal objects per row) for the freelancers and contracts lists, and
+compares a list of tuples with the column-oriented RowSet:
+  - memory held (tracemalloc) by each representation
+  - time to format every row for display the old way (inline per refresh)
+    versus RowSet.display() on first use and when memoized
+
+No database is needed.
+
+Usage: python3 benchmarks/row_memory.py [rows]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rows import FreelancerRows, ContractRows
+
+
+def freelancer_row(i):
+    """A get_all_freelancers row"""
+    return (i, f"freelancer_{i}", f"Senior developer #{i % 50}", 2500 + i % 20000,
+            Decimal(i % 500) / 100, 3 + (i % 2000) / 1000, f"Python, SQL, Skill {i % 300}",
+            i % 40, i % 12, 100000 * (i % 90))
+
+
+def contract_row(i):
+    """A get_active_contracts row"""
+    total = 50000 + i % 90000
+    paid = total * (i % 4) // 4
+    return (i, i % 40000, 100000 + i % 60000, total, paid, total - paid, "active")
+
+
+def measure(build):
+    """(result, bytes held by it) for build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+
+def timed(fn):
+    """Seconds taken by fn()"""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def format_freelancers_inline(rows):
+    """What load_freelancers did per refresh before rows.py"""
+    for user_id, username, headline, rate, rating, score, skills, reviews, completed, earned in rows:
+        rate_dollars = rate / 100 if rate else 0
+        (user_id, username, headline, f"${rate_dollars:.2f}", f"{rating:.2f}", f"{score:.4g}",
+         skills, str(reviews), str(completed), f"${earned / 100:.2f}")
+
+
+def format_contracts_inline(rows):
+    """What load_contracts did per refresh before rows.py"""
+    for contract_id, client_id, freelancer_id, total_amount, paid, remaining, status in rows:
+        amount_dollars = total_amount / 100 if total_amount else 0
+        paid_dollars = paid / 100 if paid else 0
+        remaining_dollars = remaining / 100 if remaining else 0
+        (contract_id, client_id, freelancer_id, f"${amount_dollars:.2f}",
+         f"${paid_dollars:.2f}", f"${remaining_dollars:.2f}", status)
+
+
+def display_all(row_set):
+    """Format every row through the memoized display()"""
+    for index in range(len(row_set)):
+        row_set.display(index)
+
+
+def run(name, make_row, row_set_class, format_inline, n):
+    """Compare tuples and a RowSet for one list"""
+    tuples, tuple_bytes = measure(lambda: [make_row(i) for i in range(n)])
+    inline_seconds = timed(lambda: format_inline(tuples))
+    del tuples
+
+    row_set, row_set_bytes = measure(lambda: row_set_class(make_row(i) for i in range(n)))
+    first_seconds = timed(lambda: display_all(row_set))
+    memo_seconds = timed(lambda: display_all(row_set))
+    row_set.clear_display()
+    sample = row_set[n // 2]
+
+    print(f"\n{name} ({n:,} rows)")
+    print(f"  list of tuples: {tuple_bytes / 2**20:8.1f} MiB  ({tuple_bytes / n:6.1f} B/row)")
+    print(f"  {row_set_class.__name__:<14}: {row_set_bytes / 2**20:8.1f} MiB  ({row_set_bytes / n:6.1f} B/row)"
+          f"  -> {100 * (1 - row_set_bytes / tuple_bytes):.0f}% less")
+    print(f"  format all rows: inline {inline_seconds:.2f}s, display() first {first_seconds:.2f}s, "
+          f"memoized {memo_seconds:.2f}s")
+    print(f"  sample row: {sample}")
+
+
+def main():
+    """Run both comparisons"""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print("=" * 60)
+    print("Result row memory: tuples vs rows.RowSet")
+    print("=" * 60)
+    run("Freelancers", freelancer_row, FreelancerRows, format_freelancers_inline, n)
+    run("Contracts", contract_row, ContractRows, format_contracts_inline, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ Configuration file for SkillLink application
 Modify these settings according to your PostgreSQL setup
 """
 
+import os
+
 # Database configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -11,6 +13,127 @@ DB_CONFIG = {
     'password': 'yassineafiane'
 }
 
+# Read replicas: streaming standbys of DB_CONFIG that serve the read-only
+# get_*/search_* queries. Leave empty to send everything to DB_CONFIG.
+DB_REPLICAS = [
+    # {'host': 'localhost', 'port': 5433, 'database': 'Skilllink',
+    #  'user': 'postgres', 'password': 'yassineafiane'},
+]
+
+# Replicas further behind than this (in seconds) are skipped in favour of the primary
+REPLICA_MAX_LAG_SECONDS = 5
+
+# Sharded mode: when non-empty, client-owned data is spread over these databases
+# by a hash of client_id (see sharding.py and jobs/setup_shards.py) and DB_CONFIG
+# is not used. Each entry takes the same keys as DB_CONFIG plus optional 'port'
+# and 'replicas'.
+DB_SHARDS = [
+    # {'host': 'localhost', 'database': 'skilllink_shard0', 'user': 'postgres', 'password': '...'},
+    # {'host': 'localhost', 'database': 'skilllink_shard1', 'user': 'postgres', 'password': '...'},
+]
+
+# Statement timeouts (milliseconds) per DatabaseConnection method name; calls not
+# listed use STATEMENT_TIMEOUT_DEFAULT_MS. 0 means no limit.
+STATEMENT_TIMEOUT_DEFAULT_MS = 30000
+STATEMENT_TIMEOUTS_MS = {
+    'login_user': 2000,
+    'search_freelancers_by_skill': 5000,
+    'search_freelancers_by_skills': 5000,
+    'search_projects_page': 5000,
+    'get_client_projects': 10000,
+    'get_all_freelancers': 15000,
+    'get_all_projects': 15000,
+    'get_active_contracts': 15000,
+    'export_to_file': 0,
+    'copy_export': 0,
+    'copy_freelancer_statements': 0,
+    'refresh_reputation': 0,
+    'refresh_skill_cooccurrence': 0,
+    'maintain_tables': 0,
+    'refresh_freelancer_directory': 0,
+}
+
+# Offline snapshot: the freelancer, project, contract and skill lists are kept in
+# this SQLite file, shown at startup before PostgreSQL answers and reconciled in the
+# background every SNAPSHOT_SYNC_SECONDS. Set to '' to disable (always off in sharded mode).
+SNAPSHOT_PATH = os.path.join(os.path.expanduser('~'), '.skilllink', 'snapshot.sqlite3')
+SNAPSHOT_SYNC_SECONDS = 60
+
+# Projects tab: rows per page of filtered results ("More" fetches the next page)
+PROJECT_PAGE_SIZE = 200
+
+# Proposals: full cover letters opened in the app are kept for reuse, up to this many
+COVER_LETTER_CACHE_SIZE = 256
+
+# Milestone sweeper (jobs/sweep_milestones.py): milestones per transaction, and how
+# many days ahead a pending milestone counts as due soon
+MILESTONE_SWEEP_BATCH_SIZE = 500
+MILESTONE_DUE_SOON_DAYS = 7
+
+# Reputation scores (jobs/update_reputation.py): a review's weight halves every
+# REPUTATION_HALF_LIFE_DAYS, and every freelancer starts from REPUTATION_PRIOR_WEIGHT
+# reviews' worth of the platform-wide mean rating. Changing the half-life needs a
+# rebuild of the stored sums, which the job does by itself. Weights grow as
+# 2^(days since 2020-01-01 / half-life) and must stay below double precision's 2^1024,
+# so the job refuses a half-life under (days since 2020-01-01 + 365) / 960: about
+# 3 days in 2026, 23 days by 2080.
+REPUTATION_HALF_LIFE_DAYS = 180
+REPUTATION_PRIOR_WEIGHT = 5
+
+# Related skills (related_skills.py, jobs/refresh_skill_graph.py): the app keeps the
+# RELATED_SKILLS_TOP_N most related skills of every skill in memory and picks up the
+# counts refreshed by the job every RELATED_SKILLS_SYNC_SECONDS. A skill search with
+# no results is widened to the searched skill's RELATED_SKILLS_WIDEN closest skills.
+RELATED_SKILLS_TOP_N = 10
+RELATED_SKILLS_SYNC_SECONDS = 300
+RELATED_SKILLS_WIDEN = 3
+
+# History archive (jobs/archive_history.py): proposal and payment are partitioned by
+# month, with partitions created PARTITION_MONTHS_AHEAD months ahead (an insert past
+# the last one fails, so run the job at least monthly). Rejected proposals and fully
+# released payment months older than ARCHIVE_AFTER_MONTHS move to the archive tables,
+# ARCHIVE_BATCH_SIZE proposals per transaction.
+PARTITION_MONTHS_AHEAD = 3
+ARCHIVE_AFTER_MONTHS = 12
+ARCHIVE_BATCH_SIZE = 5000
+
+# Schema migrations (migrations.py, jobs/migrate.py): backfills start with
+# MIGRATION_CHUNK_ROWS keys per transaction, resized so a chunk takes about
+# MIGRATION_CHUNK_SECONDS, and pause while a standby replays more than
+# MIGRATION_MAX_LAG_SECONDS behind or more than MIGRATION_MAX_LOCK_WAITERS sessions
+# wait on locks. Schema changes and chunks wait at most MIGRATION_LOCK_TIMEOUT_MS
+# for a lock before backing off.
+MIGRATION_CHUNK_ROWS = 1000
+MIGRATION_CHUNK_SECONDS = 0.5
+MIGRATION_MAX_LAG_SECONDS = 5
+MIGRATION_MAX_LOCK_WAITERS = 5
+MIGRATION_LOCK_TIMEOUT_MS = 2000
+
+# Freelancer directory (jobs/refresh_directory.py --listen): refreshed at most every
+# DIRECTORY_MIN_INTERVAL_SECONDS after its source tables signal a change, and every
+# DIRECTORY_REFRESH_SECONDS regardless
+DIRECTORY_MIN_INTERVAL_SECONDS = 30
+DIRECTORY_REFRESH_SECONDS = 900
+
+# Analytics tab (analytics.py): payment and proposal history extracts kept as NumPy
+# arrays, saved to ANALYTICS_CACHE_PATH and refreshed with only the rows changed
+# since the last refresh, read ANALYTICS_BATCH_ROWS rows per COPY. The open tab
+# refreshes every ANALYTICS_REFRESH_SECONDS.
+ANALYTICS_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.skilllink', 'analytics.npz')
+ANALYTICS_BATCH_ROWS = 1000000
+ANALYTICS_REFRESH_SECONDS = 60
+
+# Headless JSON API (api_server.py)
+API_HOST = '127.0.0.1'
+API_PORT = 8080
+API_WORKERS = 16         # threads running handlers' database calls; idle clients hold none
+API_KEEPALIVE_SECONDS = 30  # close keep-alive connections idle this long
+API_BACKLOG = 1024       # connections the OS queues before the server accepts them
+DB_POOL_SIZE = 16        # pooled database connections shared by the handlers
+API_PAGE_SIZE = 50       # default page size; clients may ask for up to API_MAX_PAGE_SIZE
+API_MAX_PAGE_SIZE = 500
+API_CACHE_MAX_AGE = 5    # seconds clients may reuse a GET response without revalidating
+
 # Application settings
 APP_TITLE = "SkillLink - Freelancer Marketplace"
 APP_VERSION = "1.0.0"
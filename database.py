@@ -3,33 +3,358 @@ Database connection module for SkillLink application
 Handles all PostgreSQL database operations using psycopg2
 """
 
+import functools
+import gzip
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
 import psycopg2
-from psycopg2 import sql, Error
-from typing import List, Tuple, Optional, Any
+from psycopg2 import sql, Error, errors
+from psycopg2.extensions import STATUS_READY
+from typing import List, Tuple, Optional, Any, Dict, Callable, Iterator
+
+# Errors after which a transaction can simply be retried
+RETRYABLE_ERRORS = (errors.SerializationFailure, errors.DeadlockDetected)
+
+# Full-table dumps available to export_to_file, by name
+EXPORT_QUERIES = {
+    "users": """
+        SELECT user_id, username, email, role, status, joined_at
+        FROM users ORDER BY user_id""",
+    "freelancers": """
+        SELECT u.user_id, u.username, u.email, f.headline, f.bio, f.rate_per_hour, f.avg_rating
+        FROM freelancer_profile f
+        JOIN users u ON f.user_id = u.user_id
+        ORDER BY u.user_id""",
+    "freelancer_skills": """
+        SELECT f.user_id, s.skill_name, fs.proficiency_level
+        FROM freelancer_skill fs
+        JOIN freelancer_profile f ON fs.profile_id = f.profile_id
+        JOIN skill s ON fs.skill_id = s.skill_id
+        ORDER BY f.user_id, s.skill_name""",
+    "projects": """
+        SELECT project_id, client_id, title, description, budget_min_cents,
+               budget_max_cents, price_model, deadline
+        FROM project ORDER BY project_id""",
+    "proposals": """
+        SELECT proposal_id, project_id, freelancer_id, bid_amount_cents, status, cover_letter
+        FROM proposal_history ORDER BY proposal_id""",
+    "contracts": """
+        SELECT contract_id, proposal_id, client_id, freelancer_id, total_amount_cents,
+               paid_amount_cents, remaining_amount_cents, status
+        FROM contract ORDER BY contract_id""",
+    "milestones": """
+        SELECT milestone_id, contract_id, title, amount_cents, due_date, status
+        FROM milestone ORDER BY milestone_id""",
+    "payments": """
+        SELECT payment_id, contract_id, milestone_id, payer_id, payee_id, amount_cents,
+               status, released_at
+        FROM payment_history ORDER BY payment_id""",
+}
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Orders of the freelancer directory lists, by name: the sort column (an index of
+# freelancer_directory serves each, highest first) and its type for keyset cursors
+FREELANCER_SORTS = {
+    "reputation": ("reputation_score", "float8"),
+    "rating": ("avg_rating", "numeric"),
+    "earnings": ("earned_cents", "bigint"),
+    "reviews": ("review_count", "bigint"),
+}
+
+# Columns of the freelancer directory lists (get_all_freelancers, get_freelancers_page)
+FREELANCER_DIRECTORY_COLUMNS = """user_id, username, headline, rate_per_hour, avg_rating, reputation_score,
+       skills, review_count, completed_contracts, earned_cents"""
+
+# Characters of each cover letter the proposal lists return; the rest is fetched on demand
+COVER_LETTER_PREVIEW_CHARS = 80
+
+# ts_headline options for the search_projects_text_page snippets: hits are marked «like this»
+PROJECT_SNIPPET_OPTIONS = 'StartSel=«, StopSel=», MaxWords=20, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "'
+
+# get_bid_analytics: a project's budget, its bid distribution, then one row per bid with
+# its percentile among the bids and its bidder's accepted / decided proposals over all
+# projects. The distribution and the bids depend only on the project's proposals, so they
+# are not computed (and no bid row returned) while its proposal_version still equals
+# %(cached_version)s; the budget and the bidders' counts change with other writes and are
+# always read, then for the cached bidders %(bidders)s, one row each.
+# Proposals are never older than their project, so the created_at bound prunes the
+# proposal partitions from before the project was posted.
+BID_ANALYTICS_QUERY = """
+WITH current_version AS (
+    SELECT COALESCE(MAX(version), 0) AS version FROM proposal_version WHERE project_id = %(project_id)s
+), bids AS (
+    SELECT pr.proposal_id, pr.freelancer_id, pr.bid_amount_cents
+    FROM current_version v
+    JOIN proposal pr ON pr.project_id = %(project_id)s
+        AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %(project_id)s)
+    WHERE v.version <> %(cached_version)s
+), distribution AS (
+    SELECT COUNT(*) AS bid_count, MIN(bid_amount_cents) AS min_bid,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY bid_amount_cents) AS median_bid,
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY bid_amount_cents) AS p90_bid,
+           MAX(bid_amount_cents) AS max_bid
+    FROM bids
+), bidders AS (
+    SELECT DISTINCT freelancer_id FROM bids
+    UNION
+    SELECT unnest(%(bidders)s::BIGINT[]) FROM current_version v WHERE v.version = %(cached_version)s
+), history AS (
+    SELECT h.freelancer_id,
+           COUNT(*) FILTER (WHERE h.status = 'accepted') AS accepted,
+           COUNT(*) AS decided
+    FROM proposal_history h
+    WHERE h.freelancer_id IN (SELECT freelancer_id FROM bidders) AND h.status IN ('accepted', 'rejected')
+    GROUP BY h.freelancer_id
+)
+SELECT v.version, v.version <> %(cached_version)s, p.budget_min_cents, p.budget_max_cents,
+       d.bid_count, d.min_bid, d.median_bid, d.p90_bid, d.max_bid,
+       b.proposal_id, f.freelancer_id, b.bid_amount_cents,
+       percent_rank() OVER (ORDER BY b.bid_amount_cents),
+       COALESCE(h.accepted, 0), COALESCE(h.decided, 0)
+FROM project p
+CROSS JOIN current_version v
+CROSS JOIN distribution d
+LEFT JOIN bidders f ON true
+LEFT JOIN bids b ON b.freelancer_id = f.freelancer_id
+LEFT JOIN history h ON h.freelancer_id = f.freelancer_id
+WHERE p.project_id = %(project_id)s
+ORDER BY b.bid_amount_cents, b.proposal_id
+"""
+
+# copy_freelancer_statements: one JSON document per freelancer with
+# %(first_id)s <= user_id < %(last_id)s for the month [%(month_start)s, %(next_month)s):
+# the payments released to them in the month, their contracts that are active or were
+# paid in it (each with all its milestones), and the reviews they received in it. Every
+# part is one set-based pass over the id range, joined per freelancer at the end.
+FREELANCER_STATEMENTS_QUERY = """
+WITH freelancers AS (
+    SELECT user_id, username, email
+    FROM users
+    WHERE role = 'freelancer' AND user_id >= %(first_id)s AND user_id < %(last_id)s
+), payments AS (
+    SELECT payee_id, payment_id, contract_id, milestone_id, amount_cents, released_at
+    FROM payment_history
+    WHERE payee_id >= %(first_id)s AND payee_id < %(last_id)s AND status = 'released'
+      AND released_at >= %(month_start)s AND released_at < %(next_month)s
+      AND created_at < %(next_month)s
+), contracts AS (
+    SELECT c.freelancer_id, c.contract_id, c.client_id, p.title, c.total_amount_cents,
+           c.paid_amount_cents, c.status
+    FROM contract c
+    JOIN proposal pr ON pr.proposal_id = c.proposal_id AND pr.created_at = c.proposal_created_at
+    JOIN project p ON p.project_id = pr.project_id
+    WHERE c.freelancer_id >= %(first_id)s AND c.freelancer_id < %(last_id)s
+      AND c.proposal_created_at < %(next_month)s
+      AND (c.status = 'active' OR c.contract_id IN (SELECT contract_id FROM payments))
+), milestones AS (
+    SELECT m.contract_id,
+           json_agg(json_build_object('milestone_id', m.milestone_id, 'title', m.title,
+                                      'amount_cents', m.amount_cents, 'due_date', m.due_date,
+                                      'status', m.status)
+                    ORDER BY m.due_date, m.milestone_id) AS milestones
+    FROM milestone m
+    WHERE m.contract_id IN (SELECT contract_id FROM contracts)
+    GROUP BY m.contract_id
+), contract_lists AS (
+    SELECT c.freelancer_id,
+           json_agg(json_build_object('contract_id', c.contract_id, 'client_id', c.client_id,
+                                      'project', c.title, 'total_amount_cents', c.total_amount_cents,
+                                      'paid_amount_cents', c.paid_amount_cents, 'status', c.status,
+                                      'milestones', COALESCE(m.milestones, '[]'))
+                    ORDER BY c.contract_id) AS contracts
+    FROM contracts c
+    LEFT JOIN milestones m ON m.contract_id = c.contract_id
+    GROUP BY c.freelancer_id
+), payment_lists AS (
+    SELECT payee_id, SUM(amount_cents) AS earned_cents, COUNT(*) AS payment_count,
+           json_agg(json_build_object('payment_id', payment_id, 'contract_id', contract_id,
+                                      'milestone_id', milestone_id, 'amount_cents', amount_cents,
+                                      'released_at', released_at)
+                    ORDER BY released_at, payment_id) AS payments
+    FROM payments
+    GROUP BY payee_id
+), review_lists AS (
+    SELECT reviewee_id,
+           json_agg(json_build_object('review_id', review_id, 'contract_id', contract_id,
+                                      'rating', rating, 'feedback', feedback, 'created_at', created_at)
+                    ORDER BY created_at, review_id) AS reviews
+    FROM review
+    WHERE reviewee_id >= %(first_id)s AND reviewee_id < %(last_id)s
+      AND created_at >= %(month_start)s AND created_at < %(next_month)s
+    GROUP BY reviewee_id
+)
+SELECT f.user_id AS freelancer_id, f.username, f.email, to_char(%(month_start)s, 'YYYY-MM') AS month,
+       COALESCE(pl.earned_cents, 0) AS earned_cents, COALESCE(pl.payment_count, 0) AS payment_count,
+       COALESCE(cl.contracts, '[]') AS contracts, COALESCE(pl.payments, '[]') AS payments,
+       COALESCE(rl.reviews, '[]') AS reviews
+FROM freelancers f
+LEFT JOIN contract_lists cl ON cl.freelancer_id = f.user_id
+LEFT JOIN payment_lists pl ON pl.payee_id = f.user_id
+LEFT JOIN review_lists rl ON rl.reviewee_id = f.user_id
+ORDER BY f.user_id
+"""
+
+# Replay position and lag of a standby; lag is 0 while it has replayed everything received
+REPLICA_STATUS_QUERY = """
+SELECT pg_last_wal_replay_lsn()::text,
+       CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+       END
+"""
+
+
+# Name of the DatabaseConnection method running on this thread, for statement timeouts
+_current_call = threading.local()
+
+
+def statement_timeout(method):
+    """Run a DatabaseConnection method under the statement timeout configured for its name
+
+    The outermost decorated call wins, so helpers called from a query method
+    (and shard connections called from ShardedDatabaseConnection on the same
+    thread) run under the caller's timeout.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with running_call(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def current_call() -> Optional[str]:
+    """Name of the outermost statement_timeout method running on this thread, if any"""
+    return getattr(_current_call, "name", None)
+
+
+@contextmanager
+def running_call(name: Optional[str]) -> Iterator[None]:
+    """Run a block under the statement timeout of method name, unless a call is already running
+
+    Worker threads use it to run their part of a call made on another thread
+    (see ShardedDatabaseConnection._gather) under that call's timeout.
+    """
+    outer = current_call()
+    _current_call.name = outer or name
+    try:
+        yield
+    finally:
+        _current_call.name = outer
+
+
+def parse_lsn(lsn: Optional[str]) -> int:
+    """Convert a PostgreSQL LSN such as '16/B374D848' to an integer for comparison"""
+    if not lsn:
+        return 0
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class _Replica:
+    """Connection and cached replication status for one read replica"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self.connection = None
+        self.cursor = None
+        self.replay_lsn = 0
+        self.lag = 0.0
+        self.checked_at = 0.0
+        self.down_until = 0.0
+
+    def connect(self) -> bool:
+        """Open a read-only autocommit connection to the replica"""
+        try:
+            self.connection = psycopg2.connect(**self.params)
+            self.connection.set_session(readonly=True, autocommit=True)
+            self.cursor = self.connection.cursor()
+            return True
+        except Error as e:
+            print(f"Error connecting to replica {self.params.get('host')}:{self.params.get('port', 5432)}: {e}")
+            self.connection = None
+            return False
+
+    def disconnect(self):
+        """Close the replica connection"""
+        if self.cursor:
+            self.cursor.close()
+        if self.connection:
+            self.connection.close()
+        self.connection = None
+        self.cursor = None
+
+    def refresh_status(self):
+        """Fetch the replay LSN and lag from the replica"""
+        self.cursor.execute(REPLICA_STATUS_QUERY)
+        replay_lsn, lag = self.cursor.fetchone()
+        self.replay_lsn = parse_lsn(replay_lsn)
+        self.lag = float(lag)
+        self.checked_at = time.monotonic()
 
 
 class DatabaseConnection:
     """Manages database connection and operations for SkillLink"""
 
-    def __init__(self, host="localhost", database="skilllink", user="postgres", password=""):
-        """Initialize database connection parameters"""
+    # How long a replica's status is trusted, and how long a failed replica is skipped
+    REPLICA_STATUS_TTL = 1.0
+    REPLICA_RETRY_AFTER = 30.0
+    # Projects whose bid analytics are kept (revalidated against proposal_version)
+    BID_ANALYTICS_CACHE_SIZE = 128
+
+    def __init__(self, host="localhost", database="skilllink", user="postgres", password="",
+                 port=5432, replicas: Optional[List[Dict[str, Any]]] = None,
+                 max_replica_lag: float = 5.0, statement_timeouts: Optional[Dict[str, int]] = None,
+                 default_statement_timeout: int = 0):
+        """Initialize database connection parameters
+
+        replicas is a list of psycopg2 connection dicts for streaming standbys of
+        the primary. Read-only get_*/search_* calls are spread across them;
+        everything else runs on the primary.
+
+        statement_timeouts maps method names (e.g. 'search_freelancers_by_skill')
+        to a statement timeout in milliseconds; other calls use
+        default_statement_timeout. 0 means no limit.
+        """
         self.host = host
         self.database = database
         self.user = user
         self.password = password
+        self.port = port
         self.connection = None
         self.cursor = None
+        self.replicas = [_Replica(params) for params in (replicas or [])]
+        self.max_replica_lag = max_replica_lag
+        self._replica_cycle = itertools.cycle(self.replicas) if self.replicas else None
+        # WAL position of this session's last write, for read-your-writes on replicas
+        self.last_write_lsn = 0
+        self.statement_timeouts = dict(statement_timeouts or {})
+        self.default_statement_timeout = default_statement_timeout
+        # set by a failed query; callers that must tell "failed" from "no rows" (the API)
+        # clear it before their calls and check it after
+        self.query_failed = False
+        # project_id -> (proposal_version, bid distribution, (proposal_id, freelancer_id,
+        # bid_amount_cents, bid_percentile) per bid), least recently used first
+        self._bid_analytics: "OrderedDict[int, Tuple[int, Tuple, List[Tuple]]]" = OrderedDict()
 
     def connect(self):
         """Establish connection to PostgreSQL database"""
         try:
             self.connection = psycopg2.connect(
                 host=self.host,
+                port=self.port,
                 database=self.database,
                 user=self.user,
                 password=self.password
             )
             self.cursor = self.connection.cursor()
+            for replica in self.replicas:
+                if not replica.connect():
+                    replica.down_until = time.monotonic() + self.REPLICA_RETRY_AFTER
             return True
         except Error as e:
             print(f"Error connecting to database: {e}")
@@ -37,48 +362,230 @@ class DatabaseConnection:
 
     def disconnect(self):
         """Close database connection"""
+        for replica in self.replicas:
+            replica.disconnect()
         if self.cursor:
             self.cursor.close()
         if self.connection:
             self.connection.close()
 
+    def reset(self):
+        """End any open (or aborted) transaction, reconnecting if the connection was lost"""
+        if self.connection is None or self.connection.closed:
+            self.disconnect()
+            self.connect()
+        elif self.connection.status != STATUS_READY:
+            self.connection.rollback()
+
+    def cancel(self):
+        """Cancel the statement running on this connection (and its replicas)
+
+        Uses the backend cancel protocol, so it is safe to call from another
+        thread while a query blocks. The cancelled call fails with QueryCanceled,
+        prints it and returns None/False like any other failed query.
+        """
+        connections = [self.connection] + [replica.connection for replica in self.replicas]
+        for connection in connections:
+            if connection is not None and not connection.closed:
+                try:
+                    connection.cancel()
+                except Error as e:
+                    print(f"Error cancelling query: {e}")
+
+    def _statement_timeout(self) -> int:
+        """Statement timeout in milliseconds for the running method"""
+        return int(self.statement_timeouts.get(current_call(), self.default_statement_timeout))
+
+    def _with_timeout(self, query):
+        """Prefix a statement with SET LOCAL statement_timeout for the running method
+
+        Sent in the same round trip as the statement. SET LOCAL lasts until the
+        transaction ends, so statements issued after a commit or rollback
+        (_note_write, snapshot and analytics syncs) run under the session
+        default rather than the last call's limit.
+        """
+        timeout = self._statement_timeout()
+        if isinstance(query, sql.Composable):
+            return sql.SQL("SET LOCAL statement_timeout = {}; ").format(sql.Literal(timeout)) + query
+        return f"SET LOCAL statement_timeout = {timeout}; {query}"
+
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> Optional[List[Tuple]]:
         """Execute a SELECT query and return results"""
         try:
             if params:
-                self.cursor.execute(query, params)
+                self.cursor.execute(self._with_timeout(query), params)
             else:
-                self.cursor.execute(query)
+                self.cursor.execute(self._with_timeout(query))
             return self.cursor.fetchall()
         except Error as e:
             print(f"Error executing query: {e}")
+            self.query_failed = True
+            # a failed or cancelled statement aborts the transaction; end it so the next call works
+            self.connection.rollback()
             return None
 
     def execute_update(self, query: str, params: Optional[Tuple] = None) -> bool:
         """Execute INSERT, UPDATE, or DELETE query"""
         try:
             if params:
-                self.cursor.execute(query, params)
+                self.cursor.execute(self._with_timeout(query), params)
             else:
-                self.cursor.execute(query)
+                self.cursor.execute(self._with_timeout(query))
             self.connection.commit()
+            self._note_write()
             return True
         except Error as e:
             print(f"Error executing update: {e}")
+            self.query_failed = True
             self.connection.rollback()
             return False
 
+    # Replica routing
+    def execute_read_query(self, query: str, params: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Execute a read-only SELECT on a replica when one is usable, else on the primary"""
+        replica = self._pick_replica()
+        if replica is None:
+            return self.execute_query(query, params)
+        try:
+            if params:
+                replica.cursor.execute(self._with_timeout(query), params)
+            else:
+                replica.cursor.execute(self._with_timeout(query))
+            return replica.cursor.fetchall()
+        except errors.QueryCanceled as e:
+            # a statement timeout or cancel(), not a broken replica: running the query
+            # again on the primary would wait out the limit twice and undo the cancel
+            print(f"Error executing query: {e}")
+            self.query_failed = True
+            return None
+        except psycopg2.OperationalError as e:
+            if not replica.connection.closed:
+                print(f"Error executing query: {e}")
+                self.query_failed = True
+                return None
+            print(f"Replica {replica.params.get('host')} failed, using primary: {e}")
+            replica.disconnect()
+            replica.down_until = time.monotonic() + self.REPLICA_RETRY_AFTER
+            return self.execute_query(query, params)
+        except Error as e:
+            print(f"Error executing query: {e}")
+            self.query_failed = True
+            return None
+
+    def _pick_replica(self) -> Optional[_Replica]:
+        """Round-robin over replicas that are up, within max lag and past our last write"""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = next(self._replica_cycle)
+            if replica.connection is None:
+                if now < replica.down_until or not replica.connect():
+                    replica.down_until = max(replica.down_until, now + self.REPLICA_RETRY_AFTER)
+                    continue
+            try:
+                stale = now - replica.checked_at > self.REPLICA_STATUS_TTL
+                if stale or replica.replay_lsn < self.last_write_lsn:
+                    replica.refresh_status()
+            except Error:
+                replica.disconnect()
+                replica.down_until = now + self.REPLICA_RETRY_AFTER
+                continue
+            if replica.lag <= self.max_replica_lag and replica.replay_lsn >= self.last_write_lsn:
+                return replica
+        return None
+
+    def _note_write(self):
+        """Remember the primary's WAL position after a commit so later reads see the write"""
+        if not self.replicas:
+            return
+        try:
+            # the insert position is past our commit record even before it is written out
+            # (synchronous_commit = off); pg_current_wal_lsn() can still be behind it
+            self.cursor.execute("SELECT pg_current_wal_insert_lsn()::text")
+            self.last_write_lsn = parse_lsn(self.cursor.fetchone()[0])
+            self.connection.commit()
+        except Error as e:
+            print(f"Error reading WAL position: {e}")
+            self.connection.rollback()
+
+    # Export
+    @statement_timeout
+    def export_to_file(self, export: str, path: str, fmt: str = "csv",
+                       compress: bool = False) -> Optional[int]:
+        """Stream an export straight to a file with COPY ... TO STDOUT
+
+        export is a key of EXPORT_QUERIES or a SELECT statement. Rows are never
+        materialized in Python: psycopg2 copies the server's output to the file in
+        fixed-size chunks, optionally through gzip. Returns the number of rows.
+        """
+        if fmt not in EXPORT_FORMATS:
+            print(f"Error exporting: unknown format {fmt!r}")
+            return None
+
+        opener = gzip.open if compress else open
+        try:
+            with opener(path, "wb") as f:
+                return self.copy_export(export, f, fmt)
+        except OSError as e:
+            print(f"Error exporting {export}: {e}")
+            return None
+
+    @statement_timeout
+    def copy_export(self, export: str, f, fmt: str = "csv", header: bool = True) -> Optional[int]:
+        """COPY an export into an open binary file object; returns the number of rows"""
+        query = sql.SQL(EXPORT_QUERIES.get(export, export))
+        if fmt == "csv":
+            options = "FORMAT csv, HEADER" if header else "FORMAT csv"
+            copy = sql.SQL("COPY ({}) TO STDOUT WITH ({})").format(query, sql.SQL(options))
+        else:
+            # row_to_json escapes control characters, so with these delimiters
+            # COPY passes each JSON document through untouched
+            copy = sql.SQL(
+                "COPY (SELECT row_to_json(t) FROM ({}) t) TO STDOUT "
+                "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+            ).format(query)
+
+        try:
+            self.cursor.copy_expert(self._with_timeout(copy), f, size=1024 * 1024)
+            rows = self.cursor.rowcount
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"Error exporting {export}: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def copy_freelancer_statements(self, first_id: int, last_id: int, month: date, f) -> Optional[int]:
+        """COPY the month's statements of the freelancers with first_id <= user_id < last_id
+        into an open binary file, one JSON line per freelancer; returns how many"""
+        month_start = month.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        try:
+            query = self.cursor.mogrify(FREELANCER_STATEMENTS_QUERY, {
+                "first_id": first_id, "last_id": last_id,
+                "month_start": month_start, "next_month": next_month,
+            }).decode()
+        except Error as e:
+            print(f"Error preparing statements: {e}")
+            return None
+        return self.copy_export(query, f, "jsonl")
+
     # User queries
+    @statement_timeout
     def get_all_users(self) -> Optional[List[Tuple]]:
         """Retrieve all users"""
         query = "SELECT user_id, username, email, role, status, joined_at FROM users ORDER BY user_id"
-        return self.execute_query(query)
+        return self.execute_read_query(query)
 
+    @statement_timeout
     def get_users_by_role(self, role: str) -> Optional[List[Tuple]]:
         """Get users by specific role"""
         query = "SELECT user_id, username, email, role, status FROM users WHERE role = %s"
-        return self.execute_query(query, (role,))
+        return self.execute_read_query(query, (role,))
 
+    @statement_timeout
     def login_user(self, username: str, password_hash: str) -> Optional[Tuple]:
         """Validate user credentials"""
         query = """
@@ -90,16 +597,57 @@ class DatabaseConnection:
         return result[0] if result else None
 
     # Freelancer queries
+    @statement_timeout
     def get_all_freelancers(self) -> Optional[List[Tuple]]:
-        """Get all freelancer profiles with user info"""
-        query = """
-        SELECT u.user_id, u.username, f.headline, f.rate_per_hour, f.avg_rating
-        FROM freelancer_profile f
-        JOIN users u ON f.user_id = u.user_id
-        ORDER BY f.avg_rating DESC
+        """Get every freelancer from the directory, best reputation first: profile and
+        user info, skills, review count, completed contracts and earnings"""
+        query = f"""
+        SELECT {FREELANCER_DIRECTORY_COLUMNS}
+        FROM freelancer_directory
+        ORDER BY reputation_score DESC, user_id DESC
         """
-        return self.execute_query(query)
+        return self.execute_read_query(query)
+
+    @statement_timeout
+    def get_freelancers_page(self, limit: int, after: Optional[Tuple] = None,
+                             sort: str = "reputation") -> Optional[List[Tuple]]:
+        """Get one page of the freelancer directory, highest first by a FREELANCER_SORTS order
+
+        after is the (sort value, user_id) of the last row of the previous page.
+        """
+        column, cast = FREELANCER_SORTS[sort]
+        where = f"WHERE ({column}, user_id) < (%s::{cast}, %s::bigint)" if after else ""
+        query = f"""
+        SELECT {FREELANCER_DIRECTORY_COLUMNS}
+        FROM freelancer_directory
+        {where}
+        ORDER BY {column} DESC, user_id DESC
+        LIMIT %s
+        """
+        return self.execute_read_query(query, (*(after or ()), limit))
+
+    @statement_timeout
+    def refresh_freelancer_directory(self) -> bool:
+        """Recompute the freelancer directory without blocking its readers
+
+        Also bumps the directory's counter in table_delete_version, which makes
+        the app's offline snapshot reload the freelancer list on its next sync.
+        """
+        try:
+            self.cursor.execute(self._with_timeout("REFRESH MATERIALIZED VIEW CONCURRENTLY freelancer_directory"))
+            self.cursor.execute("""
+                INSERT INTO table_delete_version (table_name, version) VALUES ('freelancer_directory', 1)
+                ON CONFLICT (table_name) DO UPDATE SET version = table_delete_version.version + 1
+            """)
+            self.connection.commit()
+            self._note_write()
+            return True
+        except Error as e:
+            print(f"Error refreshing freelancer directory: {e}")
+            self.connection.rollback()
+            return False
 
+    @statement_timeout
     def get_freelancer_details(self, user_id: int) -> Optional[Tuple]:
         """Get detailed freelancer profile"""
         query = """
@@ -108,9 +656,10 @@ class DatabaseConnection:
         JOIN users u ON f.user_id = u.user_id
         WHERE u.user_id = %s
         """
-        result = self.execute_query(query, (user_id,))
+        result = self.execute_read_query(query, (user_id,))
         return result[0] if result else None
 
+    @statement_timeout
     def get_freelancer_skills(self, user_id: int) -> Optional[List[Tuple]]:
         """Get skills for a specific freelancer"""
         query = """
@@ -121,18 +670,122 @@ class DatabaseConnection:
         WHERE f.user_id = %s
         ORDER BY fs.proficiency_level DESC
         """
-        return self.execute_query(query, (user_id,))
+        return self.execute_read_query(query, (user_id,))
 
     # Project queries
+    @statement_timeout
     def get_all_projects(self) -> Optional[List[Tuple]]:
         """Get all projects"""
         query = """
         SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
         FROM project
-        ORDER BY deadline
+        ORDER BY deadline, project_id
         """
-        return self.execute_query(query)
+        return self.execute_read_query(query)
+
+    @statement_timeout
+    def get_projects_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects by deadline (projects without one last)
+
+        after is the (deadline or 'infinity', project_id) of the previous page's last row.
+        """
+        where = "WHERE (COALESCE(deadline, 'infinity'::date), project_id) > (%s::date, %s::bigint)" if after else ""
+        query = f"""
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
+        FROM project
+        {where}
+        ORDER BY COALESCE(deadline, 'infinity'::date), project_id
+        LIMIT %s
+        """
+        return self.execute_read_query(query, (*(after or ()), limit))
+
+    @staticmethod
+    def _project_filters(budget_min_cents: Optional[int], budget_max_cents: Optional[int],
+                         deadline_from: Optional[date], deadline_to: Optional[date]) -> Tuple[List[str], List[Any]]:
+        """WHERE conditions and parameters for the project budget / deadline filters"""
+        conditions = []
+        params: List[Any] = []
+        if budget_min_cents is not None or budget_max_cents is not None:
+            # served by the GiST index on (budget_range, deadline)
+            conditions.append("budget_range && int4range(%s::int, %s::int, '[]')")
+            params += [budget_min_cents, budget_max_cents]
+        if deadline_from is not None:
+            conditions.append("deadline >= %s")
+            params.append(deadline_from)
+        if deadline_to is not None:
+            conditions.append("deadline <= %s")
+            params.append(deadline_to)
+        return conditions, params
+
+    @statement_timeout
+    def search_projects_page(self, limit: int, budget_min_cents: Optional[int] = None,
+                             budget_max_cents: Optional[int] = None, deadline_from: Optional[date] = None,
+                             deadline_to: Optional[date] = None,
+                             after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects whose budget overlaps a range, ordered like get_projects_page
+
+        Either budget bound may be None (open-ended), so budget_min_cents alone finds
+        projects paying at least that much. deadline_from/deadline_to (inclusive) keep
+        only projects due in that window. after is as for get_projects_page.
+        """
+        conditions, params = self._project_filters(budget_min_cents, budget_max_cents,
+                                                   deadline_from, deadline_to)
+        if after:
+            conditions.append("(COALESCE(deadline, 'infinity'::date), project_id) > (%s::date, %s::bigint)")
+            params += after
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"""
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline
+        FROM project
+        {where}
+        ORDER BY COALESCE(deadline, 'infinity'::date), project_id
+        LIMIT %s
+        """
+        return self.execute_read_query(query, (*params, limit))
 
+    @statement_timeout
+    def search_projects_text_page(self, text: str, limit: int, budget_min_cents: Optional[int] = None,
+                                  budget_max_cents: Optional[int] = None, deadline_from: Optional[date] = None,
+                                  deadline_to: Optional[date] = None,
+                                  after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects matching a full-text search, best match first
+
+        text uses web search syntax ("quoted phrase", or, -word); title matches rank
+        above description matches. The optional filters are as for search_projects_page.
+        Rows are (project_id, title, budget_min_cents, budget_max_cents, deadline,
+        snippet, rank); snippet is the matching part of the description with the hits
+        marked by PROJECT_SNIPPET_OPTIONS. after is the (rank, project_id) of the
+        previous page's last row.
+        """
+        conditions, params = self._project_filters(budget_min_cents, budget_max_cents,
+                                                   deadline_from, deadline_to)
+        filters = "".join(f" AND {condition}" for condition in conditions)
+        page_where = "WHERE rank < %s::real OR (rank = %s::real AND project_id > %s::bigint)" if after else ""
+        page_params = (after[0], after[0], after[1]) if after else ()
+        # only the page's rows get a snippet: ts_headline re-parses the description
+        query = f"""
+        WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+        ranked AS (
+            SELECT p.project_id, ts_rank(p.search_vector, q.query) AS rank
+            FROM project p, q
+            WHERE p.search_vector @@ q.query{filters}
+        ),
+        page AS (
+            SELECT project_id, rank
+            FROM ranked
+            {page_where}
+            ORDER BY rank DESC, project_id
+            LIMIT %s
+        )
+        SELECT p.project_id, p.title, p.budget_min_cents, p.budget_max_cents, p.deadline,
+               ts_headline('english', COALESCE(p.description, ''), q.query, %s), page.rank
+        FROM page
+        JOIN project p ON p.project_id = page.project_id, q
+        ORDER BY page.rank DESC, p.project_id
+        """
+        return self.execute_read_query(query, (text, *params, *page_params, limit, PROJECT_SNIPPET_OPTIONS))
+
+    @statement_timeout
     def get_project_details(self, project_id: int) -> Optional[Tuple]:
         """Get detailed project information"""
         query = """
@@ -142,9 +795,10 @@ class DatabaseConnection:
         JOIN users u ON p.client_id = u.user_id
         WHERE p.project_id = %s
         """
-        result = self.execute_query(query, (project_id,))
+        result = self.execute_read_query(query, (project_id,))
         return result[0] if result else None
 
+    @statement_timeout
     def get_project_skills(self, project_id: int) -> Optional[List[Tuple]]:
         """Get required skills for a project"""
         query = """
@@ -153,42 +807,182 @@ class DatabaseConnection:
         JOIN skill s ON ps.skill_id = s.skill_id
         WHERE ps.project_id = %s
         """
-        return self.execute_query(query, (project_id,))
+        return self.execute_read_query(query, (project_id,))
+
+    @statement_timeout
+    def get_client_projects(self, client_id: int) -> Optional[List[Tuple]]:
+        """Get a client's projects with their proposal count and whether one was accepted"""
+        query = """
+        SELECT p.project_id, p.title, p.budget_min_cents, p.budget_max_cents,
+               COUNT(pr.proposal_id) as proposal_count,
+               COUNT(pr.proposal_id) FILTER (WHERE pr.status = 'accepted') > 0 as in_progress
+        FROM project p
+        LEFT JOIN proposal pr ON p.project_id = pr.project_id AND pr.created_at >= p.created_at
+        WHERE p.client_id = %s
+        GROUP BY p.project_id, p.title, p.budget_min_cents, p.budget_max_cents
+        ORDER BY p.project_id DESC
+        """
+        return self.execute_read_query(query, (client_id,))
 
     # Proposal queries
+    @statement_timeout
     def get_proposals_by_project(self, project_id: int) -> Optional[List[Tuple]]:
-        """Get all proposals for a project"""
+        """Get all proposals for a project
+
+        Rows carry a preview of the cover letter (see cover_letter_preview) and its
+        length; get_proposal_cover_letter fetches the full text. Archived proposals
+        (see archive_rejected_proposals) are not listed.
+        """
         query = """
-        SELECT u.username, pr.bid_amount_cents, pr.status, pr.cover_letter
+        SELECT pr.proposal_id, u.username, pr.bid_amount_cents, pr.status,
+               cover_letter_preview(pr.cover_letter, %s), char_length(pr.cover_letter)
         FROM proposal pr
         JOIN users u ON pr.freelancer_id = u.user_id
         WHERE pr.project_id = %s
+          AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %s)
         ORDER BY pr.bid_amount_cents
         """
-        return self.execute_query(query, (project_id,))
+        return self.execute_read_query(query, (COVER_LETTER_PREVIEW_CHARS, project_id, project_id))
+
+    @statement_timeout
+    def get_proposals_page(self, project_id: int, limit: int,
+                           after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of a project's proposals by bid (lowest first)
 
+        after is the (bid_amount_cents, proposal_id) of the previous page's last row.
+        """
+        where = "AND (pr.bid_amount_cents, pr.proposal_id) > (%s::integer, %s::bigint)" if after else ""
+        query = f"""
+        SELECT pr.proposal_id, u.username, pr.bid_amount_cents, pr.status,
+               cover_letter_preview(pr.cover_letter, %s), char_length(pr.cover_letter)
+        FROM proposal pr
+        JOIN users u ON pr.freelancer_id = u.user_id
+        WHERE pr.project_id = %s {where}
+          AND pr.created_at >= (SELECT created_at FROM project WHERE project_id = %s)
+        ORDER BY pr.bid_amount_cents, pr.proposal_id
+        LIMIT %s
+        """
+        return self.execute_read_query(query, (COVER_LETTER_PREVIEW_CHARS, project_id, *(after or ()),
+                                               project_id, limit))
+
+    @statement_timeout
+    def get_proposal_cover_letter(self, proposal_id: int) -> Optional[str]:
+        """Get a proposal's full cover letter ('' if it has none), None if not found"""
+        # created_at from the proposal's key prunes the lookup to its month's partition
+        query = """
+        SELECT COALESCE(cover_letter, '')
+        FROM proposal
+        WHERE proposal_id = %s
+          AND created_at = (SELECT created_at FROM proposal_key WHERE proposal_id = %s)
+        """
+        result = self.execute_read_query(query, (proposal_id, proposal_id))
+        return result[0][0] if result else None
+
+    @statement_timeout
+    def get_bid_analytics(self, project_id: int) -> Optional[Tuple[Tuple, List[Tuple]]]:
+        """Get (summary, bids) describing a project's bids, in one round trip
+
+        summary is (bid_count, min_bid, median_bid, p90_bid, max_bid, budget_min_cents,
+        budget_max_cents); the bid statistics are None without bids. bids has one
+        (proposal_id, freelancer_id, bid_amount_cents, bid_percentile, budget_position,
+        freelancer_accepted, freelancer_decided) row per bid, lowest first:
+        bid_percentile is 0..1 among this project's bids, budget_position is
+        'below', 'within' or 'above' the budget range, and the last two count the
+        bidder's accepted and decided (accepted or rejected) proposals anywhere.
+        The distribution and the bids' percentiles are cached per project and reused
+        while its proposal_version is unchanged; the budget and the bidders' counts
+        are read on every call. None if the project doesn't exist or the query failed.
+        """
+        cached = self._bid_analytics.get(project_id)
+        rows = self.execute_read_query(BID_ANALYTICS_QUERY, {
+            "project_id": project_id,
+            "cached_version": cached[0] if cached else -1,
+            "bidders": sorted({bid[1] for bid in cached[2]}) if cached else [],
+        })
+        if not rows:
+            return None
+        version, changed, budget_min, budget_max = rows[0][:4]
+        if changed:
+            distribution, bids = rows[0][4:9], [row[9:13] for row in rows if row[9] is not None]
+            self._bid_analytics[project_id] = (version, distribution, bids)
+            self._bid_analytics.move_to_end(project_id)
+            if len(self._bid_analytics) > self.BID_ANALYTICS_CACHE_SIZE:
+                self._bid_analytics.popitem(last=False)
+        else:
+            self._bid_analytics.move_to_end(project_id)
+            _, distribution, bids = cached
+        history = {row[10]: row[13:15] for row in rows if row[10] is not None}
+        return (tuple(distribution) + (budget_min, budget_max),
+                [(proposal_id, freelancer_id, bid_amount, percentile,
+                  "below" if bid_amount < budget_min else "above" if bid_amount > budget_max else "within",
+                  *history.get(freelancer_id, (0, 0)))
+                 for proposal_id, freelancer_id, bid_amount, percentile in bids])
+
+    @statement_timeout
+    def get_freelancer_bid_history(self, freelancer_ids: List[int]) -> Optional[List[Tuple]]:
+        """Get (freelancer_id, accepted, decided) proposal counts of the given freelancers"""
+        query = """
+        SELECT freelancer_id, COUNT(*) FILTER (WHERE status = 'accepted'), COUNT(*)
+        FROM proposal_history
+        WHERE freelancer_id = ANY (%s) AND status IN ('accepted', 'rejected')
+        GROUP BY freelancer_id
+        """
+        return self.execute_read_query(query, (list(freelancer_ids),))
+
+    @statement_timeout
     def get_proposals_by_freelancer(self, freelancer_id: int) -> Optional[List[Tuple]]:
         """Get all proposals by a freelancer"""
         query = """
         SELECT p.title, pr.bid_amount_cents, pr.status
-        FROM proposal pr
+        FROM proposal_history pr
         JOIN project p ON pr.project_id = p.project_id
         WHERE pr.freelancer_id = %s
         ORDER BY pr.proposal_id DESC
         """
-        return self.execute_query(query, (freelancer_id,))
+        return self.execute_read_query(query, (freelancer_id,))
+
+    @statement_timeout
+    def accept_proposal(self, proposal_id: int) -> Optional[int]:
+        """Accept a proposal, reject the project's other pending proposals and return the contract id"""
+        try:
+            self.cursor.execute(self._with_timeout("SELECT accept_proposal(%s)"), (proposal_id,))
+            contract_id = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._note_write()
+            return contract_id
+        except Error as e:
+            print(f"Error accepting proposal: {e}")
+            self.connection.rollback()
+            return None
 
     # Contract queries
+    @statement_timeout
     def get_active_contracts(self) -> Optional[List[Tuple]]:
-        """Get all active contracts"""
+        """Get all active contracts with their stored total, paid and remaining amounts"""
         query = """
         SELECT c.contract_id, c.client_id, c.freelancer_id,
-               c.total_amount_cents, c.status
+               c.total_amount_cents, c.paid_amount_cents, c.remaining_amount_cents, c.status
         FROM contract c
         WHERE c.status = 'active'
+        ORDER BY c.contract_id
         """
-        return self.execute_query(query)
+        return self.execute_read_query(query)
 
+    @statement_timeout
+    def get_active_contracts_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of active contracts by id; after is the (contract_id,) of the previous page's last row"""
+        where = "AND c.contract_id > %s::bigint" if after else ""
+        query = f"""
+        SELECT c.contract_id, c.client_id, c.freelancer_id,
+               c.total_amount_cents, c.paid_amount_cents, c.remaining_amount_cents, c.status
+        FROM contract c
+        WHERE c.status = 'active' {where}
+        ORDER BY c.contract_id
+        LIMIT %s
+        """
+        return self.execute_read_query(query, (*(after or ()), limit))
+
+    @statement_timeout
     def get_contract_milestones(self, contract_id: int) -> Optional[List[Tuple]]:
         """Get milestones for a specific contract"""
         query = """
@@ -197,20 +991,341 @@ class DatabaseConnection:
         WHERE contract_id = %s
         ORDER BY due_date
         """
-        return self.execute_query(query, (contract_id,))
+        return self.execute_read_query(query, (contract_id,))
 
     # Payment queries
+    @statement_timeout
     def get_freelancer_earnings(self, freelancer_id: int) -> Optional[Tuple]:
-        """Get total earnings for a freelancer"""
+        """Get total earnings for a freelancer from the earnings ledger"""
+        query = """
+        SELECT total_earned_cents as total_earned
+        FROM payee_earnings
+        WHERE payee_id = %s
+        """
+        result = self.execute_read_query(query, (freelancer_id,))
+        if result is None:
+            return None
+        return result[0] if result else (0,)
+
+    @statement_timeout
+    def get_freelancer_monthly_earnings(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get released earnings per month for a freelancer, oldest month first"""
+        query = """
+        SELECT month, earned_cents, payment_count
+        FROM payee_earnings_monthly
+        WHERE payee_id = %s AND payment_count > 0
+        ORDER BY month
+        """
+        return self.execute_read_query(query, (freelancer_id,))
+
+    @statement_timeout
+    def reconcile_earnings(self) -> Optional[List[Tuple]]:
+        """Compare the earnings ledger with raw payments; returns the mismatching
+        (payee_id, month, ledger_cents, actual_cents, ledger_count, actual_count),
+        month None for a payee's lifetime total in payee_earnings"""
+        query = """
+        SELECT payee_id, month, ledger_cents, actual_cents, ledger_count, actual_count
+        FROM reconcile_payee_earnings()
+        ORDER BY payee_id, month NULLS FIRST
+        """
+        return self.execute_query(query)
+
+    @statement_timeout
+    def rebuild_earnings(self) -> bool:
+        """Rebuild the earnings ledger from raw payments"""
+        return self.execute_update("CALL rebuild_payee_earnings()")
+
+    @statement_timeout
+    def release_milestone_payment(self, milestone_id: int) -> Optional[int]:
+        """Complete a milestone and release its payment; returns 1 if paid now, 0 if already paid"""
+        try:
+            self.cursor.execute(self._with_timeout("SELECT release_payment_batch(ARRAY[%s]::BIGINT[])"),
+                                (milestone_id,))
+            released = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._note_write()
+            return released
+        except Error as e:
+            print(f"Error releasing payment: {e}")
+            self.connection.rollback()
+            return None
+
+    # Payment release queue
+    @statement_timeout
+    def enqueue_due_milestones(self, as_of=None) -> Optional[int]:
+        """Queue pending milestones due on or before as_of (default today) for release"""
+        query = "SELECT enqueue_due_milestones(COALESCE(%s, CURRENT_DATE))"
+        try:
+            self.cursor.execute(self._with_timeout(query), (as_of,))
+            queued = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._note_write()
+            return queued
+        except Error as e:
+            print(f"Error queueing milestones: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def release_queued_payments(self, batch_size: int = 100,
+                                max_retries: int = 5) -> Optional[Tuple[int, int, int]]:
+        """Claim a batch of queued milestones and release them in one transaction
+
+        Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can drain
+        the queue concurrently without waiting on (or double-paying) each other.
+        Returns (claimed, released, retries); claimed is 0 once the queue is empty.
+        """
+        claim_query = """
+        DELETE FROM payment_release_queue
+        WHERE milestone_id IN (
+            SELECT milestone_id
+            FROM payment_release_queue
+            ORDER BY enqueued_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING milestone_id
+        """
+        release_query = "SELECT release_payment_batch(%s::BIGINT[])"
+
+        for attempt in range(max_retries + 1):
+            try:
+                self.cursor.execute(self._with_timeout(claim_query), (batch_size,))
+                milestone_ids = [row[0] for row in self.cursor.fetchall()]
+                released = 0
+                if milestone_ids:
+                    self.cursor.execute(self._with_timeout(release_query), (milestone_ids,))
+                    released = self.cursor.fetchone()[0]
+                self.connection.commit()
+                self._note_write()
+                return len(milestone_ids), released, attempt
+            except RETRYABLE_ERRORS as e:
+                self.connection.rollback()
+                if attempt == max_retries:
+                    print(f"Error releasing payments after {attempt} retries: {e}")
+                    return None
+                time.sleep(0.01 * 2 ** attempt)
+            except Error as e:
+                print(f"Error releasing payments: {e}")
+                self.connection.rollback()
+                return None
+
+    # Milestone sweeper
+    @statement_timeout
+    def sweep_due_milestones(self, batch_size: int = 500,
+                             horizon_days: int = 7) -> Optional[Tuple[int, int, int, bool]]:
+        """Flag the next batch of overdue or soon-due milestones in one transaction
+
+        The sweep's position is kept in milestone_sweep_cursor, so an interrupted
+        sweep resumes where it stopped. Returns (processed, overdue, due_soon,
+        finished); finished is True once the sweep has reached its end.
+        """
+        query = "SELECT * FROM sweep_due_milestones(%s, %s)"
+        try:
+            self.cursor.execute(self._with_timeout(query), (batch_size, horizon_days))
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            self._note_write()
+            return result
+        except Error as e:
+            print(f"Error sweeping milestones: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def get_at_risk_contracts(self) -> Optional[List[Tuple]]:
+        """Get contracts with overdue or soon-due milestones, most overdue first"""
+        query = """
+        SELECT contract_id, client_id, freelancer_id, overdue_milestones,
+               due_soon_milestones, next_due_date, amount_at_risk_cents
+        FROM at_risk_contracts
+        ORDER BY overdue_milestones DESC, next_due_date, contract_id
+        """
+        return self.execute_read_query(query)
+
+    @statement_timeout
+    def get_last_milestone_sweep(self) -> Optional[Tuple]:
+        """Get (as_of, completed_at) of the last finished milestone sweep, None if there was none"""
+        query = """
+        SELECT as_of, completed_at
+        FROM milestone_sweep_cursor
+        WHERE sweep_name = 'due_milestones' AND completed_at IS NOT NULL
+        """
+        result = self.execute_read_query(query)
+        return result[0] if result else None
+
+    # Reputation scores
+    @statement_timeout
+    def refresh_reputation(self, half_life_days: float, prior_weight: float, rebuild: bool = False,
+                           rescore_all: bool = False) -> Optional[Tuple[int, int]]:
+        """Fold the reviews added, edited or removed since the last refresh into the
+        reputation scores, in one transaction
+
+        Only freelancers whose reviews changed (and new profiles) are rescored, so
+        the cost follows the new reviews. rescore_all rescores every profile from
+        the stored sums, applying the decay to freelancers without new reviews;
+        rebuild recomputes the sums from every review (needed after changing
+        half_life_days). Returns (reviewees whose sums changed, scores rewritten).
+        """
+        query = "SELECT reviewees, rescored FROM refresh_reputation(%s, %s, %s, %s)"
+        try:
+            self.cursor.execute(self._with_timeout(query), (half_life_days, prior_weight, rebuild, rescore_all))
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            self._note_write()
+            return result
+        except Error as e:
+            print(f"Error refreshing reputation scores: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def get_reputation_state(self) -> Optional[Tuple]:
+        """Get (half_life_days, prior_mean, review_count, refreshed_at) of the last
+        reputation refresh, None if there was none"""
         query = """
-        SELECT SUM(amount_cents) as total_earned
-        FROM payment
-        WHERE payee_id = %s AND status = 'released'
+        SELECT half_life_days, rating_sum::float8 / NULLIF(review_count, 0), review_count, refreshed_at
+        FROM reputation_state
+        WHERE state_name = 'reputation' AND refreshed_at IS NOT NULL
         """
-        result = self.execute_query(query, (freelancer_id,))
+        result = self.execute_query(query)
         return result[0] if result else None
 
+    # Partitions and archive
+    @statement_timeout
+    def ensure_partitions(self, months_ahead: int) -> Optional[int]:
+        """Create the missing monthly partitions of proposal and payment, from this month
+        to months_ahead months ahead; returns how many were created"""
+        query = "SELECT ensure_month_partitions('proposal', %s) + ensure_month_partitions('payment', %s)"
+        try:
+            self.cursor.execute(self._with_timeout(query), (months_ahead, months_ahead))
+            created = self.cursor.fetchone()[0]
+            self.connection.commit()
+            return created
+        except Error as e:
+            print(f"Error creating partitions: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def get_month_partitions(self) -> Optional[List[Tuple]]:
+        """Get (parent_table, partition_name, from_time, to_time, estimated_rows, total_bytes)
+        of the monthly partitions of proposal, payment and their archives, oldest first"""
+        query = """
+        SELECT parent_table, partition_name, from_time, to_time, estimated_rows, total_bytes
+        FROM month_partitions
+        ORDER BY parent_table, from_time
+        """
+        return self.execute_query(query)
+
+    @statement_timeout
+    def archive_rejected_proposals(self, cutoff, batch_size: int) -> Optional[int]:
+        """Move one batch of rejected proposals created before cutoff to proposal_archive,
+        in one transaction; returns the number moved, 0 when none are left"""
+        try:
+            self.cursor.execute(self._with_timeout("SELECT archive_rejected_proposals(%s, %s)"),
+                                (cutoff, batch_size))
+            moved = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._note_write()
+            return moved
+        except Error as e:
+            print(f"Error archiving proposals: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def get_payment_archive_moves(self) -> Optional[List[str]]:
+        """Get the payment months whose move to payment_archive was begun but not finished"""
+        result = self.execute_query("SELECT partition_name FROM payment_archive_move ORDER BY from_time")
+        return None if result is None else [name for (name,) in result]
+
+    @statement_timeout
+    def archive_payment_month(self, partition_name: str) -> Optional[int]:
+        """Move a monthly payment partition to payment_archive by detaching it whole
+
+        Runs the steps described at begin_payment_archive in SQL_QUERIES_DATABASE.sql,
+        each in its own transaction, so payment is never locked ACCESS EXCLUSIVE.
+        A move stopped partway (see get_payment_archive_moves) resumes when
+        called again. Returns the rows moved, or -1 if the month still has
+        unsettled payments (it then stays in payment).
+        """
+        name = sql.Identifier(partition_name)
+        try:
+            self.cursor.execute(self._with_timeout("SELECT begin_payment_archive(%s)"), (partition_name,))
+            begun = self.cursor.fetchone()[0]
+            self.connection.commit()
+            if not begun:
+                return -1
+
+            # validating takes no lock that blocks reads or writes of the month
+            self.cursor.execute(self._with_timeout(sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(
+                name, sql.Identifier(partition_name + "_bounds"))))
+            self.cursor.execute(self._with_timeout(
+                "SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = %s::REGCLASS "
+                "AND inhparent = 'payment'::REGCLASS"), (partition_name,))
+            attached = self.cursor.fetchone()
+            self.connection.commit()
+
+            if attached is not None:
+                # DETACH CONCURRENTLY refuses to run in a transaction (or after a SET LOCAL)
+                self.connection.autocommit = True
+                mode = "FINALIZE" if attached[0] else "CONCURRENTLY"
+                self.cursor.execute(sql.SQL("ALTER TABLE payment DETACH PARTITION {} {}").format(
+                    name, sql.SQL(mode)))
+                self.connection.autocommit = False
+
+            self.cursor.execute(self._with_timeout("SELECT finish_payment_archive(%s)"), (partition_name,))
+            moved = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._note_write()
+            return moved
+        except Error as e:
+            print(f"Error archiving {partition_name}: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            self.connection.autocommit = False
+
+    @statement_timeout
+    def maintain_tables(self, tables: List[str], vacuum: bool = True, freeze: bool = False,
+                        reindex: bool = False) -> bool:
+        """VACUUM (ANALYZE) each table, or only ANALYZE it without vacuum, then
+        REINDEX it CONCURRENTLY if asked
+
+        Meant for single partitions (and ANALYZE of partitioned parents, which
+        autovacuum skips): each runs outside a transaction, one table at a time,
+        so only that table is worked on at once.
+        """
+        options = sql.SQL("(ANALYZE, FREEZE)" if freeze else "(ANALYZE)")
+        # ends the read transaction earlier queries left open, so autocommit can be set
+        self.connection.rollback()
+        self.connection.autocommit = True
+        try:
+            # VACUUM and REINDEX CONCURRENTLY run outside a transaction, where SET LOCAL
+            # has no effect: set the timeout for the session and reset it afterwards
+            self.cursor.execute("SET statement_timeout = %s", (self._statement_timeout(),))
+            for table in tables:
+                name = sql.Identifier(table)
+                if vacuum:
+                    self.cursor.execute(sql.SQL("VACUUM {} {}").format(options, name))
+                else:
+                    self.cursor.execute(sql.SQL("ANALYZE {}").format(name))
+                if reindex:
+                    self.cursor.execute(sql.SQL("REINDEX TABLE CONCURRENTLY {}").format(name))
+            return True
+        except Error as e:
+            print(f"Error maintaining tables: {e}")
+            return False
+        finally:
+            try:
+                self.cursor.execute("RESET statement_timeout")
+            except Error as e:
+                print(f"Error resetting statement timeout: {e}")
+            self.connection.autocommit = False
+
     # Review queries
+    @statement_timeout
     def get_freelancer_reviews(self, freelancer_id: int) -> Optional[List[Tuple]]:
         """Get all reviews for a freelancer"""
         query = """
@@ -220,24 +1335,177 @@ class DatabaseConnection:
         WHERE r.reviewee_id = %s
         ORDER BY r.review_id DESC
         """
-        return self.execute_query(query, (freelancer_id,))
+        return self.execute_read_query(query, (freelancer_id,))
+
+    # Admin queries
+    @statement_timeout
+    def get_admin_stats(self) -> Optional[Tuple]:
+        """Get platform totals: users (all, clients, freelancers, admins), projects,
+        active contracts and released payment cents"""
+        query = """
+        SELECT u.total_users, u.clients, u.freelancers, u.admins,
+               (SELECT COUNT(*) FROM project) as total_projects,
+               (SELECT COUNT(*) FROM contract WHERE status = 'active') as active_contracts,
+               (SELECT COALESCE(SUM(total_earned_cents), 0) FROM payee_earnings) as released_cents
+        FROM (
+            SELECT COUNT(*) as total_users,
+                   COUNT(*) FILTER (WHERE role = 'client') as clients,
+                   COUNT(*) FILTER (WHERE role = 'freelancer') as freelancers,
+                   COUNT(*) FILTER (WHERE role = 'admin') as admins
+            FROM users
+        ) u
+        """
+        result = self.execute_read_query(query)
+        return result[0] if result else None
 
     # Skill queries
+    @statement_timeout
     def get_all_skills(self) -> Optional[List[Tuple]]:
         """Get all available skills"""
         query = "SELECT skill_id, skill_name, skill_description FROM skill ORDER BY skill_name"
-        return self.execute_query(query)
+        return self.execute_read_query(query)
+
+    # Related skills
+    @statement_timeout
+    def refresh_skill_cooccurrence(self) -> Optional[Tuple[int, int]]:
+        """Fold the skill list changes queued since the last refresh into the skill
+        co-occurrence counts
+
+        Only the pairs of freelancers and projects whose skill lists changed are
+        recounted. Returns (pairs whose count changed, new graph version).
+        """
+        query = "SELECT changed_pairs, graph_version FROM refresh_skill_cooccurrence()"
+        try:
+            self.cursor.execute(self._with_timeout(query))
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            self._note_write()
+            return result
+        except Error as e:
+            print(f"Error refreshing skill co-occurrence: {e}")
+            self.connection.rollback()
+            return None
+
+    @statement_timeout
+    def get_related_skills(self, limit: int, skill_ids: Optional[List[int]] = None) -> Optional[List[Tuple]]:
+        """Get the top `limit` related skills of every skill (or of skill_ids) as
+        (skill_id, skill_name, related_skill_id, related_skill_name, score), best first
+
+        score is the cosine similarity of the two skills' freelancer and project lists.
+        """
+        where = "c.owners > 0" if skill_ids is None else "c.owners > 0 AND c.skill_id = ANY(%(skill_ids)s)"
+        query = f"""
+        SELECT r.skill_id, s.skill_name, r.related_skill_id, rs.skill_name, r.score
+        FROM (
+            SELECT c.skill_id, c.related_skill_id,
+                   c.owners / sqrt(ua.owners::float8 * ub.owners) AS score,
+                   row_number() OVER (PARTITION BY c.skill_id
+                                      ORDER BY c.owners / sqrt(ua.owners::float8 * ub.owners) DESC,
+                                               c.related_skill_id) AS rank
+            FROM skill_cooccurrence c
+            JOIN skill_usage ua ON ua.skill_id = c.skill_id
+            JOIN skill_usage ub ON ub.skill_id = c.related_skill_id
+            WHERE {where}
+        ) r
+        JOIN skill s ON s.skill_id = r.skill_id
+        JOIN skill rs ON rs.skill_id = r.related_skill_id
+        WHERE r.rank <= %(limit)s
+        ORDER BY r.skill_id, r.rank
+        """
+        return self.execute_read_query(query, {"limit": limit, "skill_ids": skill_ids})
+
+    @statement_timeout
+    def get_skill_graph_version(self) -> Optional[int]:
+        """Get the version of the last skill co-occurrence refresh (0 before the first)"""
+        query = "SELECT COALESCE((SELECT version FROM skill_graph_state WHERE graph_name = 'skills'), 0)"
+        result = self.execute_read_query(query)
+        return result[0][0] if result else None
+
+    @statement_timeout
+    def get_skill_graph_changes(self, since_version: int) -> Optional[Tuple[int, List[int]]]:
+        """Get (graph version, skill ids whose related skills may have changed after since_version)
+
+        A skill's list changes when one of its pairs is recounted or when the usage
+        count of a skill it is paired with (or its own) changes.
+        """
+        query = """
+        SELECT COALESCE((SELECT version FROM skill_graph_state WHERE graph_name = 'skills'), 0),
+               ARRAY(
+                   SELECT skill_id FROM skill_cooccurrence WHERE version > %(since)s
+                   UNION
+                   SELECT skill_id FROM skill_usage WHERE version > %(since)s
+                   UNION
+                   SELECT c.related_skill_id
+                   FROM skill_usage u
+                   JOIN skill_cooccurrence c ON c.skill_id = u.skill_id
+                   WHERE u.version > %(since)s
+               )
+        """
+        result = self.execute_read_query(query, {"since": since_version})
+        return result[0] if result else None
 
     # Search queries
+    @statement_timeout
     def search_freelancers_by_skill(self, skill_name: str) -> Optional[List[Tuple]]:
-        """Find freelancers with a specific skill"""
+        """Find freelancers with a specific skill in the freelancer directory"""
         query = """
-        SELECT u.username, s.skill_name, fs.proficiency_level, f.avg_rating
-        FROM freelancer_skill fs
-        JOIN freelancer_profile f ON fs.profile_id = f.profile_id
-        JOIN users u ON f.user_id = u.user_id
-        JOIN skill s ON fs.skill_id = s.skill_id
+        SELECT d.username, s.skill_name, d.skill_levels[array_position(d.skill_ids, s.skill_id)] AS proficiency_level,
+               d.avg_rating, d.reputation_score
+        FROM skill s
+        JOIN freelancer_directory d ON d.skill_ids @> ARRAY[s.skill_id]
         WHERE s.skill_name = %s
-        ORDER BY fs.proficiency_level DESC, f.avg_rating DESC
+        ORDER BY proficiency_level DESC, d.reputation_score DESC
+        """
+        return self.execute_read_query(query, (skill_name,))
+
+    @statement_timeout
+    def search_freelancers_by_skills(self, skill_names: List[str]) -> Optional[List[Tuple]]:
+        """Find freelancers with any of several skills in the freelancer directory
+        (one row per freelancer and skill)"""
+        query = """
+        SELECT d.username, s.skill_name, d.skill_levels[array_position(d.skill_ids, s.skill_id)] AS proficiency_level,
+               d.avg_rating, d.reputation_score
+        FROM skill s
+        JOIN freelancer_directory d ON d.skill_ids @> ARRAY[s.skill_id]
+        WHERE s.skill_name = ANY(%s)
+        ORDER BY proficiency_level DESC, d.reputation_score DESC
         """
-        return self.execute_query(query, (skill_name,))
+        return self.execute_read_query(query, (list(skill_names),))
+
+
+class DatabaseConnectionPool:
+    """Fixed-size pool of connected DatabaseConnection objects for multi-threaded callers"""
+
+    def __init__(self, factory: Callable[[], DatabaseConnection], size: int = 10):
+        """factory builds an unconnected DatabaseConnection (or ShardedDatabaseConnection)"""
+        self.factory = factory
+        self.size = size
+        self._idle: "queue.Queue[DatabaseConnection]" = queue.Queue()
+
+    def open(self) -> bool:
+        """Connect all pooled connections"""
+        for _ in range(self.size):
+            db = self.factory()
+            if not db.connect():
+                self.close()
+                return False
+            self._idle.put(db)
+        return True
+
+    def close(self):
+        """Disconnect all idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().disconnect()
+            except queue.Empty:
+                break
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[DatabaseConnection]:
+        """Borrow a connection; raises queue.Empty if none frees up within timeout"""
+        db = self._idle.get(timeout=timeout)
+        try:
+            yield db
+        finally:
+            db.reset()
+            self._idle.put(db)
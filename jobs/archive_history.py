@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+History archive job for SkillLink
+
+proposal and payment are partitioned by month (see SQL_QUERIES_DATABASE.sql).
+On every database (each shard in sharded mode) this job
+  1. creates the partitions of the coming PARTITION_MONTHS_AHEAD months,
+  2. moves rejected proposals older than the cutoff to proposal_archive, one
+     batch per transaction (proposals a contract points to stay),
+  3. moves every payment month older than the cutoff holding only released
+     payments to payment_archive, by detaching the partition whole (finishing
+     first any move an earlier run left halfway),
+  4. vacuums the proposal months archiving deleted from (--reindex also
+     rebuilds their indexes concurrently), freezes the newly archived payment
+     months, and analyzes the partitioned parents,
+and prints the partition sizes. The cutoff is the start of the month
+ARCHIVE_AFTER_MONTHS months back. Run it monthly or more often; a run
+stopped by --max-batches resumes where it left off.
+
+Usage: python3 jobs/archive_history.py [--months N] [--batch-size N] [--max-batches N] [--pause S] [--reindex]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (DB_CONFIG, DB_SHARDS, ARCHIVE_AFTER_MONTHS, ARCHIVE_BATCH_SIZE,
+                    PARTITION_MONTHS_AHEAD)
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+PARENT_TABLES = ["proposal", "payment", "proposal_archive", "payment_archive"]
+
+
+def month_start(months_back: int) -> datetime:
+    """Midnight of the first day of the month months_back months before this one"""
+    today = date.today()
+    months = today.year * 12 + today.month - 1 - months_back
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+def archive(db: DatabaseConnection, args, cutoff: datetime) -> bool:
+    """Run the archive steps on one database"""
+    created = db.ensure_partitions(PARTITION_MONTHS_AHEAD)
+    if created is None:
+        return False
+    print(f"  {created} partition(s) created")
+
+    moved = batches = 0
+    start = time.perf_counter()
+    while args.max_batches is None or batches < args.max_batches:
+        batch = db.archive_rejected_proposals(cutoff, args.batch_size)
+        if batch is None:
+            return False
+        moved += batch
+        batches += 1
+        if batch < args.batch_size:
+            break
+        if args.pause:
+            time.sleep(args.pause)
+    print(f"  {moved} rejected proposal(s) archived in {batches} batch(es) "
+          f"({time.perf_counter() - start:.2f}s)")
+
+    partitions = db.get_month_partitions()
+    if partitions is None:
+        return False
+    old = [(parent, name) for parent, name, _, to_time, _, _ in partitions
+           if parent in ("proposal", "payment") and to_time <= cutoff]
+
+    pending = db.get_payment_archive_moves()
+    if pending is None:
+        return False
+    archived = []
+    for name in pending + [name for parent, name in old if parent == "payment" and name not in pending]:
+        rows = db.archive_payment_month(name)
+        if rows is None:
+            return False
+        if rows < 0:
+            print(f"  {name}: unsettled payments left, kept")
+        else:
+            print(f"  {name}: {rows} payment(s) archived")
+            archived.append(name)
+
+    # archiving only deletes from the old proposal months: vacuum them (and shrink their
+    # indexes); archived payment months are never written again, so freeze them once
+    old_proposals = [name for parent, name in old if parent == "proposal"]
+    if moved and not db.maintain_tables(old_proposals, reindex=args.reindex):
+        return False
+    if archived and not db.maintain_tables(archived, freeze=True):
+        return False
+    return db.maintain_tables(PARENT_TABLES, vacuum=False)
+
+
+def print_partitions(db: DatabaseConnection):
+    """Print the partition count, rows and size of every partitioned table"""
+    totals = {}
+    for parent, _, _, _, rows, size in db.get_month_partitions() or []:
+        count, total_rows, total_size = totals.get(parent, (0, 0, 0))
+        totals[parent] = (count + 1, total_rows + rows, total_size + size)
+    for parent in PARENT_TABLES:
+        count, rows, size = totals.get(parent, (0, 0, 0))
+        print(f"  {parent:<17} {count:4} month(s) {rows:12,} row(s) {size / 2 ** 20:10.1f} MB")
+
+
+def main():
+    """Archive old history on every database and report the partition sizes"""
+    parser = argparse.ArgumentParser(description="Move old proposals and payments to the archive")
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS,
+                        help="archive history older than this many months")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="stop moving proposals after this many batches; the next run resumes")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--reindex", action="store_true",
+                        help="rebuild the indexes of the proposal months archived from")
+    args = parser.parse_args()
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    cutoff = month_start(args.months)
+    print(f"Archiving history created before {cutoff:%Y-%m-%d}")
+    for target in db.shards if DB_SHARDS else [db]:
+        print(f"{target.host}/{target.database}")
+        if not archive(target, args, cutoff):
+            db.disconnect()
+            sys.exit(1)
+        print_partitions(target)
+
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
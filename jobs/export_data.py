@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Headless data export for SkillLink
+
+Streams a named export (or any SELECT) to a CSV or JSON Lines file via
+COPY ... TO STDOUT, so memory use stays flat regardless of table size.
+The format and compression follow the file name unless given explicitly.
+
+Usage:
+  python3 jobs/export_data.py contracts contracts.csv.gz
+  python3 jobs/export_data.py payments payments.jsonl
+  python3 jobs/export_data.py --query "SELECT * FROM review" reviews.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS
+from database import DatabaseConnection, EXPORT_QUERIES, EXPORT_FORMATS
+from sharding import ShardedDatabaseConnection
+
+
+def main():
+    """Parse arguments and run the export"""
+    parser = argparse.ArgumentParser(description="Export SkillLink data to CSV or JSON Lines")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("export", nargs="?", choices=sorted(EXPORT_QUERIES))
+    source.add_argument("--query", help="export the result of this SELECT instead")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--gzip", action="store_true", help="default: on for *.gz paths")
+    args = parser.parse_args()
+
+    compress = args.gzip or args.path.endswith(".gz")
+    base = args.path[:-3] if args.path.endswith(".gz") else args.path
+    fmt = args.format or ("jsonl" if base.endswith(".jsonl") else "csv")
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    start = time.perf_counter()
+    rows = db.export_to_file(args.query or args.export, args.path, fmt, compress)
+    elapsed = time.perf_counter() - start
+    db.disconnect()
+
+    if rows is None:
+        sys.exit(1)
+    size_mb = os.path.getsize(args.path) / (1024 * 1024)
+    print(f"Exported {rows} rows to {args.path} ({size_mb:.1f} MB in {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
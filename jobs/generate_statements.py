@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Monthly statement generator for SkillLink
+
+Writes one JSON line per freelancer for a month: the payments released to
+them, their active or paid contracts with all milestones, and the reviews they
+received (see FREELANCER_STATEMENTS_QUERY in database.py). Freelancers are
+split into ranges of --range-size; N worker processes, each with its own
+connection, build a range with one set-based query and COPY it straight into
+the range's file. Files are written under a temporary name and renamed when
+complete, and the ranges are fixed in plan.json on the first run, so a rerun
+skips the finished ranges and redoes only the rest. manifest.json lists the
+files and their freelancer counts once every range is done. With DB_SHARDS set,
+each range is read from every shard and merged per freelancer.
+
+Usage: python3 jobs/generate_statements.py YYYY-MM [--out DIR] [--workers N] [--range-size N] [--gzip]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS, STATEMENT_TIMEOUTS_MS, STATEMENT_TIMEOUT_DEFAULT_MS
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+# The first freelancer id of every range of range_size freelancers
+RANGE_STARTS_QUERY = """
+SELECT user_id
+FROM (SELECT user_id, row_number() OVER (ORDER BY user_id) AS n
+      FROM users WHERE role = 'freelancer') f
+WHERE n %% %s = 1
+ORDER BY user_id
+"""
+
+# This worker process's connection, opened by open_connection
+_db = None
+
+
+def create_connection() -> DatabaseConnection:
+    """Build an unconnected DatabaseConnection (or ShardedDatabaseConnection) from config.py"""
+    timeouts = {"statement_timeouts": STATEMENT_TIMEOUTS_MS,
+                "default_statement_timeout": STATEMENT_TIMEOUT_DEFAULT_MS}
+    if DB_SHARDS:
+        return ShardedDatabaseConnection(DB_SHARDS, **timeouts)
+    return DatabaseConnection(**DB_CONFIG, **timeouts)
+
+
+def open_connection():
+    """Pool initializer: give the worker process its own connection"""
+    global _db
+    _db = create_connection()
+    if not _db.connect():
+        _db = None
+
+
+def write_range(task):
+    """Write the statements of one freelancer range to its file; returns
+    (first_id, freelancers written or None on error, seconds)"""
+    first_id, last_id, month, path = task
+    start = time.perf_counter()
+    if _db is None:
+        return first_id, None, 0.0
+    part = path + ".part"
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(part, "wb") as f:
+            rows = _db.copy_freelancer_statements(first_id, last_id, month, f)
+        if rows is None:
+            os.remove(part)
+        else:
+            os.replace(part, path)
+    except OSError as e:
+        print(f"Error writing {path}: {e}")
+        rows = None
+    return first_id, rows, time.perf_counter() - start
+
+
+def load_plan(db: DatabaseConnection, plan_path: str, range_size: int):
+    """The [first_id, last_id) freelancer ranges of this month's run, fixed on the first run"""
+    if os.path.exists(plan_path):
+        with open(plan_path) as f:
+            return [tuple(r) for r in json.load(f)["ranges"]]
+    starts = db.execute_query(RANGE_STARTS_QUERY, (range_size,))
+    last = db.execute_query("SELECT MAX(user_id) FROM users WHERE role = 'freelancer'")
+    if starts is None or last is None:
+        return None
+    bounds = [row[0] for row in starts] + ([last[0][0] + 1] if starts else [])
+    ranges = list(zip(bounds, bounds[1:]))
+    with open(plan_path + ".part", "w") as f:
+        json.dump({"range_size": range_size, "ranges": ranges}, f)
+    os.replace(plan_path + ".part", plan_path)
+    return ranges
+
+
+def count_lines(path: str) -> int:
+    """Lines of a (possibly gzipped) statements file"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    """Plan the ranges, write the missing ones in parallel and write the manifest"""
+    parser = argparse.ArgumentParser(description="Generate monthly freelancer statements")
+    parser.add_argument("month", help="YYYY-MM")
+    parser.add_argument("--out", default=None, help="default: statements/YYYY-MM")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--range-size", type=int, default=1000, help="freelancers per file")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    month = datetime.strptime(args.month, "%Y-%m").date()
+    out = args.out or os.path.join("statements", args.month)
+    os.makedirs(out, exist_ok=True)
+
+    db = create_connection()
+    if not db.connect():
+        sys.exit(1)
+    ranges = load_plan(db, os.path.join(out, "plan.json"), args.range_size)
+    db.disconnect()
+    if ranges is None:
+        sys.exit(1)
+
+    suffix = ".jsonl.gz" if args.gzip else ".jsonl"
+    paths = {first_id: os.path.join(out, f"freelancers_{first_id:012d}{suffix}") for first_id, _ in ranges}
+    tasks = [(first_id, last_id, month, paths[first_id]) for first_id, last_id in ranges
+             if not os.path.exists(paths[first_id])]
+    print(f"{len(ranges)} range(s) of up to {args.range_size} freelancers, "
+          f"{len(ranges) - len(tasks)} already written")
+
+    counts = {}
+    failed = 0
+    start = time.perf_counter()
+    reported = start
+    with Pool(args.workers, initializer=open_connection) as pool:
+        for done, (first_id, rows, _) in enumerate(pool.imap_unordered(write_range, tasks), 1):
+            if rows is None:
+                failed += 1
+            else:
+                counts[first_id] = rows
+            now = time.perf_counter()
+            if now - reported >= 5 or done == len(tasks):
+                reported = now
+                written = sum(counts.values())
+                print(f"  {done}/{len(tasks)} range(s), {written:,} statement(s), "
+                      f"{written / (now - start):,.0f}/s")
+
+    if failed:
+        print(f"{failed} range(s) failed; rerun to retry them")
+        sys.exit(1)
+
+    files = []
+    for first_id, last_id in ranges:
+        path = paths[first_id]
+        files.append({"file": os.path.basename(path), "first_id": first_id, "last_id": last_id,
+                      "freelancers": counts[first_id] if first_id in counts else count_lines(path)})
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump({"month": args.month, "files": files}, f, indent=1)
+    print(f"{sum(entry['freelancers'] for entry in files):,} statement(s) for {args.month} in {out} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
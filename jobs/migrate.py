@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Schema migration job for SkillLink
+
+Applies the pending migrations of migrations.py to the database (every shard
+in sharded mode) while the app keeps running: schema changes wait only
+briefly for their locks and are retried, and backfills update small key
+ranges per transaction, slowing down while the standbys lag or sessions queue
+on locks. Progress is saved after every chunk; a run stopped by --max-chunks
+(or killed) resumes where it left off.
+
+Usage: python3 jobs/migrate.py [--status] [--to VERSION] [--max-chunks N] [--chunk-rows N]
+                               [--max-lag S] [--max-lock-waiters N]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (DB_CONFIG, DB_SHARDS, MIGRATION_CHUNK_ROWS, MIGRATION_CHUNK_SECONDS,
+                    MIGRATION_MAX_LAG_SECONDS, MIGRATION_MAX_LOCK_WAITERS, MIGRATION_LOCK_TIMEOUT_MS)
+from database import DatabaseConnection
+from migrations import MigrationRunner
+from sharding import ShardedDatabaseConnection
+
+
+def print_status(runner: MigrationRunner) -> bool:
+    """Print every migration with how far it got"""
+    state = runner.status()
+    if state is None:
+        return False
+    for version, name, step, steps, rows_done, completed_at in state:
+        progress = f"applied {completed_at:%Y-%m-%d %H:%M}" if completed_at else f"step {step}/{steps}"
+        print(f"  {version:4}  {name:<40} {progress} ({rows_done} row(s) backfilled)")
+    return True
+
+
+def main():
+    """Apply or list the migrations on every database"""
+    parser = argparse.ArgumentParser(description="Apply schema migrations online")
+    parser.add_argument("--status", action="store_true", help="list the migrations and exit")
+    parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    parser.add_argument("--max-chunks", type=int, default=None,
+                        help="stop after this many backfill chunks per database; the next run resumes")
+    parser.add_argument("--chunk-rows", type=int, default=MIGRATION_CHUNK_ROWS)
+    parser.add_argument("--max-lag", type=float, default=MIGRATION_MAX_LAG_SECONDS,
+                        help="pause backfills while a standby replays more than this many seconds behind")
+    parser.add_argument("--max-lock-waiters", type=int, default=MIGRATION_MAX_LOCK_WAITERS,
+                        help="pause backfills while more sessions than this wait on locks")
+    args = parser.parse_args()
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    finished = True
+    for target in db.shards if DB_SHARDS else [db]:
+        print(f"{target.host}/{target.database}")
+        runner = MigrationRunner(target, args.chunk_rows, MIGRATION_CHUNK_SECONDS, args.max_lag,
+                                 args.max_lock_waiters, MIGRATION_LOCK_TIMEOUT_MS)
+        if args.status:
+            if not print_status(runner):
+                db.disconnect()
+                sys.exit(1)
+            continue
+        result = runner.migrate(args.to, args.max_chunks)
+        if result is None:
+            db.disconnect()
+            sys.exit(1)
+        finished = finished and result
+
+    if not finished:
+        print("Migrations not finished; the next run resumes")
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
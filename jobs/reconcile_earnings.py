@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Earnings ledger reconciliation job for SkillLink
+
+Verifies payee_earnings_monthly and the lifetime totals in payee_earnings
+against the released payments and prints every bucket that differs. With --repair the ledger is
+rebuilt from the raw payments when a mismatch is found.
+
+Usage: python3 jobs/reconcile_earnings.py [--repair]
+Exit status is 0 when the ledger matches, 1 otherwise.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+
+def main():
+    """Run the reconciliation and optionally repair the ledger"""
+    repair = "--repair" in sys.argv[1:]
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    mismatches = db.reconcile_earnings()
+    if mismatches is None:
+        db.disconnect()
+        sys.exit(1)
+
+    if not mismatches:
+        print("✓ Earnings ledger matches released payments")
+        db.disconnect()
+        return
+
+    print(f"✗ {len(mismatches)} ledger bucket(s) differ from released payments:")
+    for payee_id, month, ledger_cents, actual_cents, ledger_count, actual_count in mismatches:
+        print(f"  payee {payee_id} {'total' if month is None else format(month, '%Y-%m')}: "
+              f"ledger ${ledger_cents / 100:.2f} in {ledger_count}, "
+              f"payments ${actual_cents / 100:.2f} in {actual_count}")
+
+    if repair:
+        if db.rebuild_earnings():
+            print("✓ Ledger rebuilt from payments")
+        else:
+            print("✗ Ledger rebuild failed")
+
+    db.disconnect()
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
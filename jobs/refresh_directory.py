@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Freelancer directory refresh for SkillLink
+
+Recomputes the freelancer_directory materialized view (see
+SQL_QUERIES_DATABASE.sql) with REFRESH MATERIALIZED VIEW CONCURRENTLY, so the
+Freelancers tab, the API and the skill search keep reading the previous
+contents until the new ones commit. Without --listen it refreshes once (run it
+from cron). With --listen it stays connected, LISTENs on the
+freelancer_directory channel that the source tables notify on every write, and
+refreshes at most every DIRECTORY_MIN_INTERVAL_SECONDS after a change and every
+DIRECTORY_REFRESH_SECONDS regardless.
+
+Usage: python3 jobs/refresh_directory.py [--listen]
+"""
+
+import argparse
+import os
+import select
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS, DIRECTORY_MIN_INTERVAL_SECONDS, DIRECTORY_REFRESH_SECONDS
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+CHANNEL = "freelancer_directory"
+
+
+def refresh(db, reason: str) -> bool:
+    """Refresh the directory (on every shard) and report how long it took"""
+    start = time.perf_counter()
+    if not db.refresh_freelancer_directory():
+        return False
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} refreshed freelancer directory ({reason}) "
+          f"in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+def drain(connections) -> set:
+    """Tables named by the notifications received on the connections"""
+    tables = set()
+    for connection in connections:
+        connection.poll()
+        while connection.notifies:
+            tables.add(connection.notifies.pop().payload)
+    return tables
+
+
+def listen(db, targets) -> bool:
+    """Refresh on change notifications (debounced) and on schedule until interrupted"""
+    connections = [target.connection for target in targets]
+    for target in targets:
+        target.cursor.execute(f"LISTEN {CHANNEL}")
+        target.connection.commit()
+
+    # refresh once at start: changes may have happened while nobody was listening
+    if not refresh(db, "start"):
+        return False
+    last = time.monotonic()
+    changed = set()
+    while True:
+        due = last + (DIRECTORY_MIN_INTERVAL_SECONDS if changed else DIRECTORY_REFRESH_SECONDS)
+        timeout = max(due - time.monotonic(), 0)
+        if timeout:
+            select.select(connections, [], [], timeout)
+            changed |= drain(connections)
+        if time.monotonic() < due:
+            continue
+        reason = f"changed: {', '.join(sorted(changed))}" if changed else "scheduled"
+        # notifications arriving during the refresh stay queued and trigger the next one
+        changed = set()
+        if not refresh(db, reason):
+            return False
+        last = time.monotonic()
+
+
+def main():
+    """Refresh the freelancer directory once, or keep it fresh with --listen"""
+    parser = argparse.ArgumentParser(description="Refresh the freelancer directory")
+    parser.add_argument("--listen", action="store_true",
+                        help="keep running, refreshing on change notifications and on schedule")
+    args = parser.parse_args()
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    try:
+        if args.listen:
+            ok = listen(db, db.shards if DB_SHARDS else [db])
+        else:
+            ok = refresh(db, "once")
+    except KeyboardInterrupt:
+        ok = True
+    db.disconnect()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Related skills refresh for SkillLink
+
+Folds the freelancer and project skill list changes queued since the last run
+into the skill co-occurrence counts (see SQL_QUERIES_DATABASE.sql). Only the
+skill pairs of the freelancers and projects whose lists changed are recounted,
+so a run costs as much as the changes; run it often (e.g. every few minutes
+from cron). The app picks up the new counts within RELATED_SKILLS_SYNC_SECONDS.
+
+Usage: python3 jobs/refresh_skill_graph.py [skill name ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS, RELATED_SKILLS_TOP_N
+from database import DatabaseConnection
+from related_skills import RelatedSkills
+from sharding import ShardedDatabaseConnection
+
+
+def main():
+    """Refresh the co-occurrence counts and print the related skills of the named skills"""
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    start = time.perf_counter()
+    result = db.refresh_skill_cooccurrence()
+    if result is None:
+        db.disconnect()
+        sys.exit(1)
+    changed_pairs, version = result
+    print(f"Recounted {changed_pairs} skill pair(s) in {time.perf_counter() - start:.2f}s "
+          f"(graph version {version})")
+
+    if len(sys.argv) > 1:
+        related = RelatedSkills(RELATED_SKILLS_TOP_N)
+        if related.load(db) is None:
+            db.disconnect()
+            sys.exit(1)
+        for skill_name in sys.argv[1:]:
+            skills = ", ".join(f"{name} ({score:.2f})" for name, score in related.related(skill_name))
+            print(f"  {skill_name}: {skills or 'no related skills'}")
+
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
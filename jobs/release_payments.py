@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Payment release job runner for SkillLink
+
+Queues every pending milestone that is due, then drains the queue with N
+worker processes. Each worker has its own connection and claims batches
+with FOR UPDATE SKIP LOCKED, so workers never wait on or double-pay the
+same milestone. Serialization failures and deadlocks are retried.
+
+Usage: python3 jobs/release_payments.py [--workers N] [--batch-size N] [--as-of YYYY-MM-DD]
+"""
+
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+
+def worker(batch_size):
+    """Release queued milestones until the queue is empty; returns this worker's counters"""
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        return 0, 0, 0, 0
+
+    claimed_total = released_total = retries_total = batches = 0
+    while True:
+        result = db.release_queued_payments(batch_size)
+        if result is None:
+            break
+        claimed, released, retries = result
+        if not claimed:
+            break
+        claimed_total += claimed
+        released_total += released
+        retries_total += retries
+        batches += 1
+
+    db.disconnect()
+    return claimed_total, released_total, retries_total, batches
+
+
+def main():
+    """Queue due milestones, run the workers and report throughput"""
+    parser = argparse.ArgumentParser(description="Release payments for due milestones")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--as-of", default=None, help="release milestones due on or before this date")
+    args = parser.parse_args()
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+    queued = db.enqueue_due_milestones(args.as_of)
+    db.disconnect()
+    if queued is None:
+        sys.exit(1)
+    print(f"Queued {queued} due milestone(s)")
+
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        results = pool.map(worker, [args.batch_size] * args.workers)
+    elapsed = time.perf_counter() - start
+
+    claimed = sum(r[0] for r in results)
+    released = sum(r[1] for r in results)
+    retries = sum(r[2] for r in results)
+    batches = sum(r[3] for r in results)
+
+    print(f"Claimed {claimed} milestone(s) in {batches} batch(es) with {args.workers} worker(s)")
+    print(f"Released {released} payment(s), {claimed - released} already paid")
+    print(f"Retries: {retries}")
+    if elapsed > 0:
+        print(f"Elapsed: {elapsed:.2f}s ({claimed / elapsed:,.0f} milestones/s)")
+
+
+if __name__ == "__main__":
+    main()
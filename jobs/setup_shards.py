@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Shard setup job for SkillLink
+
+Turns the databases listed in DB_SHARDS into shards. Every shard must first
+be loaded with the same data (e.g. SQL_QUERIES_DATABASE.sql or a restore of
+the single database). For each shard this job
+  1. configures the id sequences so new ids never collide across shards,
+  2. deletes the client-owned rows whose client hashes to another shard,
+  3. rebuilds the earnings ledger for the rows that remain,
+and finally syncs the replicated freelancer ratings across shards.
+
+Usage: python3 jobs/setup_shards.py [--sync-ratings-only]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_SHARDS
+from sharding import ShardedDatabaseConnection, shard_index
+
+# Child tables first; payment_release_queue and project_skill follow by cascade. The
+# archive tables have no triggers, so the keys of their rows are deleted here too
+PRUNE_STATEMENTS = [
+    "DELETE FROM payment WHERE contract_id IN "
+    "(SELECT contract_id FROM contract WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM payment_archive WHERE contract_id IN "
+    "(SELECT contract_id FROM contract WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM released_milestone r "
+    "WHERE NOT EXISTS (SELECT 1 FROM payment_history p WHERE p.payment_id = r.payment_id)",
+    "DELETE FROM review WHERE contract_id IN "
+    "(SELECT contract_id FROM contract WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM contract WHERE client_id <> ALL(%(owned)s)",
+    "DELETE FROM proposal WHERE project_id IN "
+    "(SELECT project_id FROM project WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM proposal_archive WHERE project_id IN "
+    "(SELECT project_id FROM project WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM proposal_key WHERE project_id IN "
+    "(SELECT project_id FROM project WHERE client_id <> ALL(%(owned)s))",
+    "DELETE FROM project WHERE client_id <> ALL(%(owned)s)",
+]
+
+
+def main():
+    """Configure and prune every shard"""
+    if not DB_SHARDS:
+        print("DB_SHARDS is empty in config.py; nothing to do")
+        sys.exit(1)
+
+    db = ShardedDatabaseConnection(DB_SHARDS)
+    if not db.connect():
+        sys.exit(1)
+
+    if "--sync-ratings-only" not in sys.argv[1:]:
+        clients = db.execute_query("SELECT user_id FROM users WHERE role = 'client'")
+        shard_count = len(db.shards)
+
+        for index, shard in enumerate(db.shards):
+            owned = [client_id for (client_id,) in clients
+                     if shard_index(client_id, shard_count) == index]
+            shard.cursor.execute("CALL configure_shard(%s, %s)", (index, shard_count))
+            for statement in PRUNE_STATEMENTS:
+                shard.cursor.execute(statement, {"owned": owned})
+            shard.connection.commit()
+            if not shard.rebuild_earnings() or not shard.refresh_freelancer_directory():
+                sys.exit(1)
+            print(f"Shard {index} ({shard.host}/{shard.database}): {len(owned)} client(s)")
+
+    if db.sync_freelancer_ratings():
+        print("✓ Freelancer ratings synced across shards")
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Overdue milestone sweeper for SkillLink
+
+Flags pending milestones that are overdue or due within the horizon in
+milestone_risk, one bounded batch per transaction, walking the partial index
+on pending milestones. The sweep's position is persisted after every batch, so
+a run stopped by --max-batches (or killed) resumes where it left off. The
+flags feed the at_risk_contracts view shown in the Contracts tab.
+
+Usage: python3 jobs/sweep_milestones.py [--batch-size N] [--horizon-days N] [--max-batches N] [--pause S]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS, MILESTONE_SWEEP_BATCH_SIZE, MILESTONE_DUE_SOON_DAYS
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+
+def main():
+    """Run the sweep batch by batch and summarize the at-risk contracts"""
+    parser = argparse.ArgumentParser(description="Flag overdue and soon-due milestones")
+    parser.add_argument("--batch-size", type=int, default=MILESTONE_SWEEP_BATCH_SIZE)
+    parser.add_argument("--horizon-days", type=int, default=MILESTONE_DUE_SOON_DAYS,
+                        help="flag pending milestones due within this many days")
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="stop after this many batches; the next run resumes")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    processed = overdue = due_soon = batches = 0
+    finished = False
+    start = time.perf_counter()
+    while not finished and (args.max_batches is None or batches < args.max_batches):
+        result = db.sweep_due_milestones(args.batch_size, args.horizon_days)
+        if result is None:
+            db.disconnect()
+            sys.exit(1)
+        batch_processed, batch_overdue, batch_due_soon, finished = result
+        processed += batch_processed
+        overdue += batch_overdue
+        due_soon += batch_due_soon
+        batches += 1
+        if not finished and args.pause:
+            time.sleep(args.pause)
+    elapsed = time.perf_counter() - start
+
+    print(f"Swept {processed} milestone(s) in {batches} batch(es) ({elapsed:.2f}s): "
+          f"{overdue} overdue, {due_soon} due within {args.horizon_days} day(s)")
+    if not finished:
+        print("Sweep not finished; the next run resumes from the saved cursor")
+
+    at_risk = db.get_at_risk_contracts() or []
+    print(f"{len(at_risk)} contract(s) at risk")
+    for contract_id, client_id, freelancer_id, late, soon, next_due, amount in at_risk[:20]:
+        print(f"  contract {contract_id} (client {client_id}, freelancer {freelancer_id}): "
+              f"{late} overdue, {soon} due soon, next due {next_due}, ${amount / 100:.2f} at risk")
+
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
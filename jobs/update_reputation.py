@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Reputation score refresh for SkillLink
+
+Folds the reviews added, edited or removed since the last run into the
+freelancers' reputation scores (a Bayesian average of their ratings with a
+recency decay, see SQL_QUERIES_DATABASE.sql). Only freelancers with changed
+reviews are rescored, so a run costs as much as the new reviews; run it often
+(e.g. every few minutes from cron). Run it with --rescore-all once a day so the
+scores of freelancers without new reviews follow the decay too; that reads one
+row per freelancer, never the reviews. The stored sums are rebuilt from every
+review on the first run, after REPUTATION_HALF_LIFE_DAYS changes and with --rebuild.
+
+Usage: python3 jobs/update_reputation.py [--rescore-all] [--rebuild]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG, DB_SHARDS, REPUTATION_HALF_LIFE_DAYS, REPUTATION_PRIOR_WEIGHT
+from database import DatabaseConnection
+from sharding import ShardedDatabaseConnection
+
+# review_weight() in SQL_QUERIES_DATABASE.sql is 2^((written - REPUTATION_EPOCH) / half-life),
+# which overflows double precision at 2^1024; the sums multiply it by ratings and add up
+# every review, so stop short of that
+REPUTATION_EPOCH = date(2020, 1, 1)
+MAX_WEIGHT_EXPONENT = 960
+
+
+def half_life_in_range(half_life_days: float) -> bool:
+    """Whether review weights at this half-life stay finite for another year"""
+    days = (date.today() - REPUTATION_EPOCH).days + 365
+    return days / half_life_days <= MAX_WEIGHT_EXPONENT
+
+
+def main():
+    """Refresh the reputation scores and print the top freelancers"""
+    parser = argparse.ArgumentParser(description="Refresh freelancer reputation scores")
+    parser.add_argument("--rescore-all", action="store_true",
+                        help="rescore every freelancer from the stored sums")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the stored sums from every review")
+    args = parser.parse_args()
+
+    if not half_life_in_range(REPUTATION_HALF_LIFE_DAYS):
+        print(f"REPUTATION_HALF_LIFE_DAYS = {REPUTATION_HALF_LIFE_DAYS} is too short: review weights "
+              f"would overflow within a year (see config.py)")
+        sys.exit(1)
+
+    db = ShardedDatabaseConnection(DB_SHARDS) if DB_SHARDS else DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        sys.exit(1)
+
+    state = db.get_reputation_state()
+    rebuild = args.rebuild or state is None or state[0] != REPUTATION_HALF_LIFE_DAYS
+    if rebuild and not args.rebuild:
+        print("Rebuilding the reputation sums from every review "
+              f"(half-life {REPUTATION_HALF_LIFE_DAYS} days)")
+
+    start = time.perf_counter()
+    result = db.refresh_reputation(REPUTATION_HALF_LIFE_DAYS, REPUTATION_PRIOR_WEIGHT,
+                                   rebuild, args.rescore_all)
+    if result is None:
+        db.disconnect()
+        sys.exit(1)
+    reviewees, rescored = result
+    print(f"Updated {reviewees} reviewee(s), rescored {rescored} freelancer(s) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    # the directory lists freelancers by score: refresh it now rather than on the next signal
+    if rescored and not db.refresh_freelancer_directory():
+        db.disconnect()
+        sys.exit(1)
+
+    half_life, prior_mean, review_count, refreshed_at = db.get_reputation_state()
+    print(f"Prior: {REPUTATION_PRIOR_WEIGHT} review(s) at the mean rating "
+          f"{prior_mean or 0:.2f} of {review_count} review(s)")
+    for user_id, username, _, _, avg_rating, score, *_ in db.get_freelancers_page(10) or []:
+        print(f"  {username} (user {user_id}): reputation {score:.3f}, average rating {avg_rating}")
+
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
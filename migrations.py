@@ -0,0 +1,281 @@
+"""
+Schema migration module for SkillLink application
+Applies the versioned schema changes in MIGRATIONS to a live database: short-lock DDL and resumable, throttled backfills
+"""
+
+import time
+from typing import Callable, List, Optional, Tuple
+
+from psycopg2 import sql, Error, errors
+
+# A schema change that cannot get its lock within lock_timeout is retried this many
+# times, waiting twice as long after each attempt (at most DDL_MAX_BACKOFF seconds)
+DDL_ATTEMPTS = 20
+DDL_MAX_BACKOFF = 30.0
+
+# How long a throttled backfill sleeps before probing the lag and lock waits again
+THROTTLE_SLEEP = 1.0
+
+# Replay lag (seconds) of the slowest standby, and the sessions of this database
+# waiting on a lock
+HEADROOM_QUERY = """
+SELECT COALESCE((SELECT MAX(EXTRACT(EPOCH FROM replay_lag)) FROM pg_stat_replication), 0)::float8,
+       (SELECT COUNT(*) FROM pg_stat_activity
+        WHERE wait_event_type = 'Lock' AND datname = current_database())
+"""
+
+
+class Ddl:
+    """A schema change run in its own transaction under a short lock_timeout
+
+    An ALTER TABLE waiting for its lock blocks every query queued behind it, so
+    it gives up after lock_timeout and is retried with backoff instead. The
+    statement and the migration's progress commit together.
+    """
+
+    def __init__(self, statement: str):
+        self.statement = statement
+
+    def __str__(self):
+        return " ".join(self.statement.split())
+
+
+class Backfill:
+    """An UPDATE run over a table's key range in small committed chunks
+
+    statement must restrict itself to %(lo)s < key <= %(hi)s and skip rows that
+    are already done. Each chunk commits with the migration's progress, so a
+    stopped backfill resumes after its last chunk. Rows added after the
+    backfill started are not visited; they must get the new value otherwise
+    (usually a column default).
+    """
+
+    def __init__(self, table: str, key: str, statement: str):
+        self.table = table
+        self.key = key
+        self.statement = statement
+
+    def __str__(self):
+        return f"backfill {self.table} by {self.key}"
+
+
+class Migration:
+    """A numbered list of steps, applied in version order and recorded in schema_migration"""
+
+    def __init__(self, version: int, name: str, steps: List):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+def set_not_null(table: str, key: str, column: str, value: str) -> List:
+    """Steps giving column a NOT NULL constraint without a long lock: fill the NULLs
+    with value in chunks, add a NOT VALID check and validate it (which only blocks
+    schema changes), then SET NOT NULL, which trusts the validated check instead of
+    scanning the table under its exclusive lock"""
+    check = f"{table}_{column}_not_null"
+    return [
+        Backfill(table, key, f"UPDATE {table} SET {column} = {value} "
+                             f"WHERE {column} IS NULL AND {key} > %(lo)s AND {key} <= %(hi)s"),
+        Ddl(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID"),
+        Ddl(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}"),
+        Ddl(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"),
+        Ddl(f"ALTER TABLE {table} DROP CONSTRAINT {check}"),
+    ]
+
+
+# Append new migrations with the next version; never change or reorder applied ones
+MIGRATIONS = [
+    Migration(1, "users.status NOT NULL", set_not_null("users", "user_id", "status", "'active'")),
+    Migration(2, "milestone.status NOT NULL", set_not_null("milestone", "milestone_id", "status", "'pending'")),
+]
+
+
+class MigrationRunner:
+    """Applies the pending MIGRATIONS to one database, step by step
+
+    Backfill chunks start at chunk_rows keys and are resized so each takes about
+    chunk_seconds. Before every chunk the runner waits while a standby replays
+    more than max_lag_seconds behind or more than max_lock_waiters sessions wait
+    on locks. Progress goes to report (print by default).
+    """
+
+    def __init__(self, db, chunk_rows: int = 1000, chunk_seconds: float = 0.5,
+                 max_lag_seconds: float = 5.0, max_lock_waiters: int = 5,
+                 lock_timeout_ms: int = 2000, report: Callable[[str], None] = print):
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.chunk_seconds = chunk_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.max_lock_waiters = max_lock_waiters
+        self.lock_timeout_ms = lock_timeout_ms
+        self.report = report
+
+    def status(self) -> Optional[List[Tuple]]:
+        """Get (version, name, steps done, steps, rows backfilled, completed_at) of every
+        migration, including those never started"""
+        try:
+            self.db.cursor.execute("SELECT version, step, rows_done, completed_at FROM schema_migration")
+            applied = {row[0]: row[1:] for row in self.db.cursor.fetchall()}
+            self.db.connection.rollback()
+        except Error as e:
+            print(f"Error reading migrations: {e}")
+            self.db.connection.rollback()
+            return None
+        rows = []
+        for migration in MIGRATIONS:
+            step, rows_done, completed_at = applied.get(migration.version, (0, 0, None))
+            rows.append((migration.version, migration.name, step, len(migration.steps), rows_done, completed_at))
+        return rows
+
+    def migrate(self, target: Optional[int] = None, max_chunks: Optional[int] = None) -> Optional[bool]:
+        """Apply the migrations up to version target (all by default)
+
+        Returns True when they are all applied, False when max_chunks backfill
+        chunks ran first (the next call resumes), None on error.
+        """
+        state = self.status()
+        if state is None:
+            return None
+        done = {version for version, _, _, _, _, completed_at in state if completed_at}
+        chunks = [0]
+        try:
+            # statements here are bounded by lock_timeout and chunk size, not statement_timeout
+            self.db.cursor.execute("SET statement_timeout = 0")
+            for migration in MIGRATIONS:
+                if migration.version in done or (target is not None and migration.version > target):
+                    continue
+                if not self._apply(migration, chunks, max_chunks):
+                    return False
+            return True
+        except Error as e:
+            print(f"Error migrating: {e}")
+            self.db.connection.rollback()
+            return None
+
+    def _apply(self, migration: Migration, chunks: List[int], max_chunks: Optional[int]) -> bool:
+        """Run the remaining steps of one migration; False if stopped by max_chunks"""
+        cursor = self.db.cursor
+        cursor.execute("""
+            INSERT INTO schema_migration (version, name) VALUES (%s, %s)
+            ON CONFLICT (version) DO NOTHING
+        """, (migration.version, migration.name))
+        cursor.execute("SELECT step FROM schema_migration WHERE version = %s", (migration.version,))
+        first_step = cursor.fetchone()[0]
+        self.db.connection.commit()
+
+        for index in range(first_step, len(migration.steps)):
+            step = migration.steps[index]
+            self.report(f"[{migration.version}] step {index + 1}/{len(migration.steps)}: {step}")
+            if isinstance(step, Backfill):
+                if not self._backfill(migration.version, index, step, chunks, max_chunks):
+                    return False
+            else:
+                self._ddl(migration.version, index, step)
+
+        cursor.execute("UPDATE schema_migration SET completed_at = CURRENT_TIMESTAMP WHERE version = %s",
+                       (migration.version,))
+        self.db.connection.commit()
+        self.report(f"[{migration.version}] {migration.name}: done")
+        return True
+
+    def _advance(self, version: int, index: int):
+        """Record (in the open transaction) that step index is done"""
+        self.db.cursor.execute("""
+            UPDATE schema_migration
+            SET step = %s, last_key = NULL, max_key = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE version = %s
+        """, (index + 1, version))
+
+    def _ddl(self, version: int, index: int, step: Ddl):
+        """Run a schema change, backing off while it cannot get its lock"""
+        backoff = 0.5
+        for attempt in range(1, DDL_ATTEMPTS + 1):
+            try:
+                self.db.cursor.execute("SET LOCAL lock_timeout = %s", (self.lock_timeout_ms,))
+                self.db.cursor.execute(step.statement)
+                self._advance(version, index)
+                self.db.connection.commit()
+                return
+            except errors.LockNotAvailable:
+                self.db.connection.rollback()
+                if attempt == DDL_ATTEMPTS:
+                    raise
+                self.report(f"  lock not available (attempt {attempt}), retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, DDL_MAX_BACKOFF)
+
+    def _backfill(self, version: int, index: int, step: Backfill, chunks: List[int],
+                  max_chunks: Optional[int]) -> bool:
+        """Run a backfill chunk by chunk from its saved position; False if stopped by max_chunks"""
+        cursor = self.db.cursor
+        cursor.execute("SELECT last_key, max_key, rows_done FROM schema_migration WHERE version = %s",
+                       (version,))
+        last_key, max_key, rows_done = cursor.fetchone()
+        if max_key is None:
+            # the key range is fixed when the backfill starts; later rows get the default
+            cursor.execute(sql.SQL("SELECT MIN({key}) - 1, MAX({key}) FROM {table}").format(
+                key=sql.Identifier(step.key), table=sql.Identifier(step.table)))
+            last_key, max_key = cursor.fetchone()
+            if max_key is None:
+                last_key = max_key = 0
+            cursor.execute("""
+                UPDATE schema_migration SET last_key = %s, max_key = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE version = %s
+            """, (last_key, max_key, version))
+        self.db.connection.commit()
+
+        size = self.chunk_rows
+        start = time.perf_counter()
+        reported = start
+        while last_key < max_key:
+            if max_chunks is not None and chunks[0] >= max_chunks:
+                self.report(f"  stopped at {step.key} {last_key} of {max_key}; the next run resumes")
+                return False
+            self._wait_for_headroom()
+            hi = min(last_key + size, max_key)
+            chunk_start = time.perf_counter()
+            try:
+                cursor.execute("SET LOCAL lock_timeout = %s", (self.lock_timeout_ms,))
+                cursor.execute(step.statement, {"lo": last_key, "hi": hi})
+                changed = cursor.rowcount
+                cursor.execute("""
+                    UPDATE schema_migration
+                    SET last_key = %s, rows_done = rows_done + %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE version = %s
+                """, (hi, changed, version))
+                self.db.connection.commit()
+            except errors.LockNotAvailable:
+                # rows of this chunk are locked by the app: retry a smaller chunk later
+                self.db.connection.rollback()
+                size = max(1, size // 2)
+                time.sleep(THROTTLE_SLEEP)
+                continue
+            elapsed = time.perf_counter() - chunk_start
+            last_key = hi
+            rows_done += changed
+            chunks[0] += 1
+            if elapsed < self.chunk_seconds / 2:
+                size = min(size * 2, self.chunk_rows * 100)
+            elif elapsed > self.chunk_seconds:
+                size = max(1, size // 2)
+            now = time.perf_counter()
+            if now - reported >= 5 or last_key >= max_key:
+                reported = now
+                self.report(f"  {step.key} {last_key} of {max_key}: {rows_done} row(s) updated, "
+                            f"{size} keys per chunk, {now - start:.1f}s")
+
+        self._advance(version, index)
+        self.db.connection.commit()
+        return True
+
+    def _wait_for_headroom(self):
+        """Sleep while the standbys lag or sessions queue on locks"""
+        while True:
+            self.db.cursor.execute(HEADROOM_QUERY)
+            lag, waiters = self.db.cursor.fetchone()
+            self.db.connection.rollback()
+            if lag <= self.max_lag_seconds and waiters <= self.max_lock_waiters:
+                return
+            self.report(f"  throttled: replay lag {lag:.1f}s, {waiters} session(s) waiting on locks")
+            time.sleep(THROTTLE_SLEEP)
@@ -0,0 +1,77 @@
+"""
+Related skills module for SkillLink application
+Keeps the most related skills of every skill in memory, from the co-occurrence counts in PostgreSQL
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# A sync touching more than this share of the known skills reloads everything instead
+FULL_RELOAD_SHARE = 0.25
+
+
+class RelatedSkills:
+    """The top_n related skills of every skill, looked up by skill name
+
+    load() reads the whole table of top related skills; sync() re-reads only the
+    skills whose related skills changed since the loaded graph version. Lookups
+    are dictionary reads. The dictionaries are replaced, never changed in place,
+    so sync() may run in a worker thread while the UI reads.
+    """
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.version: Optional[int] = None
+        self._by_id: Dict[int, Tuple[str, Tuple[Tuple[str, float], ...]]] = {}
+        self._by_name: Dict[str, Tuple[Tuple[str, float], ...]] = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def load(self, db) -> Optional[int]:
+        """Read the related skills of every skill, returning how many skills have some"""
+        version = db.get_skill_graph_version()
+        rows = db.get_related_skills(self.top_n) if version is not None else None
+        if rows is None:
+            return None
+        self._install({}, rows, version)
+        return len(self._by_id)
+
+    def sync(self, db) -> Optional[int]:
+        """Pick up the refreshes since the last load or sync, returning how many
+        skills were re-read"""
+        if self.version is None:
+            return self.load(db)
+        changes = db.get_skill_graph_changes(self.version)
+        if changes is None:
+            return None
+        version, skill_ids = changes
+        if not skill_ids:
+            self.version = version
+            return 0
+        if len(skill_ids) > max(self.top_n, FULL_RELOAD_SHARE * len(self._by_id)):
+            return self.load(db)
+        rows = db.get_related_skills(self.top_n, skill_ids)
+        if rows is None:
+            return None
+        by_id = dict(self._by_id)
+        for skill_id in skill_ids:
+            by_id.pop(skill_id, None)
+        self._install(by_id, rows, version)
+        return len(skill_ids)
+
+    def _install(self, by_id, rows, version):
+        """Add rows (ordered by skill, best first) to by_id and swap in the new lookups"""
+        related: Dict[int, List[Tuple[str, float]]] = {}
+        names: Dict[int, str] = {}
+        for skill_id, skill_name, _, related_name, score in rows:
+            names[skill_id] = skill_name
+            related.setdefault(skill_id, []).append((related_name, score))
+        for skill_id, skills in related.items():
+            by_id[skill_id] = (names[skill_id], tuple(skills))
+        self._by_name = {name.lower(): skills for name, skills in by_id.values()}
+        self._by_id = by_id
+        self.version = version
+
+    def related(self, skill_name: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """The most related skills of a skill as (skill_name, score), best first"""
+        return list(self._by_name.get(skill_name.lower(), ())[:limit])
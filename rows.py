@@ -0,0 +1,268 @@
+"""
+Compact result containers for SkillLink application
+Column-oriented storage for the catalogue queries the UI lists, with typed rows and memoized display strings
+"""
+
+import sys
+from array import array
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Stored in place of NULL in the integer columns (money, ids, ratings, dates)
+NULL = -(2 ** 63)
+
+
+# Display formatting of single values
+@lru_cache(maxsize=4096)
+def format_cents(cents: int) -> str:
+    """Cents as dollars, e.g. 12550 -> '$125.50'; NULL shows as $0.00"""
+    return f"${(0 if cents == NULL else cents) / 100:.2f}"
+
+
+@lru_cache(maxsize=1024)
+def format_hundredths(value: int) -> str:
+    """A DECIMAL(x,2) stored in hundredths, e.g. 475 -> '4.75'"""
+    return "" if value == NULL else f"{value / 100:.2f}"
+
+
+@lru_cache(maxsize=4096)
+def format_ordinal_date(ordinal: int) -> str:
+    """A date stored as its ordinal, as YYYY-MM-DD"""
+    return "" if ordinal == NULL else date.fromordinal(ordinal).isoformat()
+
+
+def format_int(value: int) -> str:
+    """A plain integer column"""
+    return "" if value == NULL else str(value)
+
+
+def format_text(value: Optional[str]) -> str:
+    """A text column"""
+    return "" if value is None else value
+
+
+# Display formatting of whole columns. These run at C speed except for one
+# formatter call per distinct value, since money, ratings, dates and labels repeat.
+def _format_distinct(fmt):
+    """Column formatter calling fmt once per distinct value"""
+    def format_column(column):
+        formatted = {value: fmt(value) for value in dict.fromkeys(column)}
+        return map(formatted.__getitem__, column)
+    return format_column
+
+
+def _format_ints(column):
+    return map(format_int, column) if NULL in column else map(str, column)
+
+
+def _format_texts(column):
+    return map(format_text, column) if None in column else column
+
+
+def _format_reals(column):
+    return ("" if value != value else f"{value:.4g}" for value in column)
+
+
+# Column kinds: how a value is stored, turned back into its Python type, and displayed
+def _store_int(value):
+    return NULL if value is None else int(value)
+
+
+def _load_int(value):
+    return None if value == NULL else value
+
+
+def _store_hundredths(value):
+    return NULL if value is None else int(Decimal(value).scaleb(2))
+
+
+def _load_hundredths(value):
+    return None if value == NULL else Decimal(value).scaleb(-2)
+
+
+def _store_date(value):
+    return NULL if value is None else value.toordinal()
+
+
+def _load_date(value):
+    return None if value == NULL else date.fromordinal(value)
+
+
+def _store_real(value):
+    return float("nan") if value is None else float(value)
+
+
+def _load_real(value):
+    return None if value != value else value
+
+
+def _identity(value):
+    return value
+
+
+def _interned(value):
+    return None if value is None else sys.intern(value)
+
+
+KINDS = {
+    # kind: (array typecode or None for a list, store, load, column formatter)
+    "int": ("q", _store_int, _load_int, _format_ints),
+    "cents": ("q", _store_int, _load_int, _format_distinct(format_cents)),
+    "hundredths": ("q", _store_hundredths, _load_hundredths, _format_distinct(format_hundredths)),
+    "date": ("q", _store_date, _load_date, _format_distinct(format_ordinal_date)),
+    # floating point scores such as search ranks; NULL is stored as NaN
+    "real": ("d", _store_real, _load_real, _format_reals),
+    "text": (None, _identity, _identity, _format_texts),
+    # low-cardinality text such as status: one shared string object per distinct value
+    "label": (None, _interned, _identity, _format_texts),
+}
+
+
+class RowSet:
+    """Result rows stored column by column
+
+    Subclasses list their COLUMNS as (name, kind) pairs in query column order.
+    Numeric, money and date columns live in 8-byte array slots instead of one
+    tuple plus one boxed object per value. Indexing returns a typed Row
+    (a namedtuple of the original Python values) built on demand. display(i)
+    returns a row's formatted strings; the first call formats the whole set
+    column by column and the result is memoized until clear_display().
+    """
+
+    __slots__ = ("_columns", "_length", "_display")
+
+    COLUMNS: Sequence[Tuple[str, str]] = ()
+    Row = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.Row = namedtuple(cls.__name__[:-4] or cls.__name__, [name for name, _ in cls.COLUMNS])
+        cls._kinds = [KINDS[kind] for _, kind in cls.COLUMNS]
+
+    def __init__(self, rows: Optional[Iterable[Sequence]] = None):
+        """Build from query result tuples (rows may be any iterable, e.g. a cursor)"""
+        self._columns = [array(code) if code else [] for code, _, _, _ in self._kinds]
+        self._length = 0
+        self._display: Optional[List[Tuple[str, ...]]] = None
+        if rows:
+            self.extend(rows)
+
+    @classmethod
+    def from_result(cls, rows: Optional[Iterable[Sequence]], format_now: bool = False):
+        """Wrap a DatabaseConnection result, keeping None (query failed) as None
+
+        format_now formats the display strings right away, so a background
+        thread can do it and the UI's refresh loop only looks them up.
+        """
+        if rows is None:
+            return None
+        row_set = cls(rows)
+        if format_now and row_set:
+            row_set.display(0)
+        return row_set
+
+    def extend(self, rows: Iterable[Sequence]):
+        """Append result tuples"""
+        stores = [(column.append, store) for column, (_, store, _, _) in zip(self._columns, self._kinds)]
+        added = 0
+        for row in rows:
+            for (append, store), value in zip(stores, row):
+                append(store(value))
+            added += 1
+        self._length += added
+        self._display = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int):
+        """The typed row at index"""
+        if index < 0:
+            index += self._length
+        return self.Row(*(load(column[index]) for column, (_, _, load, _)
+                          in zip(self._columns, self._kinds)))
+
+    def __iter__(self) -> Iterator:
+        for index in range(self._length):
+            yield self[index]
+
+    def column(self, name: str):
+        """The raw stored values of one column (array or list)"""
+        for (column_name, _), column in zip(self.COLUMNS, self._columns):
+            if column_name == name:
+                return column
+        raise KeyError(name)
+
+    def display(self, index: int) -> Tuple[str, ...]:
+        """Formatted strings for every column of a row, memoized"""
+        if self._display is None:
+            self._display = list(zip(*(format_column(column) for column, (_, _, _, format_column)
+                                       in zip(self._columns, self._kinds))))
+        return self._display[index]
+
+    def clear_display(self):
+        """Drop memoized display strings (e.g. before caching the rows long term)"""
+        self._display = None
+
+
+class FreelancerRows(RowSet):
+    """get_all_freelancers / get_freelancers_page"""
+    __slots__ = ()
+    COLUMNS = (("user_id", "int"), ("username", "text"), ("headline", "text"),
+               ("rate_per_hour", "cents"), ("avg_rating", "hundredths"), ("reputation_score", "real"),
+               ("skills", "text"), ("review_count", "int"), ("completed_contracts", "int"),
+               ("earned_cents", "cents"))
+
+
+class ProjectRows(RowSet):
+    """get_all_projects / get_projects_page"""
+    __slots__ = ()
+    COLUMNS = (("project_id", "int"), ("title", "text"), ("budget_min_cents", "cents"),
+               ("budget_max_cents", "cents"), ("deadline", "date"))
+
+
+class ProjectMatchRows(RowSet):
+    """search_projects_text_page"""
+    __slots__ = ()
+    COLUMNS = (("project_id", "int"), ("title", "text"), ("budget_min_cents", "cents"),
+               ("budget_max_cents", "cents"), ("deadline", "date"), ("snippet", "text"),
+               ("rank", "real"))
+
+
+class ContractRows(RowSet):
+    """get_active_contracts / get_active_contracts_page"""
+    __slots__ = ()
+    COLUMNS = (("contract_id", "int"), ("client_id", "int"), ("freelancer_id", "int"),
+               ("total_amount_cents", "cents"), ("paid_amount_cents", "cents"),
+               ("remaining_amount_cents", "cents"), ("status", "label"))
+
+
+class AtRiskContractRows(RowSet):
+    """get_at_risk_contracts"""
+    __slots__ = ()
+    COLUMNS = (("contract_id", "int"), ("client_id", "int"), ("freelancer_id", "int"),
+               ("overdue_milestones", "int"), ("due_soon_milestones", "int"),
+               ("next_due_date", "date"), ("amount_at_risk_cents", "cents"))
+
+
+class ProposalRows(RowSet):
+    """get_proposals_by_project / get_proposals_page"""
+    __slots__ = ()
+    COLUMNS = (("proposal_id", "int"), ("freelancer", "text"), ("bid_amount_cents", "cents"),
+               ("status", "label"), ("cover_letter_preview", "text"), ("cover_letter_length", "int"))
+
+
+class SkillSearchRows(RowSet):
+    """search_freelancers_by_skill"""
+    __slots__ = ()
+    COLUMNS = (("username", "text"), ("skill_name", "label"), ("proficiency_level", "int"),
+               ("avg_rating", "hundredths"), ("reputation_score", "real"))
+
+
+class SkillRows(RowSet):
+    """get_all_skills"""
+    __slots__ = ()
+    COLUMNS = (("skill_id", "int"), ("skill_name", "text"), ("skill_description", "text"))
@@ -0,0 +1,621 @@
+"""
+Sharded database mode for SkillLink application
+Spreads client-owned data over several PostgreSQL databases by client_id
+"""
+
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import List, Tuple, Optional, Any, Callable, Dict
+
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+
+from database import DatabaseConnection, current_call, running_call, statement_timeout
+
+# Exports of the replicated tables come from one shard; everything else is concatenated
+GLOBAL_EXPORTS = {"users", "freelancers", "freelancer_skills"}
+
+# get_proposals_by_freelancer and get_freelancer_reviews with their ORDER BY key
+# appended, so the shards' rows can be merged newest first
+PROPOSALS_BY_FREELANCER_QUERY = """
+SELECT p.title, pr.bid_amount_cents, pr.status, pr.proposal_id
+FROM proposal_history pr
+JOIN project p ON pr.project_id = p.project_id
+WHERE pr.freelancer_id = %s
+ORDER BY pr.proposal_id DESC
+"""
+FREELANCER_REVIEWS_QUERY = """
+SELECT r.rating, r.feedback, u.username as reviewer, r.review_id
+FROM review r
+JOIN users u ON r.reviewer_id = u.user_id
+WHERE r.reviewee_id = %s
+ORDER BY r.review_id DESC
+"""
+
+# Lists in a freelancer statement and the order each is kept in
+STATEMENT_LISTS = {
+    "contracts": lambda item: item["contract_id"],
+    "payments": lambda item: (item["released_at"], item["payment_id"]),
+    "reviews": lambda item: (item["created_at"], item["review_id"]),
+}
+
+# Freelancer directory orders by replicated columns, the same on every shard
+REPLICATED_FREELANCER_SORTS = {"reputation", "rating"}
+
+# A shard's part of the directory columns that count client-owned rows
+DIRECTORY_TOTALS_QUERY = """
+SELECT user_id, review_count, completed_contracts, earned_cents
+FROM freelancer_directory
+WHERE user_id = ANY(%s)
+"""
+
+
+def shard_index(client_id: int, shard_count: int) -> int:
+    """Stable hash of a client id onto 0..shard_count-1"""
+    digest = hashlib.md5(str(client_id).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+class ShardedDatabaseConnection(DatabaseConnection):
+    """DatabaseConnection over N shards, keyed by client_id
+
+    project, project_skill, proposal, contract, milestone, payment, review and
+    the payment queue/ledger tables live on the shard of the owning client.
+    users, skill, freelancer_profile and freelancer_skill are replicated to every
+    shard: reads of them use shard 0 and writes are applied to all shards.
+    Lookups by project/proposal/contract id find the owning shard once (in
+    parallel over all shards) and cache it. Listing queries fan out to every
+    shard in parallel and are merge-sorted on their ORDER BY keys.
+    """
+
+    def __init__(self, shards: List[Dict[str, Any]], statement_timeouts: Optional[Dict[str, int]] = None,
+                 default_statement_timeout: int = 0):
+        """Initialize one DatabaseConnection per shard from psycopg2-style dicts"""
+        first = {key: value for key, value in shards[0].items() if key != "replicas"}
+        timeouts = {"statement_timeouts": statement_timeouts,
+                    "default_statement_timeout": default_statement_timeout}
+        super().__init__(**first, **timeouts)
+        self.shards = [DatabaseConnection(**params, **timeouts) for params in shards]
+        self._pool = None
+        self._owner_cache: Dict[Tuple[str, int], int] = {}
+        self._release_start = itertools.cycle(range(len(self.shards)))
+
+    # Connection handling
+    def connect(self):
+        """Connect to every shard in parallel"""
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards))
+        if not all(self._pool.map(lambda shard: shard.connect(), self.shards)):
+            self.disconnect()
+            return False
+        self.connection = self.shards[0].connection
+        self.cursor = self.shards[0].cursor
+        return True
+
+    def disconnect(self):
+        """Close every shard connection"""
+        for shard in self.shards:
+            shard.disconnect()
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+        self.connection = None
+        self.cursor = None
+
+    def reset(self):
+        """End open transactions on every shard"""
+        for shard in self.shards:
+            shard.reset()
+        self.connection = self.shards[0].connection
+        self.cursor = self.shards[0].cursor
+
+    def cancel(self):
+        """Cancel the statements running on every shard"""
+        for shard in self.shards:
+            shard.cancel()
+
+    def shard_for_client(self, client_id: int) -> DatabaseConnection:
+        """The shard holding a client's projects, proposals, contracts and payments"""
+        return self.shards[shard_index(client_id, len(self.shards))]
+
+    @property
+    def query_failed(self) -> bool:
+        """Whether a query failed here or on any shard since the flag was cleared"""
+        return self._query_failed or any(shard.query_failed for shard in getattr(self, "shards", []))
+
+    @query_failed.setter
+    def query_failed(self, value: bool):
+        self._query_failed = value
+        for shard in getattr(self, "shards", []):
+            shard.query_failed = value
+
+    def _gather(self, method: str, *args) -> Optional[List[Any]]:
+        """Call a DatabaseConnection method on every shard in parallel
+
+        The pool threads run it under the statement timeout of the call running here.
+        """
+        name = current_call()
+
+        def call(shard):
+            with running_call(name):
+                return getattr(shard, method)(*args)
+
+        results = list(self._pool.map(call, self.shards))
+        return None if any(result is None for result in results) else results
+
+    def _gather_newest_first(self, query: str, params: Tuple) -> Optional[List[Tuple]]:
+        """Run a query ordered by its last column DESC on every shard and merge the rows
+        in that order, without the key column"""
+        results = self._gather("execute_read_query", query, params)
+        if results is None:
+            return None
+        return [row[:-1] for row in heapq.merge(*results, key=lambda row: row[-1], reverse=True)]
+
+    def _owner(self, table: str, column: str, row_id: int) -> Optional[DatabaseConnection]:
+        """Find (and cache) the shard holding a row of a client-owned table"""
+        key = (table, row_id)
+        if key not in self._owner_cache:
+            query = f"SELECT 1 FROM {table} WHERE {column} = %s"
+            found = self._gather("execute_read_query", query, (row_id,))
+            if not found:
+                return None
+            for index, rows in enumerate(found):
+                if rows:
+                    self._owner_cache[key] = index
+                    break
+            else:
+                return None
+        return self.shards[self._owner_cache[key]]
+
+    # Replicated tables
+    def execute_query(self, query: str, params: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Run an ad-hoc SELECT against the replicated tables (on shard 0)"""
+        return self.shards[0].execute_query(query, params)
+
+    def execute_read_query(self, query: str, params: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Run a read-only SELECT against the replicated tables (on shard 0 or its replicas)"""
+        return self.shards[0].execute_read_query(query, params)
+
+    def _write_all_shards(self, action: str, *steps: Callable[[DatabaseConnection], Any]) -> Optional[List[Any]]:
+        """Run steps on every shard in one transaction per shard, with two-phase commit
+
+        Each step runs on every shard before the next one starts. The shards'
+        transactions are PREPAREd once all steps are done and only committed once
+        every shard has prepared, so a failure on any shard before that leaves all
+        of them unchanged. Needs max_prepared_transactions > 0 on the shards. If the
+        process dies between the prepares and the commits, the prepared
+        transactions stay in pg_prepared_xacts (gid 'skilllink-<id>-<shard>') until
+        an admin commits or rolls them back.
+
+        Returns the last step's result for each shard, or None if the write was
+        rolled back or some shard failed to commit it.
+        """
+        gid = f"skilllink-{uuid.uuid4().hex}"
+        begun = []
+        try:
+            for index, shard in enumerate(self.shards):
+                # ends the read transaction earlier queries left open; tpc_begin needs none
+                shard.connection.rollback()
+                shard.connection.tpc_begin(f"{gid}-{index}")
+                begun.append(shard)
+            for step in steps:
+                results = [step(shard) for shard in self.shards]
+            for shard in self.shards:
+                shard.connection.tpc_prepare()
+        except Error as e:
+            print(f"Error {action} on {shard.host}/{shard.database}: {e}")
+            shard.query_failed = True
+            for shard in begun:
+                try:
+                    shard.connection.tpc_rollback()
+                except Error as e:
+                    print(f"Error rolling back {gid} on {shard.host}/{shard.database}: {e}")
+            return None
+        committed = True
+        for shard in self.shards:
+            try:
+                shard.connection.tpc_commit()
+                shard._note_write()
+            except Error as e:
+                # every shard prepared, so the write is decided: leave it to be committed
+                print(f"Error committing {gid} on {shard.host}/{shard.database}, "
+                      f"still prepared there: {e}")
+                shard.query_failed = True
+                committed = False
+        return results if committed else None
+
+    def execute_update(self, query: str, params: Optional[Tuple] = None) -> bool:
+        """Apply a write to every shard atomically, with two-phase commit
+
+        Correct for the replicated tables and for UPDATE/DELETE on client-owned
+        ones; INSERTs into client-owned tables must go through shard_for_client().
+        """
+        def write(shard):
+            shard.cursor.execute(shard._with_timeout(query), params)
+
+        return self._write_all_shards("executing update", write) is not None
+
+    def sync_freelancer_ratings(self) -> bool:
+        """Recompute avg_rating from the reviews on all shards and write it everywhere
+
+        Each shard's review trigger only sees its own reviews, so run this after
+        reviews are added (e.g. from cron) to keep the replicated ratings global.
+        The ratings are written to every shard with two-phase commit.
+        """
+        query = "SELECT reviewee_id, SUM(rating), COUNT(*) FROM review GROUP BY reviewee_id"
+        partials = self._gather("execute_query", query)
+        if partials is None:
+            return False
+        totals: Dict[int, List[int]] = {}
+        for rows in partials:
+            for reviewee_id, rating_sum, count in rows:
+                total = totals.setdefault(reviewee_id, [0, 0])
+                total[0] += rating_sum
+                total[1] += count
+        if not totals:
+            return True
+        values = [(user_id, round(rating_sum / count, 2)) for user_id, (rating_sum, count) in totals.items()]
+
+        update = """
+        UPDATE freelancer_profile f
+        SET avg_rating = v.avg_rating
+        FROM (VALUES %s) v(user_id, avg_rating)
+        WHERE f.user_id = v.user_id
+        """
+
+        def write(shard):
+            execute_values(shard.cursor, update, values)
+
+        return self._write_all_shards("syncing ratings", write) is not None
+
+    @statement_timeout
+    def refresh_reputation(self, half_life_days: float, prior_weight: float, rebuild: bool = False,
+                           rescore_all: bool = False) -> Optional[Tuple[int, int]]:
+        """Take every shard's queued review deltas and apply their totals to every shard
+
+        Reviews live on the client shards while freelancer_profile is replicated, so
+        the per-reviewee deltas are summed over the shards and the same totals are
+        applied to each shard's copy of the sums and scores. Taking and applying run
+        in one two-phase transaction per shard, so the deltas stay queued everywhere
+        unless every shard commits.
+        """
+        take = "SELECT * FROM take_reputation_deltas(%s, %s)"
+        apply = """
+        SELECT apply_reputation_deltas(%s::BIGINT[], %s::FLOAT8[], %s::FLOAT8[], %s::BIGINT[],
+                                       %s::BIGINT[], %s, %s, %s, %s)
+        """
+        totals: Dict[int, List[float]] = {}
+        arrays: List[List] = []
+
+        def take_deltas(shard):
+            shard.cursor.execute(shard._with_timeout(take), (half_life_days, rebuild))
+            for reviewee_id, *deltas in shard.cursor.fetchall():
+                total = totals.setdefault(reviewee_id, [0.0, 0.0, 0, 0])
+                for index, delta in enumerate(deltas):
+                    total[index] += delta
+
+        def apply_totals(shard):
+            if not arrays:
+                arrays.append(list(totals))
+                arrays.extend([list(column) for column in zip(*totals.values())] or [[], [], [], []])
+            shard.cursor.execute(shard._with_timeout(apply),
+                                 (*arrays, half_life_days, prior_weight, rebuild, rescore_all))
+            return shard.cursor.fetchone()[0]
+
+        rescored = self._write_all_shards("refreshing reputation scores", take_deltas, apply_totals)
+        return None if rescored is None else (len(totals), rescored[-1])
+
+    def refresh_skill_cooccurrence(self) -> Optional[Tuple[int, int]]:
+        """Refresh the skill co-occurrence counts on every shard
+
+        Each shard counts its replicated freelancer skill lists and its own
+        projects' skill lists. Related skills are read from shard 0, so they
+        reflect every freelancer but only shard 0's projects.
+        """
+        results = self._gather("refresh_skill_cooccurrence")
+        if results is None:
+            return None
+        return sum(changed for changed, _ in results), results[0][1]
+
+    # Export
+    def copy_export(self, export: str, f, fmt: str = "csv", header: bool = True) -> Optional[int]:
+        """COPY an export from every shard into one file (replicated tables from shard 0)"""
+        shards = self.shards[:1] if export in GLOBAL_EXPORTS else self.shards
+        total = 0
+        for index, shard in enumerate(shards):
+            rows = shard.copy_export(export, f, fmt, header and index == 0)
+            if rows is None:
+                return None
+            total += rows
+        return total
+
+    def copy_freelancer_statements(self, first_id: int, last_id: int, month: date, f) -> Optional[int]:
+        """COPY a range of freelancer statements from every shard and write one merged
+        JSON line per freelancer; returns how many
+
+        Every shard lists every freelancer of the range (users are replicated), in
+        user_id order, with the payments, contracts and reviews it holds; the lines
+        are merged by summing the totals and interleaving the lists in order.
+        """
+        parts = []
+        for shard in self.shards:
+            buffer = io.BytesIO()
+            if shard.copy_freelancer_statements(first_id, last_id, month, buffer) is None:
+                return None
+            parts.append(buffer.getvalue().splitlines())
+        if len({len(lines) for lines in parts}) > 1:
+            print(f"Shards disagree on the freelancers from {first_id} to {last_id}")
+            return None
+        for lines in zip(*parts):
+            statements = [json.loads(line) for line in lines]
+            merged = statements[0]
+            for other in statements[1:]:
+                if other["freelancer_id"] != merged["freelancer_id"]:
+                    print(f"Shards disagree on the freelancers from {first_id} to {last_id}")
+                    return None
+                merged["earned_cents"] += other["earned_cents"]
+                merged["payment_count"] += other["payment_count"]
+                for name in STATEMENT_LISTS:
+                    merged[name] += other[name]
+            for name, key in STATEMENT_LISTS.items():
+                merged[name].sort(key=key)
+            f.write(json.dumps(merged, separators=(",", ":")).encode() + b"\n")
+        return len(parts[0])
+
+    # Freelancer directory
+    def get_all_freelancers(self) -> Optional[List[Tuple]]:
+        """Get the freelancer directory from shard 0, with the review, completed
+        contract and earnings counts summed over every shard"""
+        return self._with_directory_totals(self.shards[0].get_all_freelancers())
+
+    def get_freelancers_page(self, limit: int, after: Optional[Tuple] = None,
+                             sort: str = "reputation") -> Optional[List[Tuple]]:
+        """Get one page of the freelancer directory from shard 0, with the counts summed
+        over every shard; only orders by replicated columns can be paged this way"""
+        if sort not in REPLICATED_FREELANCER_SORTS:
+            print(f"Sorting freelancers by {sort} is not available in sharded mode")
+            return None
+        return self._with_directory_totals(self.shards[0].get_freelancers_page(limit, after, sort))
+
+    def _with_directory_totals(self, rows: Optional[List[Tuple]]) -> Optional[List[Tuple]]:
+        """Directory rows with their per-shard counts replaced by the totals over all shards"""
+        if rows is None or len(self.shards) == 1:
+            return rows
+        results = self._gather("execute_read_query", DIRECTORY_TOTALS_QUERY, ([row[0] for row in rows],))
+        if results is None:
+            return None
+        totals: Dict[int, List[int]] = {}
+        for shard_rows in results:
+            for user_id, *counts in shard_rows:
+                total = totals.setdefault(user_id, [0, 0, 0])
+                for index, count in enumerate(counts):
+                    total[index] += count
+        return [row[:7] + tuple(totals.get(row[0], row[7:10])) + row[10:] for row in rows]
+
+    def refresh_freelancer_directory(self) -> bool:
+        """Refresh the freelancer directory on every shard"""
+        results = self._gather("refresh_freelancer_directory")
+        return results is not None and all(results)
+
+    # Project queries
+    def get_all_projects(self) -> Optional[List[Tuple]]:
+        """Get all projects from every shard, merged by deadline (NULLs last)"""
+        results = self._gather("get_all_projects")
+        if results is None:
+            return None
+        key = lambda row: (row[4] is None, row[4] or date.min, row[0])
+        return list(heapq.merge(*results, key=key))
+
+    def get_projects_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of projects by deadline, merged from every shard's page"""
+        results = self._gather("get_projects_page", limit, after)
+        if results is None:
+            return None
+        key = lambda row: (row[4] is None, row[4] or date.min, row[0])
+        return list(itertools.islice(heapq.merge(*results, key=key), limit))
+
+    def search_projects_page(self, limit: int, budget_min_cents: Optional[int] = None,
+                             budget_max_cents: Optional[int] = None, deadline_from: Optional[date] = None,
+                             deadline_to: Optional[date] = None,
+                             after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Search one page of projects on every shard, merged by deadline"""
+        results = self._gather("search_projects_page", limit, budget_min_cents, budget_max_cents,
+                               deadline_from, deadline_to, after)
+        if results is None:
+            return None
+        key = lambda row: (row[4] is None, row[4] or date.min, row[0])
+        return list(itertools.islice(heapq.merge(*results, key=key), limit))
+
+    def search_projects_text_page(self, text: str, limit: int, budget_min_cents: Optional[int] = None,
+                                  budget_max_cents: Optional[int] = None, deadline_from: Optional[date] = None,
+                                  deadline_to: Optional[date] = None,
+                                  after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Full-text search one page on every shard, merged best match first
+
+        ts_rank only depends on the project itself, so ranks compare across shards.
+        """
+        results = self._gather("search_projects_text_page", text, limit, budget_min_cents,
+                               budget_max_cents, deadline_from, deadline_to, after)
+        if results is None:
+            return None
+        key = lambda row: (-row[6], row[0])
+        return list(itertools.islice(heapq.merge(*results, key=key), limit))
+
+    def get_project_details(self, project_id: int) -> Optional[Tuple]:
+        """Get detailed project information from the owning shard"""
+        shard = self._owner("project", "project_id", project_id)
+        return shard.get_project_details(project_id) if shard else None
+
+    def get_project_skills(self, project_id: int) -> Optional[List[Tuple]]:
+        """Get required skills for a project from the owning shard"""
+        shard = self._owner("project", "project_id", project_id)
+        return shard.get_project_skills(project_id) if shard else []
+
+    def get_client_projects(self, client_id: int) -> Optional[List[Tuple]]:
+        """Get a client's projects from the client's shard"""
+        return self.shard_for_client(client_id).get_client_projects(client_id)
+
+    # Proposal queries
+    def get_proposals_by_project(self, project_id: int) -> Optional[List[Tuple]]:
+        """Get all proposals for a project from the owning shard"""
+        shard = self._owner("project", "project_id", project_id)
+        return shard.get_proposals_by_project(project_id) if shard else []
+
+    def get_proposals_page(self, project_id: int, limit: int,
+                           after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of a project's proposals from the owning shard"""
+        shard = self._owner("project", "project_id", project_id)
+        return shard.get_proposals_page(project_id, limit, after) if shard else []
+
+    def get_proposal_cover_letter(self, proposal_id: int) -> Optional[str]:
+        """Get a proposal's full cover letter from the owning shard"""
+        # proposal_key answers by id with one index probe, proposal would probe every month
+        shard = self._owner("proposal_key", "proposal_id", proposal_id)
+        return shard.get_proposal_cover_letter(proposal_id) if shard else None
+
+    def get_bid_analytics(self, project_id: int) -> Optional[Tuple[Tuple, List[Tuple]]]:
+        """Get a project's bid analytics from the owning shard (cached there), with the
+        bidders' accepted / decided counts summed over every shard"""
+        shard = self._owner("project", "project_id", project_id)
+        result = shard.get_bid_analytics(project_id) if shard else None
+        if not result or not result[1]:
+            return result
+        summary, bids = result
+        histories = self._gather("get_freelancer_bid_history", [bid[1] for bid in bids])
+        if histories is None:
+            return None
+        totals: Dict[int, List[int]] = {}
+        for rows in histories:
+            for freelancer_id, accepted, decided in rows:
+                total = totals.setdefault(freelancer_id, [0, 0])
+                total[0] += accepted
+                total[1] += decided
+        return summary, [bid[:5] + tuple(totals.get(bid[1], (0, 0))) for bid in bids]
+
+    @statement_timeout
+    def get_proposals_by_freelancer(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get a freelancer's proposals from every shard, merged newest first"""
+        return self._gather_newest_first(PROPOSALS_BY_FREELANCER_QUERY, (freelancer_id,))
+
+    def accept_proposal(self, proposal_id: int) -> Optional[int]:
+        """Accept a proposal on the owning shard"""
+        shard = self._owner("proposal_key", "proposal_id", proposal_id)
+        return shard.accept_proposal(proposal_id) if shard else None
+
+    # Contract queries
+    def get_active_contracts(self) -> Optional[List[Tuple]]:
+        """Get active contracts from every shard, merged by contract id"""
+        results = self._gather("get_active_contracts")
+        if results is None:
+            return None
+        return list(heapq.merge(*results, key=lambda row: row[0]))
+
+    def get_active_contracts_page(self, limit: int, after: Optional[Tuple] = None) -> Optional[List[Tuple]]:
+        """Get one page of active contracts, merged from every shard's page"""
+        results = self._gather("get_active_contracts_page", limit, after)
+        if results is None:
+            return None
+        return list(itertools.islice(heapq.merge(*results, key=lambda row: row[0]), limit))
+
+    def get_contract_milestones(self, contract_id: int) -> Optional[List[Tuple]]:
+        """Get milestones for a contract from the owning shard"""
+        shard = self._owner("contract", "contract_id", contract_id)
+        return shard.get_contract_milestones(contract_id) if shard else []
+
+    # Payment queries
+    def get_freelancer_earnings(self, freelancer_id: int) -> Optional[Tuple]:
+        """Get total earnings for a freelancer summed over all shards"""
+        results = self._gather("get_freelancer_earnings", freelancer_id)
+        if results is None:
+            return None
+        return (sum(row[0] or 0 for row in results),)
+
+    def get_freelancer_monthly_earnings(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get earnings per month for a freelancer summed over all shards"""
+        results = self._gather("get_freelancer_monthly_earnings", freelancer_id)
+        if results is None:
+            return None
+        months: Dict[date, List[int]] = {}
+        for rows in results:
+            for month, earned, payment_count in rows:
+                bucket = months.setdefault(month, [0, 0])
+                bucket[0] += earned
+                bucket[1] += payment_count
+        return [(month, earned, count) for month, (earned, count) in sorted(months.items())]
+
+    def reconcile_earnings(self) -> Optional[List[Tuple]]:
+        """Reconcile the earnings ledger on every shard"""
+        results = self._gather("reconcile_earnings")
+        return None if results is None else [row for rows in results for row in rows]
+
+    def rebuild_earnings(self) -> bool:
+        """Rebuild the earnings ledger on every shard"""
+        return all(self._pool.map(lambda shard: shard.rebuild_earnings(), self.shards))
+
+    def release_milestone_payment(self, milestone_id: int) -> Optional[int]:
+        """Release a milestone's payment on the owning shard"""
+        shard = self._owner("milestone", "milestone_id", milestone_id)
+        return shard.release_milestone_payment(milestone_id) if shard else None
+
+    # Payment release queue
+    def enqueue_due_milestones(self, as_of=None) -> Optional[int]:
+        """Queue due milestones on every shard"""
+        results = self._gather("enqueue_due_milestones", as_of)
+        return None if results is None else sum(results)
+
+    def release_queued_payments(self, batch_size: int = 100,
+                                max_retries: int = 5) -> Optional[Tuple[int, int, int]]:
+        """Release one batch from the first shard (rotating) whose queue is not empty"""
+        start = next(self._release_start)
+        for offset in range(len(self.shards)):
+            shard = self.shards[(start + offset) % len(self.shards)]
+            result = shard.release_queued_payments(batch_size, max_retries)
+            if result is None or result[0]:
+                return result
+        return 0, 0, 0
+
+    # Milestone sweeper
+    def sweep_due_milestones(self, batch_size: int = 500,
+                             horizon_days: int = 7) -> Optional[Tuple[int, int, int, bool]]:
+        """Sweep one batch on every shard; finished once every shard's sweep has finished"""
+        results = self._gather("sweep_due_milestones", batch_size, horizon_days)
+        if results is None:
+            return None
+        return (sum(r[0] for r in results), sum(r[1] for r in results),
+                sum(r[2] for r in results), all(r[3] for r in results))
+
+    def get_at_risk_contracts(self) -> Optional[List[Tuple]]:
+        """Get at-risk contracts from every shard, most overdue first"""
+        results = self._gather("get_at_risk_contracts")
+        if results is None:
+            return None
+        return sorted((row for rows in results for row in rows),
+                      key=lambda row: (-row[3], row[5], row[0]))
+
+    def get_last_milestone_sweep(self) -> Optional[Tuple]:
+        """Get the oldest shard's last finished sweep, None unless every shard has one"""
+        results = self._gather("get_last_milestone_sweep")
+        if not results or any(result is None for result in results):
+            return None
+        return min(results, key=lambda result: result[1])
+
+    # Review queries
+    @statement_timeout
+    def get_freelancer_reviews(self, freelancer_id: int) -> Optional[List[Tuple]]:
+        """Get a freelancer's reviews from every shard, merged newest first"""
+        return self._gather_newest_first(FREELANCER_REVIEWS_QUERY, (freelancer_id,))
+
+    # Admin queries
+    def get_admin_stats(self) -> Optional[Tuple]:
+        """Get platform totals; user counts come from one shard, the rest are summed"""
+        results = self._gather("get_admin_stats")
+        if results is None:
+            return None
+        users = results[0][:4]
+        totals = tuple(sum(row[i] for row in results) for i in range(4, 7))
+        return users + totals
@@ -3,13 +3,143 @@ SkillLink - Freelancer Marketplace GUI Application
 Main application file with tabbed interface
 """
 
+import queue
+from collections import OrderedDict
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 from database import DatabaseConnection
-from config import DB_CONFIG
+from sharding import ShardedDatabaseConnection
+from rows import (FreelancerRows, ProjectRows, ProjectMatchRows, ContractRows, ProposalRows, SkillSearchRows, SkillRows,
+                  AtRiskContractRows, format_cents)
+from snapshot import LocalSnapshot, SNAPSHOT_VIEWS
+from related_skills import RelatedSkills
+from analytics import Analytics
+from config import (DB_CONFIG, DB_REPLICAS, DB_SHARDS, REPLICA_MAX_LAG_SECONDS,
+                    STATEMENT_TIMEOUTS_MS, STATEMENT_TIMEOUT_DEFAULT_MS,
+                    SNAPSHOT_PATH, SNAPSHOT_SYNC_SECONDS, PROJECT_PAGE_SIZE, COVER_LETTER_CACHE_SIZE,
+                    RELATED_SKILLS_TOP_N, RELATED_SKILLS_SYNC_SECONDS, RELATED_SKILLS_WIDEN,
+                    ANALYTICS_CACHE_PATH, ANALYTICS_BATCH_ROWS, ANALYTICS_REFRESH_SECONDS)
 from typing import Optional
 
 
+# Which export (see database.EXPORT_QUERIES) File -> Export writes for each tab
+TAB_EXPORTS = {
+    "Freelancers": "freelancers",
+    "Projects": "projects",
+    "Proposals": "proposals",
+    "Contracts": "contracts",
+    "Search": "freelancer_skills",
+    "Client Dashboard": "projects",
+    "Admin Panel": "users",
+    "Analytics": "payments",
+}
+
+
+def format_age(seconds: float) -> str:
+    """A rough age such as '5 min' or '3 h' for the staleness indicator"""
+    if seconds < 60:
+        return "<1 min"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min"
+    if seconds < 2 * 86400:
+        return f"{int(seconds // 3600)} h"
+    return f"{int(seconds // 86400)} days"
+
+
+def dollars_to_cents(text: str) -> Optional[int]:
+    """A dollar amount typed by the user in cents, None if left empty"""
+    text = text.strip().lstrip("$")
+    return int(Decimal(text) * 100) if text else None
+
+
+def format_bid_summary(summary) -> str:
+    """One line describing a project's bids from get_bid_analytics"""
+    bid_count, min_bid, median_bid, p90_bid, max_bid, budget_min, budget_max = summary
+    budget = f"Budget {format_cents(budget_min)} - {format_cents(budget_max)}"
+    if not bid_count:
+        return f"{budget} · no bids yet"
+    return (f"{budget} · {bid_count} bid(s): min {format_cents(min_bid)}, "
+            f"median {format_cents(round(median_bid))}, p90 {format_cents(round(p90_bid))}, "
+            f"max {format_cents(max_bid)}")
+
+
+def is_connected(db) -> bool:
+    """Whether a DatabaseConnection (or sharded one) has an open connection"""
+    return db.connection is not None and not db.connection.closed
+
+
+class BackgroundQueries:
+    """Runs the app's list and search queries off the Tk thread on their own connection
+
+    Every query belongs to a view (e.g. "search"). A new query for a view
+    supersedes the previous one: if that one is still running it is cancelled
+    on the server, and its result is dropped either way. Queries run one at a
+    time in submission order.
+    """
+
+    def __init__(self, root, db, on_state):
+        """on_state is called on the Tk thread with the running query's label, or None when idle"""
+        self.root = root
+        self.db = db
+        self.on_state = on_state
+        self._lock = threading.Lock()
+        self._generations = {}  # view -> number of its latest submission
+        self._running = None    # view whose query is on the connection right now
+        self._pending = 0
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, view, label, fetch, on_done):
+        """Run fetch(db) in the background, then on_done(result) on the Tk thread unless superseded"""
+        with self._lock:
+            generation = self._generations.get(view, 0) + 1
+            self._generations[view] = generation
+            self._pending += 1
+            if self._running == view:
+                self.db.cancel()
+        self._jobs.put((view, generation, fetch, on_done))
+        self.root.after(0, self.on_state, label)
+
+    def cancel_all(self):
+        """Cancel the running query and drop the results of all submitted ones"""
+        with self._lock:
+            for view in self._generations:
+                self._generations[view] += 1
+            if self._running is not None:
+                self.db.cancel()
+
+    def _worker(self):
+        """Execute submitted queries one by one"""
+        while True:
+            view, generation, fetch, on_done = self._jobs.get()
+            with self._lock:
+                current = self._generations[view] == generation
+                self._running = view if current else None
+            result = None
+            if current:
+                try:
+                    result = fetch(self.db)
+                except Exception as e:
+                    print(f"Error running {view} query: {e}")
+            with self._lock:
+                self._running = None
+                self._pending -= 1
+                deliver = current and self._generations[view] == generation
+                idle = self._pending == 0
+            self.root.after(0, self._finish, on_done if deliver else None, result, idle)
+
+    def _finish(self, on_done, result, idle):
+        """Deliver a result on the Tk thread"""
+        if on_done:
+            on_done(result)
+        if idle:
+            self.on_state(None)
+
+
 class SkillLinkApp:
     """Main application class for SkillLink GUI"""
 
@@ -19,28 +149,84 @@ class SkillLinkApp:
         self.root.geometry("1200x700")
 
         # Database connection
-        self.db = DatabaseConnection(
-            host=DB_CONFIG['host'],
-            database=DB_CONFIG['database'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
-        )
-
-        # Try to connect to database FIRST
-        if not self.db.connect():
-            messagebox.showerror("Database Error",
-                                 "Failed to connect to database.\n"
-                                 "Please check your connection settings.")
-            self.root.quit()
-            return
+        if DB_SHARDS:
+            self.db = ShardedDatabaseConnection(DB_SHARDS, statement_timeouts=STATEMENT_TIMEOUTS_MS,
+                                                default_statement_timeout=STATEMENT_TIMEOUT_DEFAULT_MS)
+        else:
+            self.db = DatabaseConnection(
+                host=DB_CONFIG['host'],
+                database=DB_CONFIG['database'],
+                user=DB_CONFIG['user'],
+                password=DB_CONFIG['password'],
+                replicas=DB_REPLICAS,
+                max_replica_lag=REPLICA_MAX_LAG_SECONDS,
+                statement_timeouts=STATEMENT_TIMEOUTS_MS,
+                default_statement_timeout=STATEMENT_TIMEOUT_DEFAULT_MS
+            )
+
+        # Lists and searches run in the background on a second connection so
+        # they can be cancelled without blocking the UI
+        self.query_db = self.create_connection()
+        self.queries = BackgroundQueries(self.root, self.query_db, self.show_query_state)
+
+        # The lists are shown from the local snapshot straight away and reconciled
+        # with PostgreSQL once connected (not in sharded mode)
+        self.snapshot = LocalSnapshot.open(SNAPSHOT_PATH) if SNAPSHOT_PATH and not DB_SHARDS else None
+        self.live_views = {}  # view -> True once reconciled with PostgreSQL
+
+        # Full cover letters opened this session, least recently used first
+        self.cover_letters = OrderedDict()
+
+        # Related skills of every skill, kept in memory for the Search tab
+        self.related_skills = RelatedSkills(RELATED_SKILLS_TOP_N)
+
+        # Columnar payment and proposal history for the Analytics tab, read from
+        # the local cache at first and then refreshed incrementally
+        self.analytics = Analytics(ANALYTICS_CACHE_PATH, ANALYTICS_BATCH_ROWS)
+        self.db_state = "connecting"
+
+        # Connect in the background, as the first queued job, so the window
+        # doesn't wait on the network
+        self.queries.submit("connect", "Connecting to database", self.connect_databases, self.on_connected)
 
-        # Initialize UI after successful connection
         self.setup_ui()
 
+    def connect_databases(self, query_db):
+        """Background job: open the main and query connections if they aren't open"""
+        return all(is_connected(db) or db.connect() for db in (self.db, query_db))
+
+    def on_connected(self, connected):
+        """Finish the background connect; without a snapshot to fall back on, a failure is fatal"""
+        if connected:
+            self.db_state = "online"
+        else:
+            self.db_state = "offline"
+            has_snapshot = self.snapshot and any(self.snapshot.synced_at(view) for view in SNAPSHOT_VIEWS)
+            if not has_snapshot:
+                messagebox.showerror("Database Error",
+                                     "Failed to connect to database.\n"
+                                     "Please check your connection settings.")
+                self.root.destroy()
+                return
+        self.update_freshness()
+
+    def create_connection(self):
+        """Build an unconnected connection with the current settings"""
+        if DB_SHARDS:
+            return ShardedDatabaseConnection(DB_SHARDS, statement_timeouts=self.db.statement_timeouts,
+                                             default_statement_timeout=self.db.default_statement_timeout)
+        return DatabaseConnection(host=self.db.host, database=self.db.database,
+                                  user=self.db.user, password=self.db.password, port=self.db.port,
+                                  replicas=[replica.params for replica in self.db.replicas],
+                                  max_replica_lag=self.db.max_replica_lag,
+                                  statement_timeouts=self.db.statement_timeouts,
+                                  default_statement_timeout=self.db.default_statement_timeout)
+
     def setup_ui(self):
         """Setup main UI components"""
         # Create menu bar
         self.create_menu()
+        self.create_status_bar()
 
         # Create main container with tabs
         self.notebook = ttk.Notebook(self.root)
@@ -54,6 +240,7 @@ class SkillLinkApp:
         self.create_search_tab()
         self.create_client_dashboard_tab()
         self.create_admin_panel_tab()
+        self.create_analytics_tab()
 
     def create_menu(self):
         """Create application menu bar"""
@@ -64,6 +251,7 @@ class SkillLinkApp:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Refresh All", command=self.refresh_all_tabs)
+        file_menu.add_command(label="Export Current Tab...", command=self.export_current_tab)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.on_closing)
 
@@ -78,6 +266,71 @@ class SkillLinkApp:
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
 
+    def create_status_bar(self):
+        """Create the status bar showing the running query, with its Cancel button"""
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=(0, 5))
+
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(status_frame, textvariable=self.status_var).pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", state=tk.DISABLED,
+                                        command=self.cancel_queries)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.root.bind("<Escape>", lambda event: self.cancel_queries())
+
+        # Whether the lists are live or from the offline snapshot, and how old
+        self.freshness_var = tk.StringVar()
+        self.freshness_label = ttk.Label(status_frame, textvariable=self.freshness_var)
+        self.freshness_label.pack(side=tk.RIGHT, padx=10)
+        if self.snapshot:
+            self.root.after(SNAPSHOT_SYNC_SECONDS * 1000, self.sync_snapshot)
+
+    def update_freshness(self):
+        """Show whether the listed data is live or from the snapshot, and its age"""
+        if self.snapshot is None:
+            return
+        stale = [view for view, live in self.live_views.items() if not live]
+        if not stale:
+            self.freshness_var.set("Live data")
+            self.freshness_label.config(foreground="dark green")
+            return
+        synced = [self.snapshot.synced_at(view) for view in stale]
+        state = "Offline" if self.db_state == "offline" else "Syncing"
+        if not any(synced):
+            self.freshness_var.set(f"{state}: no snapshot yet")
+        else:
+            age = format_age(time.time() - min(t for t in synced if t))
+            self.freshness_var.set(f"{state}: {', '.join(stale)} from snapshot, up to {age} old")
+        self.freshness_label.config(foreground="dark orange" if state == "Syncing" else "red")
+
+    def sync_snapshot(self):
+        """Periodically reconcile the snapshot lists (cheap when nothing changed), reconnecting if offline"""
+        if self.db_state == "offline":
+            self.db_state = "connecting"
+            self.queries.submit("connect", "Reconnecting to database",
+                                self.connect_databases, self.on_connected)
+        self.load_freelancers()
+        if not self.project_filters:
+            self.load_projects()
+        self.load_contracts()
+        self.load_skills()
+        self.update_freshness()
+        self.root.after(SNAPSHOT_SYNC_SECONDS * 1000, self.sync_snapshot)
+
+    def show_query_state(self, label):
+        """Show the running background query, or Ready when there is none"""
+        if label:
+            self.status_var.set(f"{label}...")
+            self.cancel_button.config(state=tk.NORMAL)
+        else:
+            self.status_var.set("Ready")
+            self.cancel_button.config(state=tk.DISABLED)
+
+    def cancel_queries(self):
+        """Cancel the running background queries"""
+        self.queries.cancel_all()
+        self.status_var.set("Cancelling...")
+
     def create_freelancers_tab(self):
         """Create tab for browsing freelancers"""
         frame = ttk.Frame(self.notebook)
@@ -99,7 +352,8 @@ class SkillLinkApp:
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
 
         self.freelancers_tree = ttk.Treeview(tree_frame,
-                                             columns=("ID", "Username", "Headline", "Rate/Hour", "Rating"),
+                                             columns=("ID", "Username", "Headline", "Rate/Hour", "Rating",
+                                                      "Reputation", "Skills", "Reviews", "Completed", "Earned"),
                                              show="headings",
                                              yscrollcommand=vsb.set,
                                              xscrollcommand=hsb.set)
@@ -113,12 +367,22 @@ class SkillLinkApp:
         self.freelancers_tree.heading("Headline", text="Headline")
         self.freelancers_tree.heading("Rate/Hour", text="Rate/Hour ($)")
         self.freelancers_tree.heading("Rating", text="Avg Rating")
+        self.freelancers_tree.heading("Reputation", text="Reputation")
+        self.freelancers_tree.heading("Skills", text="Skills")
+        self.freelancers_tree.heading("Reviews", text="Reviews")
+        self.freelancers_tree.heading("Completed", text="Completed Contracts")
+        self.freelancers_tree.heading("Earned", text="Earned")
 
         self.freelancers_tree.column("ID", width=50)
         self.freelancers_tree.column("Username", width=150)
         self.freelancers_tree.column("Headline", width=300)
         self.freelancers_tree.column("Rate/Hour", width=100)
         self.freelancers_tree.column("Rating", width=100)
+        self.freelancers_tree.column("Reputation", width=100)
+        self.freelancers_tree.column("Skills", width=250)
+        self.freelancers_tree.column("Reviews", width=70)
+        self.freelancers_tree.column("Completed", width=130)
+        self.freelancers_tree.column("Earned", width=100)
 
         # Pack treeview and scrollbars
         self.freelancers_tree.grid(row=0, column=0, sticky="nsew")
@@ -153,6 +417,41 @@ class SkillLinkApp:
         ttk.Label(control_frame, text="Projects", font=("Arial", 14, "bold")).pack(side=tk.LEFT)
         ttk.Button(control_frame, text="Refresh", command=self.load_projects).pack(side=tk.RIGHT, padx=5)
 
+        # Full-text search of titles and descriptions (search_projects_text_page)
+        ttk.Button(control_frame, text="Search",
+                   command=self.apply_project_filters).pack(side=tk.RIGHT, padx=5)
+        self.project_search_entry = ttk.Entry(control_frame, width=40)
+        self.project_search_entry.pack(side=tk.RIGHT)
+        self.project_search_entry.bind("<Return>", lambda event: self.apply_project_filters())
+        ttk.Label(control_frame, text="Search:").pack(side=tk.RIGHT, padx=5)
+
+        # Budget range and deadline filters (search_projects_page)
+        filter_frame = ttk.LabelFrame(frame, text="Filter", padding=5)
+        filter_frame.pack(fill=tk.X, padx=5)
+
+        ttk.Label(filter_frame, text="Budget ($) from:").pack(side=tk.LEFT)
+        self.project_budget_min = ttk.Entry(filter_frame, width=10)
+        self.project_budget_min.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="to:").pack(side=tk.LEFT)
+        self.project_budget_max = ttk.Entry(filter_frame, width=10)
+        self.project_budget_max.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="Due within (days):").pack(side=tk.LEFT, padx=(15, 0))
+        self.project_due_days = ttk.Entry(filter_frame, width=6)
+        self.project_due_days.pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(filter_frame, text="Apply",
+                   command=self.apply_project_filters).pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Clear",
+                   command=self.clear_project_filters).pack(side=tk.LEFT)
+        self.projects_more_button = ttk.Button(filter_frame, text="More", state=tk.DISABLED,
+                                               command=self.load_more_projects)
+        self.projects_more_button.pack(side=tk.RIGHT, padx=5)
+
+        # (search text, budget_min_cents, budget_max_cents, deadline_from, deadline_to)
+        # while searching or filtering
+        self.project_filters = None
+        self.projects_after = None
+
         # Treeview for displaying projects
         tree_frame = ttk.Frame(frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -161,7 +460,8 @@ class SkillLinkApp:
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
 
         self.projects_tree = ttk.Treeview(tree_frame,
-                                          columns=("ID", "Title", "Min Budget", "Max Budget", "Deadline"),
+                                          columns=("ID", "Title", "Min Budget", "Max Budget", "Deadline",
+                                                   "Match"),
                                           show="headings",
                                           yscrollcommand=vsb.set,
                                           xscrollcommand=hsb.set)
@@ -175,12 +475,14 @@ class SkillLinkApp:
         self.projects_tree.heading("Min Budget", text="Min Budget ($)")
         self.projects_tree.heading("Max Budget", text="Max Budget ($)")
         self.projects_tree.heading("Deadline", text="Deadline")
+        self.projects_tree.heading("Match", text="Matching Text")
 
         self.projects_tree.column("ID", width=50)
         self.projects_tree.column("Title", width=300)
         self.projects_tree.column("Min Budget", width=120)
         self.projects_tree.column("Max Budget", width=120)
         self.projects_tree.column("Deadline", width=120)
+        self.projects_tree.column("Match", width=400)
 
         self.projects_tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -226,7 +528,8 @@ class SkillLinkApp:
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
 
         self.proposals_tree = ttk.Treeview(tree_frame,
-                                           columns=("Freelancer", "Bid Amount", "Status", "Cover Letter"),
+                                           columns=("Freelancer", "Bid Amount", "Status", "Cover Letter",
+                                                    "Length"),
                                            show="headings",
                                            yscrollcommand=vsb.set,
                                            xscrollcommand=hsb.set)
@@ -238,11 +541,13 @@ class SkillLinkApp:
         self.proposals_tree.heading("Bid Amount", text="Bid Amount ($)")
         self.proposals_tree.heading("Status", text="Status")
         self.proposals_tree.heading("Cover Letter", text="Cover Letter")
+        self.proposals_tree.heading("Length", text="Length (chars)")
 
         self.proposals_tree.column("Freelancer", width=150)
         self.proposals_tree.column("Bid Amount", width=120)
         self.proposals_tree.column("Status", width=100)
         self.proposals_tree.column("Cover Letter", width=400)
+        self.proposals_tree.column("Length", width=100)
 
         self.proposals_tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -251,6 +556,9 @@ class SkillLinkApp:
         tree_frame.grid_rowconfigure(0, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
 
+        # Bind double-click to show the full cover letter
+        self.proposals_tree.bind("<Double-1>", self.show_cover_letter)
+
     def create_contracts_tab(self):
         """Create tab for viewing contracts"""
         frame = ttk.Frame(self.notebook)
@@ -272,7 +580,7 @@ class SkillLinkApp:
 
         self.contracts_tree = ttk.Treeview(tree_frame,
                                            columns=("Contract ID", "Client ID", "Freelancer ID",
-                                                    "Total Amount", "Status"),
+                                                    "Total Amount", "Paid", "Remaining", "Status"),
                                            show="headings",
                                            yscrollcommand=vsb.set,
                                            xscrollcommand=hsb.set)
@@ -284,12 +592,16 @@ class SkillLinkApp:
         self.contracts_tree.heading("Client ID", text="Client ID")
         self.contracts_tree.heading("Freelancer ID", text="Freelancer ID")
         self.contracts_tree.heading("Total Amount", text="Total Amount ($)")
+        self.contracts_tree.heading("Paid", text="Paid ($)")
+        self.contracts_tree.heading("Remaining", text="Remaining ($)")
         self.contracts_tree.heading("Status", text="Status")
 
         self.contracts_tree.column("Contract ID", width=100)
         self.contracts_tree.column("Client ID", width=100)
         self.contracts_tree.column("Freelancer ID", width=120)
         self.contracts_tree.column("Total Amount", width=120)
+        self.contracts_tree.column("Paid", width=120)
+        self.contracts_tree.column("Remaining", width=120)
         self.contracts_tree.column("Status", width=100)
 
         self.contracts_tree.grid(row=0, column=0, sticky="nsew")
@@ -302,6 +614,28 @@ class SkillLinkApp:
         # Bind double-click to show milestones
         self.contracts_tree.bind("<Double-1>", self.show_contract_milestones)
 
+        # Contracts with overdue or soon-due milestones, flagged by jobs/sweep_milestones.py
+        at_risk_frame = ttk.LabelFrame(frame, text="At-Risk Contracts", padding=5)
+        at_risk_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.at_risk_var = tk.StringVar()
+        ttk.Label(at_risk_frame, textvariable=self.at_risk_var).pack(anchor=tk.W)
+
+        self.at_risk_tree = ttk.Treeview(at_risk_frame,
+                                         columns=("Contract ID", "Client ID", "Freelancer ID",
+                                                  "Overdue", "Due Soon", "Next Due", "At Risk"),
+                                         show="headings", height=5)
+        for column, heading, width in (("Contract ID", "Contract ID", 100), ("Client ID", "Client ID", 100),
+                                       ("Freelancer ID", "Freelancer ID", 120),
+                                       ("Overdue", "Overdue Milestones", 130),
+                                       ("Due Soon", "Due Soon", 100), ("Next Due", "Next Due", 110),
+                                       ("At Risk", "Amount at Risk ($)", 140)):
+            self.at_risk_tree.heading(column, text=heading)
+            self.at_risk_tree.column(column, width=width)
+        self.at_risk_tree.tag_configure("overdue", foreground="red")
+        self.at_risk_tree.pack(fill=tk.X)
+        self.at_risk_tree.bind("<Double-1>", self.show_contract_milestones)
+
         # Milestones section
         milestones_frame = ttk.LabelFrame(frame, text="Contract Milestones", padding=10)
         milestones_frame.pack(fill=tk.BOTH, padx=5, pady=5)
@@ -322,11 +656,24 @@ class SkillLinkApp:
         search_frame.pack(fill=tk.X, padx=5, pady=5)
 
         ttk.Label(search_frame, text="Skill Name:").grid(row=0, column=0, padx=5, pady=5)
-        self.search_skill_entry = ttk.Entry(search_frame, width=30)
+        self.search_skill_entry = ttk.Combobox(search_frame, width=30)
         self.search_skill_entry.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Button(search_frame, text="Search",
                    command=self.search_by_skill).grid(row=0, column=2, padx=5, pady=5)
+        self.search_skill_entry.bind("<<ComboboxSelected>>",
+                                     lambda event: self.show_related_skills(self.search_skill_entry.get()))
+        self.search_skill_entry.bind("<Return>", lambda event: self.search_by_skill())
+
+        # Skills often listed together with the searched one; a click searches that skill
+        ttk.Label(search_frame, text="Related:").grid(row=1, column=0, padx=5, pady=5)
+        self.related_skills_frame = ttk.Frame(search_frame)
+        self.related_skills_frame.grid(row=1, column=1, columnspan=3, sticky="w", padx=5, pady=5)
+
+        # Set when a search with no results was widened to related skills
+        self.search_note_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_note_var,
+                  foreground="dark orange").grid(row=2, column=0, columnspan=4, sticky="w", padx=5)
 
         # Results treeview
         tree_frame = ttk.Frame(frame)
@@ -336,7 +683,7 @@ class SkillLinkApp:
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
 
         self.search_tree = ttk.Treeview(tree_frame,
-                                        columns=("Username", "Skill", "Proficiency", "Rating"),
+                                        columns=("Username", "Skill", "Proficiency", "Rating", "Reputation"),
                                         show="headings",
                                         yscrollcommand=vsb.set,
                                         xscrollcommand=hsb.set)
@@ -348,11 +695,13 @@ class SkillLinkApp:
         self.search_tree.heading("Skill", text="Skill")
         self.search_tree.heading("Proficiency", text="Proficiency Level")
         self.search_tree.heading("Rating", text="Avg Rating")
+        self.search_tree.heading("Reputation", text="Reputation")
 
         self.search_tree.column("Username", width=200)
         self.search_tree.column("Skill", width=200)
         self.search_tree.column("Proficiency", width=150)
         self.search_tree.column("Rating", width=120)
+        self.search_tree.column("Reputation", width=120)
 
         self.search_tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -361,6 +710,10 @@ class SkillLinkApp:
         tree_frame.grid_rowconfigure(0, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
 
+        # Load skill suggestions and related skills
+        self.load_skills()
+        self.sync_related_skills()
+
     def create_client_dashboard_tab(self):
         """Create tab for client dashboard"""
         frame = ttk.Frame(self.notebook)
@@ -481,43 +834,233 @@ class SkillLinkApp:
         ttk.Button(actions_frame, text="Unblock Selected User",
                    command=self.admin_unblock_user).pack(side=tk.LEFT, padx=5)
 
+    def create_analytics_tab(self):
+        """Create tab for revenue and marketplace trends"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="Analytics")
+        self.analytics_tab = frame
+
+        controls = ttk.Frame(frame)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(controls, text="Refresh",
+                   command=self.refresh_analytics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Full Reload",
+                   command=lambda: self.refresh_analytics(full=True)).pack(side=tk.LEFT, padx=5)
+        self.analytics_var = tk.StringVar(value="Not loaded yet")
+        ttk.Label(controls, textvariable=self.analytics_var).pack(side=tk.LEFT, padx=10)
+
+        panes = ttk.Frame(frame)
+        panes.pack(fill=tk.BOTH, expand=True)
+        panes.grid_rowconfigure(0, weight=1)
+        panes.grid_rowconfigure(1, weight=1)
+        panes.grid_columnconfigure(0, weight=1)
+        panes.grid_columnconfigure(1, weight=1)
+
+        self.gmv_tree = self.create_analytics_tree(
+            panes, "GMV per Week", (("Week", "Week of", 110), ("GMV", "Released", 120), ("Payments", "Payments", 90)),
+            row=0, column=0)
+
+        self.proposal_trend_tree = self.create_analytics_tree(
+            panes, "Proposals per Month",
+            (("Month", "Month", 90), ("Proposals", "Proposals", 90), ("Projects", "Projects", 80),
+             ("PerProject", "Per Project", 90), ("Accepted", "Accepted", 80)),
+            row=0, column=1)
+
+        self.skill_acceptance_tree = self.create_analytics_tree(
+            panes, "Acceptance Rate by Skill",
+            (("Skill", "Skill", 200), ("Decided", "Decided", 90), ("Accepted", "Accepted", 90),
+             ("Rate", "Acceptance", 90)),
+            row=1, column=0, columnspan=2)
+
+        # Show the cached extracts at once; they are refreshed whenever the tab is opened
+        self.queries.submit("analytics_cache", "Loading analytics cache",
+                            lambda db: self.analytics.load_cache() and self.analytics_aggregates(),
+                            self.show_analytics)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_analytics_selected, add="+")
+        self.root.after(ANALYTICS_REFRESH_SECONDS * 1000, self.sync_analytics)
+
+    def create_analytics_tree(self, parent, title, columns, **grid):
+        """A scrolled Treeview of the given (column, heading, width) columns in a titled
+        frame, gridded into parent"""
+        section = ttk.LabelFrame(parent, text=title, padding=5)
+        section.grid(sticky="nsew", padx=5, pady=5, **grid)
+        tree_frame = ttk.Frame(section)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
+        tree = ttk.Treeview(tree_frame, columns=[column for column, _, _ in columns],
+                            show="headings", yscrollcommand=vsb.set)
+        vsb.config(command=tree.yview)
+        for column, heading, width in columns:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column in ("Week", "Month", "Skill") else tk.E)
+
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
     # Data loading methods
+    def load_view(self, view, label, row_class, fetch, show, redraw=False):
+        """Load a list in the background and pass it to show() as row_class
+
+        With a local snapshot the first load shows the snapshot at once, then
+        the snapshot is reconciled with PostgreSQL and show() runs again only
+        if something changed. redraw shows the snapshot again first, e.g. after
+        the list was replaced. Without a snapshot the list is simply queried.
+        """
+        if self.snapshot is None:
+            self.queries.submit(view, label,
+                                lambda db: row_class.from_result(fetch(db), format_now=True)
+                                if is_connected(db) else None,
+                                show)
+            return
+
+        if view not in self.live_views or redraw:
+            self.live_views.setdefault(view, False)
+            cached = self.snapshot.rows(view)
+            if cached is not None:
+                show(row_class.from_result(cached, format_now=True))
+            self.update_freshness()
+
+        def reconcile(db):
+            if not is_connected(db):
+                return False, None
+            changed = self.snapshot.sync(db, view)
+            if changed is None:
+                # e.g. a database without the change tracking columns: query it directly
+                rows = fetch(db)
+                return rows is not None, row_class.from_result(rows, format_now=True)
+            if not changed:
+                return True, None
+            return True, row_class.from_result(self.snapshot.rows(view), format_now=True)
+
+        def reconciled(result):
+            live, rows = result or (False, None)
+            if rows is not None:
+                show(rows)
+            self.live_views[view] = live
+            if not live and not is_connected(self.query_db):
+                self.db_state = "offline"
+            self.update_freshness()
+
+        self.queries.submit(view, label, reconcile, reconciled)
+
     def load_freelancers(self):
         """Load and display all freelancers"""
+        self.load_view("freelancers", "Loading freelancers", FreelancerRows,
+                       lambda db: db.get_all_freelancers(), self.show_freelancers)
+
+    def show_freelancers(self, freelancers):
+        """Display loaded freelancers"""
         # Clear existing data
         for item in self.freelancers_tree.get_children():
             self.freelancers_tree.delete(item)
 
-        # Fetch data
-        freelancers = self.db.get_all_freelancers()
         if freelancers:
-            for freelancer in freelancers:
-                user_id, username, headline, rate, rating = freelancer
-                # Convert cents to dollars
-                rate_dollars = rate / 100 if rate else 0
-                self.freelancers_tree.insert("", tk.END,
-                                             values=(user_id, username, headline,
-                                                     f"${rate_dollars:.2f}", f"{rating:.2f}"))
+            for index in range(len(freelancers)):
+                self.freelancers_tree.insert("", tk.END, values=freelancers.display(index))
 
     def load_projects(self):
-        """Load and display all projects"""
+        """Load and display all projects, or the first page matching the filters"""
+        if self.project_filters:
+            self.projects_after = None
+            self.search_projects()
+        else:
+            self.load_view("projects", "Loading projects", ProjectRows,
+                           lambda db: db.get_all_projects(), self.show_projects)
+
+    def apply_project_filters(self):
+        """Search and filter projects by the text, budget range and deadline entered"""
+        text = self.project_search_entry.get().strip()
+        try:
+            budget_min = dollars_to_cents(self.project_budget_min.get())
+            budget_max = dollars_to_cents(self.project_budget_max.get())
+            days = self.project_due_days.get().strip()
+            days = int(days) if days else None
+        except (ValueError, InvalidOperation):
+            messagebox.showerror("Invalid Input",
+                                 "Budgets must be dollar amounts and the due time a number of days")
+            return
+
+        if budget_min is not None and budget_max is not None and budget_min > budget_max:
+            messagebox.showerror("Invalid Input", "The budget range is reversed")
+            return
+        if days is not None and days < 0:
+            messagebox.showerror("Invalid Input", "Due within must not be negative")
+            return
+
+        today = date.today()
+        filters = (text or None, budget_min, budget_max,
+                   today if days is not None else None,
+                   today + timedelta(days=days) if days is not None else None)
+        if any(value is not None for value in filters):
+            self.project_filters = filters
+            self.load_projects()
+        else:
+            self.clear_project_filters()
+
+    def clear_project_filters(self):
+        """Show all projects again"""
+        for entry in (self.project_search_entry, self.project_budget_min, self.project_budget_max,
+                      self.project_due_days):
+            entry.delete(0, tk.END)
+        self.project_filters = None
+        self.projects_more_button.config(state=tk.DISABLED)
+        self.load_view("projects", "Loading projects", ProjectRows,
+                       lambda db: db.get_all_projects(), self.show_projects, redraw=True)
+
+    def load_more_projects(self):
+        """Append the next page of filtered projects"""
+        if self.project_filters and self.projects_after:
+            self.search_projects()
+
+    def search_projects(self):
+        """Fetch the page of searched / filtered projects after self.projects_after"""
+        (text, *filters), after = self.project_filters, self.projects_after
+        self.projects_more_button.config(state=tk.DISABLED)
+        if text:
+            fetch = lambda db: ProjectMatchRows.from_result(
+                db.search_projects_text_page(text, PROJECT_PAGE_SIZE, *filters, after=after),
+                format_now=True)
+        else:
+            fetch = lambda db: ProjectRows.from_result(
+                db.search_projects_page(PROJECT_PAGE_SIZE, *filters, after=after),
+                format_now=True)
+        self.queries.submit("projects", f"Searching projects for '{text}'" if text else "Filtering projects",
+                            fetch, lambda projects: self.show_project_page(after is None, projects))
+
+    def show_project_page(self, first, projects):
+        """Display a page of filtered projects, replacing the list for the first page"""
+        if projects is None:
+            messagebox.showerror("Error", "Searching projects failed or timed out")
+            return
+        if first:
+            self.show_projects(projects)
+            if not projects:
+                messagebox.showinfo("No Results", "No projects match the search and filters")
+        else:
+            for index in range(len(projects)):
+                self.projects_tree.insert("", tk.END, values=projects.display(index))
+
+        if len(projects) == PROJECT_PAGE_SIZE:
+            last = projects[-1]
+            if isinstance(projects, ProjectMatchRows):
+                self.projects_after = (last.rank, last.project_id)
+            else:
+                self.projects_after = (last.deadline or "infinity", last.project_id)
+            self.projects_more_button.config(state=tk.NORMAL)
+        else:
+            self.projects_after = None
+
+    def show_projects(self, projects):
+        """Display loaded projects"""
         # Clear existing data
         for item in self.projects_tree.get_children():
             self.projects_tree.delete(item)
 
-        # Fetch data
-        projects = self.db.get_all_projects()
         if projects:
-            for project in projects:
-                proj_id, title, min_budget, max_budget, deadline = project
-                # Convert cents to dollars
-                min_dollars = min_budget / 100 if min_budget else 0
-                max_dollars = max_budget / 100 if max_budget else 0
-                self.projects_tree.insert("", tk.END,
-                                          values=(proj_id, title,
-                                                  f"${min_dollars:.2f}",
-                                                  f"${max_dollars:.2f}",
-                                                  deadline))
+            for index in range(len(projects)):
+                self.projects_tree.insert("", tk.END, values=projects.display(index))
 
     def load_proposals_by_project(self):
         """Load proposals for a specific project"""
@@ -533,57 +1076,188 @@ class SkillLinkApp:
             messagebox.showerror("Invalid Input", "Project ID must be a number")
             return
 
+        self.queries.submit("proposals", f"Loading proposals for project {project_id}",
+                            lambda db: ProposalRows.from_result(db.get_proposals_by_project(project_id),
+                                                                format_now=True),
+                            lambda proposals: self.show_proposals(project_id, proposals))
+
+    def show_proposals(self, project_id, proposals):
+        """Display loaded proposals of a project"""
         # Clear existing data
         for item in self.proposals_tree.get_children():
             self.proposals_tree.delete(item)
 
-        # Fetch data
-        proposals = self.db.get_proposals_by_project(project_id)
-        if proposals:
-            for proposal in proposals:
-                username, bid_amount, status, cover_letter = proposal
-                bid_dollars = bid_amount / 100 if bid_amount else 0
-                self.proposals_tree.insert("", tk.END,
-                                           values=(username, f"${bid_dollars:.2f}",
-                                                   status, cover_letter))
+        if proposals is None:
+            messagebox.showerror("Error", f"Loading proposals for project {project_id} failed or timed out")
+        elif proposals:
+            for index, proposal_id in enumerate(proposals.column("proposal_id")):
+                # the id is the row's iid, not a visible column
+                self.proposals_tree.insert("", tk.END, iid=proposal_id,
+                                           values=proposals.display(index)[1:])
         else:
             messagebox.showinfo("No Results", f"No proposals found for project ID {project_id}")
 
     def load_contracts(self):
-        """Load and display active contracts"""
+        """Load and display active contracts and the at-risk summary"""
+        self.load_view("contracts", "Loading contracts", ContractRows,
+                       lambda db: db.get_active_contracts(), self.show_contracts)
+        self.queries.submit("at_risk", "Loading at-risk contracts",
+                            lambda db: (AtRiskContractRows.from_result(db.get_at_risk_contracts(),
+                                                                       format_now=True),
+                                        db.get_last_milestone_sweep())
+                            if is_connected(db) else None,
+                            self.show_at_risk_contracts)
+
+    def show_at_risk_contracts(self, result):
+        """Display the contracts flagged by the last milestone sweep"""
+        if result is None:
+            return
+        contracts, last_sweep = result
+
+        for item in self.at_risk_tree.get_children():
+            self.at_risk_tree.delete(item)
+
+        if contracts:
+            for index, overdue in enumerate(contracts.column("overdue_milestones")):
+                self.at_risk_tree.insert("", tk.END, values=contracts.display(index),
+                                         tags=("overdue",) if overdue else ())
+
+        if last_sweep:
+            as_of, completed_at = last_sweep
+            self.at_risk_var.set(f"{len(contracts or ())} contract(s) with overdue or soon-due milestones "
+                                 f"as of {as_of} (swept {completed_at:%Y-%m-%d %H:%M})")
+        else:
+            self.at_risk_var.set("No milestone sweep has run yet (jobs/sweep_milestones.py)")
+
+    def show_contracts(self, contracts):
+        """Display loaded contracts"""
         # Clear existing data
         for item in self.contracts_tree.get_children():
             self.contracts_tree.delete(item)
 
-        # Fetch data
-        contracts = self.db.get_active_contracts()
         if contracts:
-            for contract in contracts:
-                contract_id, client_id, freelancer_id, total_amount, status = contract
-                amount_dollars = total_amount / 100 if total_amount else 0
-                self.contracts_tree.insert("", tk.END,
-                                           values=(contract_id, client_id, freelancer_id,
-                                                   f"${amount_dollars:.2f}", status))
+            for index in range(len(contracts)):
+                self.contracts_tree.insert("", tk.END, values=contracts.display(index))
+
+    def load_skills(self):
+        """Load the skill names offered by the search box"""
+        self.load_view("skills", "Loading skills", SkillRows,
+                       lambda db: db.get_all_skills(), self.show_skills)
+
+    def show_skills(self, skills):
+        """Offer loaded skills as search suggestions"""
+        if skills:
+            self.search_skill_entry["values"] = list(skills.column("skill_name"))
+
+    def sync_related_skills(self):
+        """Periodically pick up the refreshed related skills (only the changed skills are re-read)"""
+        self.queries.submit("related_skills", "Loading related skills",
+                            lambda db: self.related_skills.sync(db),
+                            lambda synced: self.show_related_skills(self.search_skill_entry.get()))
+        self.root.after(RELATED_SKILLS_SYNC_SECONDS * 1000, self.sync_related_skills)
+
+    def on_analytics_selected(self, event):
+        """Bring the analytics up to date when their tab is opened"""
+        if self.notebook.select() == str(self.analytics_tab):
+            self.refresh_analytics()
+
+    def sync_analytics(self):
+        """Periodically refresh the analytics while their tab is open"""
+        if self.notebook.select() == str(self.analytics_tab):
+            self.refresh_analytics()
+        self.root.after(ANALYTICS_REFRESH_SECONDS * 1000, self.sync_analytics)
+
+    def refresh_analytics(self, full=False):
+        """Read the payments and proposals changed since the last refresh (all of them
+        with full) and recompute the trends, in the background"""
+        def fetch(db):
+            if not is_connected(db):
+                return None
+            read = self.analytics.refresh(db, full)
+            if read is None:
+                return None
+            if read:
+                self.analytics.save_cache()
+            return self.analytics_aggregates()
+
+        self.queries.submit("analytics", "Reloading analytics" if full else "Refreshing analytics",
+                            fetch, self.show_analytics)
+
+    def analytics_aggregates(self):
+        """The trends of the Analytics tab, computed over the in-memory extracts"""
+        start = time.perf_counter()
+        trends = (self.analytics.gmv_by_week(), self.analytics.proposals_by_month(),
+                  self.analytics.acceptance_by_skill())
+        return trends + (len(self.analytics), time.perf_counter() - start)
+
+    def show_analytics(self, aggregates):
+        """Display the analytics trends"""
+        if not aggregates:
+            return
+        gmv, proposals, skills, rows, elapsed = aggregates
+        for tree in (self.gmv_tree, self.proposal_trend_tree, self.skill_acceptance_tree):
+            for item in tree.get_children():
+                tree.delete(item)
+
+        # newest first
+        for week, cents, count in reversed(gmv):
+            self.gmv_tree.insert("", tk.END, values=(week, format_cents(cents), count))
+        for month, count, projects, per_project, accepted in reversed(proposals):
+            self.proposal_trend_tree.insert("", tk.END, values=(f"{month:%Y-%m}", count, projects,
+                                                                f"{per_project:.1f}", accepted))
+        for skill, decided, accepted, rate in skills:
+            self.skill_acceptance_tree.insert("", tk.END, values=(skill, decided, accepted, f"{rate:.1%}"))
+
+        self.analytics_var.set(f"{rows:,} rows, aggregated in {elapsed * 1000:.0f} ms")
+
+    def show_related_skills(self, skill_name):
+        """Show the skills most related to skill_name as buttons"""
+        for button in self.related_skills_frame.winfo_children():
+            button.destroy()
+        for related_name, score in self.related_skills.related(skill_name.strip()):
+            ttk.Button(self.related_skills_frame, text=related_name,
+                       command=lambda name=related_name: self.search_related_skill(name)).pack(side=tk.LEFT, padx=2)
+
+    def search_related_skill(self, skill_name):
+        """Search a skill picked from the related skills"""
+        self.search_skill_entry.set(skill_name)
+        self.search_by_skill()
 
     def search_by_skill(self):
-        """Search freelancers by skill"""
+        """Search freelancers by skill, widening to its closest related skills if nobody has it"""
         skill_name = self.search_skill_entry.get().strip()
 
         if not skill_name:
             messagebox.showwarning("Input Required", "Please enter a skill name")
             return
 
+        self.show_related_skills(skill_name)
+        widen = [name for name, _ in self.related_skills.related(skill_name, RELATED_SKILLS_WIDEN)]
+
+        def fetch(db):
+            results = db.search_freelancers_by_skill(skill_name)
+            if results == [] and widen:
+                return widen, SkillSearchRows.from_result(db.search_freelancers_by_skills(widen), format_now=True)
+            return [], SkillSearchRows.from_result(results, format_now=True)
+
+        self.queries.submit("search", f"Searching for {skill_name}", fetch,
+                            lambda result: self.show_search_results(skill_name, *(result or ([], None))))
+
+    def show_search_results(self, skill_name, widened, results):
+        """Display freelancers found by search_by_skill, noting when the search was widened"""
         # Clear existing data
         for item in self.search_tree.get_children():
             self.search_tree.delete(item)
 
-        # Fetch data
-        results = self.db.search_freelancers_by_skill(skill_name)
-        if results:
-            for result in results:
-                username, skill, proficiency, rating = result
-                self.search_tree.insert("", tk.END,
-                                        values=(username, skill, proficiency, f"{rating:.2f}"))
+        self.search_note_var.set("")
+        if results is None:
+            messagebox.showerror("Error", f"Search for {skill_name} failed or timed out")
+        elif results:
+            if widened:
+                self.search_note_var.set(f"No freelancers found with {skill_name}; "
+                                         f"showing related skills: {', '.join(widened)}")
+            for index in range(len(results)):
+                self.search_tree.insert("", tk.END, values=results.display(index))
         else:
             messagebox.showinfo("No Results", f"No freelancers found with skill: {skill_name}")
 
@@ -596,10 +1270,13 @@ class SkillLinkApp:
 
         item = self.freelancers_tree.item(selection[0])
         user_id = item['values'][0]
+        review_count, completed_contracts = item['values'][7:9]
 
         # Get freelancer details
         details = self.db.get_freelancer_details(user_id)
         skills = self.db.get_freelancer_skills(user_id)
+        earnings = self.db.get_freelancer_earnings(user_id)
+        monthly_earnings = self.db.get_freelancer_monthly_earnings(user_id)
 
         # Clear and update details text
         self.freelancer_details_text.delete(1.0, tk.END)
@@ -613,7 +1290,8 @@ class SkillLinkApp:
             details_str += f"Headline: {headline}\n"
             details_str += f"Bio: {bio}\n"
             details_str += f"Rate per Hour: ${rate_dollars:.2f}\n"
-            details_str += f"Average Rating: {rating:.2f}\n\n"
+            details_str += f"Average Rating: {rating:.2f} ({review_count} reviews)\n"
+            details_str += f"Completed Contracts: {completed_contracts}\n\n"
             details_str += "Skills:\n"
 
             if skills:
@@ -622,6 +1300,12 @@ class SkillLinkApp:
             else:
                 details_str += "  No skills listed\n"
 
+            total_earned = earnings[0] if earnings and earnings[0] else 0
+            details_str += f"\nTotal Earned: ${total_earned / 100:.2f}\n"
+            if monthly_earnings:
+                for month, earned, payment_count in monthly_earnings:
+                    details_str += f"  - {month:%Y-%m}: ${earned / 100:.2f} ({payment_count} payments)\n"
+
             self.freelancer_details_text.insert(1.0, details_str)
 
     def show_project_details(self, event):
@@ -662,12 +1346,13 @@ class SkillLinkApp:
             self.project_details_text.insert(1.0, details_str)
 
     def show_contract_milestones(self, event):
-        """Show milestones for selected contract"""
-        selection = self.contracts_tree.selection()
+        """Show milestones for the contract selected in the contracts or at-risk list"""
+        tree = event.widget
+        selection = tree.selection()
         if not selection:
             return
 
-        item = self.contracts_tree.item(selection[0])
+        item = tree.item(selection[0])
         contract_id = item['values'][0]
 
         # Get milestones
@@ -693,11 +1378,42 @@ class SkillLinkApp:
 
     # Utility methods
     def refresh_all_tabs(self):
-        """Refresh data in all tabs"""
+        """Refresh data in all tabs; progress is shown in the status bar"""
         self.load_freelancers()
         self.load_projects()
         self.load_contracts()
-        messagebox.showinfo("Refresh", "All data refreshed successfully")
+
+    def export_current_tab(self):
+        """Export the full table behind the current tab to CSV or JSONL"""
+        tab = self.notebook.tab(self.notebook.select(), "text")
+        export = TAB_EXPORTS.get(tab)
+        if not export:
+            messagebox.showwarning("Export", f"Nothing to export for the {tab} tab")
+            return
+
+        path = filedialog.asksaveasfilename(
+            title=f"Export {export}",
+            initialfile=f"{export}.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("CSV (gzip)", "*.csv.gz"),
+                       ("JSON Lines", "*.jsonl"), ("JSON Lines (gzip)", "*.jsonl.gz")])
+        if not path:
+            return
+
+        compress = path.endswith(".gz")
+        fmt = "jsonl" if (path[:-3] if compress else path).endswith(".jsonl") else "csv"
+
+        # Run the export on its own connection so large dumps don't block the UI
+        def run_export():
+            export_db = self.create_connection()
+            rows = export_db.export_to_file(export, path, fmt, compress) if export_db.connect() else None
+            export_db.disconnect()
+            if rows is None:
+                self.root.after(0, lambda: messagebox.showerror("Export", f"Failed to export {export}"))
+            else:
+                self.root.after(0, lambda: messagebox.showinfo("Export", f"Exported {rows} rows to {path}"))
+
+        threading.Thread(target=run_export, daemon=True).start()
 
     def show_db_settings(self):
         """Show database connection settings dialog"""
@@ -742,9 +1458,31 @@ class SkillLinkApp:
         ttk.Button(frame, text="Save", command=save_settings).grid(row=4, column=0, columnspan=2, pady=20)
 
     def reconnect_db(self):
-        """Reconnect to database"""
+        """Reconnect to database in the background, with the current settings"""
+        self.queries.cancel_all()
+        self.db_state = "connecting"
+        self.queries.submit("connect", "Reconnecting to database", self.reconnect_databases, self.on_reconnected)
+
+    def reconnect_databases(self, query_db):
+        """Background job: reopen the main connection and replace the query connection
+
+        Runs on the query worker, the only user of query_db, so closing it can't
+        pull it from under a running query. The replacement takes over under the
+        worker's lock, so cancels from the Tk thread reach the new connection.
+        """
+        query_db.disconnect()
         self.db.disconnect()
-        if self.db.connect():
+        replacement = self.create_connection()
+        with self.queries._lock:
+            self.queries.db = replacement
+            self.query_db = replacement
+        return self.connect_databases(replacement)
+
+    def on_reconnected(self, connected):
+        """Finish the background reconnect"""
+        self.db_state = "online" if connected else "offline"
+        self.update_freshness()
+        if connected:
             messagebox.showinfo("Success", "Reconnected to database successfully")
             self.refresh_all_tabs()
         else:
@@ -774,36 +1512,25 @@ class SkillLinkApp:
             messagebox.showerror("Invalid Input", "Client ID must be a number")
             return
 
+        self.queries.submit("client_dashboard", f"Loading dashboard for client {client_id}",
+                            lambda db: db.get_client_projects(client_id),
+                            lambda projects: self.show_client_dashboard(client_id, projects))
+
+    def show_client_dashboard(self, client_id, projects):
+        """Display a client's loaded projects"""
         # Clear existing data
         for item in self.client_projects_tree.get_children():
             self.client_projects_tree.delete(item)
 
-        # Get client's projects
-        query = """
-        SELECT p.project_id, p.title, p.budget_min_cents, p.budget_max_cents,
-               COUNT(pr.proposal_id) as proposal_count
-        FROM project p
-        LEFT JOIN proposal pr ON p.project_id = pr.project_id
-        WHERE p.client_id = %s
-        GROUP BY p.project_id, p.title, p.budget_min_cents, p.budget_max_cents
-        ORDER BY p.project_id DESC
-        """
-        projects = self.db.execute_query(query, (client_id,))
-
-        if projects:
+        if projects is None:
+            messagebox.showerror("Error", f"Loading the dashboard for client {client_id} failed or timed out")
+        elif projects:
             for project in projects:
-                proj_id, title, min_budget, max_budget, prop_count = project
+                proj_id, title, min_budget, max_budget, prop_count, in_progress = project
                 min_dollars = min_budget / 100 if min_budget else 0
                 max_dollars = max_budget / 100 if max_budget else 0
                 budget_str = f"${min_dollars:.2f} - ${max_dollars:.2f}"
-
-                # Check if project has accepted proposal
-                status_query = """
-                SELECT COUNT(*) FROM proposal
-                WHERE project_id = %s AND status = 'accepted'
-                """
-                accepted = self.db.execute_query(status_query, (proj_id,))
-                status = "In Progress" if accepted and accepted[0][0] > 0 else "Open"
+                status = "In Progress" if in_progress else "Open"
 
                 self.client_projects_tree.insert("", tk.END,
                                                   values=(proj_id, title, budget_str,
@@ -824,19 +1551,25 @@ class SkillLinkApp:
         # Create new window to show proposals
         proposals_window = tk.Toplevel(self.root)
         proposals_window.title(f"Proposals for Project {project_id}")
-        proposals_window.geometry("800x400")
+        proposals_window.geometry("1100x400")
 
         # Get proposals
-        proposals = self.db.get_proposals_by_project(project_id)
+        proposals = ProposalRows.from_result(self.db.get_proposals_by_project(project_id))
 
         if proposals:
+            # Bid statistics, filled in by show_analytics below
+            summary_var = tk.StringVar(value="Loading bid analytics...")
+            ttk.Label(proposals_window, textvariable=summary_var).pack(side=tk.TOP, anchor=tk.W,
+                                                                       padx=10, pady=(10, 0))
+
             # Create treeview
             tree_frame = ttk.Frame(proposals_window)
             tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
             vsb = ttk.Scrollbar(tree_frame, orient="vertical")
             tree = ttk.Treeview(tree_frame,
-                                columns=("Freelancer", "Bid", "Status", "Cover Letter"),
+                                columns=("Freelancer", "Bid", "Status", "Cover Letter", "Length",
+                                         "Percentile", "Budget", "Accepted"),
                                 show="headings",
                                 yscrollcommand=vsb.set)
             vsb.config(command=tree.yview)
@@ -845,17 +1578,66 @@ class SkillLinkApp:
             tree.heading("Bid", text="Bid Amount")
             tree.heading("Status", text="Status")
             tree.heading("Cover Letter", text="Cover Letter")
+            tree.heading("Length", text="Length")
+            tree.heading("Percentile", text="Bid Percentile")
+            tree.heading("Budget", text="vs Budget")
+            tree.heading("Accepted", text="Past Acceptance")
 
             tree.column("Freelancer", width=150)
             tree.column("Bid", width=100)
             tree.column("Status", width=100)
             tree.column("Cover Letter", width=400)
-
-            for proposal in proposals:
-                username, bid_amount, status, cover_letter = proposal
-                bid_dollars = bid_amount / 100 if bid_amount else 0
-                tree.insert("", tk.END,
-                            values=(username, f"${bid_dollars:.2f}", status, cover_letter))
+            tree.column("Length", width=70)
+            tree.column("Percentile", width=100)
+            tree.column("Budget", width=80)
+            tree.column("Accepted", width=120)
+            tree.bind("<Double-1>", self.show_cover_letter)
+
+            for index, proposal_id in enumerate(proposals.column("proposal_id")):
+                tree.insert("", tk.END, iid=proposal_id, values=proposals.display(index)[1:])
+
+            def show_analytics(analytics):
+                if not proposals_window.winfo_exists():
+                    return
+                if analytics is None:
+                    summary_var.set("Bid analytics unavailable")
+                    return
+                summary, bids = analytics
+                summary_var.set(format_bid_summary(summary))
+                for proposal_id, _, _, percentile, position, accepted, decided in bids:
+                    if tree.exists(proposal_id):
+                        tree.set(proposal_id, "Percentile", f"{percentile:.0%}")
+                        tree.set(proposal_id, "Budget", position)
+                        tree.set(proposal_id, "Accepted",
+                                 f"{accepted}/{decided} ({accepted / decided:.0%})" if decided else "no history")
+
+            self.queries.submit(f"bid_analytics:{project_id}", f"Loading bid analytics for project {project_id}",
+                                lambda db: db.get_bid_analytics(project_id) if is_connected(db) else None,
+                                show_analytics)
+
+            def accept_selected():
+                selected = tree.selection()
+                if not selected:
+                    messagebox.showwarning("Selection Required", "Please select a proposal to accept",
+                                           parent=proposals_window)
+                    return
+                username = tree.item(selected[0])['values'][0]
+                if not messagebox.askyesno("Confirm Accept",
+                                           f"Accept the proposal from '{username}'?\n"
+                                           "All other pending proposals for this project will be rejected.",
+                                           parent=proposals_window):
+                    return
+                contract_id = self.db.accept_proposal(int(selected[0]))
+                if contract_id is None:
+                    messagebox.showerror("Error", "Failed to accept proposal", parent=proposals_window)
+                    return
+                messagebox.showinfo("Success", f"Proposal accepted, contract {contract_id} created",
+                                    parent=proposals_window)
+                proposals_window.destroy()
+                self.load_contracts()
+
+            ttk.Button(proposals_window, text="Accept Selected Proposal",
+                       command=accept_selected).pack(side=tk.BOTTOM, pady=(0, 10))
 
             tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
             vsb.pack(side=tk.RIGHT, fill=tk.Y)
@@ -863,38 +1645,66 @@ class SkillLinkApp:
             ttk.Label(proposals_window, text="No proposals for this project",
                       font=("Arial", 12)).pack(pady=50)
 
+    def show_cover_letter(self, event):
+        """Open the full cover letter of the double-clicked proposal, fetched once and cached"""
+        tree = event.widget
+        selection = tree.selection()
+        if not selection:
+            return
+        proposal_id = int(selection[0])
+        freelancer = tree.item(selection[0])['values'][0]
+        parent = tree.winfo_toplevel()
+
+        letter = self.cover_letters.get(proposal_id)
+        if letter is not None:
+            self.cover_letters.move_to_end(proposal_id)
+            self.open_cover_letter_window(parent, proposal_id, freelancer, letter)
+            return
+
+        def loaded(letter):
+            if letter is None:
+                messagebox.showerror("Error", f"Loading the cover letter of proposal {proposal_id} failed",
+                                     parent=parent)
+                return
+            self.cover_letters[proposal_id] = letter
+            if len(self.cover_letters) > COVER_LETTER_CACHE_SIZE:
+                self.cover_letters.popitem(last=False)
+            if parent.winfo_exists():
+                self.open_cover_letter_window(parent, proposal_id, freelancer, letter)
+
+        self.queries.submit("cover_letter", f"Loading cover letter of proposal {proposal_id}",
+                            lambda db: db.get_proposal_cover_letter(proposal_id) if is_connected(db) else None,
+                            loaded)
+
+    def open_cover_letter_window(self, parent, proposal_id, freelancer, letter):
+        """Show a cover letter in its own window"""
+        window = tk.Toplevel(parent)
+        window.title(f"Cover Letter - Proposal {proposal_id} by {freelancer}")
+        window.geometry("600x400")
+
+        text = scrolledtext.ScrolledText(window, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        text.insert(1.0, letter or "(no cover letter)")
+        text.config(state=tk.DISABLED)
+
     # Admin Panel methods
     def load_admin_stats(self):
         """Load platform statistics for admin"""
         self.stats_text.delete(1.0, tk.END)
 
         # Get various statistics
-        stats = []
-
-        # Total users
-        total_users = self.db.execute_query("SELECT COUNT(*) FROM users")
-        stats.append(f"Total Users: {total_users[0][0] if total_users else 0}")
-
-        # Users by role
-        clients = self.db.execute_query("SELECT COUNT(*) FROM users WHERE role = 'client'")
-        freelancers = self.db.execute_query("SELECT COUNT(*) FROM users WHERE role = 'freelancer'")
-        admins = self.db.execute_query("SELECT COUNT(*) FROM users WHERE role = 'admin'")
-        stats.append(f"  - Clients: {clients[0][0] if clients else 0}")
-        stats.append(f"  - Freelancers: {freelancers[0][0] if freelancers else 0}")
-        stats.append(f"  - Admins: {admins[0][0] if admins else 0}")
+        row = self.db.get_admin_stats()
+        total_users, clients, freelancers, admins, total_projects, active_contracts, released = \
+            row if row else (0, 0, 0, 0, 0, 0, 0)
 
-        # Total projects
-        total_projects = self.db.execute_query("SELECT COUNT(*) FROM project")
-        stats.append(f"\nTotal Projects: {total_projects[0][0] if total_projects else 0}")
-
-        # Active contracts
-        active_contracts = self.db.execute_query("SELECT COUNT(*) FROM contract WHERE status = 'active'")
-        stats.append(f"Active Contracts: {active_contracts[0][0] if active_contracts else 0}")
-
-        # Total payments
-        total_payments = self.db.execute_query("SELECT SUM(amount_cents) FROM payment WHERE status = 'released'")
-        total_amount = total_payments[0][0] if total_payments and total_payments[0][0] else 0
-        stats.append(f"Total Payments Released: ${total_amount / 100:.2f}")
+        stats = []
+        stats.append(f"Total Users: {total_users}")
+        stats.append(f"  - Clients: {clients}")
+        stats.append(f"  - Freelancers: {freelancers}")
+        stats.append(f"  - Admins: {admins}")
+        stats.append(f"\nTotal Projects: {total_projects}")
+        stats.append(f"Active Contracts: {active_contracts}")
+        stats.append(f"Total Payments Released: ${released / 100:.2f}")
 
         self.stats_text.insert(1.0, "\n".join(stats))
 
@@ -959,7 +1769,11 @@ class SkillLinkApp:
     def on_closing(self):
         """Handle application closing"""
         if messagebox.askokcancel("Quit", "Do you want to quit SkillLink?"):
+            self.queries.cancel_all()
+            self.query_db.disconnect()
             self.db.disconnect()
+            if self.snapshot:
+                self.snapshot.close()
             self.root.destroy()
 
 
@@ -0,0 +1,209 @@
+"""
+Offline snapshot module for SkillLink application
+Keeps the read-mostly lists in a local SQLite file so the app can show them before (or without) PostgreSQL
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from typing import List, Tuple, Optional, Dict, Any
+
+from psycopg2 import Error
+
+# Bump when SNAPSHOT_VIEWS changes shape; older snapshot files are then rebuilt
+SCHEMA_VERSION = 3
+
+# The transaction horizon of this sync and the delete counters of the tracked tables.
+# Every row written by a transaction at or after the horizon may be unseen by this
+# snapshot, so the next sync fetches rows with change_xid >= it.
+WATERMARK_QUERY = """
+SELECT pg_snapshot_xmin(pg_current_snapshot())::text,
+       COALESCE((SELECT json_object_agg(table_name, version) FROM table_delete_version), '{}')
+"""
+
+# Per view: the PostgreSQL tables it reads, its SQLite columns (key first), the
+# delta query and how get_all_* orders it. A delta query returns the view's rows
+# whose source rows changed since %(since)s, plus a last column telling whether
+# the row belongs in the view (inactive contracts drop out of "contracts").
+SNAPSHOT_VIEWS: Dict[str, Dict[str, Any]] = {
+    # The directory only changes when refreshed, and every refresh bumps its delete
+    # counter, so the list is reloaded whole after a refresh and nothing is new otherwise
+    "freelancers": {
+        "tables": ("freelancer_directory",),
+        "columns": ("user_id", "username", "headline", "rate_per_hour", "avg_rating", "reputation_score",
+                    "skills", "review_count", "completed_contracts", "earned_cents"),
+        "delta": """
+        SELECT user_id, username, headline, rate_per_hour, avg_rating::text, reputation_score,
+               skills, review_count, completed_contracts, earned_cents, true
+        FROM freelancer_directory
+        WHERE %(since)s = '0'
+        """,
+        "order": "reputation_score DESC, user_id DESC",
+        "convert": {"avg_rating": Decimal},
+    },
+    "projects": {
+        "tables": ("project",),
+        "columns": ("project_id", "title", "budget_min_cents", "budget_max_cents", "deadline"),
+        "delta": """
+        SELECT project_id, title, budget_min_cents, budget_max_cents, deadline::text, true
+        FROM project
+        WHERE change_xid >= %(since)s::xid8
+        """,
+        "order": "deadline IS NULL, deadline, project_id",
+        "convert": {"deadline": date.fromisoformat},
+    },
+    "contracts": {
+        "tables": ("contract",),
+        "columns": ("contract_id", "client_id", "freelancer_id", "total_amount_cents",
+                    "paid_amount_cents", "remaining_amount_cents", "status"),
+        "delta": """
+        SELECT contract_id, client_id, freelancer_id, total_amount_cents,
+               paid_amount_cents, remaining_amount_cents, status, status = 'active'
+        FROM contract
+        WHERE change_xid >= %(since)s::xid8
+        """,
+        "order": "contract_id",
+        "convert": {},
+    },
+    "skills": {
+        "tables": ("skill",),
+        "columns": ("skill_id", "skill_name", "skill_description"),
+        "delta": """
+        SELECT skill_id, skill_name, skill_description, true
+        FROM skill
+        WHERE change_xid >= %(since)s::xid8
+        """,
+        "order": "skill_name",
+        "convert": {},
+    },
+}
+
+
+class LocalSnapshot:
+    """SQLite copy of the SNAPSHOT_VIEWS lists, reconciled incrementally with PostgreSQL
+
+    rows() reads a view locally (no network); sync() brings one view up to date
+    using the change watermarks kept by the change_xid columns and the
+    table_delete_version counters (see SQL_QUERIES_DATABASE.sql). Safe to share
+    between the Tk thread and a background thread.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the snapshot file"""
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._create_schema()
+
+    @classmethod
+    def open(cls, path: str) -> Optional["LocalSnapshot"]:
+        """Open a snapshot, or None (with a message) if the file can't be used"""
+        try:
+            return cls(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error opening local snapshot {path}: {e}")
+            return None
+
+    def _create_schema(self):
+        """(Re)create the snapshot tables, dropping any older layout"""
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS snapshot_meta")
+            self.connection.execute(
+                "CREATE TABLE snapshot_meta (view TEXT PRIMARY KEY, watermark TEXT NOT NULL, "
+                "delete_versions TEXT NOT NULL, synced_at REAL NOT NULL)")
+            for view, spec in SNAPSHOT_VIEWS.items():
+                key, *rest = spec["columns"]
+                self.connection.execute(f"DROP TABLE IF EXISTS {view}")
+                self.connection.execute(
+                    f"CREATE TABLE {view} ({key} INTEGER PRIMARY KEY, {', '.join(rest)})")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """Close the snapshot file"""
+        with self._lock:
+            self.connection.close()
+
+    def synced_at(self, view: str) -> Optional[float]:
+        """Unix time of the view's last successful sync, None if it never synced"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT synced_at FROM snapshot_meta WHERE view = ?", (view,)).fetchone()
+        return row[0] if row else None
+
+    def rows(self, view: str) -> Optional[List[Tuple]]:
+        """The view's rows in the same shape and order as DatabaseConnection returns them;
+        None if the view was never synced"""
+        spec = SNAPSHOT_VIEWS[view]
+        columns = spec["columns"]
+        converters = [spec["convert"].get(column) for column in columns]
+        with self._lock:
+            if not self.connection.execute(
+                    "SELECT 1 FROM snapshot_meta WHERE view = ?", (view,)).fetchone():
+                return None
+            stored = self.connection.execute(
+                f"SELECT {', '.join(columns)} FROM {view} ORDER BY {spec['order']}").fetchall()
+        if not any(converters):
+            return stored
+        return [tuple(value if convert is None or value is None else convert(value)
+                      for convert, value in zip(converters, row))
+                for row in stored]
+
+    def sync(self, db, view: str) -> Optional[bool]:
+        """Bring a view up to date from PostgreSQL over db (a DatabaseConnection)
+
+        Fetches only the rows changed since the last sync, or the whole view on
+        the first sync and after deletes in its tables. Returns True if the local
+        copy changed, False if it was already current, None on error.
+        """
+        spec = SNAPSHOT_VIEWS[view]
+        with self._lock:
+            meta = self.connection.execute(
+                "SELECT watermark, delete_versions FROM snapshot_meta WHERE view = ?", (view,)).fetchone()
+
+        # One REPEATABLE READ transaction so the watermark matches the rows read
+        try:
+            db.connection.rollback()
+            db.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            db.cursor.execute(WATERMARK_QUERY)
+            watermark, all_versions = db.cursor.fetchone()
+            versions = {table: all_versions.get(table, 0) for table in spec["tables"]}
+            full = meta is None or json.loads(meta[1]) != versions
+            db.cursor.execute(spec["delta"], {"since": "0" if full else meta[0]})
+            delta = db.cursor.fetchall()
+            db.connection.commit()
+        except Error as e:
+            print(f"Error syncing {view} snapshot: {e}")
+            if not db.connection.closed:
+                db.connection.rollback()
+            return None
+
+        columns = spec["columns"]
+        key = columns[0]
+        upsert = (f"INSERT INTO {view} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                  f"ON CONFLICT ({key}) DO UPDATE SET "
+                  + ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+                  + " WHERE " + " OR ".join(f"{column} IS NOT excluded.{column}" for column in columns[1:]))
+        try:
+            with self._lock, self.connection:
+                before = self.connection.total_changes
+                if full:
+                    self.connection.execute(f"DELETE FROM {view}")
+                self.connection.executemany(upsert, (row[:-1] for row in delta if row[-1]))
+                self.connection.executemany(f"DELETE FROM {view} WHERE {key} = ?",
+                                            ((row[0],) for row in delta if not row[-1]))
+                changed = full or self.connection.total_changes != before
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO snapshot_meta (view, watermark, delete_versions, synced_at) "
+                    "VALUES (?, ?, ?, ?)", (view, watermark, json.dumps(versions, sort_keys=True), time.time()))
+            return changed
+        except sqlite3.Error as e:
+            print(f"Error writing {view} snapshot: {e}")
+            return None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test read-replica routing for SkillLink application
+
+Needs DB_CONFIG pointing at a primary and DB_REPLICAS at one or more
+streaming standbys of it (see README, "Read Replicas").
+"""
+
+import time
+from config import DB_CONFIG, DB_REPLICAS, REPLICA_MAX_LAG_SECONDS
+from database import DatabaseConnection
+
+SERVER_QUERY = "SELECT inet_server_port(), pg_is_in_recovery()"
+
+
+def test_replication():
+    """Check that reads go to replicas and that a session reads its own writes"""
+    print("=" * 60)
+    print("SkillLink Read Replica Routing Test")
+    print("=" * 60)
+
+    if not DB_REPLICAS:
+        print("\n⚠ No replicas configured in config.py (DB_REPLICAS is empty)")
+        return False
+
+    db = DatabaseConnection(**DB_CONFIG, replicas=DB_REPLICAS,
+                            max_replica_lag=REPLICA_MAX_LAG_SECONDS)
+    if not db.connect():
+        print("\n✗ Could not connect to the primary")
+        return False
+
+    ok = True
+
+    # 1. Reads are load balanced over the replicas
+    served_by = {}
+    for _ in range(10 * len(DB_REPLICAS)):
+        port, in_recovery = db.execute_read_query(SERVER_QUERY)[0]
+        served_by[(port, in_recovery)] = served_by.get((port, in_recovery), 0) + 1
+    print("\nReads served by:")
+    for (port, in_recovery), count in sorted(served_by.items()):
+        print(f"  port {port} ({'replica' if in_recovery else 'primary'}): {count}")
+    if not any(in_recovery for _, in_recovery in served_by):
+        print("✗ No read reached a replica")
+        ok = False
+    else:
+        print("✓ Reads are routed to replicas")
+
+    # 2. Read-your-writes: a rate change is visible to the very next read
+    details = db.get_freelancer_details(5)
+    original_rate = details[4]
+    failures = 0
+    start = time.perf_counter()
+    for i in range(1, 51):
+        db.execute_update("UPDATE freelancer_profile SET rate_per_hour = %s WHERE user_id = 5",
+                          (original_rate + i,))
+        if db.get_freelancer_details(5)[4] != original_rate + i:
+            failures += 1
+    elapsed = time.perf_counter() - start
+    db.execute_update("UPDATE freelancer_profile SET rate_per_hour = %s WHERE user_id = 5",
+                      (original_rate,))
+
+    if failures:
+        print(f"\n✗ {failures}/50 reads missed the session's own write")
+        ok = False
+    else:
+        print(f"\n✓ 50/50 write-then-read cycles saw their own write ({elapsed:.2f}s)")
+
+    db.disconnect()
+    return ok
+
+
+if __name__ == "__main__":
+    test_replication()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test sharded mode for SkillLink application
+
+Needs DB_SHARDS in config.py pointing at several local databases that were
+prepared with jobs/setup_shards.py (see README, "Sharded Mode").
+"""
+
+from datetime import date
+from config import DB_SHARDS
+from sharding import ShardedDatabaseConnection, shard_index
+
+
+def test_sharding():
+    """Check routing, scatter-gather ordering and replicated tables"""
+    print("=" * 60)
+    print("SkillLink Sharded Mode Test")
+    print("=" * 60)
+
+    if not DB_SHARDS:
+        print("\n⚠ No shards configured in config.py (DB_SHARDS is empty)")
+        return False
+
+    db = ShardedDatabaseConnection(DB_SHARDS)
+    if not db.connect():
+        print("\n✗ Could not connect to every shard")
+        return False
+
+    ok = True
+    shard_count = len(db.shards)
+
+    # 1. Every project lives on the shard its client hashes to
+    print(f"\nProjects per shard ({shard_count} shards):")
+    for index, shard in enumerate(db.shards):
+        rows = shard.execute_query("SELECT client_id, COUNT(*) FROM project GROUP BY client_id")
+        misplaced = [client_id for client_id, _ in rows if shard_index(client_id, shard_count) != index]
+        print(f"  shard {index}: {sum(count for _, count in rows)} project(s)")
+        if misplaced:
+            print(f"  ✗ clients {misplaced} do not belong on shard {index}")
+            ok = False
+
+    # 2. Scatter-gather results are complete and in ORDER BY order
+    projects = db.get_all_projects()
+    expected = sum(shard.execute_query("SELECT COUNT(*) FROM project")[0][0] for shard in db.shards)
+    keys = [(deadline is None, deadline or date.min, project_id)
+            for project_id, _, _, _, deadline in projects]
+    if len(projects) != expected or keys != sorted(keys):
+        print("\n✗ get_all_projects is incomplete or out of order")
+        ok = False
+    else:
+        print(f"\n✓ get_all_projects merged {len(projects)} projects in deadline order")
+
+    contracts = db.get_active_contracts()
+    if [row[0] for row in contracts] != sorted(row[0] for row in contracts):
+        print("✗ get_active_contracts is out of order")
+        ok = False
+    else:
+        print(f"✓ get_active_contracts merged {len(contracts)} contracts")
+
+    # 3. Per-client and per-id routing
+    routed = True
+    for project_id, *_ in projects[:5]:
+        details = db.get_project_details(project_id)
+        if not details or details[0] != project_id:
+            print(f"✗ get_project_details({project_id}) was not routed to its shard")
+            routed = False
+    if routed:
+        print("✓ Project lookups routed to their shards")
+    else:
+        ok = False
+
+    # 4. Replicated tables match on every shard
+    counts = [shard.execute_query("SELECT COUNT(*) FROM users")[0][0] for shard in db.shards]
+    if len(set(counts)) != 1:
+        print(f"✗ users differ between shards: {counts}")
+        ok = False
+    else:
+        print(f"✓ users replicated to every shard ({counts[0]} rows)")
+
+    stats = db.get_admin_stats()
+    print(f"\nAdmin stats: {stats[0]} users, {stats[4]} projects, "
+          f"{stats[5]} active contracts, ${stats[6] / 100:.2f} released")
+
+    db.disconnect()
+    return ok
+
+
+if __name__ == "__main__":
+    test_sharding()